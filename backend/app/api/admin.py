@@ -373,7 +373,12 @@ ADMIN_PANEL_HTML = """
             document.getElementById('lfMode').value = set.ordering_mode;
         }
         async function lfRunNow() {
-            const r = await (await fetch('/admin/api/legal-feed/run', {method:'POST'})).json();
+            let r = await (await fetch('/admin/api/legal-feed/run', {method:'POST'})).json();
+            while (r.status === 'queued' || r.status === 'running') {
+                showMessage('lfMessage', `Run #${r.id} ${r.status} (${r.stage}): ${r.total_ingested} new item(s) so far`, 'success');
+                await new Promise(resolve => setTimeout(resolve, 2000));
+                r = await (await fetch(`/admin/api/legal-feed/runs/${r.id}`)).json();
+            }
             showMessage('lfMessage', `Run ${r.status}: ${r.total_ingested} new item(s), ${r.enriched || 0} enriched, ${r.enrich_failed || 0} failed`, 'success');
             lfLoad();
         }
@@ -386,7 +391,7 @@ ADMIN_PANEL_HTML = """
             const r = await (await fetch('/admin/api/legal-feed/backfill',
                 {method:'POST', headers:{'Content-Type':'application/json'},
                  body: JSON.stringify({limit: 100})})).json();
-            showMessage('lfMessage', `Backfill: attempted ${r.attempted}, enriched ${r.enriched}, failed ${r.failed}`, 'success');
+            showMessage('lfMessage', `Backfill: attempted ${r.attempted}, enriched ${r.enriched}, failed ${r.failed}, ${r.avoided_calls || 0} API call(s) served from cache`, 'success');
             lfLoad();
         }
         async function lfRecompute() {
@@ -501,10 +506,12 @@ from datetime import timedelta
 from app.models.models import (
     LegalFeedSource, LegalFeedItem, LegalFeedRun, LegalFeedSetting,
 )
-from app.services.legal_feed.ingest import run_ingestion, enrich_backlog
-from app.services.legal_feed.events import recompute_behavior_embedding
+from app.services.legal_feed import ingest
+from app.services.legal_feed.ingest import enrich_backlog
+from app.services.legal_feed import behavior_batch
 from app.services.legal_feed.seed import seed_sources
 from app.services.legal_feed.query import get_ordering_mode
+from app.services.legal_feed import clusters, for_you, read_cache, index as vector_index
 
 ALLOWED_ORDERING = {'recency', 'weighted'}
 
@@ -516,16 +523,32 @@ def lf_runs():
     return jsonify({'runs': [r.to_dict() for r in runs]})
 
 
+@bp.route('/api/legal-feed/runs/<int:run_id>', methods=['GET'])
+@requires_admin_auth
+def lf_run_status(run_id):
+    """Progress for polling. A run left orphaned by a dead worker is resumed."""
+    run = db.session.get(LegalFeedRun, run_id)
+    if run is None:
+        return jsonify({'error': 'Run not found'}), 404
+    if ingest.is_stale(run):
+        ingest.dispatch(run.id)
+    return jsonify(run.to_dict())
+
+
 @bp.route('/api/legal-feed/run', methods=['POST'])
 @requires_admin_auth
 def lf_run_now():
-    return jsonify(run_ingestion('manual'))
+    """Queue a run (or return the one in progress); poll /runs/<id>."""
+    return jsonify(ingest.start_run('manual').to_dict()), 202
 
 
 @bp.route('/api/legal-feed/seed', methods=['POST'])
 @requires_admin_auth
 def lf_seed():
-    return jsonify({'inserted': seed_sources()})
+    inserted = seed_sources()
+    read_cache.bump(read_cache.CONFIG)
+    db.session.commit()
+    return jsonify({'inserted': inserted})
 
 
 @bp.route('/api/legal-feed/backfill', methods=['POST'])
@@ -535,14 +558,32 @@ def lf_backfill():
     return jsonify(enrich_backlog(limit=limit))
 
 
+@bp.route('/api/legal-feed/retention', methods=['POST'])
+@requires_admin_auth
+def lf_retention():
+    from app.services.legal_feed.retention import run_retention
+    return jsonify(run_retention())
+
+
+@bp.route('/api/legal-feed/cache', methods=['GET'])
+@requires_admin_auth
+def lf_cache_stats():
+    from app.services.legal_feed import cache
+    return jsonify(cache.stats())
+
+
+@bp.route('/api/legal-feed/embedding-storage', methods=['GET'])
+@requires_admin_auth
+def lf_embedding_storage():
+    from app.services.legal_feed.embedding_report import storage_report
+    limit = request.args.get('limit', 500, type=int)
+    return jsonify(storage_report(limit=max(1, min(limit, 5000))))
+
+
 @bp.route('/api/legal-feed/recompute-behavior', methods=['POST'])
 @requires_admin_auth
 def lf_recompute_behavior():
-    from app.models.models import LegalFeedPreference
-    user_ids = [p.user_id for p in LegalFeedPreference.query.all()]
-    for uid in user_ids:
-        recompute_behavior_embedding(uid)
-    return jsonify({'recomputed': len(user_ids)})
+    return jsonify({'recomputed': behavior_batch.recompute_all()})
 
 
 @bp.route('/api/legal-feed/sources', methods=['GET'])
@@ -578,6 +619,7 @@ def lf_create_source():
         weight=int(data.get('weight', 0)),
     )
     db.session.add(src)
+    read_cache.bump(read_cache.CONFIG)
     db.session.commit()
     return jsonify(src.to_dict()), 201
 
@@ -589,10 +631,14 @@ def lf_update_source(source_id):
     data = request.get_json() or {}
     if 'enabled' in data:
         src.enabled = bool(data['enabled'])
+        if src.enabled:  # re-enabling is an explicit retry: close the breaker
+            src.failure_count = 0
+            src.backoff_until = None
     if 'weight' in data:
         src.weight = int(data['weight'])
     if 'court' in data:
         src.court = data['court']
+    read_cache.bump(read_cache.CONFIG)
     db.session.commit()
     return jsonify(src.to_dict())
 
@@ -611,7 +657,12 @@ def lf_hide_item(item_id):
     item = LegalFeedItem.query.get_or_404(item_id)
     data = request.get_json() or {}
     item.hidden = bool(data.get('hidden', True))
+    if item.hidden:
+        clusters.promote(item)
+    for_you.invalidate_all()
+    read_cache.bump(read_cache.CONTENT)
     db.session.commit()
+    vector_index.mark_stale()
     return jsonify(item.to_dict())
 
 
@@ -634,5 +685,7 @@ def lf_put_settings():
         db.session.add(setting)
     else:
         setting.ordering_mode = mode
+    db.session.flush()
+    read_cache.bump(read_cache.CONFIG)
     db.session.commit()
     return jsonify(setting.to_dict())
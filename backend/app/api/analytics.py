@@ -4,6 +4,7 @@ Queries are simple GROUP BYs that Postgres answers in <50ms at our scale;
 the previous DuckDB cache layer added cold-start sync overhead with no
 real benefit on Cloud Run (scale-to-zero wipes /tmp anyway).
 """
+import os
 from datetime import datetime, timedelta
 from decimal import Decimal
 
@@ -11,8 +12,11 @@ from flask import Blueprint, g, jsonify, request
 from sqlalchemy import text
 
 from app.middleware.jwt_auth import jwt_required
+from app.middleware.firm_context import require_permission
 from app.models.auth import User
 from app.models.models import db
+from app.services import analytics_snapshot
+from app.services.document_storage import StorageError
 
 bp = Blueprint('analytics', __name__)
 
@@ -139,3 +143,41 @@ def get_aging_analysis():
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+# ---------------------------------------------------------------------------
+# Parquet snapshots (see services/analytics_snapshot)
+# ---------------------------------------------------------------------------
+
+@bp.route('/snapshot', methods=['GET'])
+@jwt_required
+@require_permission('firm_settings.read')
+def get_snapshot_manifest():
+    """Manifest with signed URLs; ?since_version=N lists only newer partitions."""
+    since_version = request.args.get('since_version', default=0, type=int)
+    try:
+        manifest = analytics_snapshot.manifest_with_urls(g.firm_id, since_version=since_version)
+    except StorageError as e:
+        return jsonify({'error': str(e)}), 502
+    if manifest is None:
+        return jsonify({'error': 'No snapshot yet'}), 404
+    return jsonify(manifest)
+
+
+@bp.route('/snapshot', methods=['POST'])
+@jwt_required
+@require_permission('firm_settings.update')
+def run_firm_snapshot():
+    """Start an incremental snapshot of this firm (?full=1 rebuilds everything)."""
+    analytics_snapshot.dispatch(g.firm_id, full=request.args.get('full') == '1')
+    return jsonify({'status': 'started'}), 202
+
+
+@bp.route('/snapshots/run', methods=['POST'])
+def run_all_snapshots():
+    """Secret-gated endpoint for Cloud Scheduler: snapshot every firm."""
+    expected = os.getenv('CRON_SECRET')
+    if not expected or request.headers.get('X-Cron-Secret') != expected:
+        return jsonify({'error': 'Unauthorized'}), 401
+    analytics_snapshot.dispatch(full=request.args.get('full') == '1')
+    return jsonify({'status': 'started'}), 202
@@ -4,7 +4,7 @@ from app.models.models import db
 from app.models.case import CaseFile, CaseEvent, CaseDocument
 from app.middleware.jwt_auth import jwt_required
 from app.middleware.firm_context import require_permission
-from app.services import document_storage
+from app.services import document_storage, case_summary
 from app.case.documents import (
     DEFAULT_DOC_TYPE, MAX_DOCUMENT_BYTES, is_valid_doc_type,
     is_allowed_filename, extension_of,
@@ -84,6 +84,7 @@ def upload_document(case_id):
         description=request.form.get('description'),
     )
     db.session.add(doc)
+    case_summary.refresh(case_id)
     db.session.commit()
     return jsonify(doc.to_dict()), 201
 
@@ -147,5 +148,6 @@ def delete_document(doc_id):
     # Exhibit rows that referenced this file (linked_document_id) keep their record.
     CaseDocument.query.filter_by(linked_document_id=doc.id).update({'linked_document_id': None})
     db.session.delete(doc)
+    case_summary.refresh(doc.case_file_id)
     db.session.commit()
     return jsonify({'message': 'Document deleted'})
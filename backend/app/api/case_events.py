@@ -7,6 +7,7 @@ from app.middleware.jwt_auth import jwt_required
 from app.middleware.firm_context import require_permission
 from app.case.stages import is_valid_event_kind
 from app.services.case_service import recompute_next_hearing_date
+from app.services import case_summary
 
 bp = Blueprint('case_events', __name__)
 
@@ -61,6 +62,7 @@ def add_event(case_id):
     db.session.add(event)
     db.session.flush()
     recompute_next_hearing_date(case_file)
+    case_summary.refresh(case_file.id)
     db.session.commit()
     return jsonify(event.to_dict()), 201
 
@@ -90,6 +92,7 @@ def update_event(event_id):
     if 'outcome' in data:
         event.outcome = data['outcome']
     recompute_next_hearing_date(event.case_file)
+    case_summary.refresh(event.case_file_id)
     db.session.commit()
     return jsonify(event.to_dict())
 
@@ -111,6 +114,7 @@ def delete_event(event_id):
     db.session.delete(event)
     db.session.flush()
     recompute_next_hearing_date(case_file)
+    case_summary.refresh(case_file.id)
     db.session.commit()
     return jsonify({'message': 'Event deleted'})
 
@@ -157,6 +161,7 @@ def record_proceedings(case_id):
     db.session.add(new_ev)
     db.session.flush()
     recompute_next_hearing_date(case_file)
+    case_summary.refresh(case_file.id)
     db.session.commit()
     return jsonify({'case_file': case_file.to_dict(), 'next_event': new_ev.to_dict()})
 
@@ -175,5 +180,6 @@ def set_next_date(case_id):
     _hearing_or_create_next(case_id, next_date, data.get('purpose'))
     db.session.flush()
     recompute_next_hearing_date(case_file)
+    case_summary.refresh(case_file.id)
     db.session.commit()
     return jsonify(case_file.to_dict())
@@ -7,6 +7,8 @@ from app.models.case import CaseFile, CaseExpense
 from app.middleware.jwt_auth import jwt_required
 from app.middleware.firm_context import require_permission
 from app.case.expenses import DEFAULT_EXPENSE_CATEGORY, is_valid_expense_category
+from app.services.register_export import ExportError, export_response
+from app.services import case_summary
 
 bp = Blueprint('case_expenses', __name__)
 
@@ -19,15 +21,42 @@ def _case_or_404(case_id):
     return CaseFile.query.filter_by(id=case_id, firm_id=g.firm_id).first()
 
 
+def _case_expenses(case_id):
+    return (CaseExpense.query.filter_by(case_file_id=case_id)
+            .order_by(CaseExpense.expense_date.desc(), CaseExpense.id.desc()))
+
+
 @bp.route('/case-files/<int:case_id>/expenses', methods=['GET'])
 @jwt_required
 @require_permission('case_files.read')
 def list_expenses(case_id):
     if not _case_or_404(case_id):
         return jsonify({'error': 'Case not found'}), 404
-    rows = (CaseExpense.query.filter_by(case_file_id=case_id)
-            .order_by(CaseExpense.expense_date.desc(), CaseExpense.id.desc()).all())
-    return jsonify([r.to_dict() for r in rows])
+    return jsonify([r.to_dict() for r in _case_expenses(case_id).all()])
+
+
+# Register export columns: (header, column).
+EXPENSE_EXPORT_COLUMNS = [
+    ('Date', CaseExpense.expense_date),
+    ('Category', CaseExpense.category),
+    ('Description', CaseExpense.description),
+    ('Amount', CaseExpense.amount),
+]
+
+
+@bp.route('/case-files/<int:case_id>/expenses/export', methods=['GET'])
+@jwt_required
+@require_permission('case_files.read')
+def export_expenses(case_id):
+    """Stream a case's expenses as CSV or XLSX (?format=csv|xlsx)."""
+    if not _case_or_404(case_id):
+        return jsonify({'error': 'Case not found'}), 404
+    try:
+        return export_response(request.args.get('format'), f'case-{case_id}-expenses',
+                               EXPENSE_EXPORT_COLUMNS, _case_expenses(case_id),
+                               sheet_title='Expenses')
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
 
 
 @bp.route('/case-files/<int:case_id>/expenses', methods=['POST'])
@@ -49,6 +78,7 @@ def add_expense(case_id):
         description=description, category=category,
         amount=data.get('amount') or 0, created_by_user_id=g.user.id)
     db.session.add(exp)
+    case_summary.refresh(case_id)
     db.session.commit()
     return jsonify(exp.to_dict()), 201
 
@@ -71,6 +101,7 @@ def update_expense(expense_id):
         exp.amount = data['amount'] or 0
     if 'expense_date' in data:
         exp.expense_date = _parse_date(data['expense_date'])
+    case_summary.refresh(exp.case_file_id)
     db.session.commit()
     return jsonify(exp.to_dict())
 
@@ -83,6 +114,7 @@ def delete_expense(expense_id):
     if not exp:
         return jsonify({'error': 'Expense not found'}), 404
     db.session.delete(exp)
+    case_summary.refresh(exp.case_file_id)
     db.session.commit()
     return jsonify({'message': 'Expense deleted'})
 
@@ -1,16 +1,19 @@
 """Case File API — firm-scoped, gated by the case_files RBAC module."""
 from datetime import datetime
 from flask import Blueprint, request, jsonify, g
-from sqlalchemy.orm import selectinload
+from sqlalchemy import insert
+from sqlalchemy.orm import contains_eager, selectinload
 from app.models.models import db, Client
 from app.models.case import CaseFile, CaseStageChange
 from app.middleware.jwt_auth import jwt_required
 from app.middleware.firm_context import require_permission
 from app.utils.pagination import pagination_requested, get_pagination_args, paginate_query
 from app.services.case_service import generate_case_number, record_stage_change
+from app.services.register_export import ExportError, export_response
+from app.services import case_board as board, case_order
 from app.case.stages import (
     STAGES, EVENT_KINDS, PRIORITIES, STAGE_GUIDES, STAGE_FLOW, HEARING_PURPOSES,
-    is_valid_stage, is_valid_priority,
+    DEFAULT_STAGE, is_valid_stage, is_valid_priority,
 )
 from app.case.documents import DOC_TYPES
 from app.case.expenses import EXPENSE_CATEGORIES
@@ -18,6 +21,8 @@ from app.case.exhibits import EXHIBIT_STATUSES, EXHIBIT_PARTIES
 
 bp = Blueprint('case_files', __name__)
 
+MAX_REORDER_MOVES = 200
+
 
 def _parse_date(value):
     return datetime.fromisoformat(value).date() if value else None
@@ -44,19 +49,12 @@ def case_meta():
                     'hearing_purposes': HEARING_PURPOSES})
 
 
-@bp.route('/case-files', methods=['GET'])
-@jwt_required
-@require_permission('case_files.read')
-def list_case_files():
-    # Eager-load the client so to_dict()'s client_name doesn't fire one query per
-    # row (N+1). selectinload batches them into a single IN (...) lookup.
-    query = CaseFile.query.options(selectinload(CaseFile.client)).filter_by(firm_id=g.firm_id)
-    stage = request.args.get('stage')
+def _case_file_filters():
+    """The current firm's case files with the client/assignee/search filters."""
+    query = CaseFile.query.filter_by(firm_id=g.firm_id)
     client_id = request.args.get('client_id', type=int)
     assignee = request.args.get('assignee', type=int)
     search = (request.args.get('search') or '').strip()
-    if stage:
-        query = query.filter_by(stage=stage)
     if client_id:
         query = query.filter_by(client_id=client_id)
     if assignee:
@@ -68,14 +66,92 @@ def list_case_files():
             CaseFile.case_number.ilike(like),
             CaseFile.court_case_number.ilike(like),
         ))
-    query = query.order_by(CaseFile.position, CaseFile.id.desc())
-    serialize = lambda c: c.to_dict()
+    return query
+
+
+def _filtered_case_files():
+    """The current firm's case files with the list filters from the query string."""
+    query = _case_file_filters()
+    stage = request.args.get('stage')
+    if stage:
+        query = query.filter_by(stage=stage)
+    return query.order_by(CaseFile.position, CaseFile.id.desc())
+
+
+@bp.route('/case-files', methods=['GET'])
+@jwt_required
+@require_permission('case_files.read')
+def list_case_files():
+    # Eager-load the client so to_dict()'s client_name doesn't fire one query per
+    # row (N+1). selectinload batches them into a single IN (...) lookup. The
+    # card summary (services/case_summary) rides along on an outer join.
+    query = (_filtered_case_files().outerjoin(CaseFile.summary)
+             .options(selectinload(CaseFile.client), contains_eager(CaseFile.summary)))
+    serialize = lambda c: c.to_dict(include_summary=True)
     if pagination_requested():
         page, page_size = get_pagination_args()
         return jsonify(paginate_query(query, page, page_size, serialize))
     return jsonify([serialize(c) for c in query.all()])
 
 
+@bp.route('/case-files/board', methods=['GET'])
+@jwt_required
+@require_permission('case_files.read')
+def case_board():
+    """Kanban columns: each stage's count and first ``limit`` cards, in one query.
+
+    Closed cases are left out unless ``include_closed=true``. Pass a column's
+    ``next_cursor`` as ``cursor`` (repeatable) to load more of just that
+    column. Accepts the client/assignee/search filters of GET /case-files.
+    """
+    limit = min(max(request.args.get('limit', board.DEFAULT_LIMIT, type=int), 1), board.MAX_LIMIT)
+    include_closed = request.args.get('include_closed', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        cursors = {stage: (position, case_id) for stage, position, case_id in
+                   map(board.decode_cursor, request.args.getlist('cursor'))}
+    except board.CursorError as e:
+        return jsonify({'error': str(e)}), 400
+    stages = board.board_stages(include_closed or board.CLOSED in cursors)
+    columns = board.board_columns(_case_file_filters(), stages, limit, cursors)
+    return jsonify({'columns': columns, 'limit': limit})
+
+
+# Register export columns: (header, column). Clients are joined.
+CASE_FILE_EXPORT_COLUMNS = [
+    ('Case No.', CaseFile.case_number),
+    ('Title', CaseFile.title),
+    ('Client', Client.name),
+    ('Matter Type', CaseFile.matter_type),
+    ('Court', CaseFile.court),
+    ('Court Case No.', CaseFile.court_case_number),
+    ('Jurisdiction', CaseFile.jurisdiction),
+    ('Act / Section', CaseFile.act_section),
+    ('Opposing Counsel', CaseFile.opposing_counsel),
+    ('Stage', CaseFile.stage),
+    ('Priority', CaseFile.priority),
+    ('Agreed Fee', CaseFile.agreed_fee),
+    ('Filing Date', CaseFile.filing_date),
+    ('Next Hearing', CaseFile.next_hearing_date),
+    ('Opened', CaseFile.open_date),
+]
+
+
+@bp.route('/case-files/export', methods=['GET'])
+@jwt_required
+@require_permission('case_files.read')
+def export_case_files():
+    """Stream the case register as CSV or XLSX (?format=csv|xlsx).
+
+    Accepts the same filters as GET /case-files.
+    """
+    query = _filtered_case_files().join(Client, CaseFile.client_id == Client.id)
+    try:
+        return export_response(request.args.get('format'), 'case-files', CASE_FILE_EXPORT_COLUMNS,
+                               query, sheet_title='Case Files')
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+
+
 @bp.route('/case-files', methods=['POST'])
 @jwt_required
 @require_permission('case_files.create')
@@ -118,6 +194,7 @@ def create_case_file():
         case_file.stage = stage
     if priority:
         case_file.priority = priority
+    case_file.position = case_order.top_key(g.firm_id, stage or DEFAULT_STAGE)
     _set_parties(case_file, data.get('parties'))
     db.session.add(case_file)
     db.session.flush()
@@ -177,6 +254,17 @@ def update_case_file(case_id):
     return jsonify(case_file.to_dict(include_parties=True))
 
 
+def _is_id(value, optional=False):
+    """A JSON integer id (bool is not one), or None when ``optional``."""
+    if value is None:
+        return optional
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _valid_anchors(data):
+    return _is_id(data.get('after_id'), True) and _is_id(data.get('before_id'), True)
+
+
 @bp.route('/case-files/<int:case_id>/move', methods=['PATCH'])
 @jwt_required
 @require_permission('case_files.update')
@@ -188,15 +276,68 @@ def move_case_file(case_id):
     stage = data.get('stage')
     if not stage or not is_valid_stage(stage):
         return jsonify({'error': 'Invalid stage'}), 400
-    if stage != case_file.stage:
-        record_stage_change(case_file, case_file.stage, stage, g.user.id)
-        case_file.stage = stage
-    if 'position' in data:
-        case_file.position = int(data['position'])
+    if not _valid_anchors(data):
+        return jsonify({'error': 'after_id and before_id must be integers'}), 400
+    from_stage = case_file.stage
+    # Lands right below after_id, else right above before_id, else on top.
+    try:
+        case_order.place(case_file, stage, data.get('after_id'), data.get('before_id'))
+    except case_order.OrderError as e:
+        return jsonify({'error': str(e)}), 400
+    if stage != from_stage:
+        record_stage_change(case_file, from_stage, stage, g.user.id)
     db.session.commit()
     return jsonify(case_file.to_dict())
 
 
+@bp.route('/case-files/reorder', methods=['POST'])
+@jwt_required
+@require_permission('case_files.update')
+def reorder_case_files():
+    """Apply several kanban moves in one transaction.
+
+    Body: {moves: [{id, stage?, after_id?, before_id?}, ...]}, applied in
+    order, so a move may anchor on a card moved earlier in the batch. Stage
+    changes are recorded with one bulk insert; an invalid move rejects the
+    whole batch.
+    """
+    moves = (request.get_json() or {}).get('moves')
+    if not isinstance(moves, list) or not moves or not all(isinstance(m, dict) for m in moves):
+        return jsonify({'error': 'moves must be a non-empty list'}), 400
+    if len(moves) > MAX_REORDER_MOVES:
+        return jsonify({'error': f'At most {MAX_REORDER_MOVES} moves per request'}), 400
+    if not all(_is_id(m.get('id')) and _valid_anchors(m) for m in moves):
+        return jsonify({'error': 'id, after_id and before_id must be integers'}), 400
+    cards = {c.id: c for c in CaseFile.query.filter(
+        CaseFile.firm_id == g.firm_id, CaseFile.id.in_([m.get('id') for m in moves]))}
+
+    changes = []
+    try:
+        for move in moves:
+            case_file = cards.get(move.get('id'))
+            if case_file is None:
+                raise case_order.OrderError(f"Case {move.get('id')} not found")
+            stage = move.get('stage') or case_file.stage
+            if not is_valid_stage(stage):
+                raise case_order.OrderError('Invalid stage')
+            from_stage = case_file.stage
+            case_order.place(case_file, stage, move.get('after_id'), move.get('before_id'))
+            db.session.flush()   # later moves see this card's new place
+            if stage != from_stage:
+                changes.append({'firm_id': g.firm_id, 'case_file_id': case_file.id,
+                                'from_stage': from_stage, 'to_stage': stage,
+                                'changed_by_user_id': g.user.id})
+    except case_order.OrderError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    if changes:
+        db.session.execute(insert(CaseStageChange), changes)
+    db.session.commit()
+    moved = dict.fromkeys(m['id'] for m in moves)
+    return jsonify({'case_files': [cards[cid].to_dict() for cid in moved],
+                    'stage_changes': len(changes)})
+
+
 @bp.route('/case-files/<int:case_id>', methods=['DELETE'])
 @jwt_required
 @require_permission('case_files.delete')
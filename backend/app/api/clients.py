@@ -4,6 +4,7 @@ from app.models.models import db, Client, Invoice
 from app.middleware.jwt_auth import jwt_required
 from app.middleware.firm_context import require_permission
 from app.utils.pagination import pagination_requested, get_pagination_args, paginate_query
+from app.services.client_dedup import DEFAULT_THRESHOLD, find_duplicate_candidates, merge_clients
 from rapidfuzz import fuzz, process
 from sqlalchemy import func
 
@@ -89,6 +90,35 @@ def get_recent_clients():
     return jsonify(recent_clients_for_firm(g.firm_id, limit=limit))
 
 
+@bp.route('/clients/duplicates', methods=['GET'])
+@jwt_required
+@require_permission('clients.read')
+def get_duplicate_clients():
+    """Likely-duplicate client pairs for the current firm, best match first."""
+    threshold = request.args.get('threshold', default=DEFAULT_THRESHOLD, type=int)
+    threshold = max(50, min(threshold, 100))
+    return jsonify(find_duplicate_candidates(g.firm_id, threshold=threshold))
+
+
+@bp.route('/clients/merge', methods=['POST'])
+@jwt_required
+@require_permission('clients.delete')
+def merge_duplicate_clients():
+    """Fold duplicates into one client: { keep_id, merge_ids: [...] }.
+
+    Invoices, case files and recurring schedules move to keep_id; the merged
+    clients are deleted.
+    """
+    data = request.get_json() or {}
+    if not data.get('keep_id') or not data.get('merge_ids'):
+        return jsonify({'error': 'keep_id and merge_ids are required'}), 400
+    try:
+        result = merge_clients(g.firm_id, data['keep_id'], data['merge_ids'])
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+
 @bp.route('/clients/<int:client_id>', methods=['GET'])
 @jwt_required
 @require_permission('clients.read')
@@ -1,11 +1,16 @@
 """CSV Import API endpoint for data migration - multi-tenant"""
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, request, jsonify, g, Response
 from app.models.models import db, Client, Invoice, InvoiceItem, Item
 from app.models.auth import User
+from app.models.import_job import ImportJob
 from app.middleware.jwt_auth import jwt_required
+from app.middleware.firm_context import require_permission
+from app.services import import_jobs
+from app.services.client_dedup import ClientMatcher
 from datetime import datetime
 import csv
 import io
+import os
 
 bp = Blueprint('import_csv', __name__)
 
@@ -66,6 +71,8 @@ def import_migration():
         existing_clients = Client.query.filter_by(firm_id=user.firm_id).all()
         for c in existing_clients:
             client_cache[c.name.lower()] = c
+        matcher = ClientMatcher((c.id, c.name) for c in existing_clients)
+        client_matches = []  # new clients that look like an existing one
         
         # Load existing invoices for this user
         existing_invoices = Invoice.query.filter_by(firm_id=user.firm_id).all()
@@ -96,6 +103,11 @@ def import_migration():
                     db.session.flush()
                     client_cache[client_name.lower()] = client
                     clients_created += 1
+                    match = matcher.propose(client_name)
+                    if match:
+                        client_matches.append({'row': row_num, 'client_id': client.id,
+                                               'name': client_name, **match})
+                    matcher.add(client.id, client_name)
                 
                 # Get or create invoice
                 invoice_number = row.get('invoice_number', '').strip()
@@ -164,6 +176,7 @@ def import_migration():
             'clients_created': clients_created,
             'invoices_created': invoices_created,
             'items_added': items_added,
+            'client_matches': client_matches,
             'errors': errors[:20]  # Return first 20 errors only
         })
         
@@ -756,3 +769,91 @@ def import_v2_items():
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Import failed: {str(e)}'}), 500
+
+
+# =====================
+# Background import jobs - large files run off the request thread
+# =====================
+
+@bp.route('/import/jobs', methods=['POST'])
+@jwt_required
+@require_permission('invoices.create')
+def submit_import_job():
+    """
+    Queue a CSV import to run in the background and return immediately.
+
+    Multipart form: file=<csv>, kind=migration|v2_invoices (same CSV formats as
+    /import/migration and /import/v2/invoices). Poll GET /import/jobs/<id> for
+    progress. Only one import per firm may be queued or running at a time.
+    """
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    if not file.filename.endswith('.csv'):
+        return jsonify({'error': 'File must be CSV format'}), 400
+
+    try:
+        content = file.read().decode('utf-8')
+    except UnicodeDecodeError:
+        return jsonify({'error': 'File must be UTF-8 encoded'}), 400
+
+    try:
+        job = import_jobs.submit_job(g.firm_id, g.user.id, request.form.get('kind', 'migration'),
+                                     file.filename, content)
+    except import_jobs.ImportConflict as e:
+        running = import_jobs.active_job(g.firm_id)
+        return jsonify({'error': str(e), 'job': running.to_dict() if running else None}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    import_jobs.dispatch(job.id)
+    return jsonify(job.to_dict()), 202
+
+
+@bp.route('/import/jobs', methods=['GET'])
+@jwt_required
+@require_permission('invoices.create')
+def list_import_jobs():
+    jobs = (ImportJob.query.filter_by(firm_id=g.firm_id)
+            .order_by(ImportJob.id.desc()).limit(20).all())
+    return jsonify([j.to_dict() for j in jobs])
+
+
+@bp.route('/import/jobs/<int:job_id>', methods=['GET'])
+@jwt_required
+@require_permission('invoices.create')
+def get_import_job(job_id):
+    """Progress for polling. A job left orphaned by a dead worker is resumed."""
+    job = ImportJob.query.filter_by(id=job_id, firm_id=g.firm_id).first()
+    if not job:
+        return jsonify({'error': 'Import job not found'}), 404
+    if import_jobs.is_stale(job):
+        import_jobs.dispatch(job.id)
+    return jsonify(job.to_dict())
+
+
+@bp.route('/import/jobs/<int:job_id>/rejected.csv', methods=['GET'])
+@jwt_required
+@require_permission('invoices.create')
+def download_rejected_rows(job_id):
+    """The rows this job could not import, with row number and reason."""
+    job = ImportJob.query.filter_by(id=job_id, firm_id=g.firm_id).first()
+    if not job:
+        return jsonify({'error': 'Import job not found'}), 404
+    return Response(
+        import_jobs.rejected_rows_csv(job),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename=import_{job.id}_rejected.csv'},
+    )
+
+
+@bp.route('/import/jobs/resume', methods=['POST'])
+def resume_import_jobs():
+    """Secret-gated endpoint for Cloud Scheduler: restart orphaned imports."""
+    expected = os.getenv('CRON_SECRET')
+    if not expected or request.headers.get('X-Cron-Secret') != expected:
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify({'resumed': import_jobs.resume_stale_jobs()}), 200
@@ -8,6 +8,8 @@ from app.middleware.jwt_auth import jwt_required
 from app.middleware.firm_context import require_permission
 from app.utils.pagination import pagination_requested, get_pagination_args, paginate_query
 from app.services.upi import build_upi_uri, compose_note
+from app.services.register_export import ExportError, export_response
+from app.services import case_summary
 from sqlalchemy.orm import joinedload
 from datetime import datetime, date
 import io
@@ -129,21 +131,17 @@ def generate_invoice_number(firm_id):
         return str(next_seq).zfill(4)
 
 
-@bp.route('/invoices', methods=['GET'])
-@jwt_required
-@require_permission('invoices.read')
-def get_invoices():
-    """Get all invoices for the current firm with optional filters"""
+def _filtered_invoices():
+    """The current firm's invoices with the list filters from the query string.
 
-    # Query parameters
+    Shared by the list endpoint and the register export so both always agree
+    on which invoices a given set of filters selects.
+    """
     client_id = request.args.get('client_id', type=int)
     status = request.args.get('status')
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     search = request.args.get('search')
-    sort = request.args.get('sort', 'invoice_number')
-    order = request.args.get('order', 'desc')
-
     case_file_id = request.args.get('case_file_id', type=int)
 
     query = Invoice.query.filter_by(firm_id=g.firm_id)
@@ -166,14 +164,32 @@ def get_invoices():
                 Invoice.short_desc.contains(search)
             )
         )
+    return query
+
 
-    # Sorting — default is invoice number, descending.
+def _invoice_order():
+    """ORDER BY clause for ?sort=&order= — default is invoice number, descending.
+
+    Sorting by client_name needs the caller to join clients.
+    """
+    sort = request.args.get('sort', 'invoice_number')
+    order = request.args.get('order', 'desc')
     if sort == 'client_name':
-        query = query.join(Client, Invoice.client_id == Client.id)
         sort_col = Client.name
     else:
         sort_col = INVOICE_SORT_COLUMNS.get(sort, Invoice.invoice_number)
-    query = query.order_by(sort_col.asc() if order == 'asc' else sort_col.desc())
+    return sort_col.asc() if order == 'asc' else sort_col.desc()
+
+
+@bp.route('/invoices', methods=['GET'])
+@jwt_required
+@require_permission('invoices.read')
+def get_invoices():
+    """Get all invoices for the current firm with optional filters"""
+    query = _filtered_invoices()
+    if request.args.get('sort') == 'client_name':
+        query = query.join(Client, Invoice.client_id == Client.id)
+    query = query.order_by(_invoice_order())
 
     bank = _resolve_bank()
     serialize = lambda inv: _attach_upi(inv.to_dict(include_items=False), inv, bank)
@@ -185,6 +201,43 @@ def get_invoices():
     return jsonify([serialize(inv) for inv in query.all()])
 
 
+# Register export columns: (header, column). Clients and case files are joined.
+INVOICE_EXPORT_COLUMNS = [
+    ('Invoice No.', Invoice.invoice_number),
+    ('Invoice Date', Invoice.invoice_date),
+    ('Due Date', Invoice.due_date),
+    ('Client', Client.name),
+    ('Case No.', CaseFile.case_number),
+    ('Description', Invoice.short_desc),
+    ('Status', Invoice.status),
+    ('Subtotal', Invoice.subtotal),
+    ('Tax Rate', Invoice.tax_rate),
+    ('Tax Amount', Invoice.tax_amount),
+    ('Total', Invoice.total),
+    ('Paid Date', Invoice.paid_date),
+    ('Sent At', Invoice.sent_at),
+]
+
+
+@bp.route('/invoices/export', methods=['GET'])
+@jwt_required
+@require_permission('invoices.read')
+def export_invoices():
+    """Stream the invoice register as CSV or XLSX (?format=csv|xlsx).
+
+    Accepts the same filters and sort as GET /invoices.
+    """
+    query = (_filtered_invoices()
+             .join(Client, Invoice.client_id == Client.id)
+             .outerjoin(CaseFile, Invoice.case_file_id == CaseFile.id)
+             .order_by(_invoice_order()))
+    try:
+        return export_response(request.args.get('format'), 'invoices', INVOICE_EXPORT_COLUMNS,
+                               query, sheet_title='Invoices')
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+
+
 @bp.route('/invoices/<int:invoice_id>', methods=['GET'])
 @jwt_required
 @require_permission('invoices.read')
@@ -263,6 +316,7 @@ def create_invoice():
         invoice.calculate_totals()
         
         db.session.add(invoice)
+        case_summary.refresh(invoice.case_file_id)
         db.session.commit()
 
         return jsonify(_attach_upi(invoice.to_dict(include_items=True), invoice, _resolve_bank())), 201
@@ -282,6 +336,7 @@ def update_invoice(invoice_id):
         return jsonify({'error': 'Invoice not found'}), 404
 
     data = request.get_json()
+    previous_case_id = invoice.case_file_id
 
     # Update basic fields
     if 'client_id' in data:
@@ -326,9 +381,13 @@ def update_invoice(invoice_id):
                 amount=quantity * rate
             )
             db.session.add(item)
+        # Items carry no timestamp of their own; bump the parent so item-only
+        # edits still reach incremental consumers (analytics snapshots).
+        invoice.updated_at = datetime.utcnow()
     
     # Recalculate totals
     invoice.calculate_totals()
+    case_summary.refresh(previous_case_id, invoice.case_file_id)
 
     db.session.commit()
     return jsonify(_attach_upi(invoice.to_dict(include_items=True), invoice, _resolve_bank()))
@@ -347,6 +406,7 @@ def mark_invoice_paid(invoice_id):
     
     invoice.status = 'paid'
     invoice.paid_date = datetime.fromisoformat(data['paid_date']).date() if data.get('paid_date') else date.today()
+    case_summary.refresh(invoice.case_file_id)
 
     db.session.commit()
     return jsonify(_attach_upi(invoice.to_dict(include_items=True), invoice, _resolve_bank()))
@@ -457,6 +517,7 @@ def send_invoice_endpoint(invoice_id):
         traceback.print_exc()
         return jsonify({'error': f'Send failed: {e}'}), 502
 
+    case_summary.refresh(invoice.case_file_id)
     db.session.commit()
     result.update({
         'status': invoice.status,
@@ -496,6 +557,7 @@ def delete_invoice(invoice_id):
     
     # Mark as void instead of deleting
     invoice.status = 'void'
+    case_summary.refresh(invoice.case_file_id)
     db.session.commit()
     
     return jsonify({'message': 'Invoice voided successfully'})
@@ -7,6 +7,7 @@ from app.models.case import CaseFile, CaseNote
 from app.middleware.jwt_auth import jwt_required
 from app.middleware.firm_context import require_permission
 from app.services.case_service import generate_case_number, record_stage_change
+from app.services import case_order
 from app.case.stages import DEFAULT_STAGE
 
 bp = Blueprint('leads', __name__)
@@ -120,7 +121,8 @@ def convert_lead(lead_id):
     case_file = CaseFile(
         firm_id=g.firm_id, created_by_user_id=g.user.id,
         case_number=generate_case_number(g.firm_id), title=title,
-        client_id=client_row.id, stage=DEFAULT_STAGE, lead_id=lead.id)
+        client_id=client_row.id, stage=DEFAULT_STAGE, lead_id=lead.id,
+        position=case_order.top_key(g.firm_id, DEFAULT_STAGE))
     db.session.add(case_file)
     db.session.flush()
     record_stage_change(case_file, None, case_file.stage, g.user.id)
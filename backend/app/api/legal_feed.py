@@ -1,14 +1,17 @@
 """User-facing legal feed API + scheduler ingest endpoint."""
 import os
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, Response, request, jsonify, g
 
 from app.middleware.jwt_auth import jwt_required
 from app.models.auth import User
+from app.models.models import db, LegalFeedItem
 from app.utils.pagination import pagination_requested, get_pagination_args
-from app.services.legal_feed.query import query_feed, list_courts, query_for_you
+from app.services.legal_feed.query import query_feed, first_page, list_courts
+from app.services.legal_feed import for_you, read_cache, thumbnails
 from app.services.legal_feed.preferences import get_preference, upsert_preference
 from app.services.legal_feed.events import record_event, get_rejected_item_ids
-from app.services.legal_feed.ingest import run_ingestion
+from app.services.legal_feed import ingest as ingest_service
+from app.services.legal_feed.retention import run_retention
 
 bp = Blueprint('legal_feed', __name__)
 
@@ -18,6 +21,18 @@ def _current_user_id():
     return user.id if user else None
 
 
+def _not_modified(tag):
+    return request.if_none_match.contains(tag)
+
+
+def _tagged(payload, tag):
+    """JSON response the client must revalidate (If-None-Match) before reuse."""
+    resp = jsonify(payload)
+    resp.set_etag(tag)
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
+
+
 @bp.route('/legal-feed', methods=['GET'])
 @jwt_required
 def get_feed():
@@ -25,19 +40,36 @@ def get_feed():
         page, page_size = get_pagination_args()
     else:
         page, page_size = 1, 50
+    content_type, court = request.args.get('type'), request.args.get('court')
     uid = _current_user_id()
-    demote_ids = get_rejected_item_ids(uid) if uid else None
-    return jsonify(query_feed(
-        content_type=request.args.get('type'),
-        court=request.args.get('court'),
-        page=page, page_size=page_size, demote_ids=demote_ids,
-    ))
+    rejected = get_rejected_item_ids(uid) if uid else set()
+    state = read_cache.state()
+    # The feed only changes with content/config versions and the user's rejections.
+    tag = read_cache.etag('feed', state, content_type, court, page, page_size,
+                          uid, len(rejected))
+    if _not_modified(tag):
+        return '', 304, {'ETag': f'"{tag}"'}
+
+    result = None
+    if page == 1:
+        cached = first_page(content_type, court, page_size)
+        # Demotion only reorders rejected items to the end, so a first page
+        # holding none of them is the same with or without it.
+        if not any(d['id'] in rejected for d in cached['data']):
+            result = cached
+    if result is None:
+        result = query_feed(content_type=content_type, court=court, page=page,
+                            page_size=page_size, demote_user_id=uid if rejected else None)
+    return _tagged(result, tag)
 
 
 @bp.route('/legal-feed/courts', methods=['GET'])
 @jwt_required
 def get_courts():
-    return jsonify({'courts': list_courts()})
+    tag = read_cache.etag('courts', read_cache.state().config_version)
+    if _not_modified(tag):
+        return '', 304, {'ETag': f'"{tag}"'}
+    return _tagged({'courts': list_courts()}, tag)
 
 
 @bp.route('/legal-feed/for-you', methods=['GET'])
@@ -48,9 +80,12 @@ def get_for_you():
         return jsonify({'error': 'User not found'}), 401
     limit = request.args.get('limit', default=10, type=int)
     offset = request.args.get('offset', default=0, type=int)
-    data = query_for_you(uid, content_type=request.args.get('type'),
-                         limit=limit, offset=offset)
-    return jsonify({'data': data})
+    try:
+        page = for_you.get_page(uid, content_type=request.args.get('type'), limit=limit,
+                                cursor=request.args.get('cursor'), offset=offset)
+    except for_you.CursorError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(page)
 
 
 @bp.route('/legal-feed/preferences', methods=['GET'])
@@ -92,9 +127,39 @@ def post_event():
     return jsonify({'error': 'invalid event'}), 400
 
 
+@bp.route('/legal-feed/items/<int:item_id>/image', methods=['GET'])
+def item_image(item_id):
+    # Unauthenticated so <img> tags can load it; it only ever serves the
+    # stored thumbnail of an ingested item's own image. A miss is a 404 and
+    # queues a background prefetch; nothing is fetched on the request.
+    url = db.session.query(LegalFeedItem.image_url).filter(LegalFeedItem.id == item_id).scalar()
+    if not url:
+        return jsonify({'error': 'not found'}), 404
+    ext = thumbnails.negotiate(request.headers.get('Accept'))
+    tag = f'{thumbnails.url_hash(url)}.{ext}'
+    headers = {'Cache-Control': thumbnails.CACHE_CONTROL, 'Vary': 'Accept'}
+    if _not_modified(tag):
+        return '', 304, {'ETag': f'"{tag}"', **headers}
+    body = thumbnails.serve(url, ext)
+    if body is None:
+        return jsonify({'error': 'not found'}), 404
+    resp = Response(body, mimetype=thumbnails.FORMATS[ext][1], headers=headers)
+    resp.set_etag(tag)
+    return resp
+
+
 @bp.route('/legal-feed/ingest', methods=['POST'])
 def ingest():
     secret = os.getenv('LEGAL_FEED_INGEST_SECRET')
     if not secret or request.headers.get('X-Ingest-Secret') != secret:
         return jsonify({'error': 'unauthorized'}), 401
-    return jsonify(run_ingestion('scheduled'))
+    # Queued and run in the background; a stale run is resumed instead.
+    return jsonify(ingest_service.start_run('scheduled').to_dict()), 202
+
+
+@bp.route('/legal-feed/retention', methods=['POST'])
+def retention():
+    secret = os.getenv('LEGAL_FEED_INGEST_SECRET')
+    if not secret or request.headers.get('X-Ingest-Secret') != secret:
+        return jsonify({'error': 'unauthorized'}), 401
+    return jsonify(run_retention())
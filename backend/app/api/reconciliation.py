@@ -0,0 +1,74 @@
+"""Bank/UPI statement reconciliation — firm-scoped, gated by invoices perms."""
+from flask import Blueprint, request, jsonify, g
+from app.models.reconciliation import BankStatement
+from app.middleware.jwt_auth import jwt_required
+from app.middleware.firm_context import require_permission
+from app.services import reconciliation
+from app.utils.pagination import get_pagination_args, paginate_query
+
+bp = Blueprint('reconciliation', __name__)
+
+
+@bp.route('/reconciliation/statements', methods=['POST'])
+@jwt_required
+@require_permission('invoices.update')
+def upload_statement():
+    """Upload a statement CSV; confirmed payments are applied immediately,
+    ambiguous ones land in the review queue."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    if not file.filename.lower().endswith('.csv'):
+        return jsonify({'error': 'File must be CSV format'}), 400
+
+    try:
+        content = file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return jsonify({'error': 'File must be UTF-8 encoded'}), 400
+    try:
+        statement = reconciliation.reconcile_statement(
+            g.firm_id, g.user.id, content, file_name=file.filename)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(statement), 201
+
+
+@bp.route('/reconciliation/statements', methods=['GET'])
+@jwt_required
+@require_permission('invoices.read')
+def list_statements():
+    rows = (BankStatement.query.filter_by(firm_id=g.firm_id)
+            .order_by(BankStatement.created_at.desc(), BankStatement.id.desc())
+            .limit(50).all())
+    return jsonify([r.to_dict() for r in rows])
+
+
+@bp.route('/reconciliation/review', methods=['GET'])
+@jwt_required
+@require_permission('invoices.read')
+def list_review_queue():
+    """Paginated review queue; each candidate carries its invoice summary."""
+    page, page_size = get_pagination_args()
+    query = reconciliation.review_queue(g.firm_id)
+    envelope = paginate_query(query, page, page_size, lambda line: line)
+    envelope['data'] = reconciliation.describe_candidates(g.firm_id, envelope['data'])
+    return jsonify(envelope)
+
+
+@bp.route('/reconciliation/lines/<int:line_id>/resolve', methods=['POST'])
+@jwt_required
+@require_permission('invoices.update')
+def resolve_line(line_id):
+    """Body: {invoice_id} to confirm a match, or {dismiss: true}."""
+    data = request.get_json() or {}
+    try:
+        line = reconciliation.resolve_line(g.firm_id, line_id,
+                                           invoice_id=data.get('invoice_id'),
+                                           dismiss=bool(data.get('dismiss')))
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(line)
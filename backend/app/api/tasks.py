@@ -8,6 +8,7 @@ from app.middleware.jwt_auth import jwt_required
 from app.middleware.firm_context import require_permission
 from app.utils.pagination import pagination_requested, get_pagination_args, paginate_query
 from app.case.stages import is_valid_priority
+from app.services import case_summary
 
 bp = Blueprint('tasks', __name__)
 
@@ -62,6 +63,7 @@ def create_task():
                 due_date=_date(data.get('due_date')), case_file_id=data.get('case_file_id'),
                 priority=priority)
     db.session.add(task)
+    case_summary.refresh(task.case_file_id)
     db.session.commit()
     return jsonify(task.to_dict()), 201
 
@@ -74,6 +76,7 @@ def update_task(task_id):
     if not task:
         return jsonify({'error': 'Task not found'}), 404
     data = request.get_json() or {}
+    previous_case_id = task.case_file_id
     if 'title' in data:
         task.title = (data['title'] or '').strip() or task.title
     if 'due_date' in data:
@@ -86,6 +89,7 @@ def update_task(task_id):
         task.priority = data['priority']
     if 'case_file_id' in data:
         task.case_file_id = data['case_file_id']
+    case_summary.refresh(previous_case_id, task.case_file_id)
     db.session.commit()
     return jsonify(task.to_dict())
 
@@ -98,5 +102,6 @@ def delete_task(task_id):
     if not task:
         return jsonify({'error': 'Task not found'}), 404
     db.session.delete(task)
+    case_summary.refresh(task.case_file_id)
     db.session.commit()
     return jsonify({'message': 'Task deleted'})
@@ -9,7 +9,7 @@ from datetime import timedelta
 import os
 
 from app.models.models import db, init_db, Keepalive
-from app.api import invoices, clients, analytics, import_csv, backup, auth, admin, items, storage, recurring, public, legal_feed, firm, roles, invites, case_files, case_events, case_documents, case_expenses, leads, case_notes, case_exhibits, calendar, tasks, writing
+from app.api import invoices, clients, analytics, import_csv, backup, auth, admin, items, storage, recurring, public, legal_feed, firm, roles, invites, case_files, case_events, case_documents, case_expenses, leads, case_notes, case_exhibits, calendar, tasks, writing, reconciliation
 
 # Load environment variables
 load_dotenv()
@@ -29,7 +29,7 @@ def create_app():
         )
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    # Pool hardening: a gunicorn worker killed mid-request (e.g. an ingestion run
+    # Pool hardening: a gunicorn worker killed mid-request (e.g. a slow request
     # exceeding the worker timeout) can strand a dead/idle-in-transaction
     # connection in the pool. pool_pre_ping drops dead connections on checkout;
     # pool_recycle caps connection lifetime so none lingers indefinitely.
@@ -66,13 +66,17 @@ def create_app():
         from app.models.auth import User, Firm, Role, FirmInvite, FirmDetails, BankAccount
         from app.models.models import Item  # Ensure items table is created
         from app.models.models import RecurringSchedule  # ensure table is created
-        from app.models.case import CaseFile, CaseEvent, CaseDocument, CaseStageChange, CaseExpense, CaseNote  # ensure case tables are created
+        from app.models.case import CaseFile, CaseEvent, CaseDocument, CaseStageChange, CaseExpense, CaseNote, CaseSummary  # ensure case tables are created
         from app.models.lead import Lead  # ensure leads table is created
         from app.models.task import Task  # ensure tasks table is created
         from app.models.writing import WritingDoc  # ensure writing_documents table is created
+        from app.models.import_job import ImportJob  # ensure import_jobs table is created
+        from app.models.reconciliation import BankStatement, BankStatementLine  # ensure reconciliation tables are created
+        from app.models.analytics_snapshot import AnalyticsSnapshot, AnalyticsSnapshotRow  # ensure analytics_snapshots table is created
         from app.models.models import (
             LegalFeedSource, LegalFeedItem, LegalFeedRun, LegalFeedSetting,
-            LegalFeedPreference, LegalFeedEvent,
+            LegalFeedPreference, LegalFeedEvent, LegalFeedCache, LegalFeedForYou,
+            LegalFeedLshBand, LegalFeedItemArchive, LegalFeedThumbnail,
         )  # ensure legal feed tables are created
         db.create_all()
     
@@ -103,6 +107,7 @@ def create_app():
     app.register_blueprint(calendar.bp, url_prefix='/api/v1')
     app.register_blueprint(tasks.bp, url_prefix='/api/v1')
     app.register_blueprint(writing.bp, url_prefix='/api/v1')
+    app.register_blueprint(reconciliation.bp, url_prefix='/api/v1')
 
     @app.route('/health')
     def health():
@@ -0,0 +1,49 @@
+"""AnalyticsSnapshot: per-firm state of the Parquet analytics export.
+
+One row per firm. ``watermark`` is the start time of the last successful run
+(rows with ``updated_at`` at or after it are re-exported next time) and
+``manifest`` mirrors the manifest.json written next to the Parquet files.
+``AnalyticsSnapshotRow`` remembers which partition each exported row went to,
+so a row whose business date moves is also removed from its old month.
+"""
+from datetime import datetime
+from app.models.models import db
+
+
+class AnalyticsSnapshot(db.Model):
+    __tablename__ = 'analytics_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    firm_id = db.Column(db.Integer, db.ForeignKey('firms.id'), nullable=False, unique=True)
+    status = db.Column(db.String(20), nullable=False, default='idle')  # idle|running|completed|failed
+    version = db.Column(db.Integer, nullable=False, default=0)
+    watermark = db.Column(db.DateTime)
+    manifest = db.Column(db.JSON, default=dict)
+    last_counts = db.Column(db.JSON, default=dict)   # {table: partitions written} for the last run
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'firm_id': self.firm_id,
+            'status': self.status,
+            'version': self.version,
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'last_counts': self.last_counts or {},
+            'error': self.error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class AnalyticsSnapshotRow(db.Model):
+    """The month partition one exported row was last written to. Keyed, so a
+    run reads and upserts only the rows it changed."""
+    __tablename__ = 'analytics_snapshot_rows'
+
+    firm_id = db.Column(db.Integer, db.ForeignKey('firms.id'), primary_key=True)
+    table_name = db.Column(db.String(40), primary_key=True)
+    row_key = db.Column(db.String(100), primary_key=True)   # primary key, '/'-joined
+    month = db.Column(db.String(7), nullable=False)          # 'YYYY-MM' or 'undated'
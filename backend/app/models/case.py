@@ -14,6 +14,7 @@ class CaseFile(db.Model):
     __table_args__ = (
         db.UniqueConstraint('firm_id', 'case_number',
                             name='case_files_firm_id_case_number_key'),
+        db.Index('ix_case_files_firm_stage_position', 'firm_id', 'stage', 'position'),
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -30,7 +31,8 @@ class CaseFile(db.Model):
     opposing_counsel = db.Column(db.String(200))
     stage = db.Column(db.String(40), nullable=False, default=DEFAULT_STAGE)
     priority = db.Column(db.String(20), nullable=False, default=DEFAULT_PRIORITY)
-    position = db.Column(db.Integer, nullable=False, default=0)
+    # Fractional sort key within the stage column (services/case_order); 'i' = middle.
+    position = db.Column(db.String(64), nullable=False, default='i')
     agreed_fee = db.Column(db.Numeric(12, 2))
     handling_advocate_user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     filing_date = db.Column(db.Date)
@@ -57,8 +59,10 @@ class CaseFile(db.Model):
                                cascade='all, delete-orphan')
     notes = db.relationship('CaseNote', back_populates='case_file',
                             cascade='all, delete-orphan')
+    summary = db.relationship('CaseSummary', uselist=False,
+                              cascade='all, delete-orphan')
 
-    def to_dict(self, include_parties=False):
+    def to_dict(self, include_parties=False, include_summary=False):
         d = {
             'id': self.id,
             'firm_id': self.firm_id,
@@ -88,9 +92,38 @@ class CaseFile(db.Model):
         }
         if include_parties:
             d['parties'] = self.parties or []
+        if include_summary:
+            # Load the summary with the case (list/board join it); no row = nothing recorded yet.
+            d['summary'] = (self.summary or CaseSummary()).to_dict(self.updated_at)
         return d
 
 
+class CaseSummary(db.Model):
+    """Card read model: per-case aggregates of events, documents, tasks,
+    invoices and expenses, kept current by those write paths
+    (services/case_summary). The next hearing stays on case_files."""
+    __tablename__ = 'case_summaries'
+
+    case_file_id = db.Column(db.Integer, db.ForeignKey('case_files.id', ondelete='CASCADE'),
+                             primary_key=True)
+    firm_id = db.Column(db.Integer, db.ForeignKey('firms.id'), index=True)
+    document_count = db.Column(db.Integer, nullable=False, default=0)
+    open_task_count = db.Column(db.Integer, nullable=False, default=0)
+    outstanding_fees = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    last_activity_at = db.Column(db.DateTime)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self, case_updated_at=None):
+        # Editing the case itself is activity too.
+        last = max((t for t in (self.last_activity_at, case_updated_at) if t), default=None)
+        return {
+            'document_count': self.document_count or 0,
+            'open_task_count': self.open_task_count or 0,
+            'outstanding_fees': _money(self.outstanding_fees or 0),
+            'last_activity_at': last.isoformat() if last else None,
+        }
+
+
 class CaseEvent(db.Model):
     __tablename__ = 'case_events'
 
@@ -221,6 +254,7 @@ class CaseExpense(db.Model):
     amount = db.Column(db.Numeric(12, 2))
     created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     case_file = db.relationship('CaseFile', back_populates='expenses')
 
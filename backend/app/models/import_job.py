@@ -0,0 +1,69 @@
+"""ImportJob: a CSV import run in the background, committed chunk by chunk.
+
+The uploaded CSV is persisted on the row so a worker killed mid-import (or a
+gunicorn timeout) can be resumed from ``rows_processed`` — the cursor only
+advances in the same transaction that commits its chunk. Rejected rows are
+kept verbatim so they can be downloaded, fixed and re-imported.
+"""
+from datetime import datetime
+from app.models.models import db
+
+IMPORT_KINDS = {"migration", "v2_invoices"}
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class ImportJob(db.Model):
+    __tablename__ = 'import_jobs'
+    # At most one queued/running import per firm, enforced by the database so
+    # two concurrent submissions cannot both slip past the API-level check.
+    __table_args__ = (
+        db.Index('ux_import_jobs_active_firm', 'firm_id', unique=True,
+                 postgresql_where=db.text("status IN ('queued', 'running')"),
+                 sqlite_where=db.text("status IN ('queued', 'running')")),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    firm_id = db.Column(db.Integer, db.ForeignKey('firms.id'), index=True)
+    created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    kind = db.Column(db.String(30), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    file_name = db.Column(db.String(300))
+    payload = db.Column(db.Text)            # raw CSV; cleared once the job finishes
+    columns = db.Column(db.JSON, default=list)
+    total_rows = db.Column(db.Integer, nullable=False, default=0)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)  # resume cursor
+    rows_skipped = db.Column(db.Integer, nullable=False, default=0)
+    counts = db.Column(db.JSON, default=dict)     # per-kind created/updated tallies
+    rejected = db.Column(db.JSON, default=list)   # [{row, error, data}]
+    state = db.Column(db.JSON, default=dict)      # kind-specific resume state
+    error = db.Column(db.Text)                    # fatal error, if the job failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    heartbeat_at = db.Column(db.DateTime)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        rejected = self.rejected or []
+        return {
+            'id': self.id,
+            'firm_id': self.firm_id,
+            'created_by_user_id': self.created_by_user_id,
+            'kind': self.kind,
+            'status': self.status,
+            'file_name': self.file_name,
+            'total_rows': self.total_rows,
+            'rows_processed': self.rows_processed,
+            'rows_skipped': self.rows_skipped,
+            'counts': self.counts or {},
+            'errors': [f"Row {r['row']}: {r['error']}" for r in rejected[:20]],
+            'error_count': len(rejected),
+            # New clients that look like an existing one (see client_dedup).
+            'client_matches': (self.state or {}).get('client_matches', []),
+            'error': self.error,
+            'attempts': self.attempts,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
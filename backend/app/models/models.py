@@ -3,6 +3,8 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from sqlalchemy import func
 
+from app.models.vector import Float32Vector
+
 db = SQLAlchemy()
 
 
@@ -282,6 +284,15 @@ class LegalFeedSource(db.Model):
     feed_url = db.Column(db.String(500), nullable=False, unique=True)
     enabled = db.Column(db.Boolean, nullable=False, default=True)
     weight = db.Column(db.Integer, nullable=False, default=0)
+    # Conditional-GET validators from the last successful fetch.
+    etag = db.Column(db.String(300))
+    last_modified = db.Column(db.String(100))
+    # Circuit breaker: consecutive failures; while backoff_until is in the
+    # future the source is skipped by ingestion.
+    failure_count = db.Column(db.Integer, nullable=False, default=0)
+    backoff_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    last_fetched_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
@@ -289,6 +300,10 @@ class LegalFeedSource(db.Model):
             'id': self.id, 'name': self.name, 'content_type': self.content_type,
             'court': self.court, 'kind': self.kind, 'feed_url': self.feed_url,
             'enabled': self.enabled, 'weight': self.weight,
+            'failure_count': self.failure_count or 0,
+            'backoff_until': self.backoff_until.isoformat() if self.backoff_until else None,
+            'last_error': self.last_error,
+            'last_fetched_at': self.last_fetched_at.isoformat() if self.last_fetched_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
 
@@ -296,6 +311,13 @@ class LegalFeedSource(db.Model):
 class LegalFeedItem(db.Model):
     """A single feed entry: headline + summary + link-out. No full text."""
     __tablename__ = 'legal_feed_items'
+    __table_args__ = (
+        # Matches query_feed: visible representatives of a type, newest first.
+        db.Index('ix_lfi_feed_order', 'content_type',
+                 db.text('coalesce(published_at, ingested_at) DESC'),
+                 postgresql_where=db.text('hidden = false AND duplicate_of IS NULL'),
+                 sqlite_where=db.text('hidden = 0 AND duplicate_of IS NULL')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     source_id = db.Column(db.Integer, db.ForeignKey('legal_feed_sources.id'), index=True)
@@ -315,9 +337,13 @@ class LegalFeedItem(db.Model):
     topics = db.Column(db.JSON)          # subset of taxonomy
     importance = db.Column(db.Integer)   # 0-100
     image_url = db.Column(db.String(1000))
-    embedding = db.Column(db.JSON)       # list[float]
+    embedding = db.Column(Float32Vector)  # packed float32, see vector.py
     embed_model = db.Column(db.String(80))
     enriched_at = db.Column(db.DateTime)
+    # Near-duplicate clustering (see services/legal_feed/clusters.py): NULL for
+    # a cluster's representative, else the representative's id.
+    duplicate_of = db.Column(db.Integer, db.ForeignKey('legal_feed_items.id'), index=True)
+    minhash = db.Column(db.LargeBinary)   # packed uint32 MinHash signature
 
     def to_dict(self):
         return {
@@ -334,19 +360,71 @@ class LegalFeedItem(db.Model):
         }
 
 
+class LegalFeedItemArchive(db.Model):
+    """Items past the retention horizon, moved out of ``legal_feed_items`` by
+    services/legal_feed/retention.py (without embedding or MinHash).
+
+    On Postgres the table is partitioned by ``bucket_month`` (the month of
+    published_at, else ingested_at; see migration 036), so a month of history
+    can be detached or dropped as a whole."""
+    __tablename__ = 'legal_feed_items_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    bucket_month = db.Column(db.Date, primary_key=True)
+    source_id = db.Column(db.Integer)
+    content_type = db.Column(db.String(20), nullable=False)
+    title = db.Column(db.Text, nullable=False)
+    summary = db.Column(db.Text)
+    source_url = db.Column(db.String(1000), nullable=False)
+    source_name = db.Column(db.String(200), nullable=False)
+    court = db.Column(db.String(100))
+    published_at = db.Column(db.DateTime)
+    ingested_at = db.Column(db.DateTime)
+    hidden = db.Column(db.Boolean, nullable=False, default=False)
+    dedup_key = db.Column(db.String(64), nullable=False, index=True)
+    headline = db.Column(db.Text)
+    tldr = db.Column(db.Text)
+    topics = db.Column(db.JSON)
+    importance = db.Column(db.Integer)
+    image_url = db.Column(db.String(1000))
+    enriched_at = db.Column(db.DateTime)
+    duplicate_of = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class LegalFeedRun(db.Model):
-    """Audit log of one ingestion run, for the admin status view."""
+    """One ingestion run: the background job and its audit log.
+
+    A run is queued, then claimed and advanced by a worker in checkpoints
+    (one per source, one per enrichment chunk) that commit together with the
+    work they record, so a killed worker's run resumes from ``state``.
+    """
     __tablename__ = 'legal_feed_runs'
+    # At most one queued/running run, enforced by the database so two
+    # concurrent submits cannot both slip past active_run(). Indexes a
+    # constant, so any second active row collides; also serves active_run().
+    __table_args__ = (
+        db.Index('ux_lfr_one_active', db.text('(1)'), unique=True,
+                 postgresql_where=db.text("status IN ('queued', 'running')"),
+                 sqlite_where=db.text("status IN ('queued', 'running')")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     finished_at = db.Column(db.DateTime)
     trigger = db.Column(db.String(20), nullable=False)  # scheduled|manual
+    # queued|running, then success|partial|failed
     status = db.Column(db.String(20), nullable=False, default='success')
     total_ingested = db.Column(db.Integer, nullable=False, default=0)
-    results = db.Column(db.JSON, default=list)  # [{source_id, fetched, inserted, error}]
+    results = db.Column(db.JSON, default=list)  # [{source_id, fetched, inserted, error, *_ms, bytes}]
     enriched = db.Column(db.Integer, nullable=False, default=0)
     enrich_failed = db.Column(db.Integer, nullable=False, default=0)
+    stage = db.Column(db.String(20), nullable=False, default='fetch')  # fetch|images|enrich|done
+    state = db.Column(db.JSON, default=dict)      # resume checkpoint; cleared when done
+    telemetry = db.Column(db.JSON, default=dict)  # per-stage timings (see telemetry.py)
+    error = db.Column(db.Text)                    # fatal error, if the run failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    heartbeat_at = db.Column(db.DateTime)
 
     def to_dict(self):
         return {
@@ -356,6 +434,9 @@ class LegalFeedRun(db.Model):
             'trigger': self.trigger, 'status': self.status,
             'total_ingested': self.total_ingested, 'results': self.results or [],
             'enriched': self.enriched or 0, 'enrich_failed': self.enrich_failed or 0,
+            'stage': self.stage, 'telemetry': self.telemetry or {},
+            'error': self.error, 'attempts': self.attempts or 0,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
         }
 
 
@@ -365,6 +446,10 @@ class LegalFeedSetting(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     ordering_mode = db.Column(db.String(20), nullable=False, default='recency')  # recency|weighted
+    # Read-cache versions (services/legal_feed/read_cache.py): admin config
+    # changes and feed content changes respectively.
+    config_version = db.Column(db.Integer, nullable=False, default=0)
+    content_version = db.Column(db.Integer, nullable=False, default=0)
 
     def to_dict(self):
         return {'id': self.id, 'ordering_mode': self.ordering_mode}
@@ -380,10 +465,14 @@ class LegalFeedPreference(db.Model):
     topic_weights = db.Column(db.JSON, default=dict)   # {topic: weight}
     courts = db.Column(db.JSON, default=list)          # [court]
     interest_phrases = db.Column(db.JSON, default=list)
-    interest_embedding = db.Column(db.JSON)            # list[float]
+    interest_embedding = db.Column(Float32Vector)      # packed float32
     embed_model = db.Column(db.String(80))
-    behavior_embedding = db.Column(db.JSON)            # learned interest vector
+    behavior_embedding = db.Column(Float32Vector)      # learned interest vector
     behavior_updated_at = db.Column(db.DateTime)
+    # Maintained by the event write path so reads never count the event log.
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    not_interested_count = db.Column(db.Integer, nullable=False, default=0)
+    rejected_item_ids = db.Column(db.JSON, default=list)   # sorted [item_id]
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def to_dict(self):
@@ -400,7 +489,8 @@ class LegalFeedEvent(db.Model):
     """User engagement with a feed item — the source of truth for behavioral
     personalization. kind: 'click' (positive) | 'not_interested' (negative)."""
     __tablename__ = 'legal_feed_events'
-    __table_args__ = (db.Index('ix_lfe_user_kind', 'user_id', 'kind'),)
+    __table_args__ = (db.Index('ix_lfe_user_kind', 'user_id', 'kind'),
+                      db.Index('ix_lfe_user_kind_item', 'user_id', 'kind', 'item_id'))
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False, index=True)
@@ -416,6 +506,81 @@ class LegalFeedEvent(db.Model):
         }
 
 
+class LegalFeedForYou(db.Model):
+    """Materialised 'For you' ranking for one user and content type.
+
+    ``item_ids`` is the ranked list pages are cut from; ``version`` changes on
+    every recompute so cursors can tell which list they were issued against.
+    A row past ``expires_at`` or marked ``stale`` is still served while a
+    background refresh (claimed via ``refreshing_since``) recomputes it."""
+    __tablename__ = 'legal_feed_for_you'
+    __table_args__ = (db.UniqueConstraint('user_id', 'content_type',
+                                          name='uq_lffy_user_type'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    content_type = db.Column(db.String(20), nullable=False, default='news')
+    item_ids = db.Column(db.JSON, nullable=False, default=list)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    stale = db.Column(db.Boolean, nullable=False, default=False)
+    computed_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+    refreshing_since = db.Column(db.DateTime)
+
+
+class LegalFeedCache(db.Model):
+    """Content-hash keyed cache of LLM outputs, tagged by model.
+
+    kind 'enrichment' holds {headline, tldr, topics, importance} for a news
+    prompt in ``value``; kind 'embedding' holds the vector for a text, packed,
+    in ``vector``. ``hits`` counts the API calls the row has saved;
+    ``last_hit_at`` (set on insert, refreshed on every hit) drives expiry."""
+    __tablename__ = 'legal_feed_cache'
+    __table_args__ = (db.UniqueConstraint('kind', 'model', 'content_hash',
+                                          name='uq_lfc_kind_model_hash'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)   # enrichment|embedding
+    model = db.Column(db.String(80), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    value = db.Column(db.JSON)            # enrichment fields; NULL for embeddings
+    vector = db.Column(Float32Vector)     # embedding, packed float32
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_hit_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class LegalFeedLshBand(db.Model):
+    """One LSH bucket of an item's MinHash signature (one row per band), so
+    near-duplicate candidates are found by an indexed lookup, not a scan."""
+    __tablename__ = 'legal_feed_lsh_bands'
+    __table_args__ = (db.Index('ix_lflb_band_bucket', 'band', 'bucket'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('legal_feed_items.id'),
+                        nullable=False, index=True)
+    band = db.Column(db.SmallInteger, nullable=False)
+    bucket = db.Column(db.BigInteger, nullable=False)
+
+
+class LegalFeedThumbnail(db.Model):
+    """A feed image resized for cards, keyed by the sha256 of its URL.
+
+    The bytes live in storage (``{url_hash}.webp`` / ``.jpg``, see
+    services/legal_feed/thumbnails.py); the row records that they exist, or
+    that the origin could not be fetched or decoded (retried later)."""
+    __tablename__ = 'legal_feed_thumbnails'
+
+    url_hash = db.Column(db.String(64), primary_key=True)
+    source_url = db.Column(db.String(1000), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='ready')  # ready|failed
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    source_bytes = db.Column(db.Integer)   # size of the original download
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 def init_db():
     """Initialize database tables"""
     db.create_all()
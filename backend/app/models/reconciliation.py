@@ -0,0 +1,73 @@
+"""Bank/UPI statement reconciliation: uploaded statements and their lines.
+
+Every credit line of an uploaded statement is kept, whatever its outcome, so
+a reconciliation can be audited later. Lines the matcher could not settle on
+its own sit in ``status='review'`` with their scored ``candidates`` until a
+user confirms or dismisses them.
+"""
+from datetime import datetime
+from app.models.models import db
+
+LINE_STATUSES = ("applied", "review", "unmatched", "dismissed")
+
+
+class BankStatement(db.Model):
+    __tablename__ = 'bank_statements'
+
+    id = db.Column(db.Integer, primary_key=True)
+    firm_id = db.Column(db.Integer, db.ForeignKey('firms.id'), index=True)
+    uploaded_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    file_name = db.Column(db.String(300))
+    total_lines = db.Column(db.Integer, nullable=False, default=0)
+    counts = db.Column(db.JSON, default=dict)   # {applied, review, unmatched, skipped}
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'firm_id': self.firm_id,
+            'uploaded_by_user_id': self.uploaded_by_user_id,
+            'file_name': self.file_name,
+            'total_lines': self.total_lines,
+            'counts': self.counts or {},
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class BankStatementLine(db.Model):
+    __tablename__ = 'bank_statement_lines'
+    __table_args__ = (
+        db.Index('ix_bsl_firm_status', 'firm_id', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    statement_id = db.Column(db.Integer, db.ForeignKey('bank_statements.id', ondelete='CASCADE'),
+                             nullable=False, index=True)
+    firm_id = db.Column(db.Integer, db.ForeignKey('firms.id'))
+    row_number = db.Column(db.Integer)
+    txn_date = db.Column(db.Date)
+    amount = db.Column(db.Numeric(12, 2), nullable=False)
+    description = db.Column(db.Text)
+    reference = db.Column(db.String(200))
+    payer = db.Column(db.String(300))
+    status = db.Column(db.String(20), nullable=False, default='unmatched')
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoices.id', ondelete='SET NULL'), index=True)
+    candidates = db.Column(db.JSON, default=list)  # [{invoice_id, score, reasons}], best first
+    resolved_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'statement_id': self.statement_id,
+            'row_number': self.row_number,
+            'txn_date': self.txn_date.isoformat() if self.txn_date else None,
+            'amount': float(self.amount) if self.amount is not None else None,
+            'description': self.description,
+            'reference': self.reference,
+            'payer': self.payer,
+            'status': self.status,
+            'invoice_id': self.invoice_id,
+            'candidates': self.candidates or [],
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
+        }
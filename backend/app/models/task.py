@@ -11,10 +11,11 @@ class Task(db.Model):
     created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
     title = db.Column(db.String(300), nullable=False)
     due_date = db.Column(db.Date, index=True)
-    case_file_id = db.Column(db.Integer, db.ForeignKey('case_files.id'))
+    case_file_id = db.Column(db.Integer, db.ForeignKey('case_files.id'), index=True)
     done = db.Column(db.Boolean, nullable=False, default=False)
     priority = db.Column(db.String(20), nullable=False, default='normal')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     case_file = db.relationship('CaseFile')
 
@@ -0,0 +1,87 @@
+"""Compact embedding column: packed little-endian float32 bytes.
+
+A 1536-d embedding is 6 KiB packed against ~30 KiB as a JSON float list,
+and loading it is a memcpy instead of a JSON parse. Values come back as
+``PackedVector``: it keeps the raw bytes and only builds the NumPy view
+(``.array``, zero-copy) or a Python list when something actually reads
+the numbers, so rows that are loaded but never scored cost nothing extra.
+"""
+from collections.abc import Sequence
+
+import numpy as np
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+DTYPE = np.dtype('<f4')
+
+
+class PackedVector(Sequence):
+    """Read-only float32 vector backed by its stored bytes."""
+    __slots__ = ('_raw', '_array')
+
+    def __init__(self, raw):
+        self._raw = bytes(raw)
+        self._array = None
+
+    @classmethod
+    def from_values(cls, values):
+        return cls(np.asarray(values, dtype=DTYPE).tobytes())
+
+    @property
+    def array(self):
+        """float32 NumPy view over the stored bytes (read-only, no copy)."""
+        if self._array is None:
+            self._array = np.frombuffer(self._raw, dtype=DTYPE)
+        return self._array
+
+    def __array__(self, dtype=None, copy=None):
+        return self.array if dtype is None else self.array.astype(dtype)
+
+    def tobytes(self):
+        return self._raw
+
+    def tolist(self):
+        return self.array.tolist()
+
+    def __len__(self):
+        return len(self._raw) // DTYPE.itemsize
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.array[index].tolist()
+        return float(self.array[index])
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __eq__(self, other):
+        """Equal to any sequence holding the same values at float32 precision."""
+        if other is None:
+            return False
+        try:
+            return bool(np.array_equal(self.array, np.asarray(other, dtype=DTYPE)))
+        except (TypeError, ValueError):
+            return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'PackedVector(dims={len(self)})'
+
+
+class Float32Vector(TypeDecorator):
+    """Stores a float sequence as packed float32 bytes (BYTEA on Postgres)."""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, PackedVector):
+            return value.tobytes() or None
+        packed = np.asarray(value, dtype=DTYPE).tobytes()
+        return packed or None
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return PackedVector(value)
@@ -0,0 +1,383 @@
+"""Per-firm columnar (Parquet) snapshot of billing and case data.
+
+Finance runs its own analysis on these files instead of querying production.
+Layout in the private ``analytics-snapshots`` bucket::
+
+    <firm_id>/manifest.json
+    <firm_id>/<table>/month=YYYY-MM/part-<version>.parquet
+
+Each table is partitioned by month of a business date (invoice date, event
+date, …). A run is incremental: only months holding a row whose
+``updated_at`` is at or after the previous run's start are re-exported, and
+each re-exported month is rewritten whole under a new version number, so a
+partition file is always a complete, immutable picture of its month.
+``analytics_snapshot_rows`` keeps the month every exported row went to, and a
+changed row's previous month is rewritten too, so a row whose business date
+moved leaves its old partition; a run reads and upserts only the changed
+rows' entries. The manifest records, per partition, its path, row count and the version that
+wrote it — downstream tools re-read only partitions whose version is newer
+than the one they last saw.
+
+Deletions are not tracked incrementally (there are no tombstones); a
+``full`` run rebuilds every partition and drops months that are now empty.
+pyarrow is imported lazily so the web app does not pay for it on startup.
+"""
+import io
+import json
+import threading
+from copy import deepcopy
+from datetime import date, datetime, timedelta
+from typing import Any, NamedTuple
+
+from flask import current_app
+
+from app.models.models import db, Client, Invoice, InvoiceItem
+from app.models.auth import Firm
+from app.models.case import CaseFile, CaseEvent, CaseExpense
+from app.models.task import Task
+from app.models.analytics_snapshot import AnalyticsSnapshot, AnalyticsSnapshotRow
+from app.services import document_storage as storage
+from app.services.document_storage import StorageError
+
+SNAPSHOT_BUCKET = "analytics-snapshots"
+COMPRESSION = 'zstd'
+BATCH_SIZE = 5000
+STALE_AFTER = timedelta(minutes=30)
+UNDATED = 'undated'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot cannot be produced (e.g. pyarrow is missing)."""
+
+
+class SnapshotTable(NamedTuple):
+    name: str
+    model: Any
+    month_col: Any            # business date that picks the partition
+    changed_col: Any          # watermark column
+    firm_col: Any
+    join: tuple = ()          # (target, onclause) when firm scope lives on a parent
+
+
+SNAPSHOT_TABLES = (
+    SnapshotTable('invoices', Invoice, Invoice.invoice_date, Invoice.updated_at, Invoice.firm_id),
+    # Items have no firm or timestamp of their own; they follow their invoice.
+    SnapshotTable('invoice_items', InvoiceItem, Invoice.invoice_date, Invoice.updated_at,
+                  Invoice.firm_id, join=(Invoice, InvoiceItem.invoice_id == Invoice.id)),
+    SnapshotTable('clients', Client, Client.created_at, Client.updated_at, Client.firm_id),
+    SnapshotTable('case_files', CaseFile, CaseFile.created_at, CaseFile.updated_at,
+                  CaseFile.firm_id),
+    SnapshotTable('case_events', CaseEvent, CaseEvent.event_date, CaseEvent.updated_at,
+                  CaseEvent.firm_id),
+    SnapshotTable('case_expenses', CaseExpense, CaseExpense.created_at, CaseExpense.updated_at,
+                  CaseExpense.firm_id),
+    SnapshotTable('tasks', Task, Task.created_at, Task.updated_at, Task.firm_id),
+)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise SnapshotError('Parquet snapshots need pyarrow installed') from e
+    return pyarrow, pyarrow.parquet
+
+
+def _arrow_type(pa, column):
+    t = column.type
+    if isinstance(t, db.Boolean):
+        return pa.bool_()
+    if isinstance(t, db.Integer):
+        return pa.int64()
+    if isinstance(t, db.Float) or (isinstance(t, db.Numeric) and t.precision is None):
+        return pa.float64()
+    if isinstance(t, db.Numeric):
+        return pa.decimal128(t.precision, t.scale or 0)
+    if isinstance(t, db.DateTime):
+        return pa.timestamp('us')
+    if isinstance(t, db.Date):
+        return pa.date32()
+    return pa.string()  # String, Text and JSON (serialised)
+
+
+def _schema(pa, spec):
+    return pa.schema([pa.field(c.name, _arrow_type(pa, c)) for c in spec.model.__table__.columns])
+
+
+def _base_query(spec, firm_id):
+    query = db.session.query(*spec.model.__table__.columns).select_from(spec.model)
+    if spec.join:
+        query = query.join(*spec.join)
+    return query.filter(spec.firm_col == firm_id)
+
+
+def _month_key(value):
+    return value.strftime('%Y-%m') if value else UNDATED
+
+
+def _month_bounds(spec, month):
+    """[lo, hi) filter values for a 'YYYY-MM' key, typed like the column."""
+    year, mon = (int(x) for x in month.split('-'))
+    lo = date(year, mon, 1)
+    hi = date(year + (mon == 12), mon % 12 + 1, 1)
+    if isinstance(spec.month_col.type, db.DateTime):
+        return datetime.combine(lo, datetime.min.time()), datetime.combine(hi, datetime.min.time())
+    return lo, hi
+
+
+def _primary_key(spec):
+    return spec.model.__table__.primary_key.columns
+
+
+def changed_rows(spec, firm_id, since=None) -> dict:
+    """{primary key: partition key} of rows changed at/after ``since`` (all
+    when None). Keys are '/'-joined strings, as stored in
+    ``analytics_snapshot_rows``."""
+    pk = _primary_key(spec)
+    query = _base_query(spec, firm_id).with_entities(*pk, spec.month_col)
+    if since is not None:
+        query = query.filter(spec.changed_col >= since)
+    return {'/'.join(str(v) for v in row[:-1]): _month_key(row[-1]) for row in query}
+
+
+def _tracked(spec, firm_id):
+    return AnalyticsSnapshotRow.query.filter_by(firm_id=firm_id, table_name=spec.name)
+
+
+def exported_months(spec, firm_id, keys) -> dict:
+    """{primary key: month} that each of ``keys`` was last exported to."""
+    keys = list(keys)
+    found = {}
+    for i in range(0, len(keys), BATCH_SIZE):
+        found.update(_tracked(spec, firm_id)
+                     .filter(AnalyticsSnapshotRow.row_key.in_(keys[i:i + BATCH_SIZE]))
+                     .with_entities(AnalyticsSnapshotRow.row_key, AnalyticsSnapshotRow.month))
+    return found
+
+
+def record_months(spec, firm_id, rows, exported):
+    """Upsert the month of each of ``rows`` ({pk: month}) that is new or moved
+    since ``exported``; the caller commits."""
+    moved = [(key, month) for key, month in rows.items() if exported.get(key) != month]
+    stale = [key for key, _ in moved if key in exported]
+    for i in range(0, len(stale), BATCH_SIZE):
+        (_tracked(spec, firm_id)
+         .filter(AnalyticsSnapshotRow.row_key.in_(stale[i:i + BATCH_SIZE]))
+         .delete(synchronize_session=False))
+    for i in range(0, len(moved), BATCH_SIZE):
+        db.session.execute(AnalyticsSnapshotRow.__table__.insert(), [
+            {'firm_id': firm_id, 'table_name': spec.name, 'row_key': key, 'month': month}
+            for key, month in moved[i:i + BATCH_SIZE]])
+
+
+def changed_months(rows, exported=None) -> set:
+    """Partition keys to rewrite for ``changed_rows``: the months the rows are
+    in now plus, from ``exported`` ({pk: month} as of the last run), the
+    months they were exported to before."""
+    months = set(rows.values())
+    if exported:
+        months.update(exported[key] for key in rows if key in exported)
+    return months
+
+
+def _partition_rows(spec, firm_id, month):
+    query = _base_query(spec, firm_id)
+    if month == UNDATED:
+        query = query.filter(spec.month_col.is_(None))
+    else:
+        lo, hi = _month_bounds(spec, month)
+        query = query.filter(spec.month_col >= lo, spec.month_col < hi)
+    return query.order_by(*_primary_key(spec)).yield_per(BATCH_SIZE)
+
+
+def write_partition(spec, firm_id, month) -> tuple:
+    """Encode one month of one table as Parquet; returns (bytes, row_count)."""
+    pa, pq = _pyarrow()
+    schema = _schema(pa, spec)
+    json_cols = {c.name for c in spec.model.__table__.columns if isinstance(c.type, db.JSON)}
+    buf = io.BytesIO()
+    rows = 0
+    with pq.ParquetWriter(buf, schema, compression=COMPRESSION) as writer:
+        batch = []
+        for row in _partition_rows(spec, firm_id, month):
+            record = dict(row._mapping)
+            for name in json_cols:
+                if record[name] is not None:
+                    record[name] = json.dumps(record[name])
+            batch.append(record)
+            if len(batch) >= BATCH_SIZE:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                rows += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            rows += len(batch)
+    return buf.getvalue(), rows
+
+
+def partition_path(firm_id, table, month, version):
+    return f"{firm_id}/{table}/month={month}/part-{version:06d}.parquet"
+
+
+def manifest_path(firm_id):
+    return f"{firm_id}/manifest.json"
+
+
+def _snapshot_row(firm_id):
+    snap = AnalyticsSnapshot.query.filter_by(firm_id=firm_id).first()
+    if snap is None:
+        snap = AnalyticsSnapshot(firm_id=firm_id, manifest={}, last_counts={})
+        db.session.add(snap)
+        db.session.commit()
+    return snap
+
+
+def claim_snapshot(firm_id, now=None) -> bool:
+    """Atomically mark the firm's snapshot as running (or take over a stuck run)."""
+    now = now or datetime.utcnow()
+    _snapshot_row(firm_id)
+    claimed = (AnalyticsSnapshot.query
+               .filter(AnalyticsSnapshot.firm_id == firm_id,
+                       db.or_(AnalyticsSnapshot.status != 'running',
+                              AnalyticsSnapshot.started_at.is_(None),
+                              AnalyticsSnapshot.started_at < now - STALE_AFTER))
+               .update({'status': 'running', 'started_at': now, 'error': None},
+                       synchronize_session=False))
+    db.session.commit()
+    return claimed == 1
+
+
+def run_snapshot(firm_id, full=False, now=None):
+    """Export the firm's changed partitions and publish a new manifest.
+
+    Returns the snapshot dict, or None when another run holds the firm.
+    New files are uploaded before the manifest that references them, and
+    superseded files are removed only after it, so a reader following the
+    manifest never sees a missing file.
+    """
+    _pyarrow()  # fail before claiming if the writer is missing
+    started = now or datetime.utcnow()
+    if not claim_snapshot(firm_id, started):
+        return None
+    snap = _snapshot_row(firm_id)
+    since = None if full else snap.watermark
+    version = snap.version + 1
+    manifest = deepcopy(snap.manifest or {})
+    tables = manifest.setdefault('tables', {})
+    superseded, counts = [], {}
+
+    try:
+        for spec in SNAPSHOT_TABLES:
+            entry = tables.setdefault(spec.name, {'partitions': {}})
+            entry['columns'] = [c.name for c in spec.model.__table__.columns]
+            partitions = entry['partitions']
+            changed = changed_rows(spec, firm_id, since)
+            if since is None:   # every row is exported afresh
+                _tracked(spec, firm_id).delete(synchronize_session=False)
+                exported = {}
+                record_months(spec, firm_id, changed, exported)
+            elif not db.session.query(_tracked(spec, firm_id).exists()).scalar():
+                exported = {}   # first run since row months were kept
+                record_months(spec, firm_id, changed_rows(spec, firm_id), exported)
+            else:
+                exported = exported_months(spec, firm_id, changed)
+                record_months(spec, firm_id, changed, exported)
+            months = changed_months(changed, exported)
+            if full:  # months that no longer hold any rows disappear
+                for month in set(partitions) - months:
+                    superseded.append(partitions.pop(month)['path'])
+            for month in sorted(months):
+                data, rows = write_partition(spec, firm_id, month)
+                previous = partitions.pop(month, None)
+                if previous:
+                    superseded.append(previous['path'])
+                if rows:
+                    path = partition_path(firm_id, spec.name, month, version)
+                    # upsert: a failed run leaves files under the version it retries with
+                    storage.put_object(path, data, PARQUET_MIMETYPE, bucket=SNAPSHOT_BUCKET,
+                                       upsert=True)
+                    partitions[month] = {'path': path, 'rows': rows, 'version': version,
+                                         'written_at': datetime.utcnow().isoformat()}
+            counts[spec.name] = len(months)
+
+        manifest.update({
+            'firm_id': firm_id,
+            'version': version,
+            'format': 'parquet',
+            'compression': COMPRESSION,
+            'partitioned_by': 'month',
+            'watermark': started.isoformat(),
+            'generated_at': datetime.utcnow().isoformat(),
+        })
+        storage.put_object(manifest_path(firm_id), json.dumps(manifest, indent=2).encode(),
+                           'application/json', bucket=SNAPSHOT_BUCKET, upsert=True)
+    except Exception as e:
+        db.session.rollback()
+        snap = _snapshot_row(firm_id)
+        snap.status = 'failed'
+        snap.error = str(e)
+        snap.finished_at = datetime.utcnow()
+        db.session.commit()
+        current_app.logger.exception(f"analytics snapshot failed for firm {firm_id}")
+        return snap.to_dict()
+
+    snap.version = version
+    snap.watermark = started
+    snap.manifest = manifest
+    snap.last_counts = counts
+    snap.status = 'completed'
+    snap.finished_at = datetime.utcnow()
+    db.session.commit()
+
+    for path in superseded:
+        try:
+            storage.remove_object(path, bucket=SNAPSHOT_BUCKET)
+        except StorageError:
+            current_app.logger.warning(f"could not remove superseded snapshot file {path}")
+    return snap.to_dict()
+
+
+def manifest_with_urls(firm_id, since_version=0, ttl=3600):
+    """The firm's manifest with signed URLs, limited to partitions newer than
+    ``since_version`` so a consumer can fetch only what changed."""
+    snap = AnalyticsSnapshot.query.filter_by(firm_id=firm_id).first()
+    if snap is None or not snap.manifest:
+        return None
+    manifest = deepcopy(snap.manifest)
+    for entry in manifest.get('tables', {}).values():
+        entry['partitions'] = {
+            month: {**p, 'url': storage.signed_url(p['path'], ttl=ttl, bucket=SNAPSHOT_BUCKET)}
+            for month, p in entry['partitions'].items() if p['version'] > since_version
+        }
+    manifest['status'] = snap.to_dict()
+    return manifest
+
+
+def run_all_firms(full=False) -> dict:
+    """Snapshot every firm in turn; one firm's failure does not stop the rest."""
+    results = {}
+    for (firm_id,) in db.session.query(Firm.id).order_by(Firm.id).all():
+        result = run_snapshot(firm_id, full=full)
+        results[firm_id] = result['status'] if result else 'busy'
+    return results
+
+
+def dispatch(firm_id=None, full=False):
+    """Snapshot one firm (or every firm) on a daemon thread with its own app
+    context. Module-level so tests can monkeypatch it to run inline."""
+    app = current_app._get_current_object()
+
+    def _work():
+        with app.app_context():
+            try:
+                if firm_id is None:
+                    run_all_firms(full=full)
+                else:
+                    run_snapshot(firm_id, full=full)
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=_work, name=f'analytics-snapshot-{firm_id or "all"}',
+                     daemon=True).start()
@@ -0,0 +1,113 @@
+"""Kanban board of a firm's case files: every column's count and first cards
+in one query.
+
+The board used to fetch the whole register (closed cases included) and group
+it by stage in the browser. ``board_columns`` asks the database instead:
+``COUNT(*) OVER (PARTITION BY stage)`` gives each column's size and
+``ROW_NUMBER() OVER (PARTITION BY stage, <past the cursor> ORDER BY
+position, id DESC)`` numbers each column's cards, so one statement returns
+the first ``limit`` cards of every column (plus one, to know there are more).
+
+Cards are ordered like the register (position, then newest). Each column
+gets an opaque cursor for its next cards; passing cursors loads more of just
+those columns, in the same single query.
+"""
+import base64
+import binascii
+import json
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import aliased, contains_eager, selectinload
+
+from app.models.models import db
+from app.models.case import CaseFile
+from app.case.stages import STAGES, STAGE_KEYS
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+CLOSED = 'closed'
+
+
+class CursorError(ValueError):
+    """Raised for a cursor that was not issued by board_columns."""
+
+
+def encode_cursor(stage, position, case_id) -> str:
+    raw = json.dumps({'s': stage, 'p': position, 'i': case_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor) -> tuple:
+    """(stage, position, id) of the last card a column has served."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if data.get('s') not in STAGE_KEYS or not isinstance(data.get('p'), str) \
+                or not isinstance(data.get('i'), int):
+            raise ValueError
+        return data['s'], data['p'], data['i']
+    except (binascii.Error, ValueError, TypeError, AttributeError):
+        raise CursorError('Invalid cursor')
+
+
+def board_stages(include_closed=False) -> list:
+    return [s for s in STAGES if include_closed or s['key'] != CLOSED]
+
+
+def _after(cursors):
+    """1 for rows past their column's cursor (all rows of a column without one)."""
+    if not cursors:
+        return db.literal(1)
+    whens = [(db.and_(CaseFile.stage == stage,
+                      db.or_(CaseFile.position > position,
+                             db.and_(CaseFile.position == position, CaseFile.id < case_id))), 1)
+             for stage, (position, case_id) in cursors.items()]
+    return case(*whens, else_=0)
+
+
+def board_columns(query, stages, limit=DEFAULT_LIMIT, cursors=None) -> list:
+    """Columns for ``stages`` (STAGES entries) over the filtered CaseFile
+    ``query``: [{stage, label, count, cards, next_cursor}].
+
+    ``cursors`` maps stage -> (position, id) of the last card served; when
+    given, only those columns are loaded. ``count`` is always the column's
+    full size.
+    """
+    cursors = cursors or {}
+    keys = [s['key'] for s in stages if not cursors or s['key'] in cursors]
+    after = _after(cursors).label('after')
+    ranked = (query.filter(CaseFile.stage.in_(keys))
+              .with_entities(CaseFile,
+                             func.count().over(partition_by=CaseFile.stage).label('column_count'),
+                             after,
+                             func.row_number().over(
+                                 partition_by=(CaseFile.stage, after),
+                                 order_by=(CaseFile.position, CaseFile.id.desc())).label('rn'))
+              .subquery())
+    card = aliased(CaseFile, ranked)
+    rows = (db.session.query(card, ranked.c.column_count, ranked.c.after)
+            .outerjoin(card.summary)
+            .options(selectinload(card.client), contains_eager(card.summary))
+            .filter(ranked.c.rn <= limit + 1)
+            .order_by(ranked.c.stage, ranked.c.rn)
+            .all())
+
+    counts, cards = {}, {}
+    for case_file, column_count, is_after in rows:
+        counts[case_file.stage] = column_count
+        if is_after:
+            cards.setdefault(case_file.stage, []).append(case_file)
+    columns = []
+    for stage in stages:
+        if stage['key'] not in keys:
+            continue
+        page = cards.get(stage['key'], [])
+        more = len(page) > limit
+        page = page[:limit]
+        columns.append({
+            'stage': stage['key'], 'label': stage['label'],
+            'count': counts.get(stage['key'], 0),
+            'cards': [c.to_dict(include_summary=True) for c in page],
+            'next_cursor': encode_cursor(stage['key'], page[-1].position, page[-1].id)
+            if more else None,
+        })
+    return columns
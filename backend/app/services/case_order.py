@@ -0,0 +1,129 @@
+"""Kanban card order: fractional string keys in ``CaseFile.position``.
+
+Columns are sorted by ``(position, id DESC)``. Positions used to be integers,
+so dropping a card between two others meant renumbering everything below it.
+Now a position is a base-36 string read as a fraction (``'i'`` = 0.5), and
+``key_between`` always finds a key strictly between two neighbours, so a move
+writes only the moved card. Keys grow about one character per five moves
+into the same gap; when a new key would exceed ``MAX_KEY_LENGTH``, or the
+neighbours share a key (rows from before this scheme), ``rebalance`` respaces
+the whole column and the move is retried.
+
+Keys compare byte-wise: the Postgres column is ``COLLATE "C"``
+(migration 040), SQLite compares strings binary by default.
+"""
+from app.models.models import db
+from app.models.case import CaseFile
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+MAX_KEY_LENGTH = 24
+
+
+class OrderError(ValueError):
+    """Raised for an invalid key or a neighbour card that is not in the column."""
+
+
+def is_valid_key(key) -> bool:
+    return (isinstance(key, str) and 0 < len(key) <= 64 and not key.endswith(DIGITS[0])
+            and all(ch in DIGITS for ch in key))
+
+
+def _midpoint(a, b):
+    """A key between fractions ``a`` ('' = 0) and ``b`` (None = 1)."""
+    if b is not None:
+        n = 0   # skip the common prefix, padding ``a`` with zero digits
+        while n < len(b) and (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    low = DIGITS.index(a[0]) if a else 0
+    high = DIGITS.index(b[0]) if b is not None else len(DIGITS)
+    if high - low > 1:
+        return DIGITS[(low + high) // 2]
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[low] + _midpoint(a[1:], None)
+
+
+def key_between(a=None, b=None) -> str:
+    """A key sorting after ``a`` and before ``b`` (None = open end)."""
+    if a is not None and b is not None and a >= b:
+        raise OrderError(f'{a!r} does not sort before {b!r}')
+    return _midpoint(a or '', b)
+
+
+def keys_between(a, b, n) -> list:
+    """``n`` ascending keys between ``a`` and ``b``, as short as possible."""
+    if n <= 0:
+        return []
+    mid = key_between(a, b)
+    half = (n - 1) // 2
+    return keys_between(a, mid, half) + [mid] + keys_between(mid, b, n - 1 - half)
+
+
+def _column(firm_id, stage):
+    return CaseFile.query.filter_by(firm_id=firm_id, stage=stage)
+
+
+def rebalance(firm_id, stage, exclude_id=None) -> int:
+    """Respace a column's keys evenly, keeping its order. Caller commits."""
+    cards = (_column(firm_id, stage).filter(CaseFile.id != exclude_id)
+             .order_by(CaseFile.position, CaseFile.id.desc()).all())
+    for card, key in zip(cards, keys_between(None, None, len(cards))):
+        card.position = key
+    db.session.flush()
+    return len(cards)
+
+
+def _anchor(firm_id, stage, card_id):
+    anchor = _column(firm_id, stage).filter_by(id=card_id).first()
+    if anchor is None:
+        raise OrderError(f'Case {card_id} is not in {stage}')
+    return anchor
+
+
+def _neighbours(case_file, stage, after_id, before_id):
+    """Positions of the cards the moved card lands between (None = column end)."""
+    others = _column(case_file.firm_id, stage).filter(CaseFile.id != case_file.id)
+    if after_id is not None:
+        above = _anchor(case_file.firm_id, stage, after_id)
+        below = (others.filter(db.or_(CaseFile.position > above.position,
+                                      db.and_(CaseFile.position == above.position,
+                                              CaseFile.id < above.id)))
+                 .order_by(CaseFile.position, CaseFile.id.desc()).first())
+        return above.position, below.position if below else None
+    if before_id is not None:
+        below = _anchor(case_file.firm_id, stage, before_id)
+        above = (others.filter(db.or_(CaseFile.position < below.position,
+                                      db.and_(CaseFile.position == below.position,
+                                              CaseFile.id > below.id)))
+                 .order_by(CaseFile.position.desc(), CaseFile.id).first())
+        return above.position if above else None, below.position
+    first = others.order_by(CaseFile.position, CaseFile.id.desc()).first()
+    return None, first.position if first else None
+
+
+def top_key(firm_id, stage) -> str:
+    """Key for a new card at the top of a column."""
+    first = _column(firm_id, stage).order_by(CaseFile.position, CaseFile.id.desc()).first()
+    return key_between(None, first.position if first else None)
+
+
+def place(case_file, stage, after_id=None, before_id=None) -> str:
+    """Move ``case_file`` into ``stage`` right below card ``after_id``, else
+    right above ``before_id``, else to the top. Writes only the moved card
+    unless the column needs a rebalance. Caller commits."""
+    if case_file.id in (after_id, before_id):
+        raise OrderError('A card cannot be placed next to itself')
+    for attempt in range(2):
+        lower, upper = _neighbours(case_file, stage, after_id, before_id)
+        if lower is None or upper is None or lower < upper:
+            key = key_between(lower, upper)
+            if len(key) <= MAX_KEY_LENGTH or attempt:
+                break
+        rebalance(case_file.firm_id, stage, exclude_id=case_file.id)
+    else:
+        raise OrderError('Could not find a position between the neighbouring cards')
+    case_file.stage = stage
+    case_file.position = key
+    return key
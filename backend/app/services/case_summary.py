@@ -0,0 +1,182 @@
+"""Per-case summary rows (``case_summaries``) behind case cards and the vault.
+
+A card shows the document count, open tasks, outstanding fees and last
+activity of its case. Those live in five tables, so the register and the
+board would need a query per source per page. Instead every write path that
+touches a case's events, documents, tasks, invoices or expenses calls
+``refresh(case_id, ...)`` before committing, which recomputes just those
+cases' aggregates (indexed per-case queries) and upserts their rows in the
+same transaction. Readers then get the summary in the same query as the case
+(an outer join; a case with no row has nothing recorded yet).
+
+Recomputing instead of incrementing keeps a refresh idempotent: a missed or
+repeated call cannot accumulate drift, it just leaves the row stale until the
+next write. ``verify`` reports rows that disagree with the source tables
+(writers outside the API, manual SQL) and ``rebuild`` rewrites them::
+
+    python -m app.services.case_summary verify [--firm ID]
+    python -m app.services.case_summary rebuild [--firm ID]
+
+Outstanding fees are the totals of sent, unpaid invoices: drafts are not yet
+billed and void invoices never will be.
+"""
+from decimal import Decimal
+
+from sqlalchemy import case, func
+
+from app.models.models import db, Invoice
+from app.models.case import CaseFile, CaseEvent, CaseDocument, CaseExpense, CaseSummary
+from app.models.task import Task
+
+BATCH_SIZE = 500
+UNBILLED_STATUSES = ('draft', 'paid', 'void')
+FIELDS = ('document_count', 'open_task_count', 'outstanding_fees', 'last_activity_at')
+CENT = Decimal('0.01')
+
+
+def _empty():
+    return {'document_count': 0, 'open_task_count': 0, 'outstanding_fees': Decimal('0.00'),
+            'last_activity_at': None}
+
+
+def _latest(a, b):
+    return max(a, b) if a and b else a or b
+
+
+def _sources(case_ids):
+    """(case_file_id column, {field: aggregate}) query per source table."""
+    documents = (db.session.query(CaseDocument.case_file_id,
+                                  func.count(CaseDocument.id),
+                                  func.max(CaseDocument.created_at))
+                 .filter(CaseDocument.case_file_id.in_(case_ids),
+                         CaseDocument.is_exhibit.isnot(True))
+                 .group_by(CaseDocument.case_file_id))
+    tasks = (db.session.query(Task.case_file_id,
+                              func.sum(case((Task.done.is_(False), 1), else_=0)),
+                              func.max(Task.updated_at))
+             .filter(Task.case_file_id.in_(case_ids))
+             .group_by(Task.case_file_id))
+    invoices = (db.session.query(Invoice.case_file_id,
+                                 func.sum(case((Invoice.status.notin_(UNBILLED_STATUSES),
+                                                Invoice.total), else_=0)),
+                                 func.max(Invoice.updated_at))
+                .filter(Invoice.case_file_id.in_(case_ids))
+                .group_by(Invoice.case_file_id))
+    events = (db.session.query(CaseEvent.case_file_id, func.max(CaseEvent.updated_at))
+              .filter(CaseEvent.case_file_id.in_(case_ids))
+              .group_by(CaseEvent.case_file_id))
+    expenses = (db.session.query(CaseExpense.case_file_id, func.max(CaseExpense.updated_at))
+                .filter(CaseExpense.case_file_id.in_(case_ids))
+                .group_by(CaseExpense.case_file_id))
+    return (('document_count', documents), ('open_task_count', tasks),
+            ('outstanding_fees', invoices), (None, events), (None, expenses))
+
+
+def compute(case_ids) -> dict:
+    """{case_id: {field: value}} from the source tables."""
+    case_ids = list(case_ids)
+    out = {cid: _empty() for cid in case_ids}
+    if not case_ids:
+        return out
+    for field, query in _sources(case_ids):
+        for row in query:
+            values = out[row[0]]
+            if field:
+                values[field] = row[1] or 0
+            values['last_activity_at'] = _latest(values['last_activity_at'], row[-1])
+    for values in out.values():
+        values['document_count'] = int(values['document_count'])
+        values['open_task_count'] = int(values['open_task_count'])
+        values['outstanding_fees'] = Decimal(values['outstanding_fees']).quantize(CENT)
+    return out
+
+
+def _stored(row) -> dict:
+    if row is None:
+        return _empty()
+    return {'document_count': row.document_count or 0,
+            'open_task_count': row.open_task_count or 0,
+            'outstanding_fees': Decimal(row.outstanding_fees or 0).quantize(CENT),
+            'last_activity_at': row.last_activity_at}
+
+
+def refresh(*case_ids):
+    """Recompute the summaries of ``case_ids`` (None and deleted cases are
+    skipped). Caller commits."""
+    ids = {cid for cid in case_ids if cid}
+    if not ids:
+        return
+    firms = dict(db.session.query(CaseFile.id, CaseFile.firm_id).filter(CaseFile.id.in_(ids)))
+    rows = {r.case_file_id: r for r in
+            CaseSummary.query.filter(CaseSummary.case_file_id.in_(list(firms)))}
+    for cid, values in compute(firms).items():
+        row = rows.get(cid)
+        if row is None:
+            row = CaseSummary(case_file_id=cid, firm_id=firms[cid])
+            db.session.add(row)
+        for field, value in values.items():
+            setattr(row, field, value)
+
+
+def refresh_invoices(invoice_ids):
+    """Refresh the cases of ``invoice_ids`` (for bulk status updates)."""
+    if invoice_ids:
+        refresh(*(cid for (cid,) in db.session.query(Invoice.case_file_id)
+                  .filter(Invoice.id.in_(list(invoice_ids)))))
+
+
+def _batches(firm_id=None):
+    query = db.session.query(CaseFile.id).order_by(CaseFile.id)
+    if firm_id is not None:
+        query = query.filter(CaseFile.firm_id == firm_id)
+    ids = [cid for (cid,) in query]
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+def _drift(case_ids) -> list:
+    rows = {r.case_file_id: r for r in
+            CaseSummary.query.filter(CaseSummary.case_file_id.in_(case_ids))}
+    drift = []
+    for cid, actual in compute(case_ids).items():
+        stored = _stored(rows.get(cid))
+        drift += [{'case_file_id': cid, 'field': f, 'stored': stored[f], 'actual': actual[f]}
+                  for f in FIELDS if stored[f] != actual[f]]
+    return drift
+
+
+def verify(firm_id=None) -> dict:
+    """Compare every summary with its source tables: {checked, drift: [...]}."""
+    checked, drift = 0, []
+    for ids in _batches(firm_id):
+        checked += len(ids)
+        drift += _drift(ids)
+    return {'checked': checked, 'drift': drift}
+
+
+def rebuild(firm_id=None) -> dict:
+    """Rewrite the summaries that drifted; commits per batch."""
+    checked, fixed = 0, 0
+    for ids in _batches(firm_id):
+        checked += len(ids)
+        stale = sorted({d['case_file_id'] for d in _drift(ids)})
+        refresh(*stale)
+        db.session.commit()
+        fixed += len(stale)
+    return {'checked': checked, 'fixed': fixed}
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('command', choices=('verify', 'rebuild'))
+    parser.add_argument('--firm', type=int, default=None, help='only this firm')
+    args = parser.parse_args()
+
+    from app.main import create_app
+    with create_app().app_context():
+        result = verify(args.firm) if args.command == 'verify' else rebuild(args.firm)
+    print(json.dumps(result, indent=2, default=str))
+    raise SystemExit(1 if result.get('drift') else 0)
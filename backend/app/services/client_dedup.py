@@ -0,0 +1,241 @@
+"""Duplicate-client detection and merge.
+
+Imports and quick-add match clients by exact lower-cased name, so the same
+party often exists twice ("ICICI Lombard" / "ICICI Lombard Gen. Ins.") and
+splits its billing. Detection here is blocked + vectorised:
+
+* every client gets a few cheap blocking keys (name prefix, email, phone,
+  tax id); only clients sharing a key are ever compared, so a firm with
+  thousands of clients never pays for the full O(n²) cross product;
+* inside each block, normalised names are scored in ``rapidfuzz.process.cdist``
+  calls (``name_scores``): token-sort ratio (word order, legal suffixes and
+  typos do not matter, extra words do), raised to the token-set ratio when
+  the shorter name is distinctive enough to stand for the longer one — at
+  least ``MIN_SUBSET_TOKENS`` words and ``MIN_SUBSET_LENGTH`` characters. So
+  "ICICI Lombard" matches "ICICI Lombard Gen. Ins." while "Raj Kumar" does
+  not match "Raj Kumar Gupta", nor "Sharma" "Sharma and Sons";
+* exact email/phone/tax-id agreement is computed as NumPy equality matrices.
+
+Merging re-points invoices, case files and recurring schedules with one bulk
+UPDATE per table, then deletes the absorbed clients.
+"""
+import re
+from collections import defaultdict
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from app.models.models import db, Client, Invoice, RecurringSchedule
+from app.models.case import CaseFile
+from app.utils.phone import normalize_e164
+
+DEFAULT_THRESHOLD = 85
+# A name scores as a subset of a longer one (token_set_ratio) only with at
+# least this many words and characters once normalised; shorter names (a
+# bare surname, a first + last name) are compared whole (token_sort_ratio).
+MIN_SUBSET_TOKENS = 2
+MIN_SUBSET_LENGTH = 12
+# Score assigned when an identifier matches exactly, regardless of the name.
+TAX_ID_MATCH = 100
+EMAIL_MATCH = 95
+PHONE_MATCH = 90
+
+# Tokens that carry no identity ("Pvt. Ltd.", "& Co.") — dropped before scoring.
+_NOISE_TOKENS = {
+    'ltd', 'limited', 'pvt', 'private', 'llp', 'inc', 'co', 'company', 'corp',
+    'corporation', 'the', 'and',
+}
+_MS_PREFIX = re.compile(r'^\s*m\s*/\s*s\.?\s+|^\s*messrs\.?\s+', re.IGNORECASE)
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Tables whose client_id is re-pointed on merge.
+CLIENT_REFERENCES = (Invoice, CaseFile, RecurringSchedule)
+
+
+def normalize_name(name) -> str:
+    """'M/s. ICICI Lombard Gen. Ins. Co. Ltd' -> 'icici lombard gen ins'."""
+    name = _MS_PREFIX.sub('', name or '').lower()
+    tokens = [t for t in _NON_ALNUM.split(name) if t and t not in _NOISE_TOKENS]
+    return ' '.join(tokens)
+
+
+def normalize_email(email) -> str:
+    return (email or '').strip().lower()
+
+
+def normalize_tax_id(tax_id) -> str:
+    return re.sub(r'[^A-Z0-9]', '', (tax_id or '').upper())
+
+
+def _blocking_keys(norm_name, email, phone, tax_id):
+    keys = []
+    if norm_name:
+        keys.append('n:' + norm_name.split(' ', 1)[0][:4])
+    if email:
+        keys.append('e:' + email)
+    if phone:
+        keys.append('p:' + phone)
+    if tax_id:
+        keys.append('t:' + tax_id)
+    return keys
+
+
+def name_scores(queries, choices) -> np.ndarray:
+    """(len(queries), len(choices)) int16 similarity of normalised names."""
+    whole = process.cdist(queries, choices, scorer=fuzz.token_sort_ratio,
+                          dtype=np.uint8, workers=-1).astype(np.int16)
+    subset = process.cdist(queries, choices, scorer=fuzz.token_set_ratio,
+                           dtype=np.uint8, workers=-1).astype(np.int16)
+
+    def distinctive(names):
+        return np.array([len(n) >= MIN_SUBSET_LENGTH and n.count(' ') + 1 >= MIN_SUBSET_TOKENS
+                         for n in names], dtype=bool)
+
+    both = distinctive(queries)[:, None] & distinctive(choices)[None, :]
+    return np.where(both, subset, whole)
+
+
+def _exact_matrix(values):
+    """Pairwise equality of non-empty values, as a boolean matrix."""
+    arr = np.array(values, dtype=object)
+    present = arr != ''
+    return (arr[:, None] == arr[None, :]) & present[:, None] & present[None, :]
+
+
+def _score_block(rows, threshold):
+    """Yield (i, j, score, reasons) for every pair in one block above threshold.
+
+    ``rows`` are the block's (id, name, norm_name, email, phone, tax_id) tuples.
+    """
+    names = [r[2] for r in rows]
+    name_score = name_scores(names, names)
+    tax_eq = _exact_matrix([r[5] for r in rows])
+    email_eq = _exact_matrix([r[3] for r in rows])
+    phone_eq = _exact_matrix([r[4] for r in rows])
+
+    score = np.maximum.reduce([
+        name_score,
+        np.where(tax_eq, TAX_ID_MATCH, 0),
+        np.where(email_eq, EMAIL_MATCH, 0),
+        np.where(phone_eq, PHONE_MATCH, 0),
+    ])
+    # Only the strict upper triangle: each unordered pair once, no self-pairs.
+    ii, jj = np.nonzero(np.triu(score >= threshold, k=1))
+    for i, j in zip(ii.tolist(), jj.tolist()):
+        reasons = []
+        if name_score[i, j] >= threshold:
+            reasons.append('name')
+        if email_eq[i, j]:
+            reasons.append('email')
+        if phone_eq[i, j]:
+            reasons.append('phone')
+        if tax_eq[i, j]:
+            reasons.append('tax_id')
+        yield i, j, int(score[i, j]), reasons
+
+
+def find_duplicate_candidates(firm_id, threshold=DEFAULT_THRESHOLD) -> list:
+    """Scored merge candidates for a firm, best first.
+
+    Each candidate is {client_ids, names, score, reasons}; the lower id is
+    listed first (usually the original, so the natural one to keep).
+    """
+    rows = []
+    for cid, name, email, phone, tax_id in (
+            db.session.query(Client.id, Client.name, Client.email, Client.phone, Client.tax_id)
+            .filter(Client.firm_id == firm_id).order_by(Client.id)):
+        rows.append((cid, name, normalize_name(name), normalize_email(email),
+                     normalize_e164(phone) or '', normalize_tax_id(tax_id)))
+
+    blocks = defaultdict(list)
+    for idx, r in enumerate(rows):
+        for key in _blocking_keys(r[2], r[3], r[4], r[5]):
+            blocks[key].append(idx)
+
+    best = {}
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        block_rows = [rows[m] for m in members]
+        for i, j, score, reasons in _score_block(block_rows, threshold):
+            a, b = members[i], members[j]
+            pair = (rows[a][0], rows[b][0])
+            entry = best.get(pair)
+            if entry is None:
+                best[pair] = {
+                    'client_ids': list(pair),
+                    'names': [rows[a][1], rows[b][1]],
+                    'score': score,
+                    'reasons': sorted(reasons),
+                }
+            else:  # same pair surfaced by another block (e.g. name and email)
+                entry['score'] = max(entry['score'], score)
+                entry['reasons'] = sorted(set(entry['reasons']) | set(reasons))
+    return sorted(best.values(), key=lambda c: (-c['score'], c['client_ids']))
+
+
+def merge_clients(firm_id, keep_id, merge_ids) -> dict:
+    """Fold ``merge_ids`` into ``keep_id`` within one firm, in one transaction.
+
+    Blank contact fields on the kept client are filled from the absorbed ones.
+    Raises ValueError if any id is missing or belongs to another firm.
+    """
+    merge_ids = {int(i) for i in merge_ids or []} - {int(keep_id)}
+    if not merge_ids:
+        raise ValueError('merge_ids must name at least one other client')
+    clients = Client.query.filter(Client.firm_id == firm_id,
+                                  Client.id.in_(merge_ids | {int(keep_id)})).all()
+    by_id = {c.id: c for c in clients}
+    if len(by_id) != len(merge_ids) + 1:
+        raise ValueError('Client not found')
+
+    keep = by_id[int(keep_id)]
+    for cid in sorted(merge_ids):
+        other = by_id[cid]
+        for field in ('email', 'phone', 'address', 'tax_id', 'notes'):
+            if not getattr(keep, field) and getattr(other, field):
+                setattr(keep, field, getattr(other, field))
+
+    moved = {}
+    for model in CLIENT_REFERENCES:
+        moved[model.__tablename__] = (
+            model.query
+            .filter(model.firm_id == firm_id, model.client_id.in_(merge_ids))
+            .update({'client_id': keep.id}, synchronize_session=False))
+    Client.query.filter(Client.firm_id == firm_id, Client.id.in_(merge_ids)) \
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return {'kept': keep.to_dict(), 'merged_ids': sorted(merge_ids), 'moved': moved}
+
+
+class ClientMatcher:
+    """Incremental fuzzy lookup used inline by importers.
+
+    When an import is about to create a new client, ``propose`` returns the
+    closest existing client above the threshold so the job can surface it as
+    a merge suggestion instead of silently splitting the client's history.
+    """
+
+    def __init__(self, clients=(), threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._ids, self._names, self._norms = [], [], []
+        for cid, name in clients:
+            self.add(cid, name)
+
+    def add(self, client_id, name):
+        norm = normalize_name(name)
+        if norm:
+            self._ids.append(client_id)
+            self._names.append(name)
+            self._norms.append(norm)
+
+    def propose(self, name):
+        norm = normalize_name(name)
+        if not norm or not self._norms:
+            return None
+        scores = name_scores([norm], self._norms)[0]
+        idx = int(np.argmax(scores))
+        if scores[idx] < self.threshold:
+            return None
+        return {'match_id': self._ids[idx], 'match_name': self._names[idx],
+                'score': int(scores[idx])}
@@ -2,6 +2,7 @@
 
 Module-level functions so tests can monkeypatch them without a network call.
 Bytes live in a private bucket; download is always a short-lived signed URL.
+Other private buckets (analytics snapshots) reuse the same calls via ``bucket``.
 """
 import uuid
 
@@ -16,28 +17,39 @@ def build_storage_path(firm_id, case_file_id, ext):
     return f"{firm_id}/{case_file_id}/{uuid.uuid4().hex}.{ext}"
 
 
-def _bucket():
+def _bucket(bucket=BUCKET):
     from app.services.supabase_client import get_supabase_client
     try:
         client = get_supabase_client()
     except ValueError as e:
         raise StorageError(f"Storage not configured: {e}") from e
-    return client.storage.from_(BUCKET)
+    return client.storage.from_(bucket)
 
 
-def put_object(storage_path, data, content_type):
+def put_object(storage_path, data, content_type, bucket=BUCKET, upsert=False):
+    file_options = {'content-type': content_type or 'application/octet-stream'}
+    if upsert:
+        file_options['upsert'] = 'true'
     try:
-        _bucket().upload(storage_path, data,
-                         file_options={'content-type': content_type or 'application/octet-stream'})
+        _bucket(bucket).upload(storage_path, data, file_options=file_options)
     except StorageError:
         raise
     except Exception as e:
         raise StorageError(f"Upload failed: {e}") from e
 
 
-def signed_url(storage_path, ttl=3600):
+def get_object(storage_path, bucket=BUCKET):
     try:
-        result = _bucket().create_signed_url(storage_path, expires_in=ttl)
+        return _bucket(bucket).download(storage_path)
+    except StorageError:
+        raise
+    except Exception as e:
+        raise StorageError(f"Download failed: {e}") from e
+
+
+def signed_url(storage_path, ttl=3600, bucket=BUCKET):
+    try:
+        result = _bucket(bucket).create_signed_url(storage_path, expires_in=ttl)
     except StorageError:
         raise
     except Exception as e:
@@ -48,9 +60,9 @@ def signed_url(storage_path, ttl=3600):
     return url
 
 
-def remove_object(storage_path):
+def remove_object(storage_path, bucket=BUCKET):
     try:
-        _bucket().remove([storage_path])
+        _bucket(bucket).remove([storage_path])
     except StorageError:
         raise
     except Exception as e:
@@ -0,0 +1,343 @@
+"""Background CSV import jobs: submit, run in committed chunks, resume, report.
+
+An import is persisted as an ImportJob (CSV included) and processed off the
+request thread. Each chunk of rows is written together with the job's cursor
+and tallies in a single transaction, so a worker killed mid-run loses at most
+the chunk in flight and the next run picks up exactly where the last commit
+left off. Row-level problems (missing fields, unknown client, bad numbers) are
+recorded as rejected rows instead of aborting the import.
+"""
+import csv
+import io
+import threading
+from datetime import datetime, timedelta
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.models.models import db, Client, Invoice, InvoiceItem
+from app.models.import_job import ImportJob, IMPORT_KINDS, ACTIVE_STATUSES
+from app.services.client_dedup import ClientMatcher
+
+CHUNK_SIZE = 200
+# A running job whose heartbeat is older than this is presumed orphaned (worker
+# killed/recycled) and may be claimed again. Comfortably above one chunk's time.
+STALE_AFTER = timedelta(minutes=5)
+VALID_STATUSES = ('draft', 'sent', 'paid', 'void')
+
+
+class ImportConflict(Exception):
+    """Raised when the firm already has a queued or running import."""
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; recorded as rejected, not fatal."""
+
+
+def _cell(row, key):
+    return (row.get(key) or '').strip()
+
+
+def _parse_date(value):
+    from app.api.import_csv import parse_date
+    return parse_date(value)
+
+
+# ---------------------------------------------------------------------------
+# Per-kind row processors. load_* builds the lookup caches (ids only, so they
+# survive the per-chunk commits); *_row imports one row or raises RowError.
+# ---------------------------------------------------------------------------
+
+def _load_caches(job):
+    existing = db.session.query(Client.id, Client.name).filter(Client.firm_id == job.firm_id).all()
+    clients = {name.lower(): cid for cid, name in existing}
+    invoices = {
+        number: iid for iid, number in
+        db.session.query(Invoice.id, Invoice.invoice_number).filter(Invoice.firm_id == job.firm_id)
+    }
+    state = job.state or {}
+    return {'clients': clients, 'invoices': invoices,
+            'seen': set(state.get('seen', [])), 'touched': set(),
+            'matcher': ClientMatcher(existing),
+            'client_matches': list(state.get('client_matches', []))}
+
+
+def _migration_row(job, ctx, counts, row, row_num):
+    """One line item of the combined migration format (see import_migration)."""
+    client_name = _cell(row, 'client_name')
+    if not client_name:
+        raise RowError('Missing client_name')
+    invoice_number = _cell(row, 'invoice_number')
+    if not invoice_number:
+        raise RowError('Missing invoice_number')
+    description = _cell(row, 'item_description')
+    quantity = float(row.get('quantity') or 1)
+    rate = float(row.get('rate') or 0)
+    tax_rate = float(row.get('tax_rate') or 0)
+
+    client_id = ctx['clients'].get(client_name.lower())
+    if client_id is None:
+        client = Client(
+            firm_id=job.firm_id, created_by_user_id=job.created_by_user_id,
+            name=client_name,
+            address=row.get('client_address') or '',
+            email=row.get('client_email') or '',
+            phone=row.get('client_phone') or '',
+            tax_id=row.get('client_tax_id') or '',
+            default_tax_rate=18.0,
+        )
+        db.session.add(client)
+        db.session.flush()
+        client_id = ctx['clients'][client_name.lower()] = client.id
+        counts['clients_created'] = counts.get('clients_created', 0) + 1
+        # Likely the same party under a variant name: surface it for merging.
+        match = ctx['matcher'].propose(client_name)
+        if match:
+            ctx['client_matches'].append({'row': row_num, 'client_id': client_id,
+                                          'name': client_name, **match})
+        ctx['matcher'].add(client_id, client_name)
+
+    invoice_id = ctx['invoices'].get(invoice_number)
+    if invoice_id is None:
+        invoice_date = _parse_date(row.get('invoice_date') or '') or datetime.utcnow().date()
+        status = (row.get('status') or 'paid').strip().lower()
+        if status not in VALID_STATUSES:
+            status = 'paid'
+        invoice = Invoice(
+            firm_id=job.firm_id, created_by_user_id=job.created_by_user_id,
+            invoice_number=invoice_number, client_id=client_id,
+            invoice_date=invoice_date,
+            due_date=_parse_date(row.get('due_date') or ''),
+            short_desc=row.get('short_desc') or '',
+            tax_rate=tax_rate, status=status,
+            paid_date=invoice_date if status == 'paid' else None,
+        )
+        db.session.add(invoice)
+        db.session.flush()
+        invoice_id = ctx['invoices'][invoice_number] = invoice.id
+        counts['invoices_created'] = counts.get('invoices_created', 0) + 1
+
+    if description:
+        db.session.add(InvoiceItem(invoice_id=invoice_id, description=description,
+                                   quantity=quantity, rate=rate, amount=quantity * rate))
+        counts['items_added'] = counts.get('items_added', 0) + 1
+    ctx['touched'].add(invoice_id)
+
+
+def _v2_invoice_row(job, ctx, counts, row, row_num):
+    """One line item of the v2 client format (see import_v2_invoices).
+
+    Existing invoices are overwritten: their items are cleared the first time
+    the job meets their number. ``seen`` is persisted with each chunk so a
+    resumed job never clears items it already re-imported.
+    """
+    raw_number = _cell(row, 'Invoice No.')
+    if not raw_number:
+        raise RowError('Missing Invoice No.')
+    try:
+        invoice_number = str(int(raw_number)).zfill(4)
+    except ValueError:
+        invoice_number = raw_number
+    party_name = _cell(row, 'Party Name')
+    if not party_name:
+        raise RowError('Missing Party Name')
+    client_id = ctx['clients'].get(party_name.lower())
+    if client_id is None:
+        raise RowError(f"Client '{party_name}' not found. Import companies first.")
+    item_name = _cell(row, 'Item Name')
+    amount = float(row.get('Amount') or 0)
+
+    invoice_id = ctx['invoices'].get(invoice_number)
+    if invoice_number not in ctx['seen']:
+        if invoice_id is not None:
+            InvoiceItem.query.filter_by(invoice_id=invoice_id).delete(synchronize_session=False)
+            counts['invoices_updated'] = counts.get('invoices_updated', 0) + 1
+        else:
+            invoice = Invoice(
+                firm_id=job.firm_id, created_by_user_id=job.created_by_user_id,
+                invoice_number=invoice_number, client_id=client_id,
+                invoice_date=_parse_date(row.get('Date') or '') or datetime.utcnow().date(),
+                due_date=None, short_desc=row.get('Description') or '',
+                tax_rate=0, status='sent', paid_date=None,
+            )
+            db.session.add(invoice)
+            db.session.flush()
+            invoice_id = ctx['invoices'][invoice_number] = invoice.id
+            counts['invoices_created'] = counts.get('invoices_created', 0) + 1
+        ctx['seen'].add(invoice_number)
+
+    if item_name:
+        db.session.add(InvoiceItem(invoice_id=invoice_id, description=item_name,
+                                   quantity=1, rate=amount, amount=amount))
+        counts['items_added'] = counts.get('items_added', 0) + 1
+    ctx['touched'].add(invoice_id)
+
+
+PROCESSORS = {
+    'migration': _migration_row,
+    'v2_invoices': _v2_invoice_row,
+}
+
+
+# ---------------------------------------------------------------------------
+# Job lifecycle
+# ---------------------------------------------------------------------------
+
+def active_job(firm_id):
+    return (ImportJob.query
+            .filter(ImportJob.firm_id == firm_id, ImportJob.status.in_(ACTIVE_STATUSES))
+            .first())
+
+
+def submit_job(firm_id, user_id, kind, file_name, content):
+    """Persist a new queued import. Raises ValueError for a bad kind/empty CSV
+    and ImportConflict when the firm already has an active import."""
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"kind must be one of {sorted(IMPORT_KINDS)}")
+    reader = csv.DictReader(io.StringIO(content))
+    total = sum(1 for _ in reader)
+    if not reader.fieldnames:
+        raise ValueError('CSV has no header row')
+    if active_job(firm_id) is not None:
+        raise ImportConflict('An import is already running for this firm')
+
+    job = ImportJob(firm_id=firm_id, created_by_user_id=user_id, kind=kind,
+                    status='queued', file_name=file_name, payload=content,
+                    columns=list(reader.fieldnames), total_rows=total,
+                    counts={}, rejected=[], state={})
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError as e:  # lost the race against a concurrent submit
+        db.session.rollback()
+        raise ImportConflict('An import is already running for this firm') from e
+    return job
+
+
+def is_stale(job, now=None):
+    """True for an active job that no worker appears to be advancing."""
+    now = now or datetime.utcnow()
+    if job.status == 'running':
+        return job.heartbeat_at is None or job.heartbeat_at < now - STALE_AFTER
+    if job.status == 'queued':
+        return job.created_at is not None and job.created_at < now - STALE_AFTER
+    return False
+
+
+def claim_job(job_id, now=None) -> bool:
+    """Atomically mark a queued (or orphaned running) job as ours."""
+    now = now or datetime.utcnow()
+    cutoff = now - STALE_AFTER
+    claimed = (ImportJob.query
+               .filter(ImportJob.id == job_id,
+                       db.or_(ImportJob.status == 'queued',
+                              db.and_(ImportJob.status == 'running',
+                                      db.or_(ImportJob.heartbeat_at.is_(None),
+                                             ImportJob.heartbeat_at < cutoff))))
+               .update({'status': 'running', 'heartbeat_at': now,
+                        'attempts': ImportJob.attempts + 1,
+                        'started_at': func.coalesce(ImportJob.started_at, now)},
+                       synchronize_session=False))
+    db.session.commit()
+    return claimed == 1
+
+
+def _process_chunk(job, ctx, process_row, chunk):
+    counts = dict(job.counts or {})
+    rejected = list(job.rejected or [])
+    ctx['touched'] = set()
+    for row_num, row in chunk:
+        try:
+            process_row(job, ctx, counts, row, row_num)
+        except ValueError as e:
+            data = {k: v for k, v in row.items() if k is not None}
+            rejected.append({'row': row_num, 'error': str(e), 'data': data})
+
+    # Reload touched invoices so totals are computed over every persisted item
+    # (including ones added by earlier chunks) with consistent Decimal types.
+    db.session.flush()
+    for invoice_id in ctx['touched']:
+        invoice = db.session.get(Invoice, invoice_id)
+        db.session.expire(invoice)
+        invoice.calculate_totals()
+
+    job.rows_processed += len(chunk)
+    job.rows_skipped = len(rejected)
+    job.counts = counts
+    job.rejected = rejected
+    job.state = {'seen': sorted(ctx['seen']), 'client_matches': ctx['client_matches']}
+    job.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+
+
+def run_job(job_id):
+    """Claim and run a job to completion. Returns the final job dict, or None
+    if another worker holds it."""
+    if not claim_job(job_id):
+        return None
+    job = db.session.get(ImportJob, job_id)
+    process_row = PROCESSORS[job.kind]
+    try:
+        ctx = _load_caches(job)
+        rows = enumerate(csv.DictReader(io.StringIO(job.payload or '')), start=2)
+        rows = islice(rows, job.rows_processed, None)  # resume after last commit
+        while True:
+            chunk = list(islice(rows, CHUNK_SIZE))
+            if not chunk:
+                break
+            _process_chunk(job, ctx, process_row, chunk)
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(ImportJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return job.to_dict()
+
+    job.status = 'completed'
+    job.payload = None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job.to_dict()
+
+
+def dispatch(job_id):
+    """Run a job on a daemon thread with its own app context and session.
+
+    Module-level so tests can monkeypatch it to run inline. If the worker dies,
+    the job is resumed by resume_stale_jobs() or the next status poll.
+    """
+    app = current_app._get_current_object()
+
+    def _work():
+        with app.app_context():
+            try:
+                run_job(job_id)
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=_work, name=f'import-job-{job_id}', daemon=True).start()
+
+
+def resume_stale_jobs(now=None) -> list:
+    """Re-dispatch every queued/running job that has stopped making progress."""
+    now = now or datetime.utcnow()
+    jobs = ImportJob.query.filter(ImportJob.status.in_(ACTIVE_STATUSES)).all()
+    ids = [j.id for j in jobs if is_stale(j, now)]
+    for job_id in ids:
+        dispatch(job_id)
+    return ids
+
+
+def rejected_rows_csv(job) -> str:
+    """The job's rejected rows as CSV: original columns + row_number + error."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(job.columns or []) + ['row_number', 'error'],
+                            extrasaction='ignore')
+    writer.writeheader()
+    for r in job.rejected or []:
+        writer.writerow({**(r.get('data') or {}), 'row_number': r['row'], 'error': r['error']})
+    return buf.getvalue()
@@ -0,0 +1,171 @@
+"""Batch rebuild of every user's behaviour vector and counters from the log.
+
+``events.recompute_behavior_embedding`` is the per-user reference: a join
+query, a Python loop over 1536-d lists and a commit for each user. This
+streams all events in one query ordered by user, and per chunk of users
+scatters the decay weights into a (users x items) matrix and takes one
+matrix product with the items' embeddings -- the per-user segment sums --
+then normalises the rows and writes the chunk back with one executemany
+UPDATE. Everything commits once at the end.
+
+Results match the per-user function (float32 storage precision). Users
+whose events mix embedding lengths (an older embedding model) fall back to
+the reference loop; users with a preference row but no events are cleared.
+"""
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import bindparam
+
+from app.models.models import db, LegalFeedEvent, LegalFeedItem, LegalFeedPreference
+from app.services.legal_feed import behavior as bx
+from app.services.legal_feed import for_you
+from app.services.legal_feed.events import flush_events
+
+CHUNK_USERS = 500
+STREAM_BATCH = 5000
+ITEM_LOOKUP_CHUNK = 500
+
+
+def _weights(kinds, ages, ni_totals):
+    """Signed decay weight per event; 0 for rejections below the threshold."""
+    sign = np.where(kinds == 1, 1.0, np.where(ni_totals >= bx.NEGATIVE_MIN_EVENTS, -1.0, 0.0))
+    return sign * np.power(0.5, ages / bx.RECOMPUTE_DECAY_DAYS)
+
+
+def segment_vectors(segments, columns, weights, matrix, n_segments) -> np.ndarray:
+    """Sum ``weights[i] * matrix[columns[i]]`` per segment, then L2-normalise.
+
+    Rows whose sum is zero (no usable events) come back as all-zero."""
+    scatter = np.zeros((n_segments, matrix.shape[0]), dtype=np.float64)
+    np.add.at(scatter, (segments, columns), weights)
+    acc = scatter @ matrix.astype(np.float64)
+    norms = np.linalg.norm(acc, axis=1, keepdims=True)
+    return np.divide(acc, norms, out=np.zeros_like(acc), where=norms > 0)
+
+
+def _load_embeddings(item_ids) -> dict:
+    out = {}
+    ids = list(item_ids)
+    for i in range(0, len(ids), ITEM_LOOKUP_CHUNK):
+        out.update(db.session.query(LegalFeedItem.id, LegalFeedItem.embedding)
+                   .filter(LegalFeedItem.id.in_(ids[i:i + ITEM_LOOKUP_CHUNK])).all())
+    return {k: v for k, v in out.items() if v is not None and len(v)}
+
+
+def _reference_vector(events, embeddings, ni_total, now):
+    """The per-user loop, for users whose embeddings differ in length."""
+    acc = None
+    for _, item_id, kind, created_at, has_item in events:
+        vec = embeddings.get(item_id) if has_item else None
+        if vec is None:
+            continue
+        if kind == 'click':
+            sign = 1.0
+        elif kind == 'not_interested' and ni_total >= bx.NEGATIVE_MIN_EVENTS:
+            sign = -1.0
+        else:
+            continue
+        age_days = max(0.0, (now - (created_at or now)).total_seconds() / 86400.0)
+        w = sign * (0.5 ** (age_days / bx.RECOMPUTE_DECAY_DAYS))
+        if acc is None:
+            acc = [0.0] * len(vec)
+        for i, x in enumerate(vec):
+            acc[i] += w * x
+    return bx.normalize(acc) if acc else None
+
+
+def _chunk_rows(chunk, now) -> list:
+    """One UPDATE parameter dict per user in ``chunk`` ([(user_id, [event])])."""
+    embeddings = _load_embeddings({e[1] for _, events in chunk for e in events if e[4]})
+    dims = Counter(len(v) for v in embeddings.values()).most_common(1)
+    dims = dims[0][0] if dims else 0
+    columns = {item_id: i for i, item_id in enumerate(
+        k for k, v in embeddings.items() if len(v) == dims)}
+    matrix = np.zeros((len(columns), dims), dtype=np.float32)
+    for item_id, col in columns.items():
+        matrix[col] = embeddings[item_id]
+
+    segs, cols, kinds, ages, ni = [], [], [], [], []
+    rows, fallback = [], {}
+    for seg, (user_id, events) in enumerate(chunk):
+        ni_total = sum(1 for e in events if e[4] and e[2] == 'not_interested')
+        mixed = any(e[4] and e[1] in embeddings and e[1] not in columns for e in events)
+        if mixed:
+            fallback[seg] = _reference_vector(events, embeddings, ni_total, now)
+        else:
+            for _, item_id, kind, created_at, has_item in events:
+                if has_item and item_id in columns and kind in ('click', 'not_interested'):
+                    segs.append(seg)
+                    cols.append(columns[item_id])
+                    kinds.append(1 if kind == 'click' else -1)
+                    ages.append(max(0.0, (now - (created_at or now)).total_seconds() / 86400.0))
+                    ni.append(ni_total)
+        rows.append({
+            'b_user_id': user_id,
+            'event_count': len(events),
+            'not_interested_count': sum(1 for e in events if e[2] == 'not_interested'),
+            'rejected_item_ids': sorted({e[1] for e in events
+                                         if e[2] == 'not_interested' and e[1] is not None}),
+        })
+
+    vectors = np.zeros((len(chunk), dims))
+    if segs:
+        weights = _weights(np.array(kinds), np.array(ages), np.array(ni))
+        vectors = segment_vectors(np.array(segs), np.array(cols), weights, matrix, len(chunk))
+    for seg, row in enumerate(rows):
+        if seg in fallback:
+            row['behavior_embedding'] = fallback[seg]
+        else:
+            vec = vectors[seg]
+            row['behavior_embedding'] = vec if vec.any() else None
+        row['behavior_updated_at'] = now
+    return rows
+
+
+def _write(rows):
+    table = LegalFeedPreference.__table__
+    stmt = (table.update().where(table.c.user_id == bindparam('b_user_id'))
+            .values(behavior_embedding=bindparam('behavior_embedding'),
+                    behavior_updated_at=bindparam('behavior_updated_at'),
+                    event_count=bindparam('event_count'),
+                    not_interested_count=bindparam('not_interested_count'),
+                    rejected_item_ids=bindparam('rejected_item_ids')))
+    db.session.execute(stmt, rows)
+
+
+def recompute_all(now=None, chunk_users=CHUNK_USERS) -> int:
+    """Rebuild every preference's behaviour vector and counters; returns the
+    number of preferences rewritten."""
+    flush_events()
+    now = now or datetime.utcnow()
+    stream = (db.session.query(LegalFeedEvent.user_id, LegalFeedEvent.item_id,
+                               LegalFeedEvent.kind, LegalFeedEvent.created_at,
+                               LegalFeedItem.id.isnot(None))
+              .outerjoin(LegalFeedItem, LegalFeedEvent.item_id == LegalFeedItem.id)
+              .order_by(LegalFeedEvent.user_id, LegalFeedEvent.id)
+              .yield_per(STREAM_BATCH))
+
+    seen, chunk, current = set(), [], None
+    for event in stream:
+        if current is None or current[0] != event[0]:
+            if len(chunk) >= chunk_users:
+                _write(_chunk_rows(chunk, now))
+                chunk = []
+            current = (event[0], [])
+            chunk.append(current)
+            seen.add(event[0])
+        current[1].append(event)
+    if chunk:
+        _write(_chunk_rows(chunk, now))
+
+    idle = [uid for (uid,) in db.session.query(LegalFeedPreference.user_id).all()
+            if uid not in seen]
+    if idle:
+        _write([{'b_user_id': uid, 'behavior_embedding': None, 'behavior_updated_at': now,
+                 'event_count': 0, 'not_interested_count': 0, 'rejected_item_ids': []}
+                for uid in idle])
+    for_you.invalidate_all()
+    db.session.commit()
+    return LegalFeedPreference.query.count()
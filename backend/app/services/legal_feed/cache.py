@@ -0,0 +1,134 @@
+"""DB-backed cache of enrichment outputs and embeddings, keyed by content hash.
+
+The same story is often syndicated across sources with an identical summary,
+and interest phrases are re-saved unchanged; both would otherwise cost a
+fresh OpenAI call. Entries are tagged by model, so switching
+LEGAL_FEED_ENRICH_MODEL or LEGAL_FEED_EMBED_MODEL never serves stale output.
+
+Rows are written inside the caller's transaction (they commit with the items
+or preference they were computed for). ``hits`` on each row is the durable
+count of avoided calls; ``stats()`` adds this process's hit/miss counters.
+
+Embeddings are stored packed (``Float32Vector``) and come back as
+``PackedVector``, like item embeddings. Every hit refreshes ``last_hit_at``;
+``expire`` (run by retention) deletes entries idle for ``TTL_DAYS``, so the
+table holds the working set rather than every text ever embedded.
+"""
+import hashlib
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app.models.models import db, LegalFeedCache
+
+ENRICHMENT = 'enrichment'
+EMBEDDING = 'embedding'
+KINDS = (ENRICHMENT, EMBEDDING)
+LOOKUP_CHUNK = 500
+TTL_DAYS = int(os.getenv('LEGAL_FEED_CACHE_TTL_DAYS', '90'))
+
+_counters = {kind: {'hits': 0, 'misses': 0} for kind in KINDS}
+_counters_lock = threading.Lock()
+
+
+def content_hash(*parts) -> str:
+    """sha256 over whitespace-normalised text parts."""
+    text = '\x1f'.join(' '.join((p or '').split()) for p in parts)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _count(kind, hits, misses):
+    with _counters_lock:
+        _counters[kind]['hits'] += hits
+        _counters[kind]['misses'] += misses
+
+
+def lookup(kind, model, hashes) -> dict:
+    """{content_hash: value} for the cached subset of ``hashes``; bumps hit counts."""
+    wanted = list(dict.fromkeys(hashes))
+    found, ids = {}, []
+    for i in range(0, len(wanted), LOOKUP_CHUNK):
+        rows = (db.session.query(LegalFeedCache.id, LegalFeedCache.content_hash,
+                                 LegalFeedCache.value, LegalFeedCache.vector)
+                .filter(LegalFeedCache.kind == kind, LegalFeedCache.model == model,
+                        LegalFeedCache.content_hash.in_(wanted[i:i + LOOKUP_CHUNK]))
+                .all())
+        for row_id, key, value, vector in rows:
+            # Embeddings cached before the packed column still sit in ``value``.
+            found[key] = vector if vector is not None else value
+            ids.append(row_id)
+    if ids:
+        (LegalFeedCache.query.filter(LegalFeedCache.id.in_(ids))
+         .update({'hits': LegalFeedCache.hits + 1, 'last_hit_at': datetime.utcnow()},
+                 synchronize_session=False))
+    _count(kind, len(found), len(wanted) - len(found))
+    return found
+
+
+def get(kind, model, key):
+    return lookup(kind, model, [key]).get(key)
+
+
+def _insert_statement():
+    """INSERT ... ON CONFLICT DO NOTHING, so concurrent writers of one key are harmless."""
+    table = LegalFeedCache.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return table.insert()
+    return insert(table).on_conflict_do_nothing(
+        index_elements=['kind', 'model', 'content_hash'])
+
+
+def store(kind, model, values):
+    """Cache ``{content_hash: value}`` for ``model``; existing keys are kept."""
+    if not values:
+        return
+    now = datetime.utcnow()
+    packed = kind == EMBEDDING
+    rows = [{'kind': kind, 'model': model, 'content_hash': key,
+             'value': None if packed else value, 'vector': value if packed else None,
+             'hits': 0, 'created_at': now, 'last_hit_at': now}
+            for key, value in values.items()]
+    stmt = _insert_statement()
+    for i in range(0, len(rows), LOOKUP_CHUNK):
+        db.session.execute(stmt.values(rows[i:i + LOOKUP_CHUNK]))
+
+
+def put(kind, model, key, value):
+    store(kind, model, {key: value})
+
+
+def expire(now=None) -> int:
+    """Delete entries not hit for TTL_DAYS; returns how many. The caller commits."""
+    now = now or datetime.utcnow()
+    return (LegalFeedCache.query
+            .filter(LegalFeedCache.last_hit_at < now - timedelta(days=TTL_DAYS))
+            .delete(synchronize_session=False))
+
+
+def avoided_calls() -> int:
+    """API calls avoided by this process since start."""
+    with _counters_lock:
+        return sum(c['hits'] for c in _counters.values())
+
+
+def stats() -> dict:
+    """Per-kind entry counts and durable hit totals, plus this process's counters."""
+    rows = (db.session.query(LegalFeedCache.kind, func.count(LegalFeedCache.id),
+                             func.coalesce(func.sum(LegalFeedCache.hits), 0))
+            .group_by(LegalFeedCache.kind).all())
+    totals = {kind: (entries, int(hits)) for kind, entries, hits in rows}
+    with _counters_lock:
+        process = {kind: dict(c) for kind, c in _counters.items()}
+    out = {}
+    for kind in KINDS:
+        entries, hits = totals.get(kind, (0, 0))
+        out[kind] = {'entries': entries, 'avoided_calls': hits, 'process': process[kind]}
+    out['avoided_calls'] = sum(out[kind]['avoided_calls'] for kind in KINDS)
+    return out
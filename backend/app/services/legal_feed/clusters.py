@@ -0,0 +1,165 @@
+"""Near-duplicate clustering of feed items across sources.
+
+The exact dedup key only catches the same URL (or the same source and
+title), so one ruling reported by several publishers used to show up once
+per publisher. At ingest each new item gets a MinHash signature over its
+title and summary (``app.utils.minhash``); its LSH band keys are looked up in
+``legal_feed_lsh_bands`` for items of the last ``WINDOW``, and only that
+small bucket of candidates is compared. A match at estimated Jaccard
+``THRESHOLD`` or above joins the candidate's cluster.
+
+A cluster is stored on the items themselves: the representative (the first
+item seen) has ``duplicate_of`` NULL and every other member points at it.
+Feeds and the ranking index only show representatives. When enrichment
+later gives both an item and its representative an embedding, the match is
+confirmed by cosine (``MIN_COSINE``, 0 to skip) and detached if it fails.
+Hiding a representative hands the cluster to its oldest visible member.
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import tuple_
+
+from app.models.models import db, LegalFeedItem, LegalFeedLshBand
+from app.services.legal_feed.similarity import cosine
+from app.utils import minhash
+
+WINDOW = timedelta(days=int(os.getenv('LEGAL_FEED_CLUSTER_WINDOW_DAYS', '7')))
+THRESHOLD = float(os.getenv('LEGAL_FEED_CLUSTER_THRESHOLD', '0.5'))
+MIN_COSINE = float(os.getenv('LEGAL_FEED_CLUSTER_MIN_COSINE', '0.85'))
+LOOKUP_CHUNK = 500
+
+
+def item_text(title, summary) -> str:
+    return f'{title or ""} {summary or ""}'
+
+
+def _candidates(keys, content_type, exclude, since) -> dict:
+    """{(band, bucket): [item_id]} for stored items sharing any of ``keys``."""
+    found = {}
+    keys = list(keys)
+    for i in range(0, len(keys), LOOKUP_CHUNK):
+        rows = (db.session.query(LegalFeedLshBand.band, LegalFeedLshBand.bucket,
+                                 LegalFeedLshBand.item_id)
+                .join(LegalFeedItem, LegalFeedItem.id == LegalFeedLshBand.item_id)
+                .filter(tuple_(LegalFeedLshBand.band, LegalFeedLshBand.bucket)
+                        .in_(keys[i:i + LOOKUP_CHUNK]),
+                        LegalFeedItem.content_type == content_type,
+                        LegalFeedItem.ingested_at >= since,
+                        LegalFeedItem.id.notin_(exclude))
+                .all())
+        for band, bucket, item_id in rows:
+            found.setdefault((band, bucket), []).append(item_id)
+    return found
+
+
+def _reassign(old_rep_id, new_rep_id):
+    """Point the old representative and all its members at ``new_rep_id``."""
+    (LegalFeedItem.query
+     .filter(db.or_(LegalFeedItem.duplicate_of == old_rep_id, LegalFeedItem.id == old_rep_id),
+             LegalFeedItem.id != new_rep_id)
+     .update({'duplicate_of': new_rep_id}, synchronize_session=False))
+    (LegalFeedItem.query.filter(LegalFeedItem.id == new_rep_id)
+     .update({'duplicate_of': None}, synchronize_session=False))
+
+
+def cluster_new_items(ids, now=None) -> int:
+    """Sign, bucket and cluster freshly inserted items; the caller commits.
+    Returns how many were found to duplicate an existing story."""
+    if not ids:
+        return 0
+    now = now or datetime.utcnow()
+    items = (db.session.query(LegalFeedItem.id, LegalFeedItem.content_type,
+                              LegalFeedItem.title, LegalFeedItem.summary)
+             .filter(LegalFeedItem.id.in_(ids)).order_by(LegalFeedItem.id).all())
+    signed = []
+    for it in items:
+        sig = minhash.signature(item_text(it.title, it.summary))
+        if sig is not None:
+            keys = [(band, key) for band, key in enumerate(minhash.band_keys(sig))]
+            signed.append((it, sig, keys))
+    if not signed:
+        return 0
+
+    batch_ids = [it.id for it, _, _ in signed]
+    stored = {}
+    for content_type in {it.content_type for it, _, _ in signed}:
+        keys = {k for it, _, ks in signed if it.content_type == content_type for k in ks}
+        for key, found in _candidates(keys, content_type, batch_ids, now - WINDOW).items():
+            stored[(content_type, key)] = found
+    known = set(i for found in stored.values() for i in found)
+    info = {row.id: (minhash.from_bytes(row.minhash), row.duplicate_of, row.hidden)
+            for row in (db.session.query(LegalFeedItem.id, LegalFeedItem.minhash,
+                                         LegalFeedItem.duplicate_of, LegalFeedItem.hidden)
+                        .filter(LegalFeedItem.id.in_(known)).all())} if known else {}
+
+    duplicates, updates, bands = 0, [], []
+    for it, sig, keys in signed:
+        pool = {i for key in keys for i in stored.get((it.content_type, key), ())}
+        best, best_score = None, THRESHOLD
+        for cand in sorted(pool):  # ties go to the oldest item
+            cand_sig = info[cand][0]
+            score = minhash.similarity(sig, cand_sig) if cand_sig is not None else 0.0
+            if score > best_score or (best is None and score == best_score):
+                best, best_score = cand, score
+        rep = None
+        if best is not None:
+            rep = info[best][1] or best
+            rep_hidden = info[rep][2] if rep in info else (
+                db.session.query(LegalFeedItem.hidden).filter_by(id=rep).scalar())
+            if rep_hidden:  # the story is visible again through the new item
+                _reassign(rep, it.id)
+                rep = None
+            duplicates += 1
+        updates.append({'b_id': it.id, 'minhash': minhash.to_bytes(sig), 'duplicate_of': rep})
+        bands.extend({'item_id': it.id, 'band': band, 'bucket': key} for band, key in keys)
+        # Later items of this batch can match this one.
+        info[it.id] = (sig, rep, False)
+        for key in keys:
+            stored.setdefault((it.content_type, key), []).append(it.id)
+
+    table = LegalFeedItem.__table__
+    db.session.execute(table.update().where(table.c.id == db.bindparam('b_id'))
+                       .values(minhash=db.bindparam('minhash'),
+                               duplicate_of=db.bindparam('duplicate_of')), updates)
+    db.session.execute(LegalFeedLshBand.__table__.insert(), bands)
+    return duplicates
+
+
+def confirm(ids) -> int:
+    """Cosine-check cluster links touching the just-enriched ``ids`` (as member
+    or as representative) and detach members that disagree. Returns the
+    number detached; the caller commits."""
+    if MIN_COSINE <= 0 or not ids:
+        return 0
+    members = (db.session.query(LegalFeedItem.id, LegalFeedItem.duplicate_of,
+                                LegalFeedItem.embedding)
+               .filter(db.or_(LegalFeedItem.id.in_(ids), LegalFeedItem.duplicate_of.in_(ids)),
+                       LegalFeedItem.duplicate_of.isnot(None),
+                       LegalFeedItem.embedding.isnot(None))
+               .all())
+    if not members:
+        return 0
+    reps = dict(db.session.query(LegalFeedItem.id, LegalFeedItem.embedding)
+                .filter(LegalFeedItem.id.in_({m.duplicate_of for m in members}),
+                        LegalFeedItem.embedding.isnot(None)).all())
+    detach = [m.id for m in members
+              if m.duplicate_of in reps and len(reps[m.duplicate_of]) == len(m.embedding)
+              and cosine(m.embedding, reps[m.duplicate_of]) < MIN_COSINE]
+    if detach:
+        (LegalFeedItem.query.filter(LegalFeedItem.id.in_(detach))
+         .update({'duplicate_of': None}, synchronize_session=False))
+    return len(detach)
+
+
+def promote(item):
+    """Before ``item`` is hidden: hand its cluster to the oldest visible member."""
+    if item.duplicate_of is not None:
+        return
+    heir = (db.session.query(LegalFeedItem.id)
+            .filter(LegalFeedItem.duplicate_of == item.id, LegalFeedItem.hidden.is_(False))
+            .order_by(LegalFeedItem.id).first())
+    if heir is not None:
+        _reassign(item.id, heir[0])
+        db.session.expire(item, ['duplicate_of'])
+
@@ -0,0 +1,49 @@
+"""Before/after numbers for embedding storage: JSON float lists vs packed float32.
+
+Used by the admin endpoint to show what the Float32Vector column saves on the
+live corpus (size on disk and per-row decode time).
+"""
+import json
+import time
+
+import numpy as np
+
+from app.models.models import db, LegalFeedItem
+from app.models.vector import DTYPE, PackedVector
+
+
+def measure(vectors) -> dict:
+    """Encode ``vectors`` both ways and time decoding each encoding."""
+    as_json = [json.dumps([float(x) for x in v]) for v in vectors]
+    packed = [PackedVector.from_values(v).tobytes() for v in vectors]
+
+    started = time.perf_counter()
+    for blob in as_json:
+        json.loads(blob)
+    json_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for blob in packed:
+        np.frombuffer(blob, dtype=DTYPE)
+    packed_s = time.perf_counter() - started
+
+    json_bytes = sum(len(b.encode()) for b in as_json)
+    packed_bytes = sum(len(b) for b in packed)
+    return {
+        'vectors': len(packed),
+        'dims': len(vectors[0]) if len(vectors) else 0,
+        'json_bytes': json_bytes,
+        'packed_bytes': packed_bytes,
+        'size_ratio': round(json_bytes / packed_bytes, 2) if packed_bytes else None,
+        'json_decode_ms': round(json_s * 1000, 3),
+        'packed_decode_ms': round(packed_s * 1000, 3),
+        'decode_speedup': round(json_s / packed_s, 1) if packed_s else None,
+    }
+
+
+def storage_report(limit=500) -> dict:
+    """measure() over up to ``limit`` stored item embeddings."""
+    rows = (db.session.query(LegalFeedItem.embedding)
+            .filter(LegalFeedItem.embedding.isnot(None))
+            .order_by(LegalFeedItem.id.desc()).limit(limit).all())
+    return measure([r[0] for r in rows if r[0]])
@@ -2,17 +2,32 @@
 
 Only public RSS content (title/summary) is sent to OpenAI. Failures are
 non-fatal: the item keeps its raw fields and enriched_at stays NULL.
+
+``enrich_items`` is the batch path: chat completions run on a bounded thread
+pool, embeddings go out as array requests of up to ``EMBED_BATCH_SIZE``
+texts, and every request first takes a token from a process-wide token
+bucket (``LEGAL_FEED_ENRICH_RPM``) so concurrency never turns into 429s.
+Both halves consult the content-hash cache (``cache.py``) first.
 """
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from app.services.legal_feed import cache
 from app.services.legal_feed.taxonomy import PRACTICE_AREAS, normalize_topics
+from app.utils.token_bucket import TokenBucket
 
 OPENAI_CHAT_URL = 'https://api.openai.com/v1/chat/completions'
 OPENAI_EMBED_URL = 'https://api.openai.com/v1/embeddings'
 DEFAULT_EMBED_MODEL = 'text-embedding-3-small'
 
+ENRICH_CONCURRENCY = int(os.getenv('LEGAL_FEED_ENRICH_CONCURRENCY', '4'))
+ENRICH_RPM = float(os.getenv('LEGAL_FEED_ENRICH_RPM', '300'))  # per process
+EMBED_BATCH_SIZE = 64
+
 _NEWS_SYSTEM = (
     'You are a legal news editor for practising Indian lawyers. Given a news '
     'item title and summary, return STRICT JSON with keys: '
@@ -32,6 +47,10 @@ class EnrichmentClient:
     def embed(self, text):  # pragma: no cover - interface
         raise NotImplementedError
 
+    def embed_many(self, texts):
+        """Embeddings for ``texts``, in order. Override to batch requests."""
+        return [self.embed(t) for t in texts]
+
 
 class OpenAIEnrichment(EnrichmentClient):
     def __init__(self, api_key=None, chat_model=None, embed_model=None):
@@ -61,6 +80,44 @@ class OpenAIEnrichment(EnrichmentClient):
         data = self._post(OPENAI_EMBED_URL, {'model': self.embed_model, 'input': text})
         return data['data'][0]['embedding']
 
+    def embed_many(self, texts):
+        data = self._post(OPENAI_EMBED_URL, {'model': self.embed_model, 'input': list(texts)})
+        return [d['embedding'] for d in sorted(data['data'], key=lambda d: d['index'])]
+
+
+class FakeEnrichment(EnrichmentClient):
+    """Offline client with configurable latency, for local runs and throughput
+    benchmarks. Never returned by get_enrichment_client."""
+    chat_model = 'fake-chat'
+    embed_model = 'fake-embedding'
+
+    def __init__(self, latency=0.0, embed_latency=None, dims=8):
+        self.latency = latency
+        self.embed_latency = latency if embed_latency is None else embed_latency
+        self.dims = dims
+        self.calls = {'complete': 0, 'embed': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+
+    def complete(self, system, user):
+        self._count('complete')
+        time.sleep(self.latency)
+        title = user.split('\n', 1)[0].removeprefix('Title: ')
+        return json.dumps({'headline': title[:80], 'tldr': 'Offline enrichment.',
+                           'topics': [PRACTICE_AREAS[len(title) % len(PRACTICE_AREAS)]],
+                           'importance': 50})
+
+    def embed(self, text):
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts):
+        self._count('embed')
+        time.sleep(self.embed_latency)
+        return [[((hash(t) >> i) & 0xff) / 255.0 for i in range(self.dims)] for t in texts]
+
 
 def get_enrichment_client():
     if not os.getenv('OPENAI_API_KEY'):
@@ -68,6 +125,20 @@ def get_enrichment_client():
     return OpenAIEnrichment()
 
 
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> TokenBucket:
+    """Process-wide bucket shared by every enrichment request."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            rate = ENRICH_RPM / 60.0
+            _limiter = TokenBucket(rate, capacity=max(1, ENRICH_CONCURRENCY))
+        return _limiter
+
+
 def _clamp_importance(raw):
     try:
         return max(0, min(100, int(raw)))
@@ -83,23 +154,146 @@ def enrich_item(item, client) -> bool:
     """
     if item.content_type != 'news':
         return False
-    user = f"Title: {item.title}\nSummary: {item.summary or ''}"
+    payload = (item.title, item.summary)
+    fields = _enrichment_fields(client, [payload],
+                                lambda misses: [_complete(client, *p) for p in misses])[0]
+    if fields is None:
+        return False
+    try:
+        embedding = cached_embedding(client, _embed_text(fields, *payload))
+    except Exception:
+        return False
+    _apply(item, fields, embedding, client)
+    return True
+
+
+def _complete(client, title, summary):
+    """Chat half of enrichment; touches no ORM state so it can run on a pool
+    thread. Returns the parsed fields, or None on any failure."""
+    user = f"Title: {title}\nSummary: {summary or ''}"
     try:
         parsed = json.loads(client.complete(_NEWS_SYSTEM, user))
         if not isinstance(parsed, dict):
-            return False
-        topics = normalize_topics(parsed.get('topics'))
-        importance = _clamp_importance(parsed.get('importance'))
-        embed_text = f"{parsed.get('headline') or item.title}\n{parsed.get('tldr') or ''}\n{item.summary or ''}"
-        embedding = client.embed(embed_text)
+            return None
+        return {
+            'headline': (parsed.get('headline') or '').strip() or None,
+            'tldr': (parsed.get('tldr') or '').strip() or None,
+            'topics': normalize_topics(parsed.get('topics')),
+            'importance': _clamp_importance(parsed.get('importance')),
+        }
     except Exception:
-        return False
+        return None
+
+
+def _embed_text(fields, title, summary):
+    return f"{fields['headline'] or title}\n{fields['tldr'] or ''}\n{summary or ''}"
+
+
+def _chat_model(client):
+    return getattr(client, 'chat_model', None) or type(client).__name__
+
+
+def _embed_model(client):
+    return getattr(client, 'embed_model', DEFAULT_EMBED_MODEL)
+
+
+def _enrichment_fields(client, payloads, complete_misses):
+    """Fields (or None) per (title, summary) payload. Cached prompts are served
+    from the cache; ``complete_misses`` runs once per distinct uncached one."""
+    model = _chat_model(client)
+    keys = [cache.content_hash(_NEWS_SYSTEM, title, summary) for title, summary in payloads]
+    cached = cache.lookup(cache.ENRICHMENT, model, keys)
+    misses = {}
+    for key, payload in zip(keys, payloads):
+        if key not in cached:
+            misses.setdefault(key, payload)
+    computed = dict(zip(misses, complete_misses(list(misses.values()))))
+    cache.store(cache.ENRICHMENT, model, {k: v for k, v in computed.items() if v is not None})
+    return [cached.get(key) or computed.get(key) for key in keys]
+
+
+def cached_embedding(client, text):
+    """Embedding for ``text``, from the cache when this model has seen it."""
+    model = _embed_model(client)
+    key = cache.content_hash(text)
+    vector = cache.get(cache.EMBEDDING, model, key)
+    if vector is None:
+        vector = client.embed(text)
+        cache.put(cache.EMBEDDING, model, key, vector)
+    return vector
+
 
-    item.headline = (parsed.get('headline') or '').strip() or None
-    item.tldr = (parsed.get('tldr') or '').strip() or None
-    item.topics = topics
-    item.importance = importance
+def _apply(item, fields, embedding, client):
+    item.headline = fields['headline']
+    item.tldr = fields['tldr']
+    item.topics = fields['topics']
+    item.importance = fields['importance']
     item.embedding = embedding
-    item.embed_model = getattr(client, 'embed_model', DEFAULT_EMBED_MODEL)
+    item.embed_model = _embed_model(client)
     item.enriched_at = datetime.utcnow()
-    return True
+
+
+def _embed_many(client, texts):
+    # Duck-typed clients without embed_many fall back to one call per text.
+    if hasattr(client, 'embed_many'):
+        return client.embed_many(texts)
+    return [client.embed(t) for t in texts]
+
+
+def enrich_items(items, client, limiter=None, concurrency=None) -> tuple:
+    """Enrich NEWS ``items`` in place, concurrently. Returns (enriched, failed).
+
+    Completions and embeddings already in the cache are reused; only misses
+    hit the API. ORM attributes are read and written only on the calling
+    thread; pool threads see plain (title, summary) tuples. An embedding batch
+    that fails fails all of its items, which stay unenriched for the next
+    backlog pass.
+    """
+    news = [i for i in items if i.content_type == 'news']
+    if not news:
+        return 0, 0
+    limiter = limiter or get_rate_limiter()
+
+    def work(payload):
+        limiter.acquire()
+        return _complete(client, *payload)
+
+    def complete_misses(misses):
+        if not misses:
+            return []
+        workers = max(1, min(concurrency or ENRICH_CONCURRENCY, len(misses)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='legal-feed-enrich') as pool:
+            return list(pool.map(work, misses))
+
+    payloads = [(i.title, i.summary) for i in news]
+    completed = _enrichment_fields(client, payloads, complete_misses)
+    ready = [(item, fields, _embed_text(fields, *payload))
+             for item, fields, payload in zip(news, completed, payloads) if fields is not None]
+
+    model = _embed_model(client)
+    keys = [cache.content_hash(text) for _, _, text in ready]
+    vectors = cache.lookup(cache.EMBEDDING, model, keys)
+    pending = {}
+    for key, (_, _, text) in zip(keys, ready):
+        if key not in vectors:
+            pending.setdefault(key, text)
+    pending = list(pending.items())
+    for start in range(0, len(pending), EMBED_BATCH_SIZE):
+        batch = pending[start:start + EMBED_BATCH_SIZE]
+        limiter.acquire()
+        try:
+            embedded = _embed_many(client, [text for _, text in batch])
+            if len(embedded) != len(batch):
+                raise ValueError('embedding count mismatch')
+        except Exception:
+            continue
+        fresh = {key: vector for (key, _), vector in zip(batch, embedded)}
+        cache.store(cache.EMBEDDING, model, fresh)
+        vectors.update(fresh)
+
+    enriched = 0
+    for key, (item, fields, _) in zip(keys, ready):
+        if key in vectors:
+            _apply(item, fields, vectors[key], client)
+            enriched += 1
+    return enriched, len(news) - enriched
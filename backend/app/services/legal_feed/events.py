@@ -1,56 +1,269 @@
-"""Engagement events + behavioral vector maintenance (online + batch)."""
+"""Engagement events + behavioral vector maintenance (online + batch).
+
+Writes are tuned for the click path. Counters (``event_count``,
+``not_interested_count``) and the rejected-id set live on the user's
+``LegalFeedPreference`` row, so reads never count or scan the event log.
+Clicks are buffered in-process and flushed in batches (one multi-row insert,
+one embedding lookup, one counter update per user) once ``BUFFER_SIZE``
+clicks are waiting or ``FLUSH_SECONDS`` after the first, on a background
+thread. A rejection is written at once, because it demotes the item on the
+user's next read, but its behaviour-vector update rides the same flush.
+
+A failed timer flush puts its events back and tries again
+``FLUSH_SECONDS`` later; an event still failing after
+``MAX_FLUSH_ATTEMPTS`` flushes is dropped and logged, so one bad event (or a
+long outage) cannot grow the buffer forever.
+
+The log stays the source of truth: ``recompute_behavior_embedding`` rebuilds
+the vector and the counters from it. ``LEGAL_FEED_EVENT_BUFFER=0`` turns the
+buffer off and flushes inline (write-through).
+"""
+import atexit
+import os
+import threading
 from datetime import datetime
+from typing import NamedTuple
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
 
 from app.models.models import db, LegalFeedEvent, LegalFeedItem, LegalFeedPreference
 from app.services.legal_feed import behavior as bx
+from app.services.legal_feed import for_you
 
 VALID_KINDS = {'click', 'not_interested'}
+BUFFER_SIZE = int(os.getenv('LEGAL_FEED_EVENT_BUFFER', '100'))
+FLUSH_SECONDS = float(os.getenv('LEGAL_FEED_EVENT_FLUSH_SECONDS', '2'))
+MAX_FLUSH_ATTEMPTS = 3
+
+
+class _Pending(NamedTuple):
+    user_id: int
+    item_id: int
+    kind: str
+    created_at: datetime
+    persisted: bool          # rejections are inserted at record time
+    not_interested: int      # the user's rejection count including this event
+    attempts: int = 0        # failed flushes so far
+
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_exit_app = None
 
 
 def _get_or_create_pref(user_id):
     pref = LegalFeedPreference.query.filter_by(user_id=user_id).first()
     if pref is None:
-        pref = LegalFeedPreference(user_id=user_id)
+        pref = LegalFeedPreference(user_id=user_id, event_count=0,
+                                   not_interested_count=0, rejected_item_ids=[])
         db.session.add(pref)
     return pref
 
 
 def event_count(user_id) -> int:
-    return LegalFeedEvent.query.filter_by(user_id=user_id).count()
+    count = (db.session.query(LegalFeedPreference.event_count)
+             .filter_by(user_id=user_id).scalar())
+    return count or 0
 
 
-def _not_interested_count(user_id) -> int:
-    return LegalFeedEvent.query.filter_by(user_id=user_id, kind='not_interested').count()
+def get_rejected_item_ids(user_id) -> set:
+    ids = (db.session.query(LegalFeedPreference.rejected_item_ids)
+           .filter_by(user_id=user_id).scalar())
+    return set(ids or [])
 
 
-def get_rejected_item_ids(user_id) -> set:
-    rows = (db.session.query(LegalFeedEvent.item_id)
-            .filter_by(user_id=user_id, kind='not_interested').all())
-    return {r[0] for r in rows if r[0] is not None}
+def pending_count() -> int:
+    """Clicks buffered in this process and not yet flushed."""
+    with _buffer_lock:
+        return sum(1 for p in _buffer if not p.persisted)
+
+
+def _item_exists(item_id) -> bool:
+    return db.session.query(LegalFeedItem.id).filter_by(id=item_id).first() is not None
 
 
 def record_event(user_id, item_id, kind) -> bool:
     if kind not in VALID_KINDS:
         return False
-    item = LegalFeedItem.query.get(item_id)
-    if item is None:
+    try:
+        item_id = int(item_id)
+    except (TypeError, ValueError):
+        return False
+    if not _item_exists(item_id):
         return False
 
-    db.session.add(LegalFeedEvent(user_id=user_id, item_id=item_id, kind=kind))
-    db.session.commit()
+    now = datetime.utcnow()
+    if kind == 'not_interested':
+        pending = _record_rejection(user_id, item_id, now)
+    else:
+        pending = _Pending(user_id, item_id, kind, now, False, 0)
+    _enqueue(pending)
+    return True
 
-    pref = _get_or_create_pref(user_id)
-    ni_count = _not_interested_count(user_id)  # includes the event just recorded
-    new_vec = bx.apply_event(pref.behavior_embedding, item.embedding, kind, ni_count)
-    if new_vec != pref.behavior_embedding:
-        pref.behavior_embedding = new_vec
-        pref.behavior_updated_at = datetime.utcnow()
+
+def _record_rejection(user_id, item_id, now) -> _Pending:
+    """Insert the rejection and update the counters and rejected set in one commit.
+
+    The preference row is locked (``FOR UPDATE``) before ``rejected_item_ids``
+    is read, so two concurrent rejections merge instead of one overwriting the
+    other's id. If a concurrent first event created the row first, the insert
+    fails on ``user_id``'s unique index and the merge is retried on that row.
+    """
+    for attempt in range(2):
+        db.session.add(LegalFeedEvent(user_id=user_id, item_id=item_id,
+                                      kind='not_interested', created_at=now))
+        pref = (LegalFeedPreference.query.filter_by(user_id=user_id)
+                .with_for_update().populate_existing().first())
+        if pref is None:
+            pref = _get_or_create_pref(user_id)
+            pref.event_count, pref.not_interested_count = 1, 1
+        else:  # atomic, so a concurrent flush's click increment is not lost
+            pref.event_count = LegalFeedPreference.event_count + 1
+            pref.not_interested_count = LegalFeedPreference.not_interested_count + 1
+        rejected = set(pref.rejected_item_ids or [])
+        if item_id not in rejected:
+            pref.rejected_item_ids = sorted(rejected | {item_id})
+        for_you.invalidate(user_id)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if attempt:
+                raise
+            continue
+        return _Pending(user_id, item_id, 'not_interested', now, True, pref.not_interested_count)
+
+
+def _enqueue(pending):
+    if BUFFER_SIZE <= 0:
+        with _buffer_lock:
+            _buffer.append(pending)
+        flush_events()
+        return
+    with _buffer_lock:
+        _buffer.append(pending)
+        full = len(_buffer) >= BUFFER_SIZE
+        first = len(_buffer) == 1
+    if full:
+        dispatch_flush(0)
+    elif first:
+        dispatch_flush(FLUSH_SECONDS)
+
+
+def dispatch_flush(delay):
+    """Flush after ``delay`` seconds on a daemon timer with its own app context.
+    Module-level so tests can monkeypatch it."""
+    global _exit_app
+    app = current_app._get_current_object()
+    if _exit_app is None:
+        _exit_app = app
+        atexit.register(_flush_at_exit)
+
+    def _work():
+        with app.app_context():
+            try:
+                _timer_flush()
+            finally:
+                db.session.remove()
+
+    timer = threading.Timer(delay, _work)
+    timer.daemon = True
+    timer.name = 'legal-feed-events'
+    timer.start()
+
+
+def _timer_flush():
+    """Timer body: flush, and after a failure try again in FLUSH_SECONDS
+    while events are still waiting."""
+    try:
+        flush_events()
+    except Exception:
+        current_app.logger.exception('legal feed event flush failed')
+        with _buffer_lock:
+            waiting = bool(_buffer)
+        if waiting:
+            dispatch_flush(FLUSH_SECONDS)
+
+
+def _flush_at_exit():
+    if _exit_app is None:
+        return
+    with _exit_app.app_context():
+        try:
+            flush_events()
+        finally:
+            db.session.remove()
+
+
+def flush_events() -> int:
+    """Write buffered clicks and apply buffered behaviour updates; returns
+    the number of events processed."""
+    with _flush_lock:
+        with _buffer_lock:
+            pending = list(_buffer)
+            _buffer.clear()
+        if not pending:
+            return 0
+        try:
+            _flush(pending)
+        except Exception:
+            db.session.rollback()
+            retry, dropped = [], 0
+            for p in pending:
+                if p.attempts + 1 < MAX_FLUSH_ATTEMPTS:
+                    retry.append(p._replace(attempts=p.attempts + 1))
+                else:
+                    dropped += 1
+            with _buffer_lock:  # keep the rest for the next flush
+                _buffer[:0] = retry
+            if dropped:
+                current_app.logger.error(f'dropped {dropped} legal feed events after '
+                                         f'{MAX_FLUSH_ATTEMPTS} failed flushes')
+            raise
+        return len(pending)
+
+
+def _flush(pending):
+    item_ids = {p.item_id for p in pending}
+    embeddings = dict(db.session.query(LegalFeedItem.id, LegalFeedItem.embedding)
+                      .filter(LegalFeedItem.id.in_(item_ids)).all())
+    pending = [p for p in pending if p.item_id in embeddings]  # deleted meanwhile
+
+    clicks = [{'user_id': p.user_id, 'item_id': p.item_id, 'kind': p.kind,
+               'created_at': p.created_at} for p in pending if not p.persisted]
+    if clicks:
+        db.session.execute(LegalFeedEvent.__table__.insert(), clicks)
+
+    by_user = {}
+    for p in pending:
+        by_user.setdefault(p.user_id, []).append(p)
+    prefs = {pref.user_id: pref for pref in LegalFeedPreference.query
+             .filter(LegalFeedPreference.user_id.in_(by_user)).all()}
+
+    now = datetime.utcnow()
+    for user_id, events in by_user.items():
+        pref = prefs.get(user_id) or _get_or_create_pref(user_id)
+        new_clicks = sum(1 for p in events if not p.persisted)
+        if new_clicks:
+            if pref.id is None:
+                pref.event_count = new_clicks
+            else:  # atomic, so a concurrent rejection's increment is not lost
+                pref.event_count = LegalFeedPreference.event_count + new_clicks
+        vec = pref.behavior_embedding
+        for p in events:
+            vec = bx.apply_event(vec, embeddings[p.item_id], p.kind, p.not_interested)
+        if vec is not pref.behavior_embedding:
+            pref.behavior_embedding = vec
+            pref.behavior_updated_at = now
+        for_you.invalidate(user_id)
     db.session.commit()
-    return True
 
 
 def recompute_behavior_embedding(user_id) -> bool:
-    """Rebuild the behavior vector from the event log (source of truth)."""
+    """Rebuild the behavior vector and counters from the event log (source of truth)."""
+    flush_events()
     rows = (db.session.query(LegalFeedEvent, LegalFeedItem)
             .join(LegalFeedItem, LegalFeedEvent.item_id == LegalFeedItem.id)
             .filter(LegalFeedEvent.user_id == user_id).all())
@@ -73,8 +286,20 @@ def recompute_behavior_embedding(user_id) -> bool:
         for i, x in enumerate(item.embedding):
             acc[i] += w * x
 
+    kinds = dict(db.session.query(LegalFeedEvent.kind, db.func.count(LegalFeedEvent.id))
+                 .filter(LegalFeedEvent.user_id == user_id)
+                 .group_by(LegalFeedEvent.kind).all())
+    rejected = (db.session.query(LegalFeedEvent.item_id)
+                .filter(LegalFeedEvent.user_id == user_id,
+                        LegalFeedEvent.kind == 'not_interested',
+                        LegalFeedEvent.item_id.isnot(None))
+                .distinct().all())
+
     pref = _get_or_create_pref(user_id)
     pref.behavior_embedding = bx.normalize(acc) if acc else None
     pref.behavior_updated_at = now
+    pref.event_count = sum(kinds.values())
+    pref.not_interested_count = kinds.get('not_interested', 0)
+    pref.rejected_item_ids = sorted(r[0] for r in rejected)
     db.session.commit()
     return True
@@ -0,0 +1,150 @@
+"""Materialised per-user 'For you' feeds, served by opaque cursor.
+
+Ranking the whole candidate set for every page made page N cost N rankings.
+Instead the top ``FEED_SIZE`` ids are computed once (lazily, on the user's
+first request) into ``legal_feed_for_you`` and pages are slices of that list.
+
+A list is recomputed when it expires (``TTL``) or is invalidated: by the
+user's own events and preference saves, and for everyone by ingestion, the
+enrichment backlog and admin hides. Invalidation only flags rows; the next
+read still serves the old list and hands the recompute to a background
+thread, so no request waits on a ranking after the first.
+
+Cursors carry the list version, the offset and the last id served. When the
+list has been recomputed in between, paging resumes after that last id.
+"""
+import base64
+import binascii
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app.models.models import db, LegalFeedForYou
+
+FEED_SIZE = 200
+MAX_LIMIT = 50
+TTL = timedelta(seconds=int(os.getenv('LEGAL_FEED_FOR_YOU_TTL_SECONDS', '900')))
+REFRESH_TIMEOUT = timedelta(minutes=5)   # a refresh claim older than this is abandoned
+
+
+class CursorError(ValueError):
+    """Raised for a cursor that was not issued by get_page."""
+
+
+def encode_cursor(version, offset, last_id) -> str:
+    raw = json.dumps({'v': version, 'o': offset, 'l': last_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if not all(isinstance(data.get(k), int) for k in ('v', 'o')) or data['o'] < 0:
+            raise ValueError
+        return data
+    except (binascii.Error, ValueError, TypeError, AttributeError):
+        raise CursorError('Invalid cursor')
+
+
+def _row(user_id, content_type):
+    return LegalFeedForYou.query.filter_by(user_id=user_id, content_type=content_type).first()
+
+
+def materialize(user_id, content_type='news', now=None):
+    """Rank and store the user's list; returns the row."""
+    from app.services.legal_feed.query import rank_for_you
+
+    now = now or datetime.utcnow()
+    ids = rank_for_you(user_id, content_type, k=FEED_SIZE, now=now)
+    row = _row(user_id, content_type)
+    if row is None:
+        row = LegalFeedForYou(user_id=user_id, content_type=content_type, version=0)
+        db.session.add(row)
+    row.item_ids = ids
+    row.version = (row.version or 0) + 1
+    row.stale = False
+    row.computed_at = now
+    row.expires_at = now + TTL
+    row.refreshing_since = None
+    try:
+        db.session.commit()
+    except IntegrityError:  # a concurrent first request created it
+        db.session.rollback()
+        return _row(user_id, content_type)
+    return row
+
+
+def claim_refresh(row, now=None) -> bool:
+    """Atomically take the row's refresh, unless another one is under way."""
+    now = now or datetime.utcnow()
+    claimed = (LegalFeedForYou.query
+               .filter(LegalFeedForYou.id == row.id,
+                       db.or_(LegalFeedForYou.refreshing_since.is_(None),
+                              LegalFeedForYou.refreshing_since < now - REFRESH_TIMEOUT))
+               .update({'refreshing_since': now}, synchronize_session=False))
+    db.session.commit()
+    return claimed == 1
+
+
+def dispatch(user_id, content_type):
+    """Recompute on a daemon thread with its own app context. Module-level so
+    tests can monkeypatch it to run inline."""
+    app = current_app._get_current_object()
+
+    def _work():
+        with app.app_context():
+            try:
+                materialize(user_id, content_type)
+            except Exception:
+                current_app.logger.exception(f'for-you refresh failed for user {user_id}')
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=_work, name=f'for-you-{user_id}', daemon=True).start()
+
+
+def get_page(user_id, content_type=None, limit=10, cursor=None, offset=0, now=None) -> dict:
+    """One page of the user's feed: {'data', 'next_cursor', 'stale'}."""
+    from app.services.legal_feed.query import items_in_order
+
+    now = now or datetime.utcnow()
+    content_type = content_type or 'news'
+    limit = max(1, min(limit, MAX_LIMIT))
+    position = decode_cursor(cursor) if cursor else None
+
+    row = _row(user_id, content_type)
+    if row is None:
+        row = materialize(user_id, content_type, now)
+    stale = bool(row.stale or row.expires_at is None or row.expires_at <= now)
+    if stale and claim_refresh(row, now):
+        dispatch(user_id, content_type)
+
+    ids = row.item_ids or []
+    start = max(0, offset or 0)
+    if position is not None:
+        start = position['o']
+        if position['v'] != row.version and position.get('l') in ids:
+            start = ids.index(position['l']) + 1
+    page = ids[start:start + limit]
+    end = start + len(page)
+    return {
+        'data': items_in_order(page, skip_hidden=True),
+        'next_cursor': encode_cursor(row.version, end, page[-1]) if page and end < len(ids) else None,
+        'stale': stale,
+    }
+
+
+def invalidate(user_id):
+    """Flag the user's lists for recompute; committed with the caller's change."""
+    (LegalFeedForYou.query.filter(LegalFeedForYou.user_id == user_id)
+     .update({'stale': True}, synchronize_session=False))
+
+
+def invalidate_all():
+    """Flag every list (new items, enrichment, hides); the caller commits."""
+    LegalFeedForYou.query.update({'stale': True}, synchronize_session=False)
@@ -0,0 +1,306 @@
+"""Per-process vector index for the 'For you' feed.
+
+The news corpus only changes when ingestion or the enrichment backlog runs
+(or an admin hides an item), so rebuilding the candidate matrix from the
+database on every request is wasted work. ``MemoryVectorIndex`` keeps the
+visible news of the last ``INDEX_WINDOW_DAYS`` in NumPy arrays: ids,
+row-normalised float32 embeddings, recency timestamps, importance, topic
+bitmasks and court. Not-yet-enriched items are kept too (as zero rows) so
+results are exactly those of the database path in ``query_for_you``.
+
+Refreshes are incremental: rows with ``id`` above the loaded watermark, rows
+enriched since the last refresh, and the current set of hidden ids. The
+process that ran ingestion or a hide marks its index stale directly; other
+processes pick the change up on their next periodic check.
+
+``PgVectorIndex`` is the optional pgvector/HNSW backend behind the same
+interface (LEGAL_FEED_VECTOR_BACKEND=pgvector, after the optional section of
+migration 031). Its nearest-neighbour pool is approximate, so ranking can
+differ slightly from the in-memory index. It refreshes on the same schedule,
+so items enriched by another process get their ``embedding_vec`` within
+``REFRESH_SECONDS``.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import func, text
+
+from app.models.models import db, LegalFeedItem
+from app.services.legal_feed import similarity
+from app.services.legal_feed.taxonomy import PRACTICE_AREAS
+
+INDEX_WINDOW_DAYS = 30
+REFRESH_SECONDS = int(os.getenv('LEGAL_FEED_INDEX_REFRESH_SECONDS', '30'))
+LOAD_BATCH = 2000
+PGVECTOR_POOL = 20           # nearest neighbours fetched per requested result
+# Re-read rows enriched shortly before the watermark, in case their commit landed late.
+ENRICH_OVERLAP = timedelta(minutes=5)
+
+_TOPIC_BITS = {topic: 1 << i for i, topic in enumerate(PRACTICE_AREAS)}
+
+
+def topic_bits(topics) -> int:
+    bits = 0
+    for topic in topics or ():
+        bits |= _TOPIC_BITS.get(topic, 0)
+    return bits
+
+
+class _Rows(NamedTuple):
+    """Immutable column arrays, replaced wholesale on refresh."""
+    ids: np.ndarray          # int64, ascending
+    matrix: np.ndarray       # (n, dims) float32, unit rows (zero when missing)
+    whens: np.ndarray        # datetime64[us] of published_at or ingested_at
+    importance: np.ndarray   # float64, 0 when missing
+    topics: np.ndarray       # int64 topic bitmask
+    courts: np.ndarray       # object
+    hidden: np.ndarray       # bool
+
+    @classmethod
+    def empty(cls, dims=0):
+        return cls(np.empty(0, np.int64), np.empty((0, dims), np.float32),
+                   np.empty(0, 'datetime64[us]'), np.empty(0), np.empty(0, np.int64),
+                   np.empty(0, object), np.empty(0, bool))
+
+
+class MemoryVectorIndex:
+    backend = 'memory'
+
+    def __init__(self):
+        self._rows = _Rows.empty()
+        self.dims = None
+        self.odd = {}             # id -> vector whose length is not ``dims``
+        self.id_watermark = 0
+        self.enriched_watermark = None
+        self.refreshed_at = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows.ids)
+
+    def mark_stale(self):
+        self._stale = True
+
+    def ensure_fresh(self, now=None):
+        now = now or datetime.utcnow()
+        due = self.refreshed_at is None or now - self.refreshed_at >= timedelta(seconds=REFRESH_SECONDS)
+        if self._stale or due:
+            self.refresh(now)
+
+    def _load(self, query):
+        cols = (LegalFeedItem.id, LegalFeedItem.embedding, LegalFeedItem.published_at,
+                LegalFeedItem.ingested_at, LegalFeedItem.importance, LegalFeedItem.topics,
+                LegalFeedItem.court, LegalFeedItem.hidden, LegalFeedItem.enriched_at)
+        return query.with_entities(*cols).order_by(LegalFeedItem.id).yield_per(LOAD_BATCH).all()
+
+    def refresh(self, now=None, full=False):
+        """Fold new, newly enriched and newly hidden items into the index."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._stale = False
+            if full:
+                self._rows, self.dims, self.odd = _Rows.empty(), None, {}
+                self.id_watermark, self.enriched_watermark = 0, None
+            cutoff = now - timedelta(days=INDEX_WINDOW_DAYS)
+            base = (LegalFeedItem.query
+                    .filter(LegalFeedItem.content_type == 'news',
+                            func.coalesce(LegalFeedItem.published_at,
+                                          LegalFeedItem.ingested_at) >= cutoff))
+            loaded = self._load(base.filter(LegalFeedItem.id > self.id_watermark))
+            if self.id_watermark:
+                enriched = (LegalFeedItem.enriched_at >= self.enriched_watermark - ENRICH_OVERLAP
+                            if self.enriched_watermark else LegalFeedItem.enriched_at.isnot(None))
+                loaded += self._load(base.filter(LegalFeedItem.id <= self.id_watermark, enriched))
+            # Hidden items and non-representative cluster members are masked.
+            hidden = [i for (i,) in base.with_entities(LegalFeedItem.id)
+                      .filter(db.or_(LegalFeedItem.hidden.is_(True),
+                                     LegalFeedItem.duplicate_of.isnot(None)))]
+            self._rows = self._merge(loaded, hidden, cutoff)
+            if loaded:
+                self.id_watermark = max(self.id_watermark, max(r.id for r in loaded))
+            stamps = [r.enriched_at for r in loaded if r.enriched_at]
+            if stamps:
+                self.enriched_watermark = max(stamps + [self.enriched_watermark or stamps[0]])
+            self.refreshed_at = now
+
+    def _merge(self, loaded, hidden, cutoff):
+        rows = self._rows
+        if self.dims is None:
+            dims = next((len(r.embedding) for r in loaded
+                         if r.embedding is not None and len(r.embedding)), None)
+            if dims is not None:  # earlier rows had no embeddings: widen to zeros
+                self.dims = dims
+                rows = rows._replace(matrix=np.zeros((len(rows.ids), dims), np.float32))
+        dims = self.dims or 0
+
+        position = {i: p for p, i in enumerate(rows.ids.tolist())}
+        present = [r for r in loaded if r.id in position]
+        added = list({r.id: r for r in loaded if r.id not in position}.values())
+        if present:  # late enrichment (or a late commit): overwrite in place
+            rows = _Rows(*(col.copy() for col in rows))
+            for r in present:
+                self._fill(rows, position[r.id], r, dims)
+                rows.matrix[position[r.id]] = similarity.normalize_rows(
+                    rows.matrix[position[r.id]][None, :])[0]
+        if added:
+            n = len(added)
+            add = _Rows(np.array([r.id for r in added], np.int64),
+                        np.zeros((n, dims), np.float32),
+                        np.array([r.published_at or r.ingested_at for r in added], 'datetime64[us]'),
+                        np.zeros(n), np.zeros(n, np.int64), np.empty(n, object), np.zeros(n, bool))
+            for p, r in enumerate(added):
+                self._fill(add, p, r, dims)
+            similarity.normalize_rows(add.matrix)
+            rows = _Rows(*(np.concatenate([a, b]) for a, b in zip(rows, add)))
+            if len(rows.ids) > 1 and (np.diff(rows.ids) < 0).any():
+                order = np.argsort(rows.ids, kind='stable')
+                rows = _Rows(*(col[order] for col in rows))
+
+        keep = rows.whens >= np.datetime64(cutoff, 'us')
+        if not keep.all():
+            rows = _Rows(*(col[keep] for col in rows))
+            kept = set(rows.ids.tolist())
+            self.odd = {i: v for i, v in self.odd.items() if i in kept}
+        return rows._replace(hidden=np.isin(rows.ids, np.array(hidden, np.int64)))
+
+    def _fill(self, rows, p, r, dims):
+        """Copy one loaded row into position ``p`` (embedding not yet normalised)."""
+        rows.importance[p] = r.importance or 0
+        rows.topics[p] = topic_bits(r.topics)
+        rows.courts[p] = r.court
+        self.odd.pop(r.id, None)
+        vec = r.embedding
+        if vec is not None and len(vec) == dims and dims:
+            rows.matrix[p] = vec
+        else:
+            rows.matrix[p] = 0
+            if vec is not None and len(vec):
+                self.odd[r.id] = vec
+
+    def search(self, interest, k, now, window_days, topics=None, courts=None,
+               penalized_ids=None):
+        """Top ``k`` ids, ranked exactly like similarity.rank_candidates over
+        the database candidates; None when the index cannot answer."""
+        cutoff = now - timedelta(days=window_days)
+        if self.refreshed_at is None or cutoff < self.refreshed_at - timedelta(days=INDEX_WINDOW_DAYS):
+            return None  # window reaches past what the index holds
+        if interest and self.dims is not None and len(interest) != self.dims:
+            return None
+        rows = self._rows
+        pick = np.flatnonzero(~rows.hidden & (rows.whens >= np.datetime64(cutoff, 'us')))
+        if topics or courts:
+            mask = (rows.topics[pick] & topic_bits(topics)) != 0
+            if courts:
+                mask |= np.isin(rows.courts[pick], list(courts))
+            if mask.any():
+                pick = pick[mask]
+
+        ids = rows.ids[pick]
+        if not interest:
+            sims = np.ones(len(pick))
+        else:
+            query = np.asarray(interest, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm == 0 or len(pick) == 0:
+                sims = np.zeros(len(pick))
+            else:
+                sims = (rows.matrix[pick] @ (query / norm)).astype(np.float64)
+                for p, item_id in enumerate(ids.tolist()):
+                    if item_id in self.odd:
+                        sims[p] = similarity.cosine(self.odd[item_id], interest)
+        pen = penalized_ids or set()
+        penalized = np.isin(ids, list(pen)) if pen else None
+        scores = similarity.combine_scores(sims, rows.importance[pick], rows.whens[pick],
+                                           now, penalized)
+        return ids[similarity.top_k(scores, k)].tolist()
+
+
+class PgVectorIndex:
+    """pgvector/HNSW backend: nearest neighbours come from the database, then
+    the pool is re-ranked with the same scoring as the in-memory index."""
+    backend = 'pgvector'
+
+    def __init__(self):
+        self._stale = True
+        self.refreshed_at = None
+
+    def mark_stale(self):
+        self._stale = True
+
+    def ensure_fresh(self, now=None):
+        now = now or datetime.utcnow()
+        due = self.refreshed_at is None or now - self.refreshed_at >= timedelta(seconds=REFRESH_SECONDS)
+        if self._stale or due:
+            self.refresh(now)
+
+    def refresh(self, now=None, full=False):
+        """Copy packed embeddings into the pgvector column where it is still NULL."""
+        self._stale = False
+        self.refreshed_at = now or datetime.utcnow()
+        while True:
+            rows = (db.session.execute(text(
+                'SELECT id, embedding FROM legal_feed_items '
+                'WHERE embedding IS NOT NULL AND embedding_vec IS NULL LIMIT :n'),
+                {'n': LOAD_BATCH}).all())
+            if not rows:
+                break
+            vectors = [np.frombuffer(raw, dtype='<f4') for _, raw in rows]
+            db.session.execute(
+                text('UPDATE legal_feed_items SET embedding_vec = CAST(:v AS vector) WHERE id = :id'),
+                [{'id': i, 'v': '[' + ','.join(map(repr, v.tolist())) + ']'}
+                 for (i, _), v in zip(rows, vectors)])
+            db.session.commit()
+
+    def search(self, interest, k, now, window_days, topics=None, courts=None,
+               penalized_ids=None):
+        if not interest:
+            return None  # cold start is not a vector query; use the database path
+        cutoff = now - timedelta(days=window_days)
+        query = '[' + ','.join(repr(float(x)) for x in interest) + ']'
+        pool = [i for (i,) in db.session.execute(text(
+            'SELECT id FROM legal_feed_items '
+            'WHERE hidden = false AND duplicate_of IS NULL AND content_type = :ct '
+            'AND embedding_vec IS NOT NULL '
+            'AND coalesce(published_at, ingested_at) >= :cutoff '
+            'ORDER BY embedding_vec <=> CAST(:q AS vector) LIMIT :n'),
+            {'ct': 'news', 'cutoff': cutoff, 'q': query, 'n': k * PGVECTOR_POOL})]
+        if not pool:
+            return []
+        rows = (db.session.query(LegalFeedItem.id, LegalFeedItem.embedding,
+                                 LegalFeedItem.published_at, LegalFeedItem.ingested_at,
+                                 LegalFeedItem.importance, LegalFeedItem.topics,
+                                 LegalFeedItem.court)
+                .filter(LegalFeedItem.id.in_(pool)).order_by(LegalFeedItem.id).all())
+        if topics or courts:
+            matched = [r for r in rows if (set(topics or ()) & set(r.topics or []))
+                       or (r.court in (courts or ()))]
+            rows = matched or rows
+        return similarity.rank_candidates(
+            [r.id for r in rows], [r.embedding for r in rows],
+            [r.published_at or r.ingested_at for r in rows], [r.importance for r in rows],
+            interest, now=now, penalized_ids=penalized_ids, k=k)
+
+
+BACKENDS = {'memory': MemoryVectorIndex, 'pgvector': PgVectorIndex}
+
+
+def get_index():
+    """This process's index (one per app), or None when disabled."""
+    ext = current_app.extensions
+    if 'legal_feed_index' not in ext:
+        backend = os.getenv('LEGAL_FEED_VECTOR_BACKEND', 'memory')
+        ext['legal_feed_index'] = BACKENDS[backend]() if backend in BACKENDS else None
+    return ext['legal_feed_index']
+
+
+def mark_stale():
+    """Called after ingestion, enrichment or a hide in this process."""
+    if has_app_context():
+        index = current_app.extensions.get('legal_feed_index')
+        if index is not None:
+            index.mark_stale()
@@ -1,115 +1,485 @@
-"""Orchestrates one ingestion run across all enabled sources."""
-from datetime import datetime
+"""Orchestrates one ingestion run across all enabled sources.
 
-from app.models.models import db, LegalFeedSource, LegalFeedItem, LegalFeedRun
+Sources are fetched concurrently on a bounded thread pool (at most
+``PER_HOST_LIMIT`` at a time against any one publisher) using conditional
+GETs, so one slow feed no longer delays the rest and unchanged feeds are
+neither downloaded nor parsed. Pool threads only do network + parsing; every
+database write stays on the calling thread.
+
+Each source carries a circuit breaker: after ``BREAKER_THRESHOLD``
+consecutive failures it is skipped until ``backoff_until``, which doubles
+with each further failure up to ``BREAKER_MAX_BACKOFF``. The first fetch
+after the backoff is the trial; success closes the breaker.
+
+A run is a background job (same lifecycle as ``import_jobs``):
+``submit_run`` queues a ``LegalFeedRun`` and ``dispatch`` runs it on a
+daemon thread, so the endpoints answer at once with the run id. Stages run
+in order: fetch, images (thumbnails of the new items, see ``thumbnails``),
+enrich. The run checkpoints in the same transaction as each source's items
+and each enrichment chunk, and after each chunk of thumbnails; a worker
+killed mid-run leaves a run whose heartbeat goes stale, and the next submit
+(or a status poll) resumes it where the last commit left off. Per-stage timings land in
+``LegalFeedRun.telemetry``.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.models.models import (
+    db, LegalFeedSource, LegalFeedItem, LegalFeedItemArchive, LegalFeedRun,
+)
 from app.utils.legal_feed_dedup import compute_dedup_key
-from app.services.legal_feed import rss
-from app.services.legal_feed.enrichment import get_enrichment_client, enrich_item
+from app.services.legal_feed import cache, clusters, for_you, read_cache, rss, thumbnails
+from app.services.legal_feed import index as vector_index
+from app.services.legal_feed.enrichment import get_enrichment_client, enrich_items
+from app.services.legal_feed.telemetry import RunTelemetry, TimedClient
 
 # Fetchers keyed by source.kind. v1 ships RSS only.
 FETCHERS = {'rss': rss}
 
+MAX_FETCH_WORKERS = int(os.getenv('LEGAL_FEED_FETCH_WORKERS', '8'))
+PER_HOST_LIMIT = 2
+BREAKER_THRESHOLD = 3
+BREAKER_BASE_BACKOFF = timedelta(minutes=15)
+BREAKER_MAX_BACKOFF = timedelta(hours=24)
+# Rows per multi-row INSERT / keys per IN check (bounded by bind-parameter limits).
+INSERT_CHUNK = 500
+ENRICH_COMMIT_CHUNK = 25
+# New items per thumbnail prefetch between heartbeats (a few slow downloads
+# per pool worker, well inside STALE_AFTER).
+IMAGES_CHUNK = 4 * thumbnails.PREFETCH_WORKERS
+ACTIVE_STATUSES = ('queued', 'running')
+# A run whose heartbeat is older than this is presumed orphaned and may be
+# claimed again. Above the longest gap between checkpoints: the concurrent
+# fetch of every source.
+STALE_AFTER = timedelta(minutes=int(os.getenv('LEGAL_FEED_RUN_STALE_MINUTES', '10')))
 
-def _ingest_source(source) -> dict:
-    result = {'source_id': source.id, 'fetched': 0, 'inserted': 0,
-              'inserted_ids': [], 'error': None}
-    fetcher = FETCHERS.get(source.kind)
+
+def circuit_open(source, now) -> bool:
+    return source.backoff_until is not None and source.backoff_until > now
+
+
+def _record_failure(source, error, now):
+    source.failure_count = (source.failure_count or 0) + 1
+    source.last_error = error
+    if source.failure_count >= BREAKER_THRESHOLD:
+        backoff = BREAKER_BASE_BACKOFF * (2 ** (source.failure_count - BREAKER_THRESHOLD))
+        source.backoff_until = now + min(backoff, BREAKER_MAX_BACKOFF)
+
+
+def _record_success(source, fetched, now):
+    source.failure_count = 0
+    source.backoff_until = None
+    source.last_error = None
+    source.last_fetched_at = now
+    source.etag = fetched.etag
+    source.last_modified = fetched.last_modified
+
+
+def _fetch_one(job, host_slots) -> dict:
+    """Network + parse for one source. Runs on a pool thread: no DB access."""
+    fetcher = FETCHERS.get(job['kind'])
     if fetcher is None:
-        result['error'] = f'unknown source kind: {source.kind}'
+        return {'error': f"unknown source kind: {job['kind']}"}
+    timings = {}
+    try:
+        with host_slots[job['host']]:
+            started = time.perf_counter()
+            fetched = fetcher.fetch(job['url'], job['etag'], job['last_modified'],
+                                    timeout=fetcher.timeout_for(job['url']))
+            timings['fetch'] = time.perf_counter() - started
+        started = time.perf_counter()
+        items = [] if fetched.not_modified else fetcher.parse_feed(fetched.body)
+        if not fetched.not_modified:
+            timings['parse'] = time.perf_counter() - started
+    except Exception as exc:
+        return {'error': str(exc), 'timings': timings}
+    return {'error': None, 'fetched': fetched, 'items': items, 'timings': timings}
+
+
+def fetch_sources(sources) -> dict:
+    """Fetch + parse ``sources`` concurrently. Returns {source_id: outcome}."""
+    jobs = [{'id': s.id, 'kind': s.kind, 'url': s.feed_url, 'etag': s.etag,
+             'last_modified': s.last_modified,
+             'host': (urlsplit(s.feed_url).hostname or '').lower()} for s in sources]
+    if not jobs:
+        return {}
+    host_slots = {j['host']: threading.BoundedSemaphore(PER_HOST_LIMIT) for j in jobs}
+    with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(jobs)),
+                            thread_name_prefix='legal-feed-fetch') as pool:
+        futures = {j['id']: pool.submit(_fetch_one, j, host_slots) for j in jobs}
+        return {source_id: f.result() for source_id, f in futures.items()}
+
+
+def _insert_statement():
+    """INSERT ... ON CONFLICT (dedup_key) DO NOTHING RETURNING id for this dialect."""
+    table = LegalFeedItem.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:  # the IN pre-check already removed known keys
+        return table.insert().returning(table.c.id)
+    return insert(table).on_conflict_do_nothing(index_elements=['dedup_key']).returning(table.c.id)
+
+
+def insert_new_items(source, items, now) -> list:
+    """Insert the parsed ``items`` not already stored; returns the new ids.
+
+    Set-based: dedup keys for the whole batch are checked with one ``IN``
+    query (against the hot table and the archive, so an entry a source still
+    serves does not come back once archived) and the survivors go in as one
+    multi-row INSERT per ``INSERT_CHUNK`` rows. ON CONFLICT covers a
+    concurrent run inserting the same key in between; such rows are simply
+    not returned. Within one feed the first entry for a key wins, as before.
+    """
+    rows = {}
+    for it in items:
+        key = compute_dedup_key(it['source_url'], source.name, it['title'])
+        rows.setdefault(key, {
+            'source_id': source.id, 'content_type': source.content_type,
+            'title': it['title'], 'summary': it.get('summary'),
+            'source_url': it['source_url'], 'source_name': source.name,
+            'court': source.court, 'published_at': it.get('published_at'),
+            'image_url': it.get('image_url'), 'hidden': False, 'dedup_key': key,
+            'ingested_at': now,
+        })
+    keys = list(rows)
+    existing = set()
+    for i in range(0, len(keys), INSERT_CHUNK):
+        chunk = keys[i:i + INSERT_CHUNK]
+        hot = db.session.query(LegalFeedItem.dedup_key).filter(LegalFeedItem.dedup_key.in_(chunk))
+        archived = (db.session.query(LegalFeedItemArchive.dedup_key)
+                    .filter(LegalFeedItemArchive.dedup_key.in_(chunk)))
+        existing.update(k for (k,) in hot.union_all(archived))
+    fresh = [row for key, row in rows.items() if key not in existing]
+
+    ids = []
+    stmt = _insert_statement()
+    for i in range(0, len(fresh), INSERT_CHUNK):
+        ids.extend(db.session.execute(stmt.values(fresh[i:i + INSERT_CHUNK])).scalars())
+    return ids
+
+
+def _ingest_source(source, outcome, now, checkpoint=None) -> dict:
+    """Write one source's outcome; ``checkpoint(result)`` runs inside the same
+    commit."""
+    checkpoint = checkpoint or (lambda result: None)
+    result = {'source_id': source.id, 'fetched': 0, 'inserted': 0,
+              'inserted_ids': [], 'not_modified': False, 'error': None}
+    if outcome['error']:
+        result['error'] = outcome['error']
+        _record_failure(source, outcome['error'], now)
+        checkpoint(result)
+        db.session.commit()
         return result
+    started = time.perf_counter()
     try:
-        raw = fetcher.fetch_raw(source.feed_url)
-        items = fetcher.parse_feed(raw)
+        items = outcome['items']
         result['fetched'] = len(items)
-        for it in items:
-            key = compute_dedup_key(it['source_url'], source.name, it['title'])
-            if LegalFeedItem.query.filter_by(dedup_key=key).first():
-                continue
-            row = LegalFeedItem(
-                source_id=source.id, content_type=source.content_type,
-                title=it['title'], summary=it.get('summary'),
-                source_url=it['source_url'], source_name=source.name,
-                court=source.court, published_at=it.get('published_at'),
-                image_url=it.get('image_url'), hidden=False, dedup_key=key,
-            )
-            db.session.add(row)
-            db.session.flush()
-            result['inserted'] += 1
-            result['inserted_ids'].append(row.id)
+        result['not_modified'] = outcome['fetched'].not_modified
+        result['inserted_ids'] = insert_new_items(source, items, now)
+        result['inserted'] = len(result['inserted_ids'])
+        clusters.cluster_new_items(result['inserted_ids'], now)
+        # Validators are saved with the items, so a failed write re-downloads.
+        _record_success(source, outcome['fetched'], now)
+        result['write_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        checkpoint(result)
         db.session.commit()
     except Exception as exc:  # one bad source must not abort the run
         db.session.rollback()
-        result['error'] = str(exc)
+        result.update(inserted=0, inserted_ids=[], error=str(exc))
+        result.pop('write_ms', None)
+        _record_failure(source, str(exc), now)
+        checkpoint(result)
+        db.session.commit()
     return result
 
 
-def _enrich_ids(ids, client) -> tuple:
+def _enrich_ids(ids, client, checkpoint=None) -> tuple:
     """Enrich the given item ids. Returns (enriched, failed).
 
-    Commits after each item so the open-transaction window never spans more than
-    one (slow) LLM round-trip. A worker killed mid-run can then orphan at most a
-    single short transaction, and every item enriched so far is already durable.
+    Items are enriched ENRICH_COMMIT_CHUNK at a time through enrich_items
+    (concurrent completions, batched embeddings) and committed per chunk, so
+    the open-transaction window spans one chunk's worth of LLM round-trips and
+    a worker killed mid-run loses at most the chunk in flight.
+    ``checkpoint(done, enriched, failed, seconds)`` runs inside each chunk's
+    commit, ``done`` being how many of ``ids`` are behind it.
     """
     enriched = failed = 0
-    for item_id in ids:
-        item = LegalFeedItem.query.get(item_id)
+    for start in range(0, len(ids), ENRICH_COMMIT_CHUNK):
+        chunk = ids[start:start + ENRICH_COMMIT_CHUNK]
+        started = time.perf_counter()
         # Only news is enriched for now; skip judgements without counting them.
-        if item is None or item.enriched_at is not None or item.content_type != 'news':
-            continue
-        if enrich_item(item, client):
-            enriched += 1
-        else:
-            failed += 1
+        items = (LegalFeedItem.query
+                 .filter(LegalFeedItem.id.in_(chunk),
+                         LegalFeedItem.enriched_at.is_(None),
+                         LegalFeedItem.content_type == 'news')
+                 .order_by(LegalFeedItem.id)
+                 .all())
+        ok = bad = 0
+        if items:
+            ok, bad = enrich_items(items, client)
+            enriched += ok
+            failed += bad
+            clusters.confirm([it.id for it in items])
+        if checkpoint is not None:
+            checkpoint(start + len(chunk), ok, bad,
+                       time.perf_counter() - started if items else None)
         db.session.commit()
     return enriched, failed
 
 
-def run_ingestion(trigger: str) -> dict:
-    run = LegalFeedRun(started_at=datetime.utcnow(), trigger=trigger,
-                       status='success', total_ingested=0, results=[])
+# ---------------------------------------------------------------------------
+# Run lifecycle
+# ---------------------------------------------------------------------------
+
+def active_run():
+    return (LegalFeedRun.query.filter(LegalFeedRun.status.in_(ACTIVE_STATUSES))
+            .order_by(LegalFeedRun.id).first())
+
+
+def is_stale(run, now=None) -> bool:
+    """True for an active run that no worker appears to be advancing."""
+    now = now or datetime.utcnow()
+    return run.status in ACTIVE_STATUSES and (
+        run.heartbeat_at is None or run.heartbeat_at < now - STALE_AFTER)
+
+
+def submit_run(trigger: str) -> tuple:
+    """Queue a run. Returns (run, created): while one is still active, that
+    run is returned instead of starting a second (``ux_lfr_one_active``
+    settles concurrent submits)."""
+    run = active_run()
+    if run is not None:
+        return run, False
+    now = datetime.utcnow()
+    run = LegalFeedRun(started_at=now, trigger=trigger, status='queued', stage='fetch',
+                       total_ingested=0, results=[], state={}, telemetry={},
+                       attempts=0, heartbeat_at=now)
     db.session.add(run)
+    try:
+        db.session.commit()
+    except IntegrityError:  # lost the race against a concurrent submit
+        db.session.rollback()
+        run = active_run()
+        if run is None:   # the winner already finished
+            raise
+        return run, False
+    return run, True
+
+
+def claim_run(run_id, now=None) -> bool:
+    """Atomically mark a queued (or orphaned running) run as ours."""
+    now = now or datetime.utcnow()
+    cutoff = now - STALE_AFTER
+    claimed = (LegalFeedRun.query
+               .filter(LegalFeedRun.id == run_id,
+                       db.or_(LegalFeedRun.status == 'queued',
+                              db.and_(LegalFeedRun.status == 'running',
+                                      db.or_(LegalFeedRun.heartbeat_at.is_(None),
+                                             LegalFeedRun.heartbeat_at < cutoff))))
+               .update({'status': 'running', 'heartbeat_at': now,
+                        'attempts': func.coalesce(LegalFeedRun.attempts, 0) + 1},
+                       synchronize_session=False))
     db.session.commit()
+    return claimed == 1
 
-    sources = LegalFeedSource.query.filter_by(enabled=True).all()
-    results = [_ingest_source(s) for s in sources]
 
-    enriched = failed = 0
+def _fetch_stage(run, telemetry):
+    """Fetch and write every source not yet checkpointed by this run."""
+    now = datetime.utcnow()
+    state = dict(run.state or {})
+    if 'sources' not in state:
+        state['sources'] = [sid for (sid,) in db.session.query(LegalFeedSource.id)
+                            .filter(LegalFeedSource.enabled.is_(True))
+                            .order_by(LegalFeedSource.id)]
+    done = set(state.get('done', []))
+    pending = [sid for sid in state['sources'] if sid not in done]
+    sources = (LegalFeedSource.query.filter(LegalFeedSource.id.in_(pending))
+               .order_by(LegalFeedSource.id).all()) if pending else []
+    outcomes = fetch_sources([s for s in sources if s.enabled and not circuit_open(s, now)])
+
+    def checkpoint(result):
+        result = dict(result)
+        outcome = outcomes.get(result['source_id'], {})
+        fetched = outcome.get('fetched')
+        if fetched is not None and not fetched.not_modified:
+            result['bytes'] = fetched.size
+        for stage, seconds in outcome.get('timings', {}).items():
+            result[f'{stage}_ms'] = round(seconds * 1000, 1)
+            telemetry.record(stage, seconds, **({'bytes': result.get('bytes', 0)}
+                                                if stage == 'fetch' else {}))
+        if 'write_ms' in result:
+            telemetry.record('write', result['write_ms'] / 1000)
+        state['done'] = state.get('done', []) + [result['source_id']]
+        state['enrich_ids'] = state.get('enrich_ids', []) + result.pop('inserted_ids', [])
+        state['telemetry'] = telemetry.raw()
+        run.state = dict(state)
+        run.results = (run.results or []) + [result]
+        run.total_ingested = (run.total_ingested or 0) + result['inserted']
+        run.telemetry = telemetry.summary()
+        run.heartbeat_at = datetime.utcnow()
+
+    for s in sources:
+        if s.id in outcomes:
+            _ingest_source(s, outcomes[s.id], now, checkpoint)
+        else:
+            checkpoint({'source_id': s.id, 'fetched': 0, 'inserted': 0,
+                        'skipped': 'circuit_open' if s.enabled else 'disabled',
+                        'error': None})
+            db.session.commit()
+    run.stage = 'images'
+    db.session.commit()
+
+
+def _images_stage(run, telemetry):
+    """Prefetch thumbnails for the images of this run's new items,
+    IMAGES_CHUNK items at a time, checkpointing and heartbeating after each
+    chunk so a long stage is neither lost nor taken for an orphaned run."""
+    state = dict(run.state or {})
+    ids = state.get('enrich_ids', [])
+    cursor = state.get('images_done', 0)
+    for start in range(cursor, len(ids), IMAGES_CHUNK):
+        chunk = ids[start:start + IMAGES_CHUNK]
+        urls = [url for (url,) in db.session.query(LegalFeedItem.image_url)
+                .filter(LegalFeedItem.id.in_(chunk), LegalFeedItem.image_url.isnot(None))]
+        thumbnails.prefetch(urls, telemetry)
+        state['images_done'] = start + len(chunk)
+        state['telemetry'] = telemetry.raw()
+        run.state = dict(state)
+        run.telemetry = telemetry.summary()
+        run.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+    run.stage = 'enrich'
+    db.session.commit()
+
+
+def _enrich_stage(run, telemetry):
+    """Enrich the items this run inserted, resuming after the last chunk."""
+    state = dict(run.state or {})
+    ids = state.get('enrich_ids', [])
+    cursor = state.get('enrich_done', 0)
     client = get_enrichment_client()
-    if client is not None:
-        new_ids = [i for r in results for i in r.get('inserted_ids', [])]
-        enriched, failed = _enrich_ids(new_ids, client)
+    if client is not None and cursor < len(ids):
+        def checkpoint(done, ok, bad, seconds):
+            if seconds is not None:
+                telemetry.record('enrich', seconds, items=ok + bad)
+            state['enrich_done'] = cursor + done
+            state['telemetry'] = telemetry.raw()
+            run.state = dict(state)
+            run.enriched = (run.enriched or 0) + ok
+            run.enrich_failed = (run.enrich_failed or 0) + bad
+            run.telemetry = telemetry.summary()
+            run.heartbeat_at = datetime.utcnow()
 
-    error_count = sum(1 for r in results if r['error'])
+        _enrich_ids(ids[cursor:], TimedClient(client, telemetry), checkpoint)
+    run.stage = 'done'
+    db.session.commit()
+
+
+def _finish(run, telemetry):
+    results = run.results or []
+    attempted = [r for r in results if not r.get('skipped')]
+    error_count = sum(1 for r in attempted if r['error'])
     if error_count == 0:
         status = 'success'
-    elif error_count == len(results):
+    elif error_count == len(attempted):
         status = 'failed'
     else:
         status = 'partial'
 
-    # inserted_ids is internal bookkeeping; drop it from the persisted audit log.
-    for r in results:
-        r.pop('inserted_ids', None)
-
     run.finished_at = datetime.utcnow()
-    run.total_ingested = sum(r['inserted'] for r in results)
-    run.enriched = enriched
-    run.enrich_failed = failed
     run.status = status
-    run.results = results
+    run.telemetry = telemetry.summary()
+    run.state = {}
+    for_you.invalidate_all()
+    read_cache.bump(read_cache.CONTENT)
     db.session.commit()
+    vector_index.mark_stale()
+
+
+def run_job(run_id):
+    """Claim and advance a run to completion. Returns the final run dict, or
+    None if another worker holds it."""
+    if not claim_run(run_id):
+        return None
+    run = db.session.get(LegalFeedRun, run_id)
+    telemetry = RunTelemetry((run.state or {}).get('telemetry'))
+    try:
+        if run.stage == 'fetch':
+            _fetch_stage(run, telemetry)
+        if run.stage == 'images':
+            _images_stage(run, telemetry)
+        if run.stage == 'enrich':
+            _enrich_stage(run, telemetry)
+        _finish(run, telemetry)
+    except Exception as exc:
+        db.session.rollback()
+        run = db.session.get(LegalFeedRun, run_id)
+        run.status = 'failed'
+        run.error = str(exc)
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
     return run.to_dict()
 
 
+def dispatch(run_id):
+    """Run ``run_job`` on a daemon thread with its own app context and session.
+
+    Module-level so tests can monkeypatch it to run inline. If the worker
+    dies, the run is resumed by the next submit or status poll.
+    """
+    app = current_app._get_current_object()
+
+    def _work():
+        with app.app_context():
+            try:
+                run_job(run_id)
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=_work, name=f'legal-feed-run-{run_id}', daemon=True).start()
+
+
+def start_run(trigger: str) -> LegalFeedRun:
+    """Submit a run and dispatch it (or re-dispatch the active one if its
+    worker died). For the endpoints; returns without waiting."""
+    run, created = submit_run(trigger)
+    if created or is_stale(run):
+        dispatch(run.id)
+    return run
+
+
+def run_ingestion(trigger: str) -> dict:
+    """Submit and run to completion on this thread (scripts and tests)."""
+    run, _ = submit_run(trigger)
+    return run_job(run.id) or run.to_dict()
+
+
 def enrich_backlog(limit=100, client=None) -> dict:
     """Deliberately enrich already-ingested items (enriched_at IS NULL)."""
     client = client or get_enrichment_client()
     if client is None:
-        return {'attempted': 0, 'enriched': 0, 'failed': 0}
+        return {'attempted': 0, 'enriched': 0, 'failed': 0, 'avoided_calls': 0}
     rows = (LegalFeedItem.query
             .filter(LegalFeedItem.enriched_at.is_(None),
                     LegalFeedItem.content_type == 'news')
             .order_by(LegalFeedItem.id.desc()).limit(limit).all())
     ids = [r.id for r in rows]
+    avoided = cache.avoided_calls()
     enriched, failed = _enrich_ids(ids, client)
-    return {'attempted': len(ids), 'enriched': enriched, 'failed': failed}
+    for_you.invalidate_all()
+    read_cache.bump(read_cache.CONTENT)
+    db.session.commit()
+    vector_index.mark_stale()
+    return {'attempted': len(ids), 'enriched': enriched, 'failed': failed,
+            'avoided_calls': cache.avoided_calls() - avoided}
@@ -1,7 +1,8 @@
 """User feed-preference persistence + interest-phrase embedding on save."""
 from app.models.models import db, LegalFeedPreference
+from app.services.legal_feed import for_you
 from app.services.legal_feed.taxonomy import PRACTICE_AREAS
-from app.services.legal_feed.enrichment import get_enrichment_client
+from app.services.legal_feed.enrichment import get_enrichment_client, cached_embedding
 
 _VALID = set(PRACTICE_AREAS)
 
@@ -31,15 +32,20 @@ def upsert_preference(user_id, topic_weights, courts, interest_phrases, client='
     pref.topic_weights = _clean_weights(topic_weights)
     pref.courts = list(courts or [])
     phrases = [p for p in (interest_phrases or []) if isinstance(p, str) and p.strip()]
+    unchanged = (phrases == (pref.interest_phrases or []) and pref.interest_embedding
+                 and pref.embed_model == getattr(client, 'embed_model', None))
     pref.interest_phrases = phrases
 
-    if phrases and client is not None:
-        pref.interest_embedding = client.embed(' '.join(phrases))
+    if unchanged:
+        pass  # same phrases, same model: keep the stored vector
+    elif phrases and client is not None:
+        pref.interest_embedding = cached_embedding(client, ' '.join(phrases))
         pref.embed_model = getattr(client, 'embed_model', None)
     else:
         pref.interest_embedding = None
         pref.embed_model = None
 
     db.session.add(pref)
+    for_you.invalidate(user_id)
     db.session.commit()
     return pref
@@ -1,37 +1,44 @@
 """Read-side query logic for the legal feed (testable without HTTP/JWT)."""
 from datetime import datetime, timedelta
 
-from sqlalchemy import func, case
+from sqlalchemy import func, case, exists
 
-from app.models.models import db, LegalFeedItem, LegalFeedSource, LegalFeedSetting
+from app.models.models import db, LegalFeedItem, LegalFeedSource, LegalFeedEvent
 from app.utils.pagination import paginate_query
 from app.services.legal_feed.preferences import get_preference
-from app.services.legal_feed.similarity import rank_by_similarity
+from app.services.legal_feed.similarity import rank_candidates
+from app.services.legal_feed.index import get_index
 from app.services.legal_feed import behavior as bx
-from app.services.legal_feed.events import get_rejected_item_ids, event_count
+from app.services.legal_feed import read_cache
 
 
 def get_ordering_mode() -> str:
-    setting = LegalFeedSetting.query.get(1)
-    if setting is None:
-        setting = LegalFeedSetting(id=1, ordering_mode='recency')
-        db.session.add(setting)
-        db.session.commit()
-    return setting.ordering_mode
+    """The global ordering mode, from the read cache ('recency' until set)."""
+    return read_cache.state().ordering_mode
 
 
-def query_feed(content_type=None, court=None, page=1, page_size=50, demote_ids=None) -> dict:
+def query_feed(content_type=None, court=None, page=1, page_size=50, demote_ids=None,
+               demote_user_id=None) -> dict:
+    """One page of the feed. Items the user rejected sink to the end: by
+    ``demote_user_id`` (a correlated EXISTS against their not_interested
+    events, which the planner runs as a semi-join on ix_lfe_user_kind_item)
+    or, for callers that already hold them, an explicit ``demote_ids``."""
     # News-only product: default to news so judgements never surface unless a
     # caller explicitly asks (e.g. admin tooling). See 020_news_only_feed.sql.
     content_type = content_type or 'news'
-    q = LegalFeedItem.query.filter_by(hidden=False)
+    q = LegalFeedItem.query.filter_by(hidden=False, duplicate_of=None)
     q = q.filter_by(content_type=content_type)
     if court:
         q = q.filter_by(court=court)
 
     recency = func.coalesce(LegalFeedItem.published_at, LegalFeedItem.ingested_at).desc()
     order = []
-    if demote_ids:
+    if demote_user_id is not None:
+        rejected = exists().where(LegalFeedEvent.user_id == demote_user_id,
+                                  LegalFeedEvent.kind == 'not_interested',
+                                  LegalFeedEvent.item_id == LegalFeedItem.id)
+        order.append(case((rejected, 1), else_=0))
+    elif demote_ids:
         order.append(case((LegalFeedItem.id.in_(demote_ids), 1), else_=0))
 
     if get_ordering_mode() == 'weighted':
@@ -43,7 +50,24 @@ def query_feed(content_type=None, court=None, page=1, page_size=50, demote_ids=N
     return paginate_query(q, page, page_size, lambda i: i.to_dict())
 
 
+def first_page(content_type=None, court=None, page_size=50) -> dict:
+    """The unpersonalised first page, cached until the feed content or the
+    config changes. Callers must not mutate the result."""
+    content_type = content_type or 'news'
+    state = read_cache.state()
+    key = ('first_page', content_type, court, state.ordering_mode, page_size)
+    return read_cache.get_cache().get(
+        key, (state.content_version, state.config_version),
+        lambda: query_feed(content_type, court, 1, page_size))
+
+
 def list_courts() -> list:
+    """Courts of the enabled sources, cached until an admin change."""
+    return read_cache.get_cache().get(('courts',), read_cache.state().config_version,
+                                      _load_courts)
+
+
+def _load_courts() -> list:
     rows = (db.session.query(LegalFeedSource.court)
             .filter(LegalFeedSource.enabled.is_(True),
                     LegalFeedSource.court.isnot(None))
@@ -53,29 +77,68 @@ def list_courts() -> list:
 
 def query_for_you(user_id, content_type=None, limit=10, offset=0,
                   window_days=14, now=None) -> list:
+    ranked = rank_for_you(user_id, content_type, offset + limit, window_days, now)
+    return items_in_order(ranked[offset:offset + limit])
+
+
+def rank_for_you(user_id, content_type=None, k=10, window_days=14, now=None) -> list:
+    """The user's top ``k`` item ids, best first."""
     now = now or datetime.utcnow()
-    cutoff = now - timedelta(days=window_days)
     pref = get_preference(user_id)
-
     content_type = content_type or 'news'
-    q = LegalFeedItem.query.filter_by(hidden=False)
-    q = q.filter_by(content_type=content_type)
-    q = q.filter(func.coalesce(LegalFeedItem.published_at, LegalFeedItem.ingested_at) >= cutoff)
-
-    candidates = q.all()
 
-    interest = None
-    if pref is not None:
+    interest, topics, courts, rejected = None, set(), set(), set()
+    if pref is not None:  # counters and rejections are kept on the row
         interest = bx.blend_interest(pref.interest_embedding,
-                                     pref.behavior_embedding, event_count(user_id))
+                                     pref.behavior_embedding, pref.event_count or 0)
         topics = set((pref.topic_weights or {}).keys())
         courts = set(pref.courts or [])
-        if topics or courts:
-            matched = [it for it in candidates
-                       if (topics & set(it.topics or [])) or (it.court in courts)]
-            if matched:
-                candidates = matched
-
-    rejected = get_rejected_item_ids(user_id)
-    ranked = rank_by_similarity(candidates, interest, now=now, penalized_ids=rejected)
-    return [it.to_dict() for it in ranked[offset:offset + limit]]
+        rejected = set(pref.rejected_item_ids or [])
+
+    ranked = None
+    index = get_index() if content_type == 'news' else None
+    if index is not None:
+        index.ensure_fresh()
+        ranked = index.search(interest, k, now, window_days,
+                              topics=topics, courts=courts, penalized_ids=rejected)
+    if ranked is None:
+        ranked = _rank_from_db(content_type, interest, topics, courts, rejected,
+                               k, now, window_days)
+    return ranked
+
+
+def items_in_order(ids, skip_hidden=False) -> list:
+    """to_dict() of the given items in ``ids`` order (missing ids dropped)."""
+    if not ids:
+        return []
+    items = {it.id: it for it in LegalFeedItem.query.filter(LegalFeedItem.id.in_(ids))}
+    return [items[i].to_dict() for i in ids
+            if i in items and not (skip_hidden and items[i].hidden)]
+
+
+def _rank_from_db(content_type, interest, topics, courts, rejected, k, now, window_days) -> list:
+    """Rank straight from the table; the fallback when the index cannot answer."""
+    cutoff = now - timedelta(days=window_days)
+    # Only the columns scoring needs; full rows are loaded for the page alone.
+    candidates = (db.session.query(LegalFeedItem.id, LegalFeedItem.embedding,
+                                   LegalFeedItem.published_at, LegalFeedItem.ingested_at,
+                                   LegalFeedItem.importance, LegalFeedItem.topics,
+                                   LegalFeedItem.court)
+                  .filter(LegalFeedItem.hidden.is_(False),
+                          LegalFeedItem.duplicate_of.is_(None),
+                          LegalFeedItem.content_type == content_type,
+                          func.coalesce(LegalFeedItem.published_at,
+                                        LegalFeedItem.ingested_at) >= cutoff)
+                  .order_by(LegalFeedItem.id)
+                  .all())
+    if topics or courts:
+        matched = [c for c in candidates
+                   if (topics & set(c.topics or [])) or (c.court in courts)]
+        if matched:
+            candidates = matched
+
+    return rank_candidates([c.id for c in candidates],
+                           [c.embedding for c in candidates],
+                           [c.published_at or c.ingested_at for c in candidates],
+                           [c.importance for c in candidates],
+                           interest, now=now, penalized_ids=rejected, k=k)
@@ -0,0 +1,102 @@
+"""Versioned read cache for the legal feed endpoints.
+
+The singleton ``legal_feed_settings`` row carries two counters:
+``config_version`` (bumped by admin changes to settings and sources) and
+``content_version`` (bumped by ingestion, the enrichment backlog and hides).
+Each process reads the row at most every ``REFRESH_SECONDS`` (at once after
+a bump of its own) and keys its cached values by the relevant version, so a
+change anywhere is picked up everywhere without explicit invalidation
+messages. The versions also make cheap ETags: a client revalidating an
+unchanged feed gets a 304 before any item is queried.
+
+Cached here: the ordering mode, the courts list (config) and the
+unpersonalised first page of /legal-feed per content type, court, ordering
+mode and page size (content).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from flask import current_app
+
+from app.models.models import db, LegalFeedSetting
+
+REFRESH_SECONDS = float(os.getenv('LEGAL_FEED_READ_CACHE_SECONDS', '5'))
+MAX_ENTRIES = 256
+CONFIG = 'config_version'
+CONTENT = 'content_version'
+
+
+class State(NamedTuple):
+    ordering_mode: str
+    config_version: int
+    content_version: int
+
+
+class ReadCache:
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._state = None
+        self._checked_at = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def state(self) -> State:
+        """The settings row as of at most REFRESH_SECONDS ago; never writes."""
+        now = self._clock()
+        if self._state is None or now - self._checked_at >= REFRESH_SECONDS:
+            row = (db.session.query(LegalFeedSetting.ordering_mode,
+                                    LegalFeedSetting.config_version,
+                                    LegalFeedSetting.content_version)
+                   .filter(LegalFeedSetting.id == 1).first())
+            self._state = State(row[0] or 'recency', row[1] or 0, row[2] or 0) if row \
+                else State('recency', 0, 0)
+            self._checked_at = now
+        return self._state
+
+    def invalidate(self):
+        self._state = None
+
+    def get(self, key, version, loader):
+        """Cached ``loader()`` for ``key`` while ``version`` is unchanged."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+        value = loader()
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        return value
+
+
+def get_cache() -> ReadCache:
+    """This app's cache (one per app, like the vector index)."""
+    ext = current_app.extensions
+    if 'legal_feed_read_cache' not in ext:
+        ext['legal_feed_read_cache'] = ReadCache()
+    return ext['legal_feed_read_cache']
+
+
+def state() -> State:
+    return get_cache().state()
+
+
+def bump(*kinds):
+    """Advance the given versions (CONFIG, CONTENT); the caller commits."""
+    column = {k: getattr(LegalFeedSetting, k) for k in kinds}
+    updated = (LegalFeedSetting.query.filter(LegalFeedSetting.id == 1)
+               .update({c: c + 1 for c in column.values()}, synchronize_session=False))
+    if not updated:
+        db.session.add(LegalFeedSetting(id=1, ordering_mode='recency', **{k: 1 for k in kinds}))
+    get_cache().invalidate()
+
+
+def etag(*parts) -> str:
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:24]
@@ -0,0 +1,371 @@
+"""Offline replay of the engagement log, for tuning the 'For you' ranking.
+
+A ``Snapshot`` is the feed's items (representatives with embeddings),
+users' explicit preferences and the ``legal_feed_events`` log. ``replay``
+walks the events in time order. Before each event it ranks the user's feed
+as it stood at that moment (``behavior.blend_interest``, then the
+candidates of the window scored by ``similarity.score_candidates`` and cut by
+``top_k``), scores the ranking against what the user did and times the
+query. It then learns from the event through ``behavior.apply_event``.
+Behaviour vectors start empty and are rebuilt from the log as they would
+have been live.
+
+Reported per run:
+
+- ``hit_rate_at_k``: share of clicks whose item was in the top k just before
+- ``rejected_in_top_k``: the same for "not interested" events (lower is
+  better: the feed was showing something the user was about to dismiss)
+- ``rejection_leakage``: share of top-k slots held by items the user had
+  already rejected, over queries made after a rejection
+- ``latency_ms``: p50/p95/max/mean of the per-query ranking time
+
+``sweep`` replays one snapshot under every combination of a parameter grid
+(``TUNABLE`` constants of ``similarity`` and ``behavior``), one process per
+combination up to ``workers``, so overrides never leak between runs.
+Latencies measured under a parallel sweep share the CPU; compare them
+within a sweep, not with production.
+
+Snapshots come from the database (``snapshot_from_db``), a JSON file
+(``save``/``load``) or ``synthetic``, which needs neither::
+
+    cd backend && python -m app.services.legal_feed.replay --synthetic \\
+        --sweep REJECT_PENALTY=0.01,0.05,0.2 --sweep EMA_ALPHA=0.1,0.2,0.4
+"""
+import json
+import multiprocessing
+import random
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import product
+from typing import NamedTuple
+
+import numpy as np
+
+from app.services.legal_feed import behavior as bx
+from app.services.legal_feed import similarity as sim
+from app.services.legal_feed.taxonomy import PRACTICE_AREAS
+from app.services.legal_feed.telemetry import percentile
+
+TUNABLE = {
+    'RECENCY_HALF_LIFE_DAYS': sim, 'REJECT_PENALTY': sim,
+    'EMA_ALPHA': bx, 'EMA_BETA': bx, 'NEGATIVE_MIN_EVENTS': bx, 'BEHAVIOR_DOMINATES_AT': bx,
+}
+
+
+class Snapshot(NamedTuple):
+    items: list         # [{id, embedding, when, importance, topics, court}]
+    preferences: dict   # {user_id: {interest_embedding, topics, courts}}
+    events: list        # [(created_at, user_id, item_id, kind)]
+
+
+def _check(names):
+    unknown = set(names) - set(TUNABLE)
+    if unknown:
+        raise ValueError(f'not tunable: {", ".join(sorted(unknown))}')
+
+
+@contextmanager
+def tuned(params):
+    """Override ``TUNABLE`` module constants for the duration of the block."""
+    _check(params)
+    saved = {name: getattr(TUNABLE[name], name) for name in params}
+    try:
+        for name, value in params.items():
+            setattr(TUNABLE[name], name, value)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(TUNABLE[name], name, value)
+
+
+class _User:
+    __slots__ = ('behavior', 'events', 'rejections', 'rejected')
+
+    def __init__(self):
+        self.behavior = None
+        self.events = 0
+        self.rejections = 0
+        self.rejected = set()
+
+
+def _candidates(items, whens, now, window, topics, courts) -> list:
+    """The window's items, narrowed to the user's topics/courts as query.py does."""
+    pool = items[bisect_left(whens, now - window):bisect_right(whens, now)]
+    if topics or courts:
+        matched = [it for it in pool
+                   if (topics & set(it['topics'] or ())) or it['court'] in courts]
+        if matched:
+            pool = matched
+    return pool
+
+
+def replay(snapshot, params=None, k=10, window_days=14) -> dict:
+    """Replay ``snapshot``'s events under ``params``; returns the metrics."""
+    items = sorted(snapshot.items, key=lambda it: (it['when'], it['id']))
+    whens = [it['when'] for it in items]
+    embeddings = {it['id']: it['embedding'] for it in items}
+    window = timedelta(days=window_days)
+    users = {}
+    latencies, clicks, hits, rejections, rejected_shown = [], 0, 0, 0, 0
+    leak_slots = leak_total = 0
+
+    with tuned(params or {}):
+        for created_at, user_id, item_id, kind in sorted(snapshot.events,
+                                                         key=lambda e: (e[0], e[1])):
+            pref = snapshot.preferences.get(user_id) or {}
+            user = users.setdefault(user_id, _User())
+
+            started = time.perf_counter()
+            interest = bx.blend_interest(pref.get('interest_embedding'), user.behavior,
+                                         user.events)
+            pool = _candidates(items, whens, created_at, window,
+                               set(pref.get('topics') or ()), set(pref.get('courts') or ()))
+            penalized = np.fromiter((it['id'] in user.rejected for it in pool),
+                                    dtype=bool, count=len(pool)) if user.rejected else None
+            scores = sim.score_candidates([it['embedding'] for it in pool], interest,
+                                          [it['when'] for it in pool],
+                                          [it['importance'] for it in pool], created_at,
+                                          penalized=penalized, penalty=sim.REJECT_PENALTY)
+            top = [pool[i]['id'] for i in sim.top_k(scores, k)]
+            latencies.append((time.perf_counter() - started) * 1000)
+
+            if kind == 'click':
+                clicks += 1
+                hits += item_id in top
+            elif kind == 'not_interested':
+                rejections += 1
+                rejected_shown += item_id in top
+            if user.rejected and top:
+                leak_slots += sum(1 for i in top if i in user.rejected)
+                leak_total += len(top)
+
+            if kind == 'not_interested':
+                user.rejections += 1
+                user.rejected.add(item_id)
+            user.behavior = bx.apply_event(user.behavior, embeddings.get(item_id), kind,
+                                           user.rejections)
+            user.events += 1
+
+    ordered = sorted(latencies)
+    return {
+        'params': dict(params or {}),
+        'k': k,
+        'queries': len(latencies),
+        'clicks': clicks,
+        'hit_rate_at_k': round(hits / clicks, 4) if clicks else None,
+        'rejections': rejections,
+        'rejected_in_top_k': round(rejected_shown / rejections, 4) if rejections else None,
+        'rejection_leakage': round(leak_slots / leak_total, 4) if leak_total else None,
+        'latency_ms': {
+            'p50': round(percentile(ordered, 0.5), 3) if ordered else None,
+            'p95': round(percentile(ordered, 0.95), 3) if ordered else None,
+            'max': round(ordered[-1], 3) if ordered else None,
+            'mean': round(sum(ordered) / len(ordered), 3) if ordered else None,
+        },
+    }
+
+
+def grid_points(grid) -> list:
+    """Every combination of ``{name: [values]}`` as a list of param dicts."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*(grid[n] for n in names))]
+
+
+_worker_snapshot = None
+
+
+def _init_worker(snapshot):
+    global _worker_snapshot
+    _worker_snapshot = snapshot
+
+
+def _replay_point(params, k, window_days):
+    return replay(_worker_snapshot, params, k, window_days)
+
+
+def sweep(snapshot, grid, k=10, window_days=14, workers=None) -> list:
+    """``replay`` for each point of ``grid``, in parallel processes (in this
+    process when ``workers`` is 1). Results are in grid order."""
+    _check(grid)
+    points = grid_points(grid)
+    if workers == 1 or len(points) <= 1:
+        return [replay(snapshot, p, k, window_days) for p in points]
+    # spawn: workers import the ranker fresh rather than inherit this
+    # process's threads, connections and any overrides in force.
+    with ProcessPoolExecutor(max_workers=min(workers or len(points), len(points)),
+                             mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(snapshot,)) as pool:
+        futures = [pool.submit(_replay_point, p, k, window_days) for p in points]
+        return [f.result() for f in futures]
+
+
+# ---------------------------------------------------------------------------
+# Snapshots
+# ---------------------------------------------------------------------------
+
+def snapshot_from_db(content_type='news') -> Snapshot:
+    """Visible representatives with embeddings, every preference row and the
+    whole event log. Needs an app context; everything after it does not."""
+    from app.models.models import db, LegalFeedItem, LegalFeedPreference, LegalFeedEvent
+
+    rows = (db.session.query(LegalFeedItem.id, LegalFeedItem.embedding,
+                             LegalFeedItem.published_at, LegalFeedItem.ingested_at,
+                             LegalFeedItem.importance, LegalFeedItem.topics,
+                             LegalFeedItem.court)
+            .filter(LegalFeedItem.hidden.is_(False), LegalFeedItem.duplicate_of.is_(None),
+                    LegalFeedItem.content_type == content_type,
+                    LegalFeedItem.embedding.isnot(None))
+            .order_by(LegalFeedItem.id).all())
+    items = [{'id': r.id, 'embedding': [float(x) for x in r.embedding],
+              'when': r.published_at or r.ingested_at, 'importance': r.importance,
+              'topics': r.topics or [], 'court': r.court}
+             for r in rows if r.embedding is not None and (r.published_at or r.ingested_at)]
+    preferences = {
+        p.user_id: {'interest_embedding': ([float(x) for x in p.interest_embedding]
+                                           if p.interest_embedding is not None else None),
+                    'topics': sorted((p.topic_weights or {}).keys()),
+                    'courts': list(p.courts or [])}
+        for p in LegalFeedPreference.query.all()}
+    events = [(e.created_at, e.user_id, e.item_id, e.kind)
+              for e in (db.session.query(LegalFeedEvent.created_at, LegalFeedEvent.user_id,
+                                         LegalFeedEvent.item_id, LegalFeedEvent.kind)
+                        .filter(LegalFeedEvent.item_id.isnot(None),
+                                LegalFeedEvent.created_at.isnot(None))
+                        .order_by(LegalFeedEvent.created_at, LegalFeedEvent.id))]
+    return Snapshot(items, preferences, events)
+
+
+def _stamp(when):
+    return when.isoformat() if when else None
+
+
+def _unstamp(raw):
+    return datetime.fromisoformat(raw) if raw else None
+
+
+def save(snapshot, path):
+    with open(path, 'w') as fh:
+        json.dump({'items': [{**it, 'when': _stamp(it['when'])} for it in snapshot.items],
+                   'preferences': {str(uid): p for uid, p in snapshot.preferences.items()},
+                   'events': [[_stamp(at), uid, item_id, kind]
+                              for at, uid, item_id, kind in snapshot.events]}, fh)
+
+
+def load(path) -> Snapshot:
+    with open(path) as fh:
+        raw = json.load(fh)
+    return Snapshot([{**it, 'when': _unstamp(it['when'])} for it in raw['items']],
+                    {int(uid): p for uid, p in raw['preferences'].items()},
+                    [(_unstamp(at), uid, item_id, kind)
+                     for at, uid, item_id, kind in raw['events']])
+
+
+def _unit(vec) -> list:
+    return [round(float(x), 6) for x in vec / np.linalg.norm(vec)]
+
+
+def synthetic(users=50, items=1000, events=5000, dims=32, days=60, topics=8,
+              reject_share=0.2, seed=0, start=datetime(2026, 1, 1)) -> Snapshot:
+    """A reproducible snapshot with learnable structure.
+
+    Each of ``topics`` random directions has two angles (say, two lines of
+    tax cases) and items scatter around one angle. Each user follows one
+    angle of one or two topics: they click recent items on it and dismiss
+    recent items on the other angle of the same topic (``reject_share`` of
+    events), which is what ranks close enough to need dismissing. About half
+    the users have an explicit interest vector near the topic (as phrases
+    would give) and a quarter pick the topic in their preferences."""
+    rng = np.random.default_rng(seed)
+    pick = random.Random(seed)
+    centres = rng.normal(size=(topics, 1, dims))
+    angles = centres + 0.8 * rng.normal(size=(topics, 2, dims))
+    angles /= np.linalg.norm(angles, axis=2, keepdims=True)
+    names = [PRACTICE_AREAS[t % len(PRACTICE_AREAS)] for t in range(topics)]
+
+    feed = []
+    for item_id in range(1, items + 1):
+        topic, angle = int(rng.integers(topics)), int(rng.integers(2))
+        vec = angles[topic, angle] + rng.normal(scale=0.5 / np.sqrt(dims), size=dims)
+        feed.append({'id': item_id, 'embedding': _unit(vec),
+                     'when': start + timedelta(seconds=float(rng.uniform(0, days * 86400))),
+                     'importance': int(rng.integers(0, 101)),
+                     'topics': [names[topic]], 'court': None, '_on': (topic, angle)})
+    feed.sort(key=lambda it: it['when'])
+    whens = [it['when'] for it in feed]
+
+    prefs, follows = {}, {}
+    for user_id in range(1, users + 1):
+        chosen = rng.choice(topics, size=pick.choice((1, 2)), replace=False)
+        follows[user_id] = {(int(t), pick.randint(0, 1)) for t in chosen}
+        anchor = int(chosen[0])
+        pref = {'interest_embedding': None, 'topics': [], 'courts': []}
+        if pick.random() < 0.5:
+            pref['interest_embedding'] = _unit(centres[anchor, 0]
+                                               + rng.normal(scale=0.5, size=dims))
+        if pick.random() < 0.25:
+            pref['topics'] = [names[anchor]]
+        prefs[user_id] = pref
+
+    log = []
+    first = start + timedelta(days=3)
+    span = (days - 3) * 86400
+    while len(log) < events:
+        user_id = pick.randint(1, users)
+        at = first + timedelta(seconds=pick.uniform(0, span))
+        recent = feed[bisect_left(whens, at - timedelta(days=3)):bisect_right(whens, at)]
+        reject = pick.random() < reject_share
+        wanted = follows[user_id] if not reject else \
+            {(topic, 1 - angle) for topic, angle in follows[user_id]}
+        pool = [it for it in recent if it['_on'] in wanted]
+        if pool:
+            log.append((at, user_id, pick.choice(pool)['id'],
+                        'not_interested' if reject else 'click'))
+    for it in feed:
+        del it['_on']
+    return Snapshot(feed, prefs, sorted(log, key=lambda e: (e[0], e[1])))
+
+
+def _parse_sweep(specs) -> dict:
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        cast = int if name in ('NEGATIVE_MIN_EVENTS', 'BEHAVIOR_DOMINATES_AT') else float
+        grid[name] = [cast(v) for v in values.split(',') if v]
+    return grid
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--synthetic', action='store_true', help='generate a dataset')
+    source.add_argument('--load', metavar='PATH', help='a snapshot saved with --save')
+    source.add_argument('--from-db', action='store_true', help='snapshot DATABASE_URL')
+    parser.add_argument('--save', metavar='PATH', help='write the snapshot for later replays')
+    parser.add_argument('--sweep', action='append', default=[], metavar='NAME=V1,V2',
+                        help=f'grid axis; one of {", ".join(TUNABLE)}')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--window-days', type=int, default=14)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.from_db:
+        from app.main import create_app
+        with create_app().app_context():
+            snap = snapshot_from_db()
+    elif args.load:
+        snap = load(args.load)
+    else:
+        snap = synthetic(users=args.users, items=args.items, events=args.events, seed=args.seed)
+    if args.save:
+        save(snap, args.save)
+    print(json.dumps(sweep(snap, _parse_sweep(args.sweep), args.k, args.window_days,
+                           args.workers), indent=2))
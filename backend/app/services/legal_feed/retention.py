@@ -0,0 +1,140 @@
+"""Retention for ``legal_feed_items``: prune embeddings, archive old items.
+
+Ranking only reads embeddings inside the vector index window, so
+``prune_embeddings`` clears them (and MinHash signatures and LSH bands past
+the clustering window) on older items. Items someone engaged with keep their
+embedding: ``recompute_behavior_embedding`` rebuilds vectors from them.
+
+``archive_items`` moves items older than ``ARCHIVE_DAYS`` into
+``legal_feed_items_archive`` in batches (one commit per batch), so the hot
+table, its indexes and the feed's COUNT stay the size of the horizon rather
+than of all history. Items referenced by engagement events stay put (the log
+keeps its foreign key). Ingestion dedups against the archive's ``dedup_key``
+too, so an archived entry its source still serves is not ingested again. On
+Postgres the archive is partitioned by month and the month partitions are
+created here on demand.
+
+``run_retention`` also expires idle ``legal_feed_cache`` entries (see
+``cache.expire``).
+
+The hot table is not itself partitioned: events, LSH bands and cluster links
+hold foreign keys to ``legal_feed_items.id``, and a partitioned table can
+only be referenced through a key that includes the partition column.
+"""
+import os
+from datetime import datetime, timedelta, date
+
+from sqlalchemy import func, text
+
+from app.models.models import (
+    db, LegalFeedItem, LegalFeedItemArchive, LegalFeedEvent, LegalFeedLshBand,
+)
+from app.services.legal_feed import cache, clusters, for_you, read_cache
+from app.services.legal_feed import index as vector_index
+
+# Never below the index window: ranking must keep every embedding it can read.
+EMBED_RETENTION_DAYS = max(vector_index.INDEX_WINDOW_DAYS,
+                           int(os.getenv('LEGAL_FEED_EMBED_RETENTION_DAYS', '30')))
+ARCHIVE_DAYS = max(EMBED_RETENTION_DAYS, int(os.getenv('LEGAL_FEED_ARCHIVE_DAYS', '365')))
+BATCH = 1000
+
+ARCHIVED_COLUMNS = (
+    'id', 'source_id', 'content_type', 'title', 'summary', 'source_url', 'source_name',
+    'court', 'published_at', 'ingested_at', 'hidden', 'dedup_key', 'headline', 'tldr',
+    'topics', 'importance', 'image_url', 'enriched_at', 'duplicate_of',
+)
+
+
+def _when():
+    return func.coalesce(LegalFeedItem.published_at, LegalFeedItem.ingested_at)
+
+
+def _engaged():
+    return db.session.query(LegalFeedEvent.item_id).filter(LegalFeedEvent.item_id.isnot(None))
+
+
+def prune_embeddings(now=None) -> dict:
+    """Drop embeddings past EMBED_RETENTION_DAYS and clustering data past the
+    clustering window; the caller commits."""
+    now = now or datetime.utcnow()
+    embeddings = (LegalFeedItem.query
+                  .filter(_when() < now - timedelta(days=EMBED_RETENTION_DAYS),
+                          LegalFeedItem.embedding.isnot(None),
+                          LegalFeedItem.id.notin_(_engaged()))
+                  .update({'embedding': None}, synchronize_session=False))
+    old = db.session.query(LegalFeedItem.id).filter(
+        LegalFeedItem.ingested_at < now - clusters.WINDOW)
+    bands = (LegalFeedLshBand.query.filter(LegalFeedLshBand.item_id.in_(old))
+             .delete(synchronize_session=False))
+    signatures = (LegalFeedItem.query
+                  .filter(LegalFeedItem.ingested_at < now - clusters.WINDOW,
+                          LegalFeedItem.minhash.isnot(None))
+                  .update({'minhash': None}, synchronize_session=False))
+    return {'embeddings_pruned': embeddings, 'lsh_bands_deleted': bands,
+            'signatures_pruned': signatures}
+
+
+def month_of(when) -> date:
+    return date(when.year, when.month, 1)
+
+
+def ensure_partitions(months):
+    """Create the archive's month partitions on Postgres (no-op elsewhere)."""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for start in sorted(set(months)):
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        db.session.execute(text(
+            f'CREATE TABLE IF NOT EXISTS legal_feed_items_archive_{start:%Y_%m} '
+            f'PARTITION OF legal_feed_items_archive '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"))
+
+
+def archive_items(now=None, batch=BATCH) -> int:
+    """Move items older than ARCHIVE_DAYS to the archive; returns how many."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=ARCHIVE_DAYS)
+    table = LegalFeedItem.__table__
+    moved = 0
+    while True:
+        rows = (db.session.query(*(table.c[name] for name in ARCHIVED_COLUMNS))
+                .filter(_when() < cutoff, LegalFeedItem.id.notin_(_engaged()))
+                .order_by(LegalFeedItem.id).limit(batch).all())
+        if not rows:
+            break
+        ids = [r.id for r in rows]
+        archived = []
+        for r in rows:
+            row = dict(r._mapping)
+            row['bucket_month'] = month_of(r.published_at or r.ingested_at)
+            row['archived_at'] = now
+            archived.append(row)
+        ensure_partitions(row['bucket_month'] for row in archived)
+        db.session.execute(LegalFeedItemArchive.__table__.insert(), archived)
+        # Members of a cluster whose representative leaves stand on their own.
+        (LegalFeedItem.query.filter(LegalFeedItem.duplicate_of.in_(ids))
+         .update({'duplicate_of': None}, synchronize_session=False))
+        (LegalFeedLshBand.query.filter(LegalFeedLshBand.item_id.in_(ids))
+         .delete(synchronize_session=False))
+        LegalFeedItem.query.filter(LegalFeedItem.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        moved += len(ids)
+        if len(ids) < batch:
+            break
+    return moved
+
+
+def run_retention(now=None) -> dict:
+    """Prune, expire the LLM cache, then archive. Feeds and caches are
+    refreshed if anything moved."""
+    now = now or datetime.utcnow()
+    result = prune_embeddings(now)
+    result['cache_expired'] = cache.expire(now)
+    db.session.commit()
+    result['archived'] = archive_items(now)
+    if result['archived']:
+        for_you.invalidate_all()
+        read_cache.bump(read_cache.CONTENT)
+        db.session.commit()
+        vector_index.mark_stale()
+    return result
@@ -0,0 +1,301 @@
+"""Streaming parser for well-formed RSS 2.0 and Atom 1.0 feeds.
+
+feedparser copes with every dialect and every kind of broken feed, and every
+feed pays for that: encoding sniffing, a SAX state machine that handles
+dozens of namespaces, and a dict per element. Our sources are almost all
+plain, well-formed RSS 2.0. This reads them with an incremental
+``XMLPullParser`` and keeps only the entry fields ``rss.parse_feed`` reads:
+title, summary, link, published/updated date and the image candidates
+(``media:content``, enclosures, ``media:thumbnail``). Each entry is cleared
+as soon as it is read, so memory stays flat however long the feed.
+
+Entries come back in the shape feedparser gives them (``title``,
+``summary``, ``link``, ``published_parsed``, ``media_content`` ...), so
+``parse_feed`` treats both paths the same. Field values go through the
+same post-processing feedparser applies (whitespace, relative URIs, the HTML
+sanitizer, the cp1252 and double-encoding fixups, its date parser), which
+keeps results identical. Anything this does not model -- malformed XML, a
+DOCTYPE, another encoding, RSS 1.0/Atom 0.3, xml:base, XHTML or base64
+content, the less common aliases of the fields above -- raises
+``Unsupported`` and the caller falls back to feedparser.
+"""
+import re
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+
+from feedparser.datetimes import _parse_date
+from feedparser.mixin import _FeedParserMixin, _cp1252
+from feedparser.sanitizer import _sanitize_html
+from feedparser.urls import _urljoin, resolve_relative_uris
+
+CHUNK = 64 * 1024
+ENCODING = 'utf-8'
+
+ATOM = 'http://www.w3.org/2005/Atom'
+XML_NS = 'http://www.w3.org/XML/1998/namespace'
+XML_BASE = f'{{{XML_NS}}}base'
+_NAMESPACES = {uri.lower(): prefix for uri, prefix in _FeedParserMixin.namespaces.items()}
+_PREFIXES = set(_NAMESPACES.values())
+_HTML_TYPES = _FeedParserMixin.html_types
+_MARKUP = _FeedParserMixin.can_contain_dangerous_markup
+_looks_like_html = _FeedParserMixin.looks_like_html
+_map_content_type = _FeedParserMixin.map_content_type
+
+_START_TAG = re.compile(r'<[A-Za-z_]')
+_DECLARED = re.compile(r'<\?xml[^>]*?encoding\s*=\s*["\']([^"\']+)', re.I)
+_REFERENCE = re.compile('&([A-Za-z0-9_]+);')
+# The sanitizer returns text without these characters unchanged.
+_MARKUP_CHARS = re.compile('[<&\r]')
+
+SUMMARIES = {'description': 'text/html', 'summary': 'text/plain'}
+CONTENTS = {'content': 'text/plain', 'content:encoded': 'text/html'}
+PUBLISHED = {'pubdate', 'published'}
+UPDATED = {'updated', 'dc:date'}
+IMAGES = {'media:content', 'media:thumbnail', 'enclosure'}
+NESTABLE = IMAGES | {'media:group'}
+HANDLED = {'title', 'link', 'guid', 'id', 'source'} | set(SUMMARIES) | set(CONTENTS) \
+    | PUBLISHED | UPDATED | NESTABLE
+# feedparser maps these onto the fields above (or changes how it reads them).
+UNMODELLED = {
+    'item', 'entry', 'image', 'textinput', 'abstract', 'fullitem', 'body', 'xhtml:body',
+    'issued', 'modified', 'lastbuilddate', 'created', 'dc:title', 'dc:description',
+    'dcterms:title', 'dcterms:issued', 'dcterms:modified', 'dcterms:created',
+    'media:title', 'media:description', 'itunes:summary',
+}
+
+
+class Unsupported(Exception):
+    """The document needs feedparser."""
+
+
+@lru_cache(maxsize=512)
+def _name(tag):
+    """feedparser's element name for an ElementTree tag ('media:content')."""
+    if tag[0] != '{':
+        return tag.lower()
+    uri, local = tag[1:].split('}', 1)
+    uri = uri.lower()
+    if 'backend.userland.com/rss' in uri:
+        return local.lower()
+    prefix = _NAMESPACES.get(uri)
+    if prefix is None:
+        return None  # an extension feedparser does not know either
+    return f'{prefix}:{local}'.lower() if prefix else local.lower()
+
+
+def _attrs(elem) -> dict:
+    out = {}
+    for key, value in elem.attrib.items():
+        if key[0] == '{':
+            uri, local = key[1:].split('}', 1)
+            prefix = _NAMESPACES.get(uri.lower(), '')
+            key = f'{prefix}:{local}' if prefix else local
+        out[key.lower()] = value
+    return out
+
+
+def _text(elem) -> str:
+    if len(elem):
+        raise Unsupported('markup inside a text element')
+    return elem.text or ''
+
+
+def _fixups(output):
+    # feedparser's repair of UTF-8 read as Latin-1, then the cp1252 range.
+    try:
+        output = output.encode('iso-8859-1').decode('utf-8')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        pass
+    return output.translate(_cp1252)
+
+
+def _finish(raw, element, content_type=None, atom=False, relative=False):
+    """A field value as feedparser's ``pop`` would store it."""
+    output = raw.strip()
+    if relative and output:
+        output = _urljoin('', output)
+    if content_type == 'text/plain' and not atom and _looks_like_html(output):
+        content_type = 'text/html'
+    if content_type in _HTML_TYPES and element in _MARKUP and _MARKUP_CHARS.search(output):
+        output = resolve_relative_uris(output, '', ENCODING, content_type)
+        output = _sanitize_html(output, ENCODING, content_type)
+    return _fixups(output)
+
+
+def _content_type(attrs, default):
+    if 'mode' in attrs:
+        raise Unsupported('content mode')
+    content_type = _map_content_type(attrs.get('type', default))
+    if content_type not in ('text/plain', 'text/html'):
+        raise Unsupported(f'{content_type} content')
+    return content_type
+
+
+def _enforce_href(attrs):
+    href = attrs.get('url', attrs.get('uri', attrs.get('href')))
+    if href:
+        attrs.pop('url', None)
+        attrs.pop('uri', None)
+        attrs['href'] = href
+    return attrs
+
+
+class _Reader:
+    def __init__(self, atom):
+        self.atom = atom
+        self.has_content = False   # feedparser's flag; reset after each entry
+
+    def entry(self, elem) -> dict:
+        attrs = _attrs(elem)
+        if 'lastmod' in attrs or 'href' in attrs:
+            raise Unsupported('CDF item attributes')
+        out = {}
+        title_locked = False
+        links = []
+        for child in elem:
+            self._nested(child)
+            name = _name(child.tag)
+            if name is None:
+                continue
+            attrs = _attrs(child)
+            if name == 'title':
+                value = _finish(_text(child), 'title', _content_type(attrs, 'text/plain'), self.atom)
+                if not title_locked:
+                    out['title'] = value
+                    title_locked = bool(value)
+            elif name == 'source':
+                if len(child):
+                    raise Unsupported('atom:source')
+                title_locked = False
+            elif name in SUMMARIES:
+                if 'summary' in out and not self.has_content:
+                    # feedparser reads a second summary as content.
+                    self._content(child, attrs, 'text/plain', out)
+                else:
+                    out['summary'] = _finish(_text(child), name,
+                                             _content_type(attrs, SUMMARIES[name]), self.atom)
+            elif name in CONTENTS:
+                self._content(child, attrs, CONTENTS[name], out)
+            elif name == 'link':
+                self._link(child, attrs, out, links)
+            elif name in ('guid', 'id'):
+                # A permalink guid (or Atom id) is the link when there is none.
+                if attrs.get('ispermalink', 'true') == 'true':
+                    out.setdefault('link', _finish(_text(child), 'id', relative=True))
+            elif name in PUBLISHED:
+                out['published_parsed'] = _parse_date(_finish(_text(child), name))
+            elif name in UPDATED:
+                out['updated_parsed'] = _parse_date(_finish(_text(child), name))
+            elif name in UNMODELLED:
+                raise Unsupported(name)
+        self._images(elem, out, links)
+        if links:
+            out['links'] = links
+        self.has_content = False
+        return out
+
+    def _nested(self, parent):
+        for elem in parent.iter():
+            if elem is parent:
+                continue
+            name = _name(elem.tag)
+            if name in HANDLED - NESTABLE or name in UNMODELLED:
+                raise Unsupported(f'nested {name}')
+
+    def _content(self, elem, attrs, default, out):
+        self.has_content = True
+        value = _finish(_text(elem), 'content', _content_type(attrs, default), self.atom)
+        out.setdefault('summary', value)
+
+    def _link(self, elem, attrs, out, links):
+        attrs.setdefault('rel', 'alternate')
+        attrs.setdefault('type', 'application/atom+xml' if attrs['rel'] == 'self' else 'text/html')
+        attrs = _enforce_href(attrs)
+        links.append(attrs)
+        if 'href' in attrs:
+            attrs['href'] = _urljoin('', attrs['href'])
+            if attrs['rel'] == 'alternate' and _map_content_type(attrs['type']) in _HTML_TYPES:
+                out['link'] = attrs['href']
+            return
+        value = _finish(_text(elem), 'link', relative=True)
+        value = _REFERENCE.sub(r'&\g<1>', value.replace('&amp;', '&'))
+        out['link'] = value
+        if value:
+            attrs['href'] = value
+
+    def _images(self, elem, out, links):
+        for child in elem.iter():
+            name = _name(child.tag) if child is not elem else None
+            if name == 'media:content':
+                out.setdefault('media_content', []).append(_attrs(child))
+            elif name == 'enclosure':
+                attrs = _enforce_href(_attrs(child))
+                attrs['rel'] = 'enclosure'
+                links.append(attrs)
+            elif name == 'media:thumbnail':
+                attrs = _attrs(child)
+                text = _finish(child.text or '', 'url', relative=True)
+                if text and 'url' not in attrs:
+                    attrs['url'] = text
+                out.setdefault('media_thumbnail', []).append(attrs)
+        out['enclosures'] = [{k: v for k, v in link.items() if k != 'rel'}
+                             for link in links if link.get('rel') == 'enclosure']
+
+
+def _check_prolog(raw):
+    start = _START_TAG.search(raw)
+    if start is None:
+        raise Unsupported('no root element')
+    prolog = raw[:start.start()]
+    if '<!DOCTYPE' in prolog.upper():
+        raise Unsupported('DOCTYPE')
+    declared = _DECLARED.search(prolog)
+    if declared and declared.group(1).lower().replace('_', '-') not in ('utf-8', 'utf8'):
+        raise Unsupported(f'{declared.group(1)} encoding')
+
+
+def parse_entries(raw: str) -> list:
+    """feedparser-shaped entries of a well-formed RSS 2.0 or Atom 1.0 feed.
+
+    Raises ``Unsupported`` for anything else (see the module docstring)."""
+    _check_prolog(raw)
+    parser = ET.XMLPullParser(events=('start', 'end', 'start-ns'))
+    reader, depth, entries = None, 0, []
+    try:
+        for i in range(0, len(raw), CHUNK):
+            parser.feed(raw[i:i + CHUNK])
+            for event, payload in parser.read_events():
+                if event == 'start-ns':
+                    prefix, uri = payload
+                    uri = uri.lower()
+                    if uri not in _NAMESPACES and 'backend.userland.com/rss' not in uri \
+                            and (not prefix or prefix.lower() in _PREFIXES):
+                        raise Unsupported(f'namespace {uri}')
+                    continue
+                name = _name(payload.tag)
+                if event == 'start':
+                    if XML_BASE in payload.attrib:
+                        raise Unsupported('xml:base')
+                    if reader is None:
+                        if payload.tag == 'rss':
+                            reader = _Reader(atom=False)
+                        elif payload.tag == f'{{{ATOM}}}feed':
+                            reader = _Reader(atom=True)
+                        else:
+                            raise Unsupported(f'root {payload.tag}')
+                    if name in ('item', 'entry'):
+                        depth += 1
+                        if depth > 1:
+                            raise Unsupported('nested entries')
+                    elif name in CONTENTS and not depth:
+                        reader.has_content = True
+                elif name in ('item', 'entry'):
+                    depth -= 1
+                    entries.append(reader.entry(payload))
+                    payload.clear()
+        parser.close()
+    except ET.ParseError as exc:
+        raise Unsupported(f'not well-formed: {exc}') from exc
+    if reader is None:
+        raise Unsupported('no root element')
+    return entries
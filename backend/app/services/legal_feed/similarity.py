@@ -1,8 +1,16 @@
-"""Pure-Python ranking for the 'For you' feed. Brute-force cosine over a
-taxonomy/recency-filtered candidate set; swap in pgvector here if it grows."""
+"""Ranking for the 'For you' feed: cosine to the user's interest vector,
+weighted by importance and recency, with rejected items penalised.
+
+``rank_candidates`` is the production path: candidate embeddings are stacked
+into one float32 matrix, normalised once, scored with a single mat-vec and
+cut to the top k with ``argpartition``. ``rank_by_similarity`` is the
+per-item pure-Python reference it must agree with (ties keep input order).
+"""
 import math
 from datetime import datetime
 
+import numpy as np
+
 RECENCY_HALF_LIFE_DAYS = 14
 REJECT_PENALTY = 0.05
 
@@ -44,3 +52,98 @@ def rank_by_similarity(items, interest_embedding, now=None,
         return s
 
     return sorted(items, key=_key, reverse=True)
+
+
+def recency_decay(whens, now) -> np.ndarray:
+    """Vectorised _recency_decay over published_at-or-ingested_at values."""
+    stamps = np.array(whens, dtype='datetime64[us]')
+    ages = (np.datetime64(now, 'us') - stamps) / np.timedelta64(1, 's') / 86400.0
+    decay = 0.5 ** (np.maximum(0.0, ages) / RECENCY_HALF_LIFE_DAYS)
+    return np.where(np.isnat(stamps), 0.5, decay)
+
+
+def embedding_matrix(embeddings, dims) -> tuple:
+    """Stack ``dims``-long vectors into an (n, dims) float32 matrix.
+
+    Returns (matrix, mismatched): rows without an embedding stay zero, and
+    indices of rows whose vector has a different length (an older embedding
+    model) are returned so they can be scored the slow way."""
+    matrix = np.zeros((len(embeddings), dims), dtype=np.float32)
+    mismatched = []
+    for i, vec in enumerate(embeddings):
+        if vec is None or len(vec) == 0:
+            continue
+        if len(vec) == dims:
+            matrix[i] = vec
+        else:
+            mismatched.append(i)
+    return matrix, mismatched
+
+
+def similarity_scores(embeddings, interest_embedding) -> np.ndarray:
+    """cosine(embedding, interest) per candidate; 1.0 for all without interest."""
+    n = len(embeddings)
+    if not interest_embedding:
+        return np.ones(n)
+    query = np.asarray(interest_embedding, dtype=np.float32)
+    query_norm = np.linalg.norm(query)
+    if n == 0 or query_norm == 0:
+        return np.zeros(n)
+    matrix, mismatched = embedding_matrix(embeddings, len(query))
+    sims = (normalize_rows(matrix) @ (query / query_norm)).astype(np.float64)
+    for i in mismatched:
+        sims[i] = cosine(embeddings[i], interest_embedding)
+    return sims
+
+
+def normalize_rows(matrix) -> np.ndarray:
+    """Scale each row to unit length in place; zero rows stay zero."""
+    norms = np.linalg.norm(matrix, axis=1)
+    np.divide(matrix, norms[:, None], out=matrix, where=norms[:, None] > 0)
+    return matrix
+
+
+def combine_scores(sims, importance, whens, now, penalized=None,
+                   penalty=REJECT_PENALTY) -> np.ndarray:
+    """score_item from similarity, importance (0-100 floats) and recency arrays."""
+    scores = sims * (0.5 + 0.5 * (np.asarray(importance, dtype=np.float64) / 100.0))
+    scores = scores * recency_decay(whens, now)
+    if penalized is not None:
+        scores = np.where(penalized, scores * penalty, scores)
+    return scores
+
+
+def score_candidates(embeddings, interest_embedding, whens, importance, now,
+                     penalized=None, penalty=REJECT_PENALTY) -> np.ndarray:
+    """Vectorised score_item (times ``penalty`` where ``penalized`` is set)."""
+    imp = np.array([v or 0 for v in importance], dtype=np.float64)
+    return combine_scores(similarity_scores(embeddings, interest_embedding), imp,
+                          whens, now, penalized, penalty)
+
+
+def top_k(scores, k) -> np.ndarray:
+    """Indices of the ``k`` best scores, best first; ties keep input order
+    (the same order a stable descending sort gives)."""
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.array([], dtype=np.intp)
+    neg = -np.asarray(scores)
+    if k < n:
+        kth = neg[np.argpartition(neg, k - 1)[k - 1]]
+        pool = np.flatnonzero(neg <= kth)  # every tie at the cut, in input order
+    else:
+        pool = np.arange(n)
+    return pool[np.argsort(neg[pool], kind='stable')][:k]
+
+
+def rank_candidates(ids, embeddings, whens, importance, interest_embedding, now=None,
+                    penalized_ids=None, k=None) -> list:
+    """Top ``k`` candidate ids (all when None), best first. Columns are parallel
+    sequences; ``whens`` is published_at or, failing that, ingested_at."""
+    now = now or datetime.utcnow()
+    pen = penalized_ids or set()
+    penalized = np.fromiter((i in pen for i in ids), dtype=bool, count=len(ids)) if pen else None
+    scores = score_candidates(embeddings, interest_embedding, whens, importance, now,
+                              penalized=penalized)
+    order = top_k(scores, len(ids) if k is None else k)
+    return [ids[i] for i in order]
@@ -0,0 +1,95 @@
+"""Per-stage timings for one ingestion run (``LegalFeedRun.telemetry``).
+
+Stages, each a list of millisecond samples plus optional counters:
+
+- ``fetch``: one sample per source fetched (HTTP latency); counter ``bytes``
+- ``parse``: one sample per feed body parsed
+- ``write``: one sample per source written (dedup check, insert, clustering)
+- ``images``: one sample per thumbnail made (download, resize, upload);
+  counter ``bytes`` (originals downloaded)
+- ``enrich``: one sample per enrichment chunk
+- ``complete`` / ``embed``: one sample per enrichment API request, timed
+  by ``TimedClient``; their counts are the run's API calls
+
+The raw samples ride in the run's resume state so percentiles cover every
+attempt; ``summary()`` is what the run exposes.
+"""
+import threading
+import time
+
+from app.services.legal_feed.enrichment import _chat_model, _embed_model
+
+STAGES = ('fetch', 'parse', 'write', 'images', 'enrich', 'complete', 'embed')
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))]
+
+
+class RunTelemetry:
+    def __init__(self, raw=None):
+        raw = raw or {}
+        self.samples = {k: list(v) for k, v in (raw.get('samples') or {}).items()}
+        self.counters = {k: dict(v) for k, v in (raw.get('counters') or {}).items()}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, **counters):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(round(seconds * 1000, 1))
+            totals = self.counters.setdefault(stage, {})
+            for name, value in counters.items():
+                totals[name] = totals.get(name, 0) + value
+
+    def raw(self) -> dict:
+        with self._lock:
+            return {'samples': {k: list(v) for k, v in self.samples.items()},
+                    'counters': {k: dict(v) for k, v in self.counters.items()}}
+
+    def summary(self) -> dict:
+        out = {}
+        with self._lock:
+            for stage in STAGES:
+                ordered = sorted(self.samples.get(stage, ()))
+                if not ordered:
+                    continue
+                out[stage] = {'count': len(ordered), 'total_ms': round(sum(ordered), 1),
+                              'p50_ms': percentile(ordered, 0.5),
+                              'p95_ms': percentile(ordered, 0.95),
+                              'max_ms': ordered[-1], **self.counters.get(stage, {})}
+        out['api_calls'] = {kind: out.get(kind, {}).get('count', 0)
+                            for kind in ('complete', 'embed')}
+        return out
+
+
+class TimedClient:
+    """An enrichment client that records each API request's latency.
+
+    Model names are copied from the wrapped client so cache keys (which are
+    tagged by model) do not change."""
+
+    def __init__(self, client, telemetry):
+        self._client = client
+        self._telemetry = telemetry
+        self.chat_model = _chat_model(client)
+        self.embed_model = _embed_model(client)
+
+    def _timed(self, stage, call, *args):
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            self._telemetry.record(stage, time.perf_counter() - started)
+
+    def complete(self, system, user):
+        return self._timed('complete', self._client.complete, system, user)
+
+    def embed(self, text):
+        return self._timed('embed', self._client.embed, text)
+
+    def embed_many(self, texts):
+        if hasattr(self._client, 'embed_many'):
+            return self._timed('embed', self._client.embed_many, texts)
+        return [self.embed(t) for t in texts]
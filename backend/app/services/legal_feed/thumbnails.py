@@ -0,0 +1,324 @@
+"""Card-sized thumbnails of feed images, served from our own endpoint.
+
+Feed cards used to hotlink ``LegalFeedItem.image_url`` from publishers'
+CDNs: often multi-megabyte originals, and every reader's IP handed to the
+publisher. Now each image is fetched once, cropped to ``SIZE`` and stored as
+WebP and JPEG in the ``BUCKET`` storage bucket under the sha256 of its URL,
+so an image shared by syndicated items is only fetched once.
+``legal_feed_thumbnails`` records which URLs are done, or failed (retried
+after ``RETRY_AFTER``).
+
+Ingestion calls ``prefetch`` for the images of each run's new items, so the
+first reader never waits: pool threads download, resize and upload, and rows
+are written on the calling thread. ``GET /legal-feed/items/<id>/image``
+(``serve``) answers with the stored bytes and a year-long immutable
+Cache-Control. It is unauthenticated, so it never fetches on the request: an
+image ingestion has not reached gets a 404 and a background prefetch
+(``dispatch_prefetch``), and the next load finds it. JPEG originals are
+decoded in Pillow's draft mode, at the smallest DCT scale that still covers
+``SIZE``.
+
+Image URLs come from third-party feeds, so ``fetch_image`` only talks to
+public addresses: every hop's host is resolved and rejected if any address is
+private, loopback, link-local or otherwise not globally routable, and
+redirects are followed by hand (at most ``MAX_REDIRECTS``) so each one is
+checked the same way. The connection then goes to the address that passed
+the check (``_PinnedAdapter``), not to a second lookup a rebinding DNS server
+could answer differently; the Host header, TLS SNI and certificate check
+still use the hostname.
+
+Pillow is imported lazily; without it (or with ``LEGAL_FEED_THUMBNAILS=0``)
+nothing is fetched and cards show no image.
+"""
+import hashlib
+import io
+import ipaddress
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+from app.models.models import db, LegalFeedThumbnail
+from app.services import document_storage
+from app.services.document_storage import StorageError
+from app.services.legal_feed.rss import USER_AGENT, DEFAULT_TIMEOUT
+
+ENABLED = os.getenv('LEGAL_FEED_THUMBNAILS', '1') != '0'
+BUCKET = 'legal-feed-thumbnails'
+SIZE = (480, 270)
+MAX_SOURCE_BYTES = 15 * 1024 * 1024
+MAX_REDIRECTS = 3
+PREFETCH_WORKERS = 4
+RETRY_AFTER = timedelta(days=1)
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# extension -> (Pillow format, content type, save options)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+MEMORY_ITEMS = 256
+
+_memory = OrderedDict()   # (url_hash, ext) -> bytes, most recent last
+_memory_lock = threading.Lock()
+_queued = set()   # url hashes with a background prefetch in flight
+_queued_lock = threading.Lock()
+
+
+class ThumbnailError(Exception):
+    """The image could not be fetched or decoded."""
+
+
+def _pillow():
+    try:
+        from PIL import Image, ImageOps
+    except ImportError as e:
+        raise ThumbnailError('Thumbnails need Pillow installed') from e
+    return Image, ImageOps
+
+
+def available() -> bool:
+    try:
+        _pillow()
+    except ThumbnailError:
+        return False
+    return ENABLED
+
+
+def url_hash(url) -> str:
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def storage_path(key, ext) -> str:
+    return f'{key}.{ext}'
+
+
+def negotiate(accept) -> str:
+    """'webp' for clients that take it, else 'jpg'."""
+    return 'webp' if 'image/webp' in (accept or '') else 'jpg'
+
+
+def check_public(url) -> str:
+    """Raise ThumbnailError unless ``url`` is http(s) to a host whose every
+    address is publicly routable; returns the address to connect to."""
+    parts = urlsplit(url)
+    if parts.scheme.lower() not in ('http', 'https') or not parts.hostname:
+        raise ThumbnailError(f'unsupported image URL: {url[:80]}')
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError, ValueError) as e:
+        raise ThumbnailError(f'cannot resolve {parts.hostname[:80]}') from e
+    for info in infos:
+        addr = ipaddress.ip_address(info[4][0].split('%', 1)[0])
+        if addr.version == 6 and addr.ipv4_mapped:
+            addr = addr.ipv4_mapped
+        if not addr.is_global or addr.is_multicast:
+            raise ThumbnailError(f'refusing non-public address for {parts.hostname[:80]}')
+    return infos[0][4][0]
+
+
+class _PinnedAdapter(HTTPAdapter):
+    """Connects to ``address`` whatever the URL's host resolves to now. The
+    Host header, SNI and certificate hostname stay ``hostname``."""
+
+    def __init__(self, hostname, address):
+        self._hostname = hostname
+        self._address = address
+        super().__init__()   # calls init_poolmanager
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['server_hostname'] = self._hostname   # urllib3 drops it for http
+        super().init_poolmanager(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        host = f'[{self._address}]' if ':' in self._address else self._address
+        if parts.port:
+            host += f':{parts.port}'
+        request.headers['Host'] = parts.netloc.rpartition('@')[2]
+        request.url = urlunsplit(parts._replace(netloc=host))
+        return super().send(request, **kwargs)
+
+
+def _pinned_session(url, address):
+    session = requests.Session()
+    session.trust_env = False   # a proxy would resolve the host again
+    adapter = _PinnedAdapter(urlsplit(url).hostname, address)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_image(url) -> bytes:
+    """Download ``url`` from a public host, refusing anything over
+    MAX_SOURCE_BYTES."""
+    for _ in range(MAX_REDIRECTS + 1):
+        address = check_public(url)
+        with _pinned_session(url, address) as session, \
+                session.get(url, headers={'User-Agent': USER_AGENT}, timeout=DEFAULT_TIMEOUT,
+                            stream=True, allow_redirects=False) as resp:
+            if resp.is_redirect:
+                url = urljoin(url, resp.headers['Location'])
+                continue
+            resp.raise_for_status()
+            if int(resp.headers.get('Content-Length') or 0) > MAX_SOURCE_BYTES:
+                raise ThumbnailError('image too large')
+            body = bytearray()
+            for chunk in resp.iter_content(64 * 1024):
+                body.extend(chunk)
+                if len(body) > MAX_SOURCE_BYTES:
+                    raise ThumbnailError('image too large')
+        return bytes(body)
+    raise ThumbnailError('too many redirects')
+
+
+def render(data) -> dict:
+    """``SIZE`` cover-cropped encodings of an image: {ext: bytes}."""
+    Image, ImageOps = _pillow()
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            im.draft('RGB', SIZE)   # JPEG: decode at a reduced scale
+            im = ImageOps.exif_transpose(im)
+            if im.mode in ('RGBA', 'LA', 'P'):
+                im = im.convert('RGBA')
+                flat = Image.new('RGB', im.size, (255, 255, 255))
+                flat.paste(im, mask=im.getchannel('A'))
+                im = flat
+            elif im.mode != 'RGB':
+                im = im.convert('RGB')
+            thumb = ImageOps.fit(im, SIZE, Image.Resampling.LANCZOS)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ThumbnailError(f'not a usable image: {e}') from e
+    out = {}
+    for ext, (fmt, _, options) in FORMATS.items():
+        buf = io.BytesIO()
+        thumb.save(buf, fmt, **options)
+        out[ext] = buf.getvalue()
+    return out
+
+
+def _remember(key, ext, body):
+    with _memory_lock:
+        _memory[(key, ext)] = body
+        _memory.move_to_end((key, ext))
+        while len(_memory) > MEMORY_ITEMS:
+            _memory.popitem(last=False)
+
+
+def _make(url, telemetry=None) -> dict:
+    """Fetch, render and upload one image. No DB access (pool threads)."""
+    key = url_hash(url)
+    started = time.perf_counter()
+    try:
+        data = fetch_image(url)
+        encoded = render(data)
+        for ext, body in encoded.items():
+            document_storage.put_object(storage_path(key, ext), body, FORMATS[ext][1],
+                                        bucket=BUCKET, upsert=True)
+            _remember(key, ext, body)
+    except (ThumbnailError, StorageError, requests.RequestException) as e:
+        return {'url': url, 'error': str(e)}
+    if telemetry is not None:
+        telemetry.record('images', time.perf_counter() - started, bytes=len(data))
+    return {'url': url, 'error': None, 'source_bytes': len(data)}
+
+
+def _record(outcome, now):
+    """Upsert the row for ``_make``'s outcome; the caller commits."""
+    row = db.session.get(LegalFeedThumbnail, url_hash(outcome['url']))
+    if row is None:
+        row = LegalFeedThumbnail(url_hash=url_hash(outcome['url']), source_url=outcome['url'])
+        db.session.add(row)
+    row.status = 'failed' if outcome['error'] else 'ready'
+    row.width, row.height = (None, None) if outcome['error'] else SIZE
+    row.source_bytes = outcome.get('source_bytes')
+    row.error = outcome['error']
+    row.created_at = now
+    return row
+
+
+def _pending(urls, now) -> list:
+    """The distinct ``urls`` with no thumbnail and no recent failure."""
+    wanted = {url_hash(u): u for u in urls if u}
+    if not wanted:
+        return []
+    done = {row.url_hash for row in LegalFeedThumbnail.query
+            .filter(LegalFeedThumbnail.url_hash.in_(wanted))
+            if row.status == 'ready' or row.created_at > now - RETRY_AFTER}
+    return [url for key, url in wanted.items() if key not in done]
+
+
+def prefetch(urls, telemetry=None) -> dict:
+    """Make thumbnails for ``urls`` that have none; commits the rows."""
+    if not available():
+        return {'created': 0, 'failed': 0}
+    now = datetime.utcnow()
+    pending = _pending(urls, now)
+    if not pending:
+        return {'created': 0, 'failed': 0}
+    with ThreadPoolExecutor(max_workers=min(PREFETCH_WORKERS, len(pending)),
+                            thread_name_prefix='legal-feed-thumb') as pool:
+        outcomes = list(pool.map(lambda u: _make(u, telemetry), pending))
+    for outcome in outcomes:
+        _record(outcome, now)
+    db.session.commit()
+    failed = sum(1 for o in outcomes if o['error'])
+    return {'created': len(outcomes) - failed, 'failed': failed}
+
+
+def dispatch_prefetch(url):
+    """Prefetch ``url`` on a daemon thread with its own app context, once per
+    URL at a time. Module-level so tests can monkeypatch it to run inline."""
+    key = url_hash(url)
+    with _queued_lock:
+        if key in _queued:
+            return
+        _queued.add(key)
+    app = current_app._get_current_object()
+
+    def _work():
+        with app.app_context():
+            try:
+                prefetch([url])
+            except Exception:
+                current_app.logger.exception('thumbnail prefetch failed')
+            finally:
+                db.session.remove()
+                with _queued_lock:
+                    _queued.discard(key)
+
+    threading.Thread(target=_work, name='legal-feed-thumb-miss', daemon=True).start()
+
+
+def serve(url, ext):
+    """Thumbnail bytes of ``url`` in ``ext``, or None if there is none yet.
+    A URL with no thumbnail (or a failure past RETRY_AFTER) is queued for
+    ``dispatch_prefetch`` instead of being fetched here."""
+    key = url_hash(url)
+    with _memory_lock:
+        body = _memory.get((key, ext))
+    if body is not None:
+        return body
+    row = db.session.get(LegalFeedThumbnail, key)
+    if row is None or (row.status == 'failed' and row.created_at <= datetime.utcnow() - RETRY_AFTER):
+        if available():
+            dispatch_prefetch(url)
+        return None
+    if row.status != 'ready':
+        return None
+    with _memory_lock:
+        body = _memory.get((key, ext))
+    if body is None:
+        try:
+            body = document_storage.get_object(storage_path(key, ext), bucket=BUCKET)
+        except StorageError:
+            return None
+        _remember(key, ext, body)
+    return body
@@ -0,0 +1,372 @@
+"""Bank/UPI statement reconciliation against open invoices.
+
+A statement CSV is parsed into credit lines, then matched in three passes
+that never compare every line with every invoice:
+
+* **amount** — open invoices hashed by total in paise; each line looks up
+  its own amount;
+* **reference** — invoice numbers hashed by a normalised key (prefix and
+  zero padding kept); a line's reference field, each whitespace- or
+  ``/``-separated piece of its narration and each prefix+number run
+  (``LAW/0042``, ``LAW-0042``) are looked up whole, which catches the ``tr``
+  invoice number ``upi.build_upi_uri`` puts in the QR (UPI apps echo it back
+  in the narration) as well as references typed by hand. Tokens are never
+  joined, so date and UTR fragments cannot spell out an invoice number, and
+  a bare number shorter than ``MIN_REFERENCE_LENGTH`` is only a weak hint;
+* **payer name** — payer strings scored against client names in one
+  ``rapidfuzz.process.cdist`` call, then gathered for the candidate pairs.
+
+A line with exactly one candidate backed by two independent signals (amount
+plus a prefixed or long reference, or amount plus payer name) is applied automatically; all
+applied invoices are marked paid in one bulk UPDATE. Anything weaker or
+contested goes to the review queue with its scored candidates.
+"""
+import csv
+import io
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from sqlalchemy import case, insert
+
+from app.models.models import db, Client, Invoice
+from app.models.reconciliation import BankStatement, BankStatementLine
+from app.services import case_summary
+from app.services.client_dedup import normalize_name
+
+CLOSED_STATUSES = ('paid', 'void')
+NAME_THRESHOLD = 85
+# Unprefixed invoice numbers ('0042') shorter than this are too easy to hit
+# by accident in dates and UTRs to apply a payment on their own.
+MIN_REFERENCE_LENGTH = 6
+MAX_CANDIDATES = 5
+# Candidate score out of 100: reference and amount dominate, name breaks ties.
+REFERENCE_WEIGHT = 50
+AMOUNT_WEIGHT = 30
+NAME_WEIGHT = 20
+
+# Header aliases, compared after lower-casing and stripping non-alphanumerics.
+_COLUMN_ALIASES = {
+    'date': ('date', 'txndate', 'transactiondate', 'valuedate', 'postingdate', 'trandate'),
+    'credit': ('credit', 'credits', 'deposit', 'deposits', 'creditamount', 'depositamount', 'cr'),
+    'amount': ('amount', 'amountinr', 'txnamount', 'transactionamount'),
+    'type': ('type', 'drcr', 'crdr', 'txntype', 'transactiontype'),
+    'description': ('description', 'narration', 'particulars', 'remarks', 'details',
+                    'transactiondetails'),
+    'reference': ('reference', 'referenceno', 'ref', 'refno', 'utr', 'utrno', 'chqrefno',
+                  'chequeno', 'transactionid', 'txnid'),
+    'payer': ('payer', 'payername', 'name', 'from', 'sender', 'remitter', 'remittername'),
+}
+_EXTRA_DATE_FORMATS = ('%d-%b-%Y', '%d %b %Y', '%d/%m/%y', '%d-%m-%y', '%d-%b-%y')
+_PIECE = re.compile(r'[^\s,;/|]+')
+_PREFIXED = re.compile(r'(?<![A-Za-z0-9])[A-Za-z]+[/\-_.]?[0-9]+(?![A-Za-z0-9])')
+
+
+def _norm_header(name):
+    return re.sub(r'[^a-z0-9]', '', (name or '').lower())
+
+
+def _map_columns(fieldnames):
+    """{role: header} for the statement's columns we recognise."""
+    normalised = {_norm_header(f): f for f in fieldnames or []}
+    mapping = {}
+    for role, aliases in _COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalised:
+                mapping[role] = normalised[alias]
+                break
+    return mapping
+
+
+def _parse_money(value):
+    """'₹1,234.50 Cr' -> Decimal('1234.50'); debits come back negative."""
+    text = (value or '').strip().upper()
+    if not text:
+        return None
+    negative = text.startswith('(') or text.startswith('-') or text.endswith('DR')
+    text = re.sub(r'[^0-9.]', '', text)
+    if not text:
+        return None
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        return None
+    return -amount if negative else amount
+
+
+def _parse_date(value):
+    from app.api.import_csv import parse_date
+    parsed = parse_date(value)
+    if parsed or not value:
+        return parsed
+    for fmt in _EXTRA_DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _paise(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal('1')))
+
+
+def parse_statement(content):
+    """Parse statement CSV text into credit lines.
+
+    Returns ``(lines, skipped)``; each line is a dict with row, txn_date,
+    amount (Decimal), description, reference and payer. Debits, zero and
+    unparseable amounts are counted in ``skipped``. Raises ValueError when no
+    amount column can be found.
+    """
+    reader = csv.DictReader(io.StringIO(content))
+    cols = _map_columns(reader.fieldnames)
+    if 'credit' not in cols and 'amount' not in cols:
+        raise ValueError('Statement needs a Credit/Deposit or Amount column')
+
+    lines, skipped = [], 0
+    for row_num, row in enumerate(reader, start=2):
+        def get(role):
+            header = cols.get(role)
+            return (row.get(header) or '').strip() if header else ''
+
+        if 'credit' in cols:
+            amount = _parse_money(get('credit'))
+        else:
+            amount = _parse_money(get('amount'))
+            kind = get('type').upper()
+            if kind.startswith('D') and amount is not None:  # DR / DEBIT
+                amount = -abs(amount)
+        if amount is None or amount <= 0:
+            skipped += 1
+            continue
+        lines.append({
+            'row': row_num,
+            'txn_date': _parse_date(get('date')),
+            'amount': amount,
+            'description': get('description'),
+            'reference': get('reference'),
+            'payer': get('payer'),
+        })
+    return lines, skipped
+
+
+def reference_key(value):
+    """Comparable form of an invoice number: 'inv/0042' -> 'INV0042', '0042' -> '0042'."""
+    return re.sub(r'[^A-Z0-9]', '', (value or '').upper())
+
+
+def is_strong_reference(key):
+    """Whether a reference hit on ``key`` may back an automatic match."""
+    return not key.isdigit() or len(key) >= MIN_REFERENCE_LENGTH
+
+
+def _reference_keys(reference, description):
+    """Candidate invoice-number keys of a statement line, each taken whole."""
+    keys = {reference_key(reference)}
+    for text in (reference or '', description or ''):
+        keys.update(reference_key(piece) for piece in _PIECE.findall(text))
+        keys.update(reference_key(run) for run in _PREFIXED.findall(text))
+    keys.discard('')
+    return keys
+
+
+def match_lines(lines, invoices, name_threshold=NAME_THRESHOLD):
+    """Match statement lines to open invoices. Pure; touches no database.
+
+    ``invoices`` are (id, invoice_number, total, client_name) tuples. Returns
+    one result per line, in order: {status, invoice_id, candidates}, where
+    status is 'applied', 'review' or 'unmatched' and candidates are
+    {invoice_id, score, reasons}, best first.
+    """
+    by_amount = defaultdict(list)
+    by_reference = defaultdict(list)
+    strong_reference = np.zeros(len(invoices), dtype=bool)
+    client_index = {}
+    inv_client = np.empty(len(invoices), dtype=np.int64)
+    for idx, (_, number, total, client_name) in enumerate(invoices):
+        by_amount[_paise(total or 0)].append(idx)
+        key = reference_key(number)
+        if key:
+            by_reference[key].append(idx)
+            strong_reference[idx] = is_strong_reference(key)
+        inv_client[idx] = client_index.setdefault(normalize_name(client_name), len(client_index))
+
+    # Hash joins: (line, invoice) pairs that agree on amount and/or reference.
+    pair_line, pair_inv, pair_ref, pair_amt = [], [], [], []
+    for li, line in enumerate(lines):
+        hits = {}
+        for key in _reference_keys(line['reference'], line['description']):
+            for idx in by_reference.get(key, ()):
+                hits[idx] = [True, False]
+        for idx in by_amount.get(_paise(line['amount']), ()):
+            hits.setdefault(idx, [False, False])[1] = True
+        for idx, (ref, amt) in hits.items():
+            pair_line.append(li)
+            pair_inv.append(idx)
+            pair_ref.append(ref)
+            pair_amt.append(amt)
+
+    results = [{'status': 'unmatched', 'invoice_id': None, 'candidates': []} for _ in lines]
+    if not pair_line:
+        return results
+
+    pair_line = np.array(pair_line, dtype=np.int64)
+    pair_inv = np.array(pair_inv, dtype=np.int64)
+    pair_ref = np.array(pair_ref, dtype=bool)
+    pair_amt = np.array(pair_amt, dtype=bool)
+
+    # Payer names: one cdist over the distinct payer strings of lines that
+    # have any candidate, against the distinct client names.
+    payer_index, line_payer = {}, np.zeros(len(lines), dtype=np.int64)
+    for li in np.unique(pair_line).tolist():
+        text = normalize_name(lines[li]['payer'] or lines[li]['description'])
+        line_payer[li] = payer_index.setdefault(text, len(payer_index))
+    name_matrix = process.cdist(list(payer_index), list(client_index), scorer=fuzz.token_set_ratio,
+                                dtype=np.uint8, workers=-1)
+    pair_name = name_matrix[line_payer[pair_line], inv_client[pair_inv]].astype(np.int16)
+    pair_name_ok = pair_name >= name_threshold
+
+    score = (np.where(pair_ref, REFERENCE_WEIGHT, 0) + np.where(pair_amt, AMOUNT_WEIGHT, 0)
+             + (pair_name * NAME_WEIGHT) // 100)
+    strong = pair_amt & ((pair_ref & strong_reference[pair_inv]) | pair_name_ok)
+    strong_per_line = np.bincount(pair_line, weights=strong, minlength=len(lines))
+
+    # An invoice strongly claimed by two lines is contested: both go to review.
+    claims = Counter(pair_inv[strong & (strong_per_line[pair_line] == 1)].tolist())
+
+    order = np.lexsort((-score, pair_line))
+    for p in order.tolist():
+        li, idx = int(pair_line[p]), int(pair_inv[p])
+        res = results[li]
+        if len(res['candidates']) >= MAX_CANDIDATES:
+            continue
+        top = not res['candidates']
+        reasons = [r for r, ok in (('reference', pair_ref[p]), ('amount', pair_amt[p]),
+                                   ('name', pair_name_ok[p])) if ok]
+        res['candidates'].append({'invoice_id': invoices[idx][0], 'score': int(score[p]),
+                                  'reasons': reasons})
+        # Only the best-scoring candidate may auto-apply: a reference pointing
+        # at a different invoice outranks an amount + name agreement.
+        if top and strong[p] and strong_per_line[li] == 1 and claims[idx] == 1:
+            res['status'], res['invoice_id'] = 'applied', invoices[idx][0]
+        elif res['status'] == 'unmatched':
+            res['status'] = 'review'
+    return results
+
+
+def _open_invoices(firm_id):
+    return (db.session.query(Invoice.id, Invoice.invoice_number, Invoice.total, Client.name)
+            .join(Client, Invoice.client_id == Client.id)
+            .filter(Invoice.firm_id == firm_id, Invoice.status.notin_(CLOSED_STATUSES))
+            .all())
+
+
+def _mark_paid(firm_id, paid_dates):
+    """Mark {invoice_id: date} paid in a single UPDATE; returns rows changed."""
+    if not paid_dates:
+        return 0
+    changed = (Invoice.query
+               .filter(Invoice.firm_id == firm_id, Invoice.id.in_(list(paid_dates)),
+                       Invoice.status.notin_(CLOSED_STATUSES))
+               .update({
+                   'status': 'paid',
+                   'paid_date': case(paid_dates, value=Invoice.id),
+                   'updated_at': datetime.utcnow(),
+               }, synchronize_session=False))
+    case_summary.refresh_invoices(paid_dates)
+    return changed
+
+
+def reconcile_statement(firm_id, user_id, content, file_name=None):
+    """Parse, match and persist one statement; auto-apply confirmed matches.
+
+    Everything — the statement, its lines and the paid invoices — commits
+    together. Returns the statement dict.
+    """
+    lines, skipped = parse_statement(content)
+    results = match_lines(lines, _open_invoices(firm_id))
+
+    today = datetime.utcnow().date()
+    paid_dates = {r['invoice_id']: (line['txn_date'] or today)
+                  for line, r in zip(lines, results) if r['status'] == 'applied'}
+    counts = Counter(r['status'] for r in results)
+
+    statement = BankStatement(firm_id=firm_id, uploaded_by_user_id=user_id, file_name=file_name,
+                              total_lines=len(lines),
+                              counts={'applied': counts['applied'], 'review': counts['review'],
+                                      'unmatched': counts['unmatched'], 'skipped': skipped})
+    db.session.add(statement)
+    db.session.flush()
+    if lines:
+        now = datetime.utcnow()
+        db.session.execute(insert(BankStatementLine), [{
+            'statement_id': statement.id,
+            'firm_id': firm_id,
+            'row_number': line['row'],
+            'txn_date': line['txn_date'],
+            'amount': line['amount'],
+            'description': line['description'],
+            'reference': line['reference'][:200],
+            'payer': line['payer'][:300],
+            'status': r['status'],
+            'invoice_id': r['invoice_id'],
+            'candidates': r['candidates'],
+            'resolved_at': now if r['status'] == 'applied' else None,
+        } for line, r in zip(lines, results)])
+    _mark_paid(firm_id, paid_dates)
+    db.session.commit()
+    return statement.to_dict()
+
+
+def review_queue(firm_id):
+    """Query of lines awaiting a decision, oldest statement first."""
+    return (BankStatementLine.query
+            .filter_by(firm_id=firm_id, status='review')
+            .order_by(BankStatementLine.statement_id, BankStatementLine.row_number))
+
+
+def describe_candidates(firm_id, lines):
+    """Line dicts with each candidate's invoice number, client and total filled in."""
+    ids = {c['invoice_id'] for line in lines for c in (line.candidates or [])}
+    info = {}
+    if ids:
+        for inv_id, number, total, status, client_name in (
+                db.session.query(Invoice.id, Invoice.invoice_number, Invoice.total,
+                                 Invoice.status, Client.name)
+                .join(Client, Invoice.client_id == Client.id)
+                .filter(Invoice.firm_id == firm_id, Invoice.id.in_(ids))):
+            info[inv_id] = {'invoice_number': number, 'client_name': client_name,
+                            'total': float(total or 0), 'invoice_status': status}
+    out = []
+    for line in lines:
+        d = line.to_dict()
+        d['candidates'] = [{**c, **info.get(c['invoice_id'], {})} for c in d['candidates']]
+        out.append(d)
+    return out
+
+
+def resolve_line(firm_id, line_id, invoice_id=None, dismiss=False):
+    """Confirm a review line against ``invoice_id`` or dismiss it.
+
+    Raises LookupError when the line is not in this firm's review queue and
+    ValueError when the invoice is missing, foreign or already closed.
+    """
+    line = BankStatementLine.query.filter_by(id=line_id, firm_id=firm_id).first()
+    if not line or line.status != 'review':
+        raise LookupError('Line not found in review queue')
+    if dismiss:
+        line.status = 'dismissed'
+    else:
+        if invoice_id is None:
+            raise ValueError('invoice_id is required')
+        if not _mark_paid(firm_id, {int(invoice_id): line.txn_date or datetime.utcnow().date()}):
+            raise ValueError('Invoice not found or already closed')
+        line.status = 'applied'
+        line.invoice_id = int(invoice_id)
+    line.resolved_at = datetime.utcnow()
+    db.session.commit()
+    return line.to_dict()
@@ -0,0 +1,71 @@
+"""MinHash signatures and LSH band keys for near-duplicate text.
+
+Text is normalised (case, punctuation, whitespace) and cut into character
+shingles; each of ``NUM_PERM`` seeded universal hashes keeps its minimum over
+the shingles. The fraction of equal positions in two signatures estimates the
+Jaccard similarity of their shingle sets. Signatures are split into ``BANDS``
+bands of ``ROWS`` values, and each band is hashed to a 63-bit bucket key:
+two texts share at least one bucket with probability 1 - (1 - J**ROWS)**BANDS,
+about 0.87 at J = 0.5 and under 0.01 at J = 0.2.
+
+Hashes are seeded constants (not Python's salted ``hash``), so signatures
+and bucket keys are stable across processes and can be stored.
+"""
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE = 5
+MIN_SHINGLES = 20   # shorter texts are too small to compare reliably
+
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK = np.uint64(0xFFFFFFFF)
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+
+
+def normalize(text) -> str:
+    return ' '.join(re.sub(r'[^\w\s]', ' ', (text or '').lower()).split())
+
+
+def shingles(text, k=SHINGLE) -> set:
+    text = normalize(text)
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def signature(text):
+    """uint32 array of NUM_PERM minima, or None for text below MIN_SHINGLES."""
+    grams = shingles(text)
+    if len(grams) < MIN_SHINGLES:
+        return None
+    hashed = np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams),
+                         dtype=np.uint64, count=len(grams))
+    permuted = ((np.outer(hashed, _A) + _B) % _PRIME) & _MASK
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_keys(sig) -> list:
+    """One bucket key per band, as signed-safe 63-bit ints."""
+    sig = np.asarray(sig, dtype='<u4')
+    return [int.from_bytes(hashlib.blake2b(sig[b * ROWS:(b + 1) * ROWS].tobytes(),
+                                           digest_size=8).digest(), 'little') >> 1
+            for b in range(BANDS)]
+
+
+def similarity(a, b) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(np.asarray(a) == np.asarray(b)))
+
+
+def to_bytes(sig) -> bytes:
+    return np.asarray(sig, dtype='<u4').tobytes()
+
+
+def from_bytes(raw):
+    return np.frombuffer(raw, dtype='<u4') if raw else None
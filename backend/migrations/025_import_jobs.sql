@@ -0,0 +1,33 @@
+-- 025_import_jobs.sql — background CSV import jobs (progress, resume, rejects).
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.import_jobs (
+  id SERIAL PRIMARY KEY,
+  firm_id INTEGER REFERENCES public.firms(id),
+  created_by_user_id INTEGER REFERENCES public.users(id),
+  kind VARCHAR(30) NOT NULL,
+  status VARCHAR(20) NOT NULL DEFAULT 'queued',
+  file_name VARCHAR(300),
+  payload TEXT,
+  columns JSON,
+  total_rows INTEGER NOT NULL DEFAULT 0,
+  rows_processed INTEGER NOT NULL DEFAULT 0,
+  rows_skipped INTEGER NOT NULL DEFAULT 0,
+  counts JSON,
+  rejected JSON,
+  state JSON,
+  error TEXT,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  heartbeat_at TIMESTAMP,
+  started_at TIMESTAMP,
+  finished_at TIMESTAMP,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS ix_import_jobs_firm_id ON public.import_jobs (firm_id);
+CREATE INDEX IF NOT EXISTS ix_import_jobs_created_by_user_id ON public.import_jobs (created_by_user_id);
+-- One active (queued/running) import per firm.
+CREATE UNIQUE INDEX IF NOT EXISTS ux_import_jobs_active_firm
+  ON public.import_jobs (firm_id) WHERE status IN ('queued', 'running');
+
+COMMIT;
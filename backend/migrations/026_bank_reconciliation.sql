@@ -0,0 +1,38 @@
+-- 026_bank_reconciliation.sql — bank/UPI statement uploads and their review queue.
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.bank_statements (
+  id SERIAL PRIMARY KEY,
+  firm_id INTEGER REFERENCES public.firms(id),
+  uploaded_by_user_id INTEGER REFERENCES public.users(id),
+  file_name VARCHAR(300),
+  total_lines INTEGER NOT NULL DEFAULT 0,
+  counts JSON,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS ix_bank_statements_firm_id ON public.bank_statements (firm_id);
+CREATE INDEX IF NOT EXISTS ix_bank_statements_uploaded_by_user_id ON public.bank_statements (uploaded_by_user_id);
+
+CREATE TABLE IF NOT EXISTS public.bank_statement_lines (
+  id SERIAL PRIMARY KEY,
+  statement_id INTEGER NOT NULL REFERENCES public.bank_statements(id) ON DELETE CASCADE,
+  firm_id INTEGER REFERENCES public.firms(id),
+  row_number INTEGER,
+  txn_date DATE,
+  amount NUMERIC(12, 2) NOT NULL,
+  description TEXT,
+  reference VARCHAR(200),
+  payer VARCHAR(300),
+  status VARCHAR(20) NOT NULL DEFAULT 'unmatched',
+  invoice_id INTEGER REFERENCES public.invoices(id) ON DELETE SET NULL,
+  candidates JSON,
+  resolved_at TIMESTAMP,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS ix_bank_statement_lines_statement_id ON public.bank_statement_lines (statement_id);
+CREATE INDEX IF NOT EXISTS ix_bank_statement_lines_invoice_id ON public.bank_statement_lines (invoice_id);
+-- Review queue lookups.
+CREATE INDEX IF NOT EXISTS ix_bsl_firm_status ON public.bank_statement_lines (firm_id, status);
+
+COMMIT;
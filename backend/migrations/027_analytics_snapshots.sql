@@ -0,0 +1,24 @@
+-- 027_analytics_snapshots.sql — per-firm Parquet snapshot state, plus updated_at
+-- on case_expenses and tasks so snapshots can export them incrementally.
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+-- Also create a private Storage bucket named "analytics-snapshots".
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.analytics_snapshots (
+  id SERIAL PRIMARY KEY,
+  firm_id INTEGER NOT NULL UNIQUE REFERENCES public.firms(id),
+  status VARCHAR(20) NOT NULL DEFAULT 'idle',
+  version INTEGER NOT NULL DEFAULT 0,
+  watermark TIMESTAMP,
+  manifest JSON,
+  last_counts JSON,
+  error TEXT,
+  started_at TIMESTAMP,
+  finished_at TIMESTAMP,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+ALTER TABLE public.case_expenses ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+ALTER TABLE public.tasks ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+
+COMMIT;
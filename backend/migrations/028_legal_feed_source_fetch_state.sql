@@ -0,0 +1,13 @@
+-- 028_legal_feed_source_fetch_state.sql — conditional-GET validators and
+-- circuit-breaker state per legal feed source.
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+ALTER TABLE public.legal_feed_sources ADD COLUMN IF NOT EXISTS etag VARCHAR(300);
+ALTER TABLE public.legal_feed_sources ADD COLUMN IF NOT EXISTS last_modified VARCHAR(100);
+ALTER TABLE public.legal_feed_sources ADD COLUMN IF NOT EXISTS failure_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE public.legal_feed_sources ADD COLUMN IF NOT EXISTS backoff_until TIMESTAMP;
+ALTER TABLE public.legal_feed_sources ADD COLUMN IF NOT EXISTS last_error TEXT;
+ALTER TABLE public.legal_feed_sources ADD COLUMN IF NOT EXISTS last_fetched_at TIMESTAMP;
+
+COMMIT;
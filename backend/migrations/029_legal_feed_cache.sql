@@ -0,0 +1,18 @@
+-- 029_legal_feed_cache.sql — content-hash keyed cache of legal feed
+-- enrichment outputs and embeddings, tagged by model.
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.legal_feed_cache (
+  id SERIAL PRIMARY KEY,
+  kind VARCHAR(20) NOT NULL,
+  model VARCHAR(80) NOT NULL,
+  content_hash VARCHAR(64) NOT NULL,
+  value JSON NOT NULL,
+  hits INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP DEFAULT NOW(),
+  last_hit_at TIMESTAMP,
+  CONSTRAINT uq_lfc_kind_model_hash UNIQUE (kind, model, content_hash)
+);
+
+COMMIT;
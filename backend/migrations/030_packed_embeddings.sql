@@ -0,0 +1,41 @@
+-- 030_packed_embeddings.sql — store legal feed embeddings as packed
+-- little-endian float32 (BYTEA) instead of JSON float lists.
+-- The JSON columns are kept as *_json for rollback; drop them once the app
+-- is verified on the new columns. Apply in the Supabase SQL editor.
+BEGIN;
+
+-- JSON float array -> little-endian float32 bytes (float4send is big-endian).
+CREATE OR REPLACE FUNCTION public.lf_json_to_f32le(v JSON) RETURNS BYTEA AS $$
+  SELECT string_agg(
+           set_byte(set_byte(set_byte(set_byte('\x00000000'::bytea,
+             0, get_byte(b, 3)), 1, get_byte(b, 2)), 2, get_byte(b, 1)), 3, get_byte(b, 0)),
+           ''::bytea ORDER BY ord)
+  FROM json_array_elements_text(v) WITH ORDINALITY AS e(x, ord),
+       LATERAL float4send(x::float4) AS b
+$$ LANGUAGE SQL IMMUTABLE;
+
+ALTER TABLE public.legal_feed_items RENAME COLUMN embedding TO embedding_json;
+ALTER TABLE public.legal_feed_items ADD COLUMN IF NOT EXISTS embedding BYTEA;
+UPDATE public.legal_feed_items
+   SET embedding = public.lf_json_to_f32le(embedding_json)
+ WHERE embedding_json IS NOT NULL AND json_typeof(embedding_json) = 'array';
+
+ALTER TABLE public.legal_feed_preferences RENAME COLUMN interest_embedding TO interest_embedding_json;
+ALTER TABLE public.legal_feed_preferences RENAME COLUMN behavior_embedding TO behavior_embedding_json;
+ALTER TABLE public.legal_feed_preferences ADD COLUMN IF NOT EXISTS interest_embedding BYTEA;
+ALTER TABLE public.legal_feed_preferences ADD COLUMN IF NOT EXISTS behavior_embedding BYTEA;
+UPDATE public.legal_feed_preferences
+   SET interest_embedding = public.lf_json_to_f32le(interest_embedding_json)
+ WHERE interest_embedding_json IS NOT NULL AND json_typeof(interest_embedding_json) = 'array';
+UPDATE public.legal_feed_preferences
+   SET behavior_embedding = public.lf_json_to_f32le(behavior_embedding_json)
+ WHERE behavior_embedding_json IS NOT NULL AND json_typeof(behavior_embedding_json) = 'array';
+
+DROP FUNCTION public.lf_json_to_f32le(JSON);
+
+-- Before/after size check:
+-- SELECT pg_size_pretty(sum(pg_column_size(embedding_json))) AS json_size,
+--        pg_size_pretty(sum(pg_column_size(embedding))) AS packed_size
+--   FROM public.legal_feed_items;
+
+COMMIT;
@@ -0,0 +1,20 @@
+-- 031_legal_feed_vector_index.sql — indexes behind the incremental refresh of
+-- the in-process for-you vector index (late enrichment and hidden items).
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS ix_lfi_enriched_at ON public.legal_feed_items (enriched_at);
+CREATE INDEX IF NOT EXISTS ix_lfi_hidden ON public.legal_feed_items (id) WHERE hidden;
+
+COMMIT;
+
+-- Optional: pgvector/HNSW backend (LEGAL_FEED_VECTOR_BACKEND=pgvector).
+-- Needs the "vector" extension enabled in Supabase (Database -> Extensions).
+-- The app copies packed embeddings into embedding_vec on refresh.
+--
+-- BEGIN;
+-- CREATE EXTENSION IF NOT EXISTS vector;
+-- ALTER TABLE public.legal_feed_items ADD COLUMN IF NOT EXISTS embedding_vec vector(1536);
+-- CREATE INDEX IF NOT EXISTS ix_lfi_embedding_hnsw
+--   ON public.legal_feed_items USING hnsw (embedding_vec vector_cosine_ops);
+-- COMMIT;
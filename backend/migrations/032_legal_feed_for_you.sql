@@ -0,0 +1,19 @@
+-- 032_legal_feed_for_you.sql — materialised per-user "For you" rankings.
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.legal_feed_for_you (
+  id SERIAL PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  content_type VARCHAR(20) NOT NULL DEFAULT 'news',
+  item_ids JSON NOT NULL DEFAULT '[]',
+  version INTEGER NOT NULL DEFAULT 0,
+  stale BOOLEAN NOT NULL DEFAULT FALSE,
+  computed_at TIMESTAMP,
+  expires_at TIMESTAMP,
+  refreshing_since TIMESTAMP,
+  CONSTRAINT uq_lffy_user_type UNIQUE (user_id, content_type)
+);
+CREATE INDEX IF NOT EXISTS ix_legal_feed_for_you_user_id ON public.legal_feed_for_you (user_id);
+
+COMMIT;
@@ -0,0 +1,28 @@
+-- 033_legal_feed_event_counters.sql — engagement counters and rejected ids on
+-- legal_feed_preferences, so reads stop counting/scanning legal_feed_events.
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+ALTER TABLE public.legal_feed_preferences
+  ADD COLUMN IF NOT EXISTS event_count INTEGER NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS not_interested_count INTEGER NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS rejected_item_ids JSON DEFAULT '[]';
+
+-- Backfill from the event log (every user with events already has a row).
+UPDATE public.legal_feed_preferences p
+SET event_count = c.total,
+    not_interested_count = c.rejections,
+    rejected_item_ids = c.rejected
+FROM (
+  SELECT user_id,
+         COUNT(*) AS total,
+         COUNT(*) FILTER (WHERE kind = 'not_interested') AS rejections,
+         COALESCE(json_agg(DISTINCT item_id ORDER BY item_id)
+                    FILTER (WHERE kind = 'not_interested' AND item_id IS NOT NULL),
+                  '[]'::json) AS rejected
+  FROM public.legal_feed_events
+  GROUP BY user_id
+) c
+WHERE p.user_id = c.user_id;
+
+COMMIT;
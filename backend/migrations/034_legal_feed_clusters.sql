@@ -0,0 +1,22 @@
+-- 034_legal_feed_clusters.sql — near-duplicate story clusters (MinHash/LSH).
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+ALTER TABLE public.legal_feed_items
+  ADD COLUMN IF NOT EXISTS duplicate_of INTEGER REFERENCES public.legal_feed_items (id),
+  ADD COLUMN IF NOT EXISTS minhash BYTEA;
+CREATE INDEX IF NOT EXISTS ix_legal_feed_items_duplicate_of
+  ON public.legal_feed_items (duplicate_of);
+
+CREATE TABLE IF NOT EXISTS public.legal_feed_lsh_bands (
+  id SERIAL PRIMARY KEY,
+  item_id INTEGER NOT NULL REFERENCES public.legal_feed_items (id),
+  band SMALLINT NOT NULL,
+  bucket BIGINT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_lflb_band_bucket ON public.legal_feed_lsh_bands (band, bucket);
+CREATE INDEX IF NOT EXISTS ix_legal_feed_lsh_bands_item_id ON public.legal_feed_lsh_bands (item_id);
+
+-- Existing items stay unclustered (duplicate_of NULL); only new ingests are signed.
+
+COMMIT;
@@ -0,0 +1,13 @@
+-- 035_legal_feed_read_cache.sql — version counters for the feed read cache and
+-- an index for demoting a user's rejected items by EXISTS instead of IN (...).
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+ALTER TABLE public.legal_feed_settings
+  ADD COLUMN IF NOT EXISTS config_version INTEGER NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS content_version INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS ix_lfe_user_kind_item
+  ON public.legal_feed_events (user_id, kind, item_id);
+
+COMMIT;
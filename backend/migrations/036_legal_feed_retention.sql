@@ -0,0 +1,43 @@
+-- 036_legal_feed_retention.sql — archive table for items past the retention
+-- horizon (partitioned by month) and a composite index matching the feed order.
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+-- legal_feed_items itself stays unpartitioned: events, LSH bands and cluster
+-- links reference its id, which a partitioned table could not provide alone.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.legal_feed_items_archive (
+  id INTEGER NOT NULL,
+  bucket_month DATE NOT NULL,
+  source_id INTEGER,
+  content_type VARCHAR(20) NOT NULL,
+  title TEXT NOT NULL,
+  summary TEXT,
+  source_url VARCHAR(1000) NOT NULL,
+  source_name VARCHAR(200) NOT NULL,
+  court VARCHAR(100),
+  published_at TIMESTAMP,
+  ingested_at TIMESTAMP,
+  hidden BOOLEAN NOT NULL DEFAULT FALSE,
+  dedup_key VARCHAR(64) NOT NULL,
+  headline TEXT,
+  tldr TEXT,
+  topics JSON,
+  importance INTEGER,
+  image_url VARCHAR(1000),
+  enriched_at TIMESTAMP,
+  duplicate_of INTEGER,
+  archived_at TIMESTAMP DEFAULT now(),
+  PRIMARY KEY (id, bucket_month)
+) PARTITION BY RANGE (bucket_month);
+-- Month partitions are created by the retention job; this catches strays.
+CREATE TABLE IF NOT EXISTS public.legal_feed_items_archive_default
+  PARTITION OF public.legal_feed_items_archive DEFAULT;
+CREATE INDEX IF NOT EXISTS ix_legal_feed_items_archive_dedup_key
+  ON public.legal_feed_items_archive (dedup_key);
+
+-- query_feed: visible representatives of one type, newest first.
+CREATE INDEX IF NOT EXISTS ix_lfi_feed_order
+  ON public.legal_feed_items (content_type, (coalesce(published_at, ingested_at)) DESC)
+  WHERE hidden = false AND duplicate_of IS NULL;
+
+COMMIT;
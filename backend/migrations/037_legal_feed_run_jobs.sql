@@ -0,0 +1,22 @@
+-- 037_legal_feed_run_jobs.sql — ingestion runs become resumable background
+-- jobs: stage, checkpoint state, per-stage telemetry, attempts and heartbeat.
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+ALTER TABLE public.legal_feed_runs
+  ADD COLUMN IF NOT EXISTS stage VARCHAR(20) NOT NULL DEFAULT 'fetch',
+  ADD COLUMN IF NOT EXISTS state JSON DEFAULT '{}',
+  ADD COLUMN IF NOT EXISTS telemetry JSON DEFAULT '{}',
+  ADD COLUMN IF NOT EXISTS error TEXT,
+  ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP;
+
+-- Runs finished before this migration are not resumable.
+UPDATE public.legal_feed_runs SET stage = 'done' WHERE status NOT IN ('queued', 'running');
+
+-- active_run(): at most a handful of rows are ever queued or running.
+CREATE INDEX IF NOT EXISTS ix_lfr_active
+  ON public.legal_feed_runs (status)
+  WHERE status IN ('queued', 'running');
+
+COMMIT;
@@ -0,0 +1,17 @@
+-- 038_legal_feed_thumbnails.sql — which feed images have card thumbnails in
+-- the "legal-feed-thumbnails" storage bucket (create it, private, alongside).
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.legal_feed_thumbnails (
+  url_hash VARCHAR(64) PRIMARY KEY,
+  source_url VARCHAR(1000) NOT NULL,
+  status VARCHAR(20) NOT NULL DEFAULT 'ready',
+  width INTEGER,
+  height INTEGER,
+  source_bytes INTEGER,
+  error TEXT,
+  created_at TIMESTAMP DEFAULT now()
+);
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- 039_case_summaries.sql — per-case card aggregates (document count, open
+-- tasks, outstanding fees, last activity) kept current by the write paths.
+-- After applying, backfill with: python -m app.services.case_summary rebuild
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.case_summaries (
+  case_file_id INTEGER PRIMARY KEY REFERENCES public.case_files(id) ON DELETE CASCADE,
+  firm_id INTEGER REFERENCES public.firms(id),
+  document_count INTEGER NOT NULL DEFAULT 0,
+  open_task_count INTEGER NOT NULL DEFAULT 0,
+  outstanding_fees NUMERIC(12, 2) NOT NULL DEFAULT 0,
+  last_activity_at TIMESTAMP,
+  refreshed_at TIMESTAMP DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_case_summaries_firm_id ON public.case_summaries (firm_id);
+
+-- The summary refresh filters each source by case.
+CREATE INDEX IF NOT EXISTS ix_tasks_case_file_id ON public.tasks (case_file_id);
+
+COMMIT;
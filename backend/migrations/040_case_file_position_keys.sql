@@ -0,0 +1,37 @@
+-- 040_case_file_position_keys.sql — case_files.position becomes a fractional
+-- string sort key (services/case_order) so a kanban move writes one row.
+-- Existing integer positions are rewritten as evenly spaced keys in each
+-- column's current order (position, then newest first). Byte-wise "C"
+-- collation keeps the keys' sort order independent of the database locale.
+-- Apply in the Supabase SQL editor, once (re-running is a no-op).
+BEGIN;
+
+DO $$
+BEGIN
+  IF (SELECT data_type FROM information_schema.columns
+      WHERE table_schema = 'public' AND table_name = 'case_files'
+        AND column_name = 'position') = 'integer' THEN
+    ALTER TABLE public.case_files ADD COLUMN position_key VARCHAR(64) COLLATE "C";
+
+    -- Fixed-width decimal digits are valid base-36 keys; the trailing 'i'
+    -- keeps a key from ending in '0'.
+    UPDATE public.case_files cf
+    SET position_key = lpad(ranked.rn::text, 8, '0') || 'i'
+    FROM (
+      SELECT id, row_number() OVER (PARTITION BY firm_id, stage
+                                    ORDER BY position, id DESC) AS rn
+      FROM public.case_files
+    ) ranked
+    WHERE cf.id = ranked.id;
+
+    ALTER TABLE public.case_files DROP COLUMN position;
+    ALTER TABLE public.case_files RENAME COLUMN position_key TO position;
+    ALTER TABLE public.case_files ALTER COLUMN position SET DEFAULT 'i';
+    ALTER TABLE public.case_files ALTER COLUMN position SET NOT NULL;
+  END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS ix_case_files_firm_stage_position
+  ON public.case_files (firm_id, stage, position);
+
+COMMIT;
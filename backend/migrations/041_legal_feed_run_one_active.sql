@@ -0,0 +1,22 @@
+-- 041_legal_feed_run_one_active.sql — at most one queued/running ingestion run.
+-- submit_run() checked for an active run and then inserted, so two concurrent
+-- triggers could both queue one. A unique index on a constant, restricted to
+-- active rows, lets the database reject the second; it also serves
+-- active_run(), replacing ix_lfr_active.
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+-- Keep the oldest active run; any others are duplicates from that race.
+UPDATE public.legal_feed_runs
+  SET status = 'failed', error = 'duplicate active run', finished_at = NOW()
+  WHERE status IN ('queued', 'running')
+    AND id <> (SELECT MIN(id) FROM public.legal_feed_runs
+               WHERE status IN ('queued', 'running'));
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_lfr_one_active
+  ON public.legal_feed_runs ((1))
+  WHERE status IN ('queued', 'running');
+
+DROP INDEX IF EXISTS public.ix_lfr_active;
+
+COMMIT;
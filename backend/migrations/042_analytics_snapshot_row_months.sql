@@ -0,0 +1,9 @@
+-- 042_analytics_snapshot_row_months.sql — the partition each exported row went
+-- to, so an incremental snapshot also rewrites a changed row's previous month
+-- (a row whose invoice/event date moved no longer lingers in its old partition).
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+ALTER TABLE public.analytics_snapshots ADD COLUMN IF NOT EXISTS row_months JSON;
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- 043_legal_feed_cache_packed_ttl.sql — packed embeddings and expiry for
+-- legal_feed_cache. Embeddings were stored as JSON float lists (~30 KiB per
+-- 1536-d vector) and nothing was ever deleted. New embedding rows go in the
+-- packed BYTEA column `vector` (value stays NULL); rows written before this
+-- keep their JSON value and are still read. Retention deletes rows whose
+-- last_hit_at (now set on insert as well as on every hit) is older than
+-- LEGAL_FEED_CACHE_TTL_DAYS.
+-- Additive/non-destructive. Apply in the Supabase SQL editor.
+BEGIN;
+
+ALTER TABLE public.legal_feed_cache ADD COLUMN IF NOT EXISTS vector BYTEA;
+ALTER TABLE public.legal_feed_cache ALTER COLUMN value DROP NOT NULL;
+
+UPDATE public.legal_feed_cache
+  SET last_hit_at = COALESCE(created_at, NOW())
+  WHERE last_hit_at IS NULL;
+ALTER TABLE public.legal_feed_cache ALTER COLUMN last_hit_at SET DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS ix_legal_feed_cache_last_hit_at
+  ON public.legal_feed_cache (last_hit_at);
+
+COMMIT;
@@ -0,0 +1,20 @@
+-- 044_analytics_snapshot_rows.sql — the partition each exported row went to,
+-- one row per exported row, keyed by (firm, table, primary key). Replaces the
+-- analytics_snapshots.row_months JSON map from 042, which held a firm's whole
+-- history and was loaded and rewritten on every run; a run now reads and
+-- upserts only the entries of rows it changed. The first incremental run
+-- after this migration records every row's current month.
+-- Drops analytics_snapshots.row_months. Apply in the Supabase SQL editor.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.analytics_snapshot_rows (
+  firm_id INTEGER NOT NULL REFERENCES public.firms(id),
+  table_name VARCHAR(40) NOT NULL,
+  row_key VARCHAR(100) NOT NULL,
+  month VARCHAR(7) NOT NULL,
+  PRIMARY KEY (firm_id, table_name, row_key)
+);
+
+ALTER TABLE public.analytics_snapshots DROP COLUMN IF EXISTS row_months;
+
+COMMIT;
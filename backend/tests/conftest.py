@@ -12,11 +12,40 @@ os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
 # during ingestion. Tests that exercise enrichment inject a fake client instead.
 os.environ['OPENAI_API_KEY'] = ''
 
+# Write legal feed engagement events through instead of buffering them, so no
+# flush timer thread shares the in-memory DB. Buffer tests opt back in.
+os.environ['LEGAL_FEED_EVENT_BUFFER'] = '0'
+
+# No thumbnail downloads from ingestion or the image endpoint; thumbnail
+# tests switch them back on with a fake origin and storage.
+os.environ['LEGAL_FEED_THUMBNAILS'] = '0'
+
 import pytest
 from app.main import create_app
 from app.models.models import db as _db
 
 
+def pytest_addoption(parser):
+    parser.addoption('--benchmark', action='store_true',
+                     help='also run the wall-clock benchmarks (tests marked benchmark)')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: wall-clock comparison; '
+                                       'skipped unless pytest runs with --benchmark')
+
+
+def pytest_collection_modifyitems(config, items):
+    # Timings depend on the machine and its load, so they never gate a normal
+    # run; the tests next to each benchmark check the results instead.
+    if config.getoption('--benchmark'):
+        return
+    skip = pytest.mark.skip(reason='benchmark; run with --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
 @pytest.fixture
 def app():
     """Create application for testing"""
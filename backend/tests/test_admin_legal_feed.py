@@ -86,6 +86,17 @@ def test_backfill_route(client, db, monkeypatch):
     assert resp.get_json()['enriched'] == 2
 
 
+def test_cache_stats_route(client, db, monkeypatch):
+    from app.services.legal_feed import cache
+    h = _h(monkeypatch)
+    cache.put(cache.EMBEDDING, 'm', cache.content_hash('x'), [0.1])
+    cache.get(cache.EMBEDDING, 'm', cache.content_hash('x'))
+    db.session.commit()
+    body = client.get('/admin/api/legal-feed/cache', headers=h).get_json()
+    assert body['embedding']['entries'] == 1
+    assert body['avoided_calls'] == 1
+
+
 def test_recompute_behavior_route(client, db, monkeypatch):
     from app.models.models import LegalFeedPreference
     h = _h(monkeypatch)
@@ -0,0 +1,150 @@
+"""Per-firm Parquet snapshots: month partitions, incremental runs, manifest."""
+import io
+from datetime import date, datetime, timedelta
+
+import pyarrow.parquet as pq
+import pytest
+
+from app.models.models import db, Client, Invoice, InvoiceItem
+from app.models.task import Task
+from app.services import analytics_snapshot as snap
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    """In-memory stand-in for the storage bucket."""
+    objects = {}
+
+    def put(path, data, content_type, bucket=None, upsert=False):
+        assert bucket == snap.SNAPSHOT_BUCKET
+        objects[path] = data
+
+    monkeypatch.setattr('app.services.document_storage.put_object', put)
+    monkeypatch.setattr('app.services.document_storage.remove_object',
+                        lambda path, bucket=None: objects.pop(path))
+    monkeypatch.setattr('app.services.document_storage.signed_url',
+                        lambda path, ttl=3600, bucket=None: f'https://signed/{path}')
+    return objects
+
+
+def _seed(firm_id):
+    acme = Client(firm_id=firm_id, name='Acme')
+    db.session.add(acme)
+    db.session.flush()
+    for number, day in (('0001', date(2026, 1, 5)), ('0002', date(2026, 1, 20)),
+                        ('0003', date(2026, 2, 3))):
+        inv = Invoice(firm_id=firm_id, client_id=acme.id, invoice_number=number,
+                      invoice_date=day, total=100)
+        inv.items.append(InvoiceItem(description='Fee', quantity=1, rate=100, amount=100))
+        db.session.add(inv)
+    db.session.add(Task(firm_id=firm_id, title='File reply'))
+    db.session.commit()
+
+
+def _read(bucket, path):
+    return pq.read_table(io.BytesIO(bucket[path])).to_pylist()
+
+
+def test_full_run_writes_month_partitions_and_manifest(make_owner, bucket):
+    _, firm_id = make_owner()
+    _seed(firm_id)
+    result = snap.run_snapshot(firm_id)
+    assert result['status'] == 'completed' and result['version'] == 1
+
+    manifest = snap.AnalyticsSnapshot.query.filter_by(firm_id=firm_id).one().manifest
+    assert f'{firm_id}/manifest.json' in bucket
+    invoices = manifest['tables']['invoices']['partitions']
+    assert set(invoices) == {'2026-01', '2026-02'}
+    assert invoices['2026-01']['rows'] == 2
+
+    rows = _read(bucket, invoices['2026-01']['path'])
+    assert [r['invoice_number'] for r in rows] == ['0001', '0002']
+    assert float(rows[0]['total']) == 100.0
+    items = manifest['tables']['invoice_items']['partitions']
+    assert items['2026-02']['rows'] == 1
+    assert manifest['tables']['tasks']['partitions']
+
+
+def test_incremental_run_rewrites_only_changed_months(make_owner, bucket):
+    _, firm_id = make_owner()
+    _seed(firm_id)
+    first = datetime.utcnow() - timedelta(hours=1)
+    snap.run_snapshot(firm_id, now=first)
+    # pretend nothing changed since the first run, then touch one invoice
+    for model in (Invoice, Client, Task):
+        model.query.update({'updated_at': first - timedelta(hours=1)})
+    db.session.commit()
+    old_path = snap.AnalyticsSnapshot.query.one().manifest['tables']['invoices']['partitions']['2026-02']['path']
+
+    inv = Invoice.query.filter_by(invoice_number='0003').one()
+    inv.status = 'paid'
+    db.session.commit()
+
+    result = snap.run_snapshot(firm_id)
+    assert result['version'] == 2
+    assert result['last_counts']['invoices'] == 1
+    assert result['last_counts']['clients'] == 0
+
+    parts = snap.AnalyticsSnapshot.query.one().manifest['tables']['invoices']['partitions']
+    assert parts['2026-01']['version'] == 1
+    assert parts['2026-02']['version'] == 2
+    assert old_path not in bucket  # superseded file removed
+    assert _read(bucket, parts['2026-02']['path'])[0]['status'] == 'paid'
+
+
+def test_row_whose_date_moved_leaves_its_old_month(make_owner, bucket):
+    _, firm_id = make_owner()
+    _seed(firm_id)
+    first = datetime.utcnow() - timedelta(hours=1)
+    snap.run_snapshot(firm_id, now=first)
+    for model in (Invoice, Client, Task):
+        model.query.update({'updated_at': first - timedelta(hours=1)})
+    db.session.commit()
+
+    # 0002 moves from January to February; nothing else changes.
+    inv = Invoice.query.filter_by(invoice_number='0002').one()
+    inv.invoice_date = date(2026, 2, 10)
+    db.session.commit()
+    tracked = snap.AnalyticsSnapshotRow.query.filter_by(firm_id=firm_id, table_name='invoices')
+    assert tracked.filter_by(row_key=str(inv.id)).one().month == '2026-01'
+    result = snap.run_snapshot(firm_id)
+    assert result['last_counts']['invoices'] == 2
+    assert {r.row_key: r.month for r in tracked} == {
+        str(i.id): i.invoice_date.strftime('%Y-%m') for i in Invoice.query}
+
+    tables = snap.AnalyticsSnapshot.query.one().manifest['tables']
+    parts = tables['invoices']['partitions']
+    assert [r['invoice_number'] for r in _read(bucket, parts['2026-01']['path'])] == ['0001']
+    assert [r['invoice_number'] for r in _read(bucket, parts['2026-02']['path'])] == \
+        ['0002', '0003']
+    assert tables['invoice_items']['partitions']['2026-01']['rows'] == 1
+
+    # Moving the last January row empties that month's partition.
+    Invoice.query.filter_by(invoice_number='0001').one().invoice_date = date(2026, 3, 1)
+    db.session.commit()
+    snap.run_snapshot(firm_id)
+    parts = snap.AnalyticsSnapshot.query.one().manifest['tables']['invoices']['partitions']
+    assert set(parts) == {'2026-02', '2026-03'}
+    assert sum(p['rows'] for p in parts.values()) == 3
+
+
+def test_manifest_endpoint_filters_by_version(client, make_owner, bucket, monkeypatch):
+    monkeypatch.setattr(snap, 'dispatch', lambda firm_id=None, full=False: snap.run_snapshot(firm_id, full=full))
+    headers, firm_id = make_owner()
+    _seed(firm_id)
+    assert client.get('/api/v1/analytics/snapshot', headers=headers).status_code == 404
+    assert client.post('/api/v1/analytics/snapshot', headers=headers).status_code == 202
+
+    body = client.get('/api/v1/analytics/snapshot', headers=headers).get_json()
+    jan = body['tables']['invoices']['partitions']['2026-01']
+    assert jan['url'] == f"https://signed/{jan['path']}"
+    body = client.get('/api/v1/analytics/snapshot?since_version=1', headers=headers).get_json()
+    assert body['tables']['invoices']['partitions'] == {}
+
+
+def test_cron_endpoint_requires_secret(client, monkeypatch):
+    monkeypatch.setenv('CRON_SECRET', 's3cret')
+    monkeypatch.setattr(snap, 'dispatch', lambda firm_id=None, full=False: None)
+    assert client.post('/api/v1/analytics/snapshots/run').status_code == 401
+    resp = client.post('/api/v1/analytics/snapshots/run', headers={'X-Cron-Secret': 's3cret'})
+    assert resp.status_code == 202
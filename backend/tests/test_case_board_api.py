@@ -0,0 +1,92 @@
+"""Tests for the single-query kanban board endpoint."""
+from app.models.models import db, Client
+from app.models.auth import User
+from app.models.case import CaseFile
+
+
+def _seed(client, firm_id, email='owner@firm.com', **per_stage):
+    """Create ``n`` cases per stage (positions repeat, so ids break ties); returns
+    their ids by stage."""
+    with client.application.app_context():
+        owner = User.query.filter_by(email=email).first()
+        c = Client(firm_id=firm_id, created_by_user_id=owner.id, name='X Corp')
+        db.session.add(c)
+        db.session.flush()
+        ids = {}
+        for stage, n in per_stage.items():
+            for i in range(n):
+                case_file = CaseFile(firm_id=firm_id, created_by_user_id=owner.id,
+                                     case_number=f'CF/{stage}/{i}', title=f'{stage} {i}',
+                                     client_id=c.id, stage=stage, position='abc'[i % 3])
+                db.session.add(case_file)
+                db.session.flush()
+                ids.setdefault(stage, []).append(case_file.id)
+        db.session.commit()
+        return ids
+
+
+def _board(client, headers, **params):
+    resp = client.get('/api/v1/case-files/board', headers=headers, query_string=params)
+    assert resp.status_code == 200, resp.get_json()
+    return {col['stage']: col for col in resp.get_json()['columns']}
+
+
+def test_board_returns_counts_and_first_cards_per_column(client, make_owner):
+    headers, firm_id = make_owner()
+    _seed(client, firm_id, engaged=5, filed=2, closed=4)
+
+    cols = _board(client, headers, limit=3)
+
+    assert 'closed' not in cols
+    assert list(cols)[:3] == ['engaged', 'notice', 'filed']
+    assert cols['engaged']['count'] == 5 and len(cols['engaged']['cards']) == 3
+    assert cols['engaged']['next_cursor']
+    assert cols['filed']['count'] == 2 and cols['filed']['next_cursor'] is None
+    assert cols['notice'] == {'stage': 'notice', 'label': 'Notice', 'count': 0,
+                              'cards': [], 'next_cursor': None}
+    assert cols['engaged']['cards'][0]['client_name'] == 'X Corp'
+
+
+def test_cursor_loads_rest_of_column_in_register_order(client, make_owner):
+    headers, firm_id = make_owner()
+    _seed(client, firm_id, engaged=7, filed=3)
+    expected = [c['id'] for c in client.get('/api/v1/case-files', headers=headers,
+                                            query_string={'stage': 'engaged'}).get_json()]
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 3, 'cursor': cursor} if cursor else {'limit': 3}
+        cols = _board(client, headers, **params)
+        if cursor:
+            assert list(cols) == ['engaged']   # only the column being paged
+        seen += [c['id'] for c in cols['engaged']['cards']]
+        assert cols['engaged']['count'] == 7
+        cursor = cols['engaged']['next_cursor']
+        if not cursor:
+            break
+    assert seen == expected
+
+
+def test_closed_column_is_opt_in(client, make_owner):
+    headers, firm_id = make_owner()
+    _seed(client, firm_id, closed=2)
+    cols = _board(client, headers, include_closed='true')
+    assert cols['closed']['count'] == 2
+
+
+def test_board_is_firm_scoped_and_filtered(client, make_owner):
+    headers, firm_id = make_owner()
+    _, other_firm = make_owner(supabase_id='sb-other', email='other@firm.com', firm_name='Other')
+    _seed(client, firm_id, engaged=2)
+    _seed(client, other_firm, email='other@firm.com', engaged=4)
+
+    assert _board(client, headers)['engaged']['count'] == 2
+    cols = _board(client, headers, search='engaged 1')
+    assert [c['title'] for c in cols['engaged']['cards']] == ['engaged 1']
+
+
+def test_invalid_cursor_is_rejected(client, make_owner):
+    headers, _ = make_owner()
+    resp = client.get('/api/v1/case-files/board', headers=headers,
+                      query_string={'cursor': 'not-a-cursor'})
+    assert resp.status_code == 400
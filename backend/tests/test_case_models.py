@@ -30,7 +30,7 @@ def test_case_file_defaults_and_to_dict(app):
         assert d['case_number'] == 'CF/2026/0001'
         assert d['stage'] == 'engaged'       # DEFAULT_STAGE
         assert d['client_name'] == 'X Corp'
-        assert d['position'] == 0
+        assert d['position'] == 'i'
 
 
 def test_events_cascade_on_delete(app):
@@ -0,0 +1,160 @@
+"""Tests for fractional kanban positions, single moves and bulk reorder."""
+import random
+
+import pytest
+from sqlalchemy import event
+
+from app.models.models import db, Client
+from app.models.auth import User
+from app.models.case import CaseFile, CaseStageChange
+from app.services import case_order
+
+
+def test_key_between_stays_ordered_under_random_inserts():
+    rng = random.Random(7)
+    keys = [case_order.key_between()]
+    for _ in range(2000):
+        i = rng.randrange(len(keys) + 1)
+        lower = keys[i - 1] if i else None
+        upper = keys[i] if i < len(keys) else None
+        key = case_order.key_between(lower, upper)
+        assert case_order.is_valid_key(key)
+        assert (lower is None or lower < key) and (upper is None or key < upper)
+        keys.insert(i, key)
+    spread = case_order.keys_between(None, None, 500)
+    assert spread == sorted(set(spread)) and max(map(len, spread)) <= 2
+    with pytest.raises(case_order.OrderError):
+        case_order.key_between('b', 'a')
+
+
+def _client_id(client, firm_id):
+    with client.application.app_context():
+        c = Client(firm_id=firm_id, created_by_user_id=User.query.filter_by(
+            email='owner@firm.com').first().id, name='X Corp')
+        db.session.add(c)
+        db.session.commit()
+        return c.id
+
+
+def _open(client, headers, cid, n):
+    """Open ``n`` cases; each lands on top, so the column reads newest first."""
+    return [client.post('/api/v1/case-files', headers=headers,
+                        json={'title': f'M{i}', 'client_id': cid}).get_json()['id']
+            for i in range(n)]
+
+
+def _column(client, headers, stage='engaged'):
+    rows = client.get('/api/v1/case-files', headers=headers,
+                      query_string={'stage': stage}).get_json()
+    return [r['id'] for r in rows]
+
+
+def test_new_cases_go_on_top_and_a_move_writes_one_row(client, make_owner):
+    headers, firm_id = make_owner()
+    a, b, c, d = _open(client, headers, _client_id(client, firm_id), 4)
+    assert _column(client, headers) == [d, c, b, a]
+
+    updates = []
+    with client.application.app_context():
+        engine = db.engine
+    listener = lambda conn, cur, stmt, params, ctx, many: updates.append(stmt) \
+        if stmt.startswith('UPDATE case_files') else None
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        resp = client.patch(f'/api/v1/case-files/{a}/move', headers=headers,
+                            json={'stage': 'engaged', 'after_id': d})
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert resp.status_code == 200
+    assert _column(client, headers) == [d, a, c, b]
+    assert len(updates) == 1
+
+    client.patch(f'/api/v1/case-files/{d}/move', headers=headers,
+                 json={'stage': 'filed'})
+    client.patch(f'/api/v1/case-files/{c}/move', headers=headers,
+                 json={'stage': 'filed', 'before_id': d})
+    assert _column(client, headers, 'filed') == [c, d]
+    assert client.patch(f'/api/v1/case-files/{b}/move', headers=headers,
+                        json={'stage': 'filed', 'after_id': a}).status_code == 400
+
+
+def test_tied_or_long_keys_trigger_a_rebalance(client, make_owner, monkeypatch):
+    headers, firm_id = make_owner()
+    ids = _open(client, headers, _client_id(client, firm_id), 4)
+    with client.application.app_context():
+        for case_file in CaseFile.query.all():
+            case_file.position = 'i'   # rows from before fractional keys
+        db.session.commit()
+    order = _column(client, headers)
+
+    client.patch(f'/api/v1/case-files/{order[-1]}/move', headers=headers,
+                 json={'stage': 'engaged', 'after_id': order[0]})
+    assert _column(client, headers) == [order[0], order[-1]] + order[1:-1]
+
+    monkeypatch.setattr(case_order, 'MAX_KEY_LENGTH', 1)
+    for _ in range(3):   # keep squeezing into the same gap
+        top, second = _column(client, headers)[:2]
+        bottom = _column(client, headers)[-1]
+        client.patch(f'/api/v1/case-files/{bottom}/move', headers=headers,
+                     json={'stage': 'engaged', 'after_id': top})
+        assert _column(client, headers)[:2] == [top, bottom]
+    with client.application.app_context():
+        assert max(len(c.position) for c in CaseFile.query.all()) <= 2
+    assert sorted(_column(client, headers)) == sorted(ids)
+
+
+def test_reorder_applies_moves_and_stage_changes_together(client, make_owner):
+    headers, firm_id = make_owner()
+    a, b, c = _open(client, headers, _client_id(client, firm_id), 3)
+    resp = client.post('/api/v1/case-files/reorder', headers=headers, json={'moves': [
+        {'id': a, 'stage': 'notice'},
+        {'id': b, 'stage': 'notice', 'after_id': a},   # anchors on the first move
+        {'id': c, 'after_id': None, 'before_id': None},
+    ]})
+    assert resp.status_code == 200, resp.get_json()
+    assert resp.get_json()['stage_changes'] == 2
+    assert _column(client, headers, 'notice') == [a, b]
+    assert _column(client, headers) == [c]
+    with client.application.app_context():
+        moved = CaseStageChange.query.filter_by(to_stage='notice').all()
+        assert {m.case_file_id for m in moved} == {a, b}
+        assert all(m.from_stage == 'engaged' and m.changed_at for m in moved)
+
+
+def test_reorder_rejects_the_whole_batch_on_a_bad_move(client, make_owner):
+    headers, firm_id = make_owner()
+    _, other_firm = make_owner(supabase_id='sb-other', email='other@firm.com', firm_name='Other')
+    a, b = _open(client, headers, _client_id(client, firm_id), 2)
+    with client.application.app_context():
+        foreign = CaseFile(firm_id=other_firm, case_number='CF/X/1', title='Theirs',
+                           client_id=Client.query.first().id)
+        db.session.add(foreign)
+        db.session.commit()
+        foreign_id = foreign.id
+
+    for bad in ({'id': foreign_id, 'stage': 'notice'},
+                {'id': b, 'stage': 'nowhere'},
+                {'id': b, 'stage': 'notice', 'after_id': 999999}):
+        resp = client.post('/api/v1/case-files/reorder', headers=headers,
+                           json={'moves': [{'id': a, 'stage': 'filed'}, bad]})
+        assert resp.status_code == 400
+    assert _column(client, headers) == [b, a]
+    with client.application.app_context():
+        assert CaseStageChange.query.filter_by(to_stage='filed').count() == 0
+    assert client.post('/api/v1/case-files/reorder', headers=headers,
+                       json={'moves': []}).status_code == 400
+
+
+def test_reorder_and_move_reject_non_integer_ids(client, make_owner):
+    headers, firm_id = make_owner()
+    a, b = _open(client, headers, _client_id(client, firm_id), 2)
+    for bad in ({'id': [a]}, {'id': str(a)}, {'id': True}, {'id': {'x': 1}},
+                {'id': a, 'after_id': str(b)}, {'id': a, 'before_id': [b]},
+                {'id': a, 'after_id': 1.5}):
+        resp = client.post('/api/v1/case-files/reorder', headers=headers,
+                           json={'moves': [bad]})
+        assert resp.status_code == 400, bad
+    resp = client.patch(f'/api/v1/case-files/{a}/move', headers=headers,
+                        json={'stage': 'notice', 'after_id': 'x'})
+    assert resp.status_code == 400
+    assert _column(client, headers) == [b, a]
@@ -0,0 +1,124 @@
+"""Tests for the per-case summary read model and its write-path upkeep."""
+import io
+
+from app.models.models import db, Client
+from app.models.auth import User
+from app.models.case import CaseSummary
+from app.services import case_summary
+
+
+def _case(client, headers, firm_id, email='owner@firm.com'):
+    with client.application.app_context():
+        c = Client(firm_id=firm_id, created_by_user_id=User.query.filter_by(
+            email=email).first().id, name='X')
+        db.session.add(c)
+        db.session.commit()
+        cid = c.id
+    case_id = client.post('/api/v1/case-files', headers=headers,
+                          json={'title': 'M', 'client_id': cid}).get_json()['id']
+    return cid, case_id
+
+
+def _summary(client, headers, case_id):
+    rows = client.get('/api/v1/case-files', headers=headers).get_json()
+    return next(r['summary'] for r in rows if r['id'] == case_id)
+
+
+def _invoice(client, headers, cid, case_id, rate=1000):
+    return client.post('/api/v1/invoices', headers=headers, json={
+        'client_id': cid, 'case_file_id': case_id, 'invoice_date': '2026-06-01',
+        'tax_rate': 0, 'items': [{'description': 'Fee', 'quantity': 1, 'rate': rate}],
+    }).get_json()['id']
+
+
+def test_write_paths_keep_summary_current(client, make_owner, monkeypatch):
+    monkeypatch.setattr('app.services.document_storage.put_object',
+                        lambda path, data, content_type: None)
+    monkeypatch.setattr('app.services.document_storage.remove_object', lambda path: None)
+    headers, firm_id = make_owner()
+    cid, case_id = _case(client, headers, firm_id)
+    s = _summary(client, headers, case_id)
+    assert (s['document_count'], s['open_task_count'], s['outstanding_fees']) == (0, 0, 0.0)
+
+    doc = client.post(f'/api/v1/case-files/{case_id}/documents', headers=headers,
+                      data={'title': 'P', 'file': (io.BytesIO(b'%PDF'), 'p.pdf')},
+                      content_type='multipart/form-data').get_json()['id']
+    task = client.post('/api/v1/tasks', headers=headers,
+                       json={'title': 'Call', 'case_file_id': case_id}).get_json()['id']
+    client.post('/api/v1/tasks', headers=headers, json={'title': 'Brief', 'case_file_id': case_id})
+    inv = _invoice(client, headers, cid, case_id)
+    client.post(f'/api/v1/case-files/{case_id}/events', headers=headers,
+                json={'title': 'Filed', 'event_date': '2026-06-02', 'kind': 'filing'})
+    client.post(f'/api/v1/case-files/{case_id}/expenses', headers=headers,
+                json={'description': 'Court fee', 'amount': 50})
+
+    s = _summary(client, headers, case_id)
+    assert (s['document_count'], s['open_task_count'], s['outstanding_fees']) == (1, 2, 0.0)
+
+    client.put(f'/api/v1/invoices/{inv}', headers=headers, json={'status': 'sent'})
+    assert _summary(client, headers, case_id)['outstanding_fees'] == 1000.0
+    client.patch(f'/api/v1/tasks/{task}', headers=headers, json={'done': True})
+    client.delete(f'/api/v1/case-documents/{doc}', headers=headers)
+    s = _summary(client, headers, case_id)
+    assert (s['document_count'], s['open_task_count']) == (0, 1)
+    client.post(f'/api/v1/invoices/{inv}/mark_paid', headers=headers, json={})
+    assert _summary(client, headers, case_id)['outstanding_fees'] == 0.0
+
+    with client.application.app_context():
+        assert case_summary.verify(firm_id)['drift'] == []
+
+
+def test_moving_a_task_or_invoice_refreshes_both_cases(client, make_owner):
+    headers, firm_id = make_owner()
+    cid, first = _case(client, headers, firm_id)
+    _, second = _case(client, headers, firm_id)
+    task = client.post('/api/v1/tasks', headers=headers,
+                       json={'title': 'Call', 'case_file_id': first}).get_json()['id']
+    client.patch(f'/api/v1/tasks/{task}', headers=headers, json={'case_file_id': second})
+    assert _summary(client, headers, first)['open_task_count'] == 0
+    assert _summary(client, headers, second)['open_task_count'] == 1
+
+    inv = _invoice(client, headers, cid, first)
+    client.put(f'/api/v1/invoices/{inv}', headers=headers, json={'status': 'sent'})
+    assert _summary(client, headers, first)['outstanding_fees'] == 1000.0
+    client.put(f'/api/v1/invoices/{inv}', headers=headers, json={'case_file_id': second})
+    assert _summary(client, headers, first)['outstanding_fees'] == 0.0
+    assert _summary(client, headers, second)['outstanding_fees'] == 1000.0
+
+
+def test_board_cards_carry_the_summary(client, make_owner):
+    headers, firm_id = make_owner()
+    _, case_id = _case(client, headers, firm_id)
+    client.post('/api/v1/tasks', headers=headers, json={'title': 'Call', 'case_file_id': case_id})
+    cols = client.get('/api/v1/case-files/board', headers=headers).get_json()['columns']
+    card = next(c for col in cols for c in col['cards'] if c['id'] == case_id)
+    assert card['summary']['open_task_count'] == 1
+
+
+def test_verify_reports_and_rebuild_repairs_drift(client, make_owner):
+    headers, firm_id = make_owner()
+    _, case_id = _case(client, headers, firm_id)
+    _, untouched = _case(client, headers, firm_id)
+    client.post('/api/v1/tasks', headers=headers, json={'title': 'Call', 'case_file_id': case_id})
+
+    with client.application.app_context():
+        db.session.get(CaseSummary, case_id).open_task_count = 7   # e.g. a manual SQL edit
+        db.session.commit()
+        report = case_summary.verify(firm_id)
+        assert report['checked'] == 2
+        assert [(d['case_file_id'], d['field'], d['stored'], d['actual'])
+                for d in report['drift']] == [(case_id, 'open_task_count', 7, 1)]
+
+        assert case_summary.rebuild(firm_id) == {'checked': 2, 'fixed': 1}
+        assert case_summary.verify(firm_id)['drift'] == []
+        assert db.session.get(CaseSummary, untouched) is None   # nothing to record
+
+
+def test_deleting_a_case_drops_its_summary(client, make_owner):
+    headers, firm_id = make_owner()
+    _, case_id = _case(client, headers, firm_id)
+    client.post(f'/api/v1/case-files/{case_id}/expenses', headers=headers,
+                json={'description': 'Court fee', 'amount': 50})
+    assert client.delete(f'/api/v1/case-files/{case_id}', headers=headers).status_code == 200
+    with client.application.app_context():
+        assert db.session.get(CaseSummary, case_id) is None
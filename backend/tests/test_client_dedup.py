@@ -0,0 +1,120 @@
+"""Duplicate-client detection, merge, and inline import suggestions."""
+import io
+from datetime import date
+
+from app.models.models import db, Client, Invoice, RecurringSchedule
+from app.models.case import CaseFile
+from app.services import import_jobs
+from app.services.client_dedup import (
+    normalize_name, find_duplicate_candidates, merge_clients, ClientMatcher,
+)
+
+
+def _client(firm_id, name, **kw):
+    c = Client(firm_id=firm_id, name=name, **kw)
+    db.session.add(c)
+    db.session.commit()
+    return c
+
+
+def test_normalize_name_drops_noise():
+    assert normalize_name('M/s. ICICI Lombard Gen. Ins. Co. Ltd') == 'icici lombard gen ins'
+    assert normalize_name('The Acme Pvt. Ltd.') == 'acme'
+
+
+def test_candidates_by_name_and_identifiers(make_owner):
+    _, firm_id = make_owner()
+    a = _client(firm_id, 'ICICI Lombard')
+    b = _client(firm_id, 'ICICI Lombard Gen. Ins.')
+    _client(firm_id, 'ICICI Bank')
+    c = _client(firm_id, 'Sharma Traders', tax_id='27aapfu0939f1zv')
+    d = _client(firm_id, 'S.T. Enterprises', tax_id='27AAPFU0939F1ZV')
+    _client(firm_id, 'Unrelated Co', email='x@y.com')
+
+    found = {tuple(c_['client_ids']): c_ for c_ in find_duplicate_candidates(firm_id)}
+    assert set(found) == {(a.id, b.id), (c.id, d.id)}
+    assert found[(a.id, b.id)]['reasons'] == ['name']
+    assert found[(c.id, d.id)]['reasons'] == ['tax_id']
+    assert found[(c.id, d.id)]['score'] == 100
+
+
+def test_candidates_are_firm_scoped(make_owner):
+    _, firm_a = make_owner()
+    _, firm_b = make_owner(supabase_id='sb-2', email='b@firm.com', firm_name='B')
+    _client(firm_a, 'Acme Corp')
+    _client(firm_b, 'Acme Corporation')
+    assert find_duplicate_candidates(firm_a) == []
+
+
+def test_merge_repoints_references_in_bulk(make_owner):
+    _, firm_id = make_owner()
+    keep = _client(firm_id, 'ICICI Lombard')
+    dup = _client(firm_id, 'ICICI Lombard Gen. Ins.', email='ops@icici.com')
+    db.session.add_all([
+        Invoice(firm_id=firm_id, invoice_number='1', client_id=dup.id),
+        CaseFile(firm_id=firm_id, case_number='CF/1', title='T', client_id=dup.id),
+        RecurringSchedule(firm_id=firm_id, client_id=dup.id, items=[], frequency='monthly',
+                          start_date=date(2026, 1, 1), next_run_date=date(2026, 1, 1)),
+    ])
+    db.session.commit()
+    keep_id, dup_id = keep.id, dup.id
+
+    out = merge_clients(firm_id, keep_id, [dup_id])
+    assert out['moved'] == {'invoices': 1, 'case_files': 1, 'recurring_schedules': 1}
+    assert Client.query.get(dup_id) is None
+    assert Invoice.query.one().client_id == keep_id
+    assert Client.query.get(keep_id).email == 'ops@icici.com'  # blank filled in
+
+
+def test_merge_endpoint_rejects_foreign_client(client, make_owner):
+    headers, firm_a = make_owner()
+    _, firm_b = make_owner(supabase_id='sb-2', email='b@firm.com', firm_name='B')
+    mine = _client(firm_a, 'Acme')
+    theirs = _client(firm_b, 'Acme')
+    resp = client.post('/api/v1/clients/merge', headers=headers,
+                       json={'keep_id': mine.id, 'merge_ids': [theirs.id]})
+    assert resp.status_code == 400
+    assert Client.query.get(theirs.id) is not None
+
+
+def test_duplicates_endpoint(client, make_owner):
+    headers, firm_id = make_owner()
+    _client(firm_id, 'ICICI Lombard')
+    _client(firm_id, 'ICICI Lombard Gen. Ins.')
+    body = client.get('/api/v1/clients/duplicates', headers=headers).get_json()
+    assert len(body) == 1 and body[0]['score'] >= 85
+
+
+def test_matcher_proposes_closest_existing():
+    m = ClientMatcher([(1, 'ICICI Lombard'), (2, 'Tata Motors')])
+    assert m.propose('ICICI Lombard Gen. Ins.')['match_id'] == 1
+    assert m.propose('Motors Tata')['match_id'] == 2
+    assert m.propose('Reliance') is None
+
+
+def test_strict_subset_names_need_a_distinctive_short_name(make_owner):
+    m = ClientMatcher([(1, 'Raj Kumar Gupta'), (2, 'Sharma and Sons Pvt Ltd'),
+                       (3, 'ICICI Lombard Gen. Ins.')])
+    assert m.propose('Raj Kumar') is None
+    assert m.propose('Sharma') is None
+    assert m.propose('ICICI Lombard')['match_id'] == 3
+
+    _, firm_id = make_owner()
+    for name in ('Raj Kumar', 'Raj Kumar Gupta', 'Sharma', 'Sharma and Sons Pvt Ltd'):
+        _client(firm_id, name)
+    assert find_duplicate_candidates(firm_id) == []
+
+
+def test_import_job_suggests_matches_for_new_clients(client, make_owner, monkeypatch):
+    monkeypatch.setattr(import_jobs, 'dispatch', lambda job_id: import_jobs.run_job(job_id))
+    headers, firm_id = make_owner()
+    existing = _client(firm_id, 'ICICI Lombard')
+    csv_text = ("invoice_number,client_name,item_description,rate\n"
+                "INV-9,ICICI Lombard Gen. Ins.,Advice,100\n")
+    job = client.post('/api/v1/import/jobs', headers=headers, data={
+        'kind': 'migration', 'file': (io.BytesIO(csv_text.encode()), 'x.csv'),
+    }, content_type='multipart/form-data').get_json()
+    body = client.get(f"/api/v1/import/jobs/{job['id']}", headers=headers).get_json()
+    [match] = body['client_matches']
+    assert match['match_id'] == existing.id
+    assert match['name'] == 'ICICI Lombard Gen. Ins.'
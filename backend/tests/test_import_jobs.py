@@ -0,0 +1,148 @@
+"""Background CSV import jobs: progress, one-per-firm, resume, rejected rows."""
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import db, Client, Invoice, InvoiceItem
+from app.models.import_job import ImportJob
+from app.services import import_jobs
+
+MIGRATION_CSV = (
+    "invoice_number,client_name,invoice_date,status,item_description,quantity,rate\n"
+    "INV-1,Acme,2026-01-10,sent,Drafting,2,1000\n"
+    "INV-1,Acme,2026-01-10,sent,Filing,1,500\n"
+    "INV-2,,2026-01-11,sent,Orphan,1,100\n"
+    "INV-3,Beta,2026-01-12,paid,Advice,1,abc\n"
+    "INV-4,Beta,2026-01-12,paid,Advice,1,300\n"
+)
+
+
+def _upload(client, headers, content, kind='migration'):
+    return client.post('/api/v1/import/jobs', headers=headers, data={
+        'kind': kind, 'file': (io.BytesIO(content.encode()), 'data.csv'),
+    }, content_type='multipart/form-data')
+
+
+@pytest.fixture
+def inline_dispatch(monkeypatch):
+    monkeypatch.setattr(import_jobs, 'dispatch', lambda job_id: import_jobs.run_job(job_id))
+
+
+def test_job_imports_and_reports_progress(client, make_owner, inline_dispatch):
+    headers, firm_id = make_owner()
+    resp = _upload(client, headers, MIGRATION_CSV)
+    assert resp.status_code == 202
+    job_id = resp.get_json()['id']
+
+    body = client.get(f'/api/v1/import/jobs/{job_id}', headers=headers).get_json()
+    assert body['status'] == 'completed'
+    assert body['total_rows'] == 5
+    assert body['rows_processed'] == 5
+    assert body['rows_skipped'] == 2
+    assert body['counts'] == {'clients_created': 2, 'invoices_created': 2, 'items_added': 3}
+    assert body['errors'][0] == 'Row 4: Missing client_name'
+
+    inv = Invoice.query.filter_by(firm_id=firm_id, invoice_number='INV-1').one()
+    assert float(inv.subtotal) == 2500.0
+    assert ImportJob.query.get(job_id).payload is None  # CSV dropped once done
+
+
+def test_rejected_rows_download(client, make_owner, inline_dispatch):
+    headers, _ = make_owner()
+    job_id = _upload(client, headers, MIGRATION_CSV).get_json()['id']
+    resp = client.get(f'/api/v1/import/jobs/{job_id}/rejected.csv', headers=headers)
+    assert resp.status_code == 200
+    lines = resp.get_data(as_text=True).strip().splitlines()
+    assert lines[0].endswith('row_number,error')
+    assert len(lines) == 3
+    assert 'INV-3' in lines[2] and 'could not convert' in lines[2]
+
+
+def test_one_active_import_per_firm(client, make_owner, monkeypatch):
+    monkeypatch.setattr(import_jobs, 'dispatch', lambda job_id: None)  # stays queued
+    headers, _ = make_owner()
+    assert _upload(client, headers, MIGRATION_CSV).status_code == 202
+    resp = _upload(client, headers, MIGRATION_CSV)
+    assert resp.status_code == 409
+    assert resp.get_json()['job']['status'] == 'queued'
+
+
+def test_rejects_unknown_kind(client, make_owner, inline_dispatch):
+    headers, _ = make_owner()
+    assert _upload(client, headers, MIGRATION_CSV, kind='bogus').status_code == 400
+
+
+def test_killed_job_resumes_from_last_committed_chunk(client, make_owner, monkeypatch):
+    monkeypatch.setattr(import_jobs, 'dispatch', lambda job_id: None)
+    monkeypatch.setattr(import_jobs, 'CHUNK_SIZE', 2)
+    headers, firm_id = make_owner()
+    job_id = _upload(client, headers, MIGRATION_CSV).get_json()['id']
+
+    real_chunk = import_jobs._process_chunk
+    calls = {'n': 0}
+
+    def dies_on_second_chunk(*args):
+        calls['n'] += 1
+        if calls['n'] == 2:
+            raise KeyboardInterrupt('worker killed')  # not caught by run_job
+        return real_chunk(*args)
+
+    monkeypatch.setattr(import_jobs, '_process_chunk', dies_on_second_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        import_jobs.run_job(job_id)
+    db.session.rollback()
+
+    job = ImportJob.query.get(job_id)
+    assert job.status == 'running' and job.rows_processed == 2
+    assert import_jobs.run_job(job_id) is None  # heartbeat still fresh: not claimable
+
+    job.heartbeat_at = datetime.utcnow() - timedelta(minutes=10)
+    db.session.commit()
+    result = import_jobs.run_job(job_id)
+
+    assert result['status'] == 'completed'
+    assert result['rows_processed'] == 5
+    assert result['attempts'] == 2
+    inv = Invoice.query.filter_by(firm_id=firm_id, invoice_number='INV-1').one()
+    assert InvoiceItem.query.filter_by(invoice_id=inv.id).count() == 2  # no duplicates
+
+
+def test_v2_overwrite_survives_resume(client, make_owner, monkeypatch):
+    monkeypatch.setattr(import_jobs, 'dispatch', lambda job_id: None)
+    monkeypatch.setattr(import_jobs, 'CHUNK_SIZE', 1)
+    headers, firm_id = make_owner()
+    acme = Client(firm_id=firm_id, name='Acme')
+    db.session.add(acme)
+    db.session.flush()
+    old = Invoice(firm_id=firm_id, invoice_number='0007', client_id=acme.id, tax_rate=0)
+    old.items.append(InvoiceItem(description='stale', quantity=1, rate=9, amount=9))
+    db.session.add(old)
+    db.session.commit()
+
+    csv_text = ("Date,Invoice No.,Description,Party Name,Item Name,Amount\n"
+                "01/02/2026,7,Retainer,Acme,Part A,100\n"
+                "01/02/2026,7,Retainer,Acme,Part B,200\n")
+    job_id = _upload(client, headers, csv_text, kind='v2_invoices').get_json()['id']
+
+    real_chunk = import_jobs._process_chunk
+    calls = {'n': 0}
+
+    def dies_on_second_chunk(*args):
+        calls['n'] += 1
+        if calls['n'] == 2:
+            raise KeyboardInterrupt('worker killed')
+        return real_chunk(*args)
+
+    monkeypatch.setattr(import_jobs, '_process_chunk', dies_on_second_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        import_jobs.run_job(job_id)
+    db.session.rollback()
+    ImportJob.query.get(job_id).heartbeat_at = datetime.utcnow() - timedelta(minutes=10)
+    db.session.commit()
+
+    result = import_jobs.run_job(job_id)
+    assert result['counts'] == {'invoices_updated': 1, 'items_added': 2}
+    inv = Invoice.query.filter_by(firm_id=firm_id, invoice_number='0007').one()
+    assert sorted(i.description for i in inv.items) == ['Part A', 'Part B']
+    assert float(inv.total) == 300.0
@@ -90,7 +90,9 @@ def test_query_weighted_ordering(db):
 
 
 def test_ingest_endpoint_requires_secret(client, monkeypatch):
+    from app.services.legal_feed import ingest
     monkeypatch.setenv('LEGAL_FEED_INGEST_SECRET', 'topsecret')
+    monkeypatch.setattr(ingest, 'dispatch', lambda run_id: ingest.run_job(run_id))
     # missing header
     assert client.post('/api/v1/legal-feed/ingest').status_code == 401
     # wrong header
@@ -99,7 +101,7 @@ def test_ingest_endpoint_requires_secret(client, monkeypatch):
     # correct header
     ok = client.post('/api/v1/legal-feed/ingest',
                      headers={'X-Ingest-Secret': 'topsecret'})
-    assert ok.status_code == 200
+    assert ok.status_code == 202
     assert ok.get_json()['trigger'] == 'scheduled'
 
 
@@ -155,3 +157,22 @@ def test_post_event_invalid_kind(client, db, auth_headers):
 def test_event_requires_auth(client):
     assert client.post('/api/v1/legal-feed/events',
                        json={'item_id': 1, 'kind': 'click'}).status_code == 401
+
+
+def test_for_you_returns_cursor_pages(client, db, auth_headers, monkeypatch):
+    from app.services.legal_feed import for_you
+    monkeypatch.setattr(for_you, 'dispatch', lambda uid, ct: None)
+    make_user('sb-fy')
+    for i in range(3):
+        db.session.add(LegalFeedItem(content_type='news', title=f'fy{i}', source_url=f'u{i}',
+                                     source_name='s', dedup_key=f'api-fy{i}',
+                                     published_at=datetime.utcnow()))
+    db.session.commit()
+    h = auth_headers('sb-fy')
+    first = client.get('/api/v1/legal-feed/for-you?limit=2', headers=h).get_json()
+    assert len(first['data']) == 2 and first['next_cursor']
+    rest = client.get(f"/api/v1/legal-feed/for-you?cursor={first['next_cursor']}",
+                      headers=h).get_json()
+    assert len(rest['data']) == 1 and rest['next_cursor'] is None
+    bad = client.get('/api/v1/legal-feed/for-you?cursor=%%%', headers=h)
+    assert bad.status_code == 400
@@ -0,0 +1,87 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.models.models import db, LegalFeedItem, LegalFeedPreference, LegalFeedEvent
+from app.services.legal_feed import behavior_batch
+from app.services.legal_feed.events import recompute_behavior_embedding
+
+
+def _seed(users, items_n=40, dims=8, seed=3):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    items = []
+    for i in range(items_n):
+        emb = None if i % 7 == 0 else [rng.uniform(-1, 1) for _ in range(dims)]
+        items.append(LegalFeedItem(content_type='news', title='t', source_url=f'u/{i}',
+                                   source_name='s', dedup_key=f'k{i}', embedding=emb))
+    db.session.add_all(items)
+    db.session.flush()
+    for uid in users:
+        db.session.add(LegalFeedPreference(user_id=uid))
+        for _ in range(rng.randint(0, 12)):
+            db.session.add(LegalFeedEvent(
+                user_id=uid, item_id=rng.choice(items).id,
+                kind='click' if rng.random() < 0.6 else 'not_interested',
+                created_at=now - timedelta(days=rng.uniform(0, 90))))
+    db.session.commit()
+
+
+def _snapshot():
+    return {p.user_id: (None if p.behavior_embedding is None else np.asarray(p.behavior_embedding),
+                        p.event_count, p.not_interested_count, p.rejected_item_ids)
+            for p in LegalFeedPreference.query.all()}
+
+
+def test_batch_matches_per_user_recompute(db):
+    users = list(range(1, 41))
+    _seed(users)
+    assert behavior_batch.recompute_all(chunk_users=7) == len(users)
+    batch = _snapshot()
+    for uid in users:
+        recompute_behavior_embedding(uid)
+    reference = _snapshot()
+
+    for uid in users:
+        got, want = batch[uid], reference[uid]
+        assert got[1:] == want[1:]
+        if want[0] is None:
+            assert got[0] is None
+        else:
+            assert np.allclose(got[0], want[0], atol=1e-5)
+
+
+def test_mixed_embedding_lengths_fall_back_to_reference(db):
+    a = LegalFeedItem(content_type='news', title='t', source_url='u/a', source_name='s',
+                      dedup_key='a', embedding=[1.0, 0.0, 0.0])
+    b = LegalFeedItem(content_type='news', title='t', source_url='u/b', source_name='s',
+                      dedup_key='b', embedding=[0.0, 1.0])
+    db.session.add_all([a, b, LegalFeedPreference(user_id=1), LegalFeedPreference(user_id=2)])
+    db.session.flush()
+    db.session.add_all([LegalFeedEvent(user_id=1, item_id=a.id, kind='click'),
+                        LegalFeedEvent(user_id=2, item_id=b.id, kind='click')])
+    db.session.commit()
+
+    behavior_batch.recompute_all()
+    vecs = {p.user_id: p.behavior_embedding for p in LegalFeedPreference.query.all()}
+    assert vecs[1] == [1.0, 0.0, 0.0] and vecs[2] == [0.0, 1.0]
+
+
+def test_segment_vectors_for_many_users_in_chunks():
+    rng = np.random.default_rng(0)
+    users, items, dims, per_user = 10_000, 2_000, 256, 20
+    matrix = rng.standard_normal((items, dims)).astype(np.float32)
+    segments = np.repeat(np.arange(users), per_user)
+    columns = rng.integers(0, items, size=segments.size)
+    weights = rng.uniform(-1, 1, size=segments.size)
+
+    out = np.vstack([behavior_batch.segment_vectors(segments[s:s + 500 * per_user] - s // per_user,
+                                                    columns[s:s + 500 * per_user],
+                                                    weights[s:s + 500 * per_user], matrix, 500)
+                     for s in range(0, segments.size, 500 * per_user)])
+    assert out.shape == (users, dims)
+    for user in (0, 499, 500, users - 1):   # first/last of a chunk, next chunk
+        rows = slice(user * per_user, (user + 1) * per_user)
+        expected = weights[rows] @ matrix[columns[rows]].astype(np.float64)
+        assert np.allclose(out[user], expected / np.linalg.norm(expected), atol=1e-5)
@@ -0,0 +1,115 @@
+"""Near-duplicate clustering (MinHash/LSH) of feed items."""
+import base64
+from datetime import datetime
+
+from app.models.models import db, LegalFeedSource, LegalFeedItem, LegalFeedLshBand
+from app.services.legal_feed import clusters, rss
+from app.services.legal_feed import index as vector_index
+from app.services.legal_feed.ingest import run_ingestion
+from app.services.legal_feed.query import query_feed, _rank_from_db
+from app.utils import minhash
+
+RULING = ('Supreme Court holds that the right to privacy extends to personal '
+          'health records held by insurers; directs the Centre to frame rules '
+          'within six months')
+
+
+def _feed(title, summary, url):
+    return f"""<?xml version="1.0"?><rss version="2.0"><channel>
+<item><title>{title}</title><link>{url}</link><description>{summary}</description>
+</item></channel></rss>"""
+
+
+def _source(name, url):
+    s = LegalFeedSource(name=name, content_type='news', kind='rss', feed_url=url,
+                        enabled=True, weight=10)
+    db.session.add(s)
+    db.session.commit()
+    return s
+
+
+def _item(key, text, **kw):
+    it = LegalFeedItem(content_type='news', title=text, source_url='u/' + key,
+                       source_name='s', dedup_key=key, **kw)
+    db.session.add(it)
+    db.session.flush()
+    return it
+
+
+def test_signatures_estimate_jaccard_and_are_stable():
+    a = minhash.signature(RULING)
+    b = minhash.signature(RULING.replace('six months', 'six weeks') + ' (LiveLaw)')
+    c = minhash.signature('Bombay High Court grants bail to accused in a '
+                          'cheque bounce case after the complainant settles')
+    assert minhash.similarity(a, b) > 0.6
+    assert minhash.similarity(a, c) < 0.2
+    assert minhash.similarity(a, minhash.signature(RULING.upper() + '!')) == 1.0
+    assert minhash.band_keys(a) == minhash.band_keys(minhash.from_bytes(minhash.to_bytes(a)))
+    assert minhash.signature('Too short') is None
+
+
+def test_syndicated_story_is_shown_once(db, monkeypatch):
+    feeds = {
+        'https://a.in/rss': _feed('SC: privacy covers health records', RULING, 'https://a.in/1'),
+        'https://b.in/rss': _feed('Privacy extends to health records, says SC',
+                                  RULING + ' (Bar and Bench)', 'https://b.in/9'),
+        'https://c.in/rss': _feed('HC grants bail in cheque bounce case',
+                                  'Bombay High Court grants bail to accused after '
+                                  'the complainant settles the dispute', 'https://c.in/2'),
+    }
+    for i, url in enumerate(feeds):
+        _source(f'S{i}', url)
+    monkeypatch.setattr(rss, 'fetch', lambda url, *a, **kw: rss.FetchResult(feeds[url], None, None))
+
+    run_ingestion('manual')
+
+    first, second, other = LegalFeedItem.query.order_by(LegalFeedItem.id).all()
+    assert (first.duplicate_of, second.duplicate_of, other.duplicate_of) == (None, first.id, None)
+    assert LegalFeedLshBand.query.filter_by(item_id=second.id).count() == minhash.BANDS
+    assert {d['id'] for d in query_feed()['data']} == {first.id, other.id}
+    ranked = _rank_from_db('news', None, set(), set(), set(), 10, datetime.utcnow(), 14)
+    assert second.id not in ranked and first.id in ranked
+
+
+def test_candidates_come_from_the_lsh_bucket_only(db):
+    stored = _item('s1', RULING)
+    _item('s2', 'Delhi High Court quashes the FIR against journalist over a social media post')
+    clusters.cluster_new_items([stored.id, stored.id + 1])
+    new = _item('n1', RULING + ' Read the judgment.')
+    keys = list(enumerate(minhash.band_keys(minhash.signature(new.title))))
+    found = clusters._candidates(keys, 'news', [new.id], datetime(2000, 1, 1))
+    assert {i for ids in found.values() for i in ids} == {stored.id}
+
+
+def test_hiding_the_representative_promotes_a_member(client, db, monkeypatch):
+    monkeypatch.setenv('ADMIN_PASSWORD', 'pw')
+    rep, dup = _item('h1', RULING), _item('h2', RULING + ' Updated.')
+    clusters.cluster_new_items([rep.id, dup.id])
+    db.session.commit()
+    assert dup.duplicate_of == rep.id
+
+    h = {'Authorization': 'Basic ' + base64.b64encode(b'admin:pw').decode()}
+    assert client.post(f'/admin/api/legal-feed/items/{rep.id}/hide', headers=h,
+                       json={}).status_code == 200
+    db.session.expire_all()
+    assert LegalFeedItem.query.get(dup.id).duplicate_of is None
+    assert LegalFeedItem.query.get(rep.id).duplicate_of == dup.id
+    assert [d['id'] for d in query_feed()['data']] == [dup.id]
+
+    index = vector_index.MemoryVectorIndex()
+    index.refresh()
+    assert index.search(None, 10, datetime.utcnow(), 14) == [dup.id]
+
+
+def test_embedding_confirmation_detaches_false_matches(db):
+    rep, same, wrong = _item('c1', RULING), _item('c2', RULING + ' More.'), _item('c3', RULING + '.')
+    clusters.cluster_new_items([rep.id, same.id, wrong.id])
+    db.session.expire_all()
+    assert same.duplicate_of == rep.id and wrong.duplicate_of == rep.id
+    rep.embedding, same.embedding, wrong.embedding = [1.0, 0.0], [0.99, 0.1], [0.0, 1.0]
+    db.session.flush()
+
+    assert clusters.confirm([same.id, wrong.id]) == 1
+    db.session.expire_all()
+    assert LegalFeedItem.query.get(same.id).duplicate_of == rep.id
+    assert LegalFeedItem.query.get(wrong.id).duplicate_of is None
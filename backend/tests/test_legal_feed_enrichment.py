@@ -1,4 +1,7 @@
 import json
+
+import pytest
+
 from app.models.models import LegalFeedItem
 from app.services.legal_feed.enrichment import enrich_item
 
@@ -72,3 +75,133 @@ def test_embed_text_uses_news_content(db):
     enrich_item(item, client)
     # No headline in completion -> embed text falls back to the item title.
     assert 'Court rules on GST' in client.embed_calls[0]
+
+
+def _backlog(n):
+    return [LegalFeedItem(content_type='news', title=f'Story {i}', summary='s',
+                          source_url=f'u{i}', source_name='s', dedup_key=f'b{i}')
+            for i in range(n)]
+
+
+def _fast_limiter():
+    from app.utils.token_bucket import TokenBucket
+    return TokenBucket(rate=10_000, capacity=10_000)
+
+
+def test_enrich_items_batches_embeddings(db, monkeypatch):
+    from app.services.legal_feed import enrichment
+    from app.services.legal_feed.enrichment import FakeEnrichment, enrich_items
+    monkeypatch.setattr(enrichment, 'EMBED_BATCH_SIZE', 16)
+    items = _backlog(40)
+    client = FakeEnrichment()
+    assert enrich_items(items, client, limiter=_fast_limiter()) == (40, 0)
+    assert client.calls == {'complete': 40, 'embed': 3}
+    assert all(i.enriched_at and len(i.embedding) == client.dims for i in items)
+
+
+def test_failed_embedding_batch_leaves_items_unenriched(db):
+    from app.services.legal_feed.enrichment import enrich_items
+    client = FakeClient(json.dumps({'topics': ['Tax'], 'importance': 50}))
+    client.embed_many = lambda texts: [[0.1]]  # wrong count for the batch
+    items = _backlog(3)
+    assert enrich_items(items, client, limiter=_fast_limiter()) == (0, 3)
+    assert all(i.enriched_at is None for i in items)
+
+
+def test_enrichment_runs_completions_concurrently(db):
+    """Up to ``concurrency`` completions are in flight at once (the first two
+    only return once both have started) and embeddings are batched."""
+    import threading
+    from app.services.legal_feed.enrichment import FakeEnrichment, enrich_items
+
+    class Tracking(FakeEnrichment):
+        def __init__(self):
+            super().__init__(latency=0.002)
+            self.in_flight = self.peak = self.started = 0
+            self.meet = threading.Barrier(2, timeout=10)
+
+        def complete(self, system, user):
+            with self._lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+                self.started += 1
+                first_two = self.started <= 2
+            try:
+                if first_two:
+                    self.meet.wait()   # breaks (and the item fails) if run serially
+                return super().complete(system, user)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+    items = _backlog(100)
+    client = Tracking()
+    assert enrich_items(items, client, limiter=_fast_limiter(), concurrency=8) == (100, 0)
+    assert 2 <= client.peak <= 8
+    assert client.calls['complete'] == 100 and client.calls['embed'] < 100
+
+
+@pytest.mark.benchmark
+def test_concurrent_enrichment_beats_serial_throughput(db):
+    """Against a fake with 20 ms per request the serial path (one completion
+    + one embedding per item) needs ~4 s for 100 items."""
+    import time
+    from app.services.legal_feed.enrichment import FakeEnrichment, enrich_items
+    items = _backlog(100)
+    client = FakeEnrichment(latency=0.02)
+    started = time.perf_counter()
+    enriched, _ = enrich_items(items, client, limiter=_fast_limiter(), concurrency=8)
+    elapsed = time.perf_counter() - started
+    serial = 100 * 2 * 0.02
+    assert enriched == 100
+    assert elapsed < serial / 3, f'{elapsed:.2f}s vs {serial:.2f}s serial'
+
+
+def test_token_bucket_throttles_after_burst():
+    from app.utils.token_bucket import TokenBucket
+    now = [0.0]
+    slept = []
+
+    def sleep(s):
+        slept.append(s)
+        now[0] += s
+
+    bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        bucket.acquire()
+    assert slept == [0.5, 0.5]  # two free from the burst, then one per 1/rate
+
+
+def test_syndicated_story_is_served_from_cache(db):
+    from app.services.legal_feed import cache
+    from app.services.legal_feed.enrichment import FakeEnrichment, enrich_items
+    client = FakeEnrichment()
+    first = _backlog(3)
+    assert enrich_items(first, client, limiter=_fast_limiter()) == (3, 0)
+    db.session.commit()
+
+    # The same stories again from another source (new dedup keys).
+    again = _backlog(3)
+    for item in again:
+        item.dedup_key += '-syndicated'
+    before = cache.avoided_calls()
+    assert enrich_items(again, client, limiter=_fast_limiter()) == (3, 0)
+    assert client.calls == {'complete': 3, 'embed': 1}
+    assert cache.avoided_calls() - before == 6
+    assert [i.headline for i in again] == [i.headline for i in first]
+    assert again[0].embedding == first[0].embedding
+
+    stats = cache.stats()
+    assert stats['enrichment']['entries'] == 3
+    assert stats['enrichment']['avoided_calls'] == 3
+    assert stats['embedding']['avoided_calls'] == 3
+
+
+def test_enrich_item_uses_cache(db):
+    client = FakeClient(json.dumps({'headline': 'H', 'topics': ['Tax'], 'importance': 5}))
+    assert enrich_item(_news(), client)
+    client._completion = 'not json'  # would fail if the completion were re-requested
+    item = _news()
+    assert enrich_item(item, client) is True
+    assert item.headline == 'H'
+    assert len(client.embed_calls) == 1
@@ -1,3 +1,5 @@
+import pytest
+
 from app.models.models import db, LegalFeedItem, LegalFeedPreference, LegalFeedEvent
 from app.services.legal_feed.events import (
     record_event, get_rejected_item_ids, event_count, recompute_behavior_embedding,
@@ -38,3 +40,119 @@ def test_recompute_builds_from_clicks(db):
     record_event(8, it.id, 'click')
     assert recompute_behavior_embedding(8) is True
     assert LegalFeedPreference.query.filter_by(user_id=8).first().behavior_embedding == [1.0, 0.0]
+
+
+def test_counters_and_rejections_are_kept_on_the_preference(db):
+    a, b = _news('e5', [1.0, 0.0]), _news('e6', [0.0, 1.0])
+    record_event(9, a.id, 'click')
+    record_event(9, b.id, 'not_interested')
+    record_event(9, b.id, 'not_interested')
+    pref = LegalFeedPreference.query.filter_by(user_id=9).first()
+    assert (pref.event_count, pref.not_interested_count) == (3, 2)
+    assert pref.rejected_item_ids == [b.id]
+    assert event_count(9) == 3
+    assert event_count(404) == 0 and get_rejected_item_ids(404) == set()
+
+    pref.event_count, pref.rejected_item_ids = 0, []
+    db.session.commit()
+    recompute_behavior_embedding(9)  # counters are rebuilt from the log
+    assert event_count(9) == 3 and get_rejected_item_ids(9) == {b.id}
+
+
+def test_clicks_are_buffered_and_flushed_in_one_batch(db, monkeypatch):
+    from app.services.legal_feed import events
+
+    delays = []
+    monkeypatch.setattr(events, 'BUFFER_SIZE', 3)
+    monkeypatch.setattr(events, 'dispatch_flush', delays.append)
+    items = [_news(f'b{i}', [1.0, float(i)]) for i in range(3)]
+
+    assert record_event(10, items[0].id, 'click') is True
+    assert record_event(11, items[1].id, 'click') is True
+    assert delays == [events.FLUSH_SECONDS]          # timer armed by the first click
+    assert LegalFeedEvent.query.count() == 0 and events.pending_count() == 2
+
+    record_event(10, items[2].id, 'click')
+    assert delays[-1] == 0                           # full buffer flushes now
+    assert events.flush_events() == 3
+    assert events.pending_count() == 0
+    assert LegalFeedEvent.query.count() == 3
+    assert event_count(10) == 2 and event_count(11) == 1
+    assert LegalFeedPreference.query.filter_by(user_id=10).first().behavior_embedding is not None
+
+
+def test_rejection_is_written_now_and_its_vector_update_is_deferred(db, monkeypatch):
+    from app.services.legal_feed import events
+
+    monkeypatch.setattr(events, 'BUFFER_SIZE', 10)
+    monkeypatch.setattr(events, 'dispatch_flush', lambda delay: None)
+    liked, items = _news('r0', [1.0, 0.0]), [_news(f'r{i}', [0.6, 0.8]) for i in range(1, 4)]
+    record_event(12, liked.id, 'click')
+    for it in items:
+        record_event(12, it.id, 'not_interested')
+
+    assert get_rejected_item_ids(12) == {it.id for it in items}
+    assert LegalFeedEvent.query.filter_by(kind='not_interested').count() == 3
+    assert LegalFeedPreference.query.filter_by(user_id=12).first().behavior_embedding is None
+
+    events.flush_events()
+    vec = LegalFeedPreference.query.filter_by(user_id=12).first().behavior_embedding
+    assert vec is not None and vec[1] < 0   # third rejection pushed away from [0.6, 0.8]
+
+
+def test_failed_timer_flush_is_retried_then_dropped(db, monkeypatch):
+    from app.services.legal_feed import events
+
+    delays = []
+    monkeypatch.setattr(events, 'BUFFER_SIZE', 10)
+    monkeypatch.setattr(events, 'dispatch_flush', delays.append)
+    item = _news('f0', [1.0, 0.0])
+    record_event(13, item.id, 'click')
+    real_flush = events._flush
+
+    def broken(pending):
+        raise RuntimeError('database unavailable')
+
+    monkeypatch.setattr(events, '_flush', broken)
+    events._timer_flush()
+    assert delays == [events.FLUSH_SECONDS] * 2      # re-armed after the failure
+    assert events.pending_count() == 1
+
+    monkeypatch.setattr(events, '_flush', real_flush)
+    events._timer_flush()                            # recovered: written once
+    assert LegalFeedEvent.query.count() == 1 and events.pending_count() == 0
+
+    record_event(13, item.id, 'click')
+    monkeypatch.setattr(events, '_flush', broken)
+    for _ in range(events.MAX_FLUSH_ATTEMPTS - 1):
+        with pytest.raises(RuntimeError):
+            events.flush_events()
+    assert events.pending_count() == 1
+    del delays[:]
+    events._timer_flush()                            # last attempt: dropped, not re-armed
+    assert events.pending_count() == 0 and delays == []
+
+
+def test_rejection_locks_the_preference_row_before_merging(db):
+    """Concurrent rejections must not overwrite each other's rejected ids:
+    the preference is read FOR UPDATE (a no-op on SQLite, so the compiled
+    Postgres statement is checked)."""
+    from sqlalchemy import event
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.orm import Session
+
+    a, b = _news('e7'), _news('e8')
+    record_event(10, a.id, 'not_interested')
+    selects = []
+
+    def capture(state):
+        if state.is_select and 'legal_feed_preferences' in str(state.statement):
+            selects.append(str(state.statement.compile(dialect=postgresql.dialect())))
+
+    event.listen(Session, 'do_orm_execute', capture)
+    try:
+        record_event(10, b.id, 'not_interested')
+    finally:
+        event.remove(Session, 'do_orm_execute', capture)
+    assert selects and selects[0].endswith('FOR UPDATE')
+    assert get_rejected_item_ids(10) == {a.id, b.id}
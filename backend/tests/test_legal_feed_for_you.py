@@ -0,0 +1,95 @@
+"""Materialised per-user for-you feeds: cursor paging, TTL and invalidation."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import db, LegalFeedItem, LegalFeedForYou
+from app.services.legal_feed import for_you
+from app.services.legal_feed.events import record_event
+from app.services.legal_feed.preferences import upsert_preference
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    """Record background refreshes instead of starting threads."""
+    calls = []
+    monkeypatch.setattr(for_you, 'dispatch', lambda uid, ct: calls.append((uid, ct)))
+    return calls
+
+
+def _items(n, start=0):
+    now = datetime.utcnow()
+    db.session.add_all([
+        LegalFeedItem(content_type='news', title=f'n{i}', source_url=f'u{i}', source_name='s',
+                      dedup_key=f'fy{i}', importance=100 - i, topics=['Tax'],
+                      published_at=now - timedelta(hours=1))
+        for i in range(start, start + n)])
+    db.session.commit()
+
+
+def _titles(page):
+    return [d['title'] for d in page['data']]
+
+
+def test_cursor_pages_through_materialised_list(db, refreshes):
+    _items(5)
+    first = for_you.get_page(1, limit=2)
+    assert _titles(first) == ['n0', 'n1'] and first['stale'] is False
+    second = for_you.get_page(1, limit=2, cursor=first['next_cursor'])
+    third = for_you.get_page(1, limit=2, cursor=second['next_cursor'])
+    assert _titles(second) == ['n2', 'n3'] and _titles(third) == ['n4']
+    assert third['next_cursor'] is None
+    assert LegalFeedForYou.query.filter_by(user_id=1).one().version == 1  # ranked once
+    assert refreshes == []
+
+
+def test_expired_list_is_served_stale_while_refreshing(db, refreshes):
+    _items(3)
+    for_you.get_page(2)
+    later = datetime.utcnow() + for_you.TTL + timedelta(seconds=1)
+    page = for_you.get_page(2, now=later)
+    assert page['stale'] is True and _titles(page) == ['n0', 'n1', 'n2']
+    for_you.get_page(2, now=later)
+    assert refreshes == [(2, 'news')]     # second stale read does not re-dispatch
+
+
+def test_user_actions_and_ingestion_invalidate(db, refreshes):
+    _items(3)
+    for_you.get_page(3)
+    for_you.get_page(4)
+    item = LegalFeedItem.query.filter_by(title='n0').one()
+    record_event(3, item.id, 'not_interested')
+    assert LegalFeedForYou.query.filter_by(user_id=3).one().stale
+    assert not LegalFeedForYou.query.filter_by(user_id=4).one().stale
+
+    upsert_preference(4, {'Tax': 1.0}, [], [], client=None)
+    assert LegalFeedForYou.query.filter_by(user_id=4).one().stale
+
+    from app.services.legal_feed.ingest import run_ingestion
+    for_you.materialize(3)
+    run_ingestion('manual')
+    assert all(r.stale for r in LegalFeedForYou.query.all())
+
+
+def test_refresh_keeps_cursor_position(db, refreshes):
+    _items(4)
+    first = for_you.get_page(5, limit=2)
+    _items(2, start=-2)                   # two new items rank above everything
+    for_you.materialize(5)
+    second = for_you.get_page(5, limit=2, cursor=first['next_cursor'])
+    assert _titles(second) == ['n2', 'n3']
+
+
+def test_hidden_items_are_dropped_from_pages(db, refreshes):
+    _items(3)
+    for_you.get_page(6)
+    LegalFeedItem.query.filter_by(title='n1').one().hidden = True
+    db.session.commit()
+    assert _titles(for_you.get_page(6)) == ['n0', 'n2']
+
+
+def test_bad_cursor_is_rejected(db):
+    with pytest.raises(for_you.CursorError):
+        for_you.get_page(7, cursor='not-a-cursor')
+    with pytest.raises(for_you.CursorError):
+        for_you.get_page(7, cursor=for_you.encode_cursor(1, -3, None))
@@ -0,0 +1,117 @@
+"""In-process vector index for the for-you feed."""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.models.models import db, LegalFeedItem
+from app.services.legal_feed import index as vector_index
+from app.services.legal_feed.query import _rank_from_db, query_for_you
+from app.services.legal_feed.taxonomy import PRACTICE_AREAS
+
+NOW = datetime.utcnow()
+
+
+def _seed(n, dims=16, seed=0, start=0):
+    rng = np.random.default_rng(seed)
+    items = []
+    for i in range(start, start + n):
+        enriched = i % 7 != 0
+        items.append(LegalFeedItem(
+            content_type='news' if i % 19 else 'judgement', title=f't{i}',
+            source_url=f'u{i}', source_name='s', dedup_key=f'k{i}',
+            court=['Delhi HC', 'Bombay HC', None][i % 3],
+            topics=[PRACTICE_AREAS[i % len(PRACTICE_AREAS)]] if enriched else None,
+            importance=int(rng.integers(0, 101)) if enriched else None,
+            embedding=rng.standard_normal(dims).tolist() if enriched else None,
+            enriched_at=NOW if enriched else None, hidden=i % 31 == 0,
+            published_at=NOW - timedelta(days=float(rng.uniform(0, 20)))))
+    db.session.add_all(items)
+    db.session.commit()
+    return items
+
+
+def _fresh_index():
+    index = vector_index.MemoryVectorIndex()
+    index.refresh()
+    return index
+
+
+@pytest.mark.parametrize('topics,courts', [(set(), set()), ({'Tax'}, set()),
+                                           ({'Tax'}, {'Delhi HC'}), ({'NoSuch'}, set())])
+def test_index_ranking_matches_database_path(db, topics, courts):
+    _seed(400)
+    index = _fresh_index()
+    interest = np.random.default_rng(3).standard_normal(16).tolist()
+    rejected = {5, 6, 40}
+    for vec in (interest, None):
+        expected = _rank_from_db('news', vec, topics, courts, rejected, 400, NOW, 14)
+        got = index.search(vec, 400, NOW, 14, topics=topics, courts=courts,
+                           penalized_ids=rejected)
+        assert got == expected
+
+
+def test_incremental_refresh_picks_up_new_enriched_and_hidden(db):
+    items = _seed(50)
+    index = _fresh_index()
+    watermark = index.id_watermark
+    interest = np.ones(16).tolist()
+
+    late = items[7]                        # unenriched so far
+    late.embedding, late.importance, late.enriched_at = np.ones(16).tolist(), 100, datetime.utcnow()
+    items[1].hidden = True
+    _seed(5, start=50, seed=9)
+    index.mark_stale()
+    index.ensure_fresh()
+
+    assert index.id_watermark > watermark
+    expected = _rank_from_db('news', interest, set(), set(), set(), 100, NOW, 14)
+    got = index.search(interest, 100, NOW, 14)
+    assert got == expected
+    assert got[0] == late.id and items[1].id not in got
+
+
+def test_window_beyond_index_falls_back(db):
+    _seed(10)
+    index = _fresh_index()
+    assert index.search(None, 5, NOW, vector_index.INDEX_WINDOW_DAYS + 1) is None
+
+
+def test_query_for_you_uses_index_and_sees_hides(client, db, monkeypatch):
+    import base64
+    items = _seed(20)
+    first = query_for_you(1, limit=5)
+    idx = vector_index.get_index()
+    assert isinstance(idx, vector_index.MemoryVectorIndex) and len(idx) > 0
+
+    monkeypatch.setenv('ADMIN_PASSWORD', 'pw')
+    auth = {'Authorization': 'Basic ' + base64.b64encode(b'admin:pw').decode()}
+    top = next(i for i in items if i.id == first[0]['id'])
+    assert client.post(f'/admin/api/legal-feed/items/{top.id}/hide', headers=auth,
+                       json={'hidden': True}).status_code == 200
+    assert top.id not in [i['id'] for i in query_for_you(1, limit=5)]
+
+
+def test_pgvector_index_refreshes_periodically_without_mark_stale(monkeypatch):
+    index = vector_index.PgVectorIndex()
+    refreshes = []
+
+    def refresh(now=None, full=False):   # the real one copies vectors on Postgres
+        refreshes.append(now)
+        index._stale, index.refreshed_at = False, now
+
+    monkeypatch.setattr(index, 'refresh', refresh)
+
+    index.ensure_fresh(NOW)
+    index.ensure_fresh(NOW + timedelta(seconds=1))
+    assert refreshes == [NOW]
+    # Enrichment in another process never marks this index stale: the clock does.
+    later = NOW + timedelta(seconds=vector_index.REFRESH_SECONDS)
+    index.ensure_fresh(later)
+    assert refreshes == [NOW, later]
+
+
+def test_index_can_be_disabled(app, monkeypatch):
+    monkeypatch.setenv('LEGAL_FEED_VECTOR_BACKEND', 'off')
+    app.extensions.pop('legal_feed_index', None)
+    assert vector_index.get_index() is None
@@ -1,5 +1,7 @@
 """Tests for the ingestion orchestration service."""
 import json
+from datetime import datetime, timedelta
+
 from app.models.models import db, LegalFeedSource, LegalFeedItem, LegalFeedRun
 from app.services.legal_feed import rss
 from app.services.legal_feed.ingest import run_ingestion, enrich_backlog
@@ -10,6 +12,11 @@ SAMPLE = """<?xml version="1.0"?><rss version="2.0"><channel>
 </channel></rss>"""
 
 
+def _serve(body):
+    """Stand-in for rss.fetch that always answers 200 with ``body``."""
+    return lambda url, etag=None, last_modified=None, timeout=None: rss.FetchResult(body, None, None)
+
+
 def _add_source(name='SC', url='https://ik.org/feeds/sc/', enabled=True):
     s = LegalFeedSource(name=name, content_type='judgement', court='Supreme Court',
                         kind='rss', feed_url=url, enabled=enabled, weight=10)
@@ -20,7 +27,7 @@ def _add_source(name='SC', url='https://ik.org/feeds/sc/', enabled=True):
 
 def test_ingestion_inserts_and_logs_run(db, monkeypatch):
     _add_source()
-    monkeypatch.setattr(rss, 'fetch_raw', lambda url: SAMPLE)
+    monkeypatch.setattr(rss, 'fetch', _serve(SAMPLE))
 
     result = run_ingestion('manual')
 
@@ -35,7 +42,7 @@ def test_ingestion_inserts_and_logs_run(db, monkeypatch):
 
 def test_ingestion_is_idempotent(db, monkeypatch):
     _add_source()
-    monkeypatch.setattr(rss, 'fetch_raw', lambda url: SAMPLE)
+    monkeypatch.setattr(rss, 'fetch', _serve(SAMPLE))
     run_ingestion('manual')
     run_ingestion('manual')
     assert LegalFeedItem.query.count() == 1  # second run dedupes
@@ -45,12 +52,12 @@ def test_ingestion_partial_when_one_source_fails(db, monkeypatch):
     _add_source(name='Good', url='https://ik.org/feeds/good/')
     _add_source(name='Bad', url='https://ik.org/feeds/bad/')
 
-    def fake_fetch(url):
+    def fake_fetch(url, etag=None, last_modified=None, timeout=None):
         if 'bad' in url:
             raise RuntimeError('boom')
-        return SAMPLE
+        return rss.FetchResult(SAMPLE, None, None)
 
-    monkeypatch.setattr(rss, 'fetch_raw', fake_fetch)
+    monkeypatch.setattr(rss, 'fetch', fake_fetch)
     result = run_ingestion('scheduled')
 
     assert result['status'] == 'partial'
@@ -62,7 +69,7 @@ def test_ingestion_partial_when_one_source_fails(db, monkeypatch):
 
 def test_ingestion_disabled_source_skipped(db, monkeypatch):
     _add_source(enabled=False)
-    monkeypatch.setattr(rss, 'fetch_raw', lambda url: SAMPLE)
+    monkeypatch.setattr(rss, 'fetch', _serve(SAMPLE))
     result = run_ingestion('manual')
     assert result['total_ingested'] == 0
     assert LegalFeedItem.query.count() == 0
@@ -109,7 +116,7 @@ def test_run_records_enrichment_counters(db, monkeypatch):
     db.session.add(src)
     db.session.commit()
 
-    monkeypatch.setattr(ing.rss, 'fetch_raw', lambda url: 'raw')
+    monkeypatch.setattr(ing.rss, 'fetch', _serve('raw'))
     monkeypatch.setattr(ing.rss, 'parse_feed', lambda raw: [
         {'title': 'News A', 'summary': 's', 'source_url': 'http://x/a',
          'published_at': None, 'image_url': 'http://img/a'},
@@ -124,9 +131,8 @@ def test_run_records_enrichment_counters(db, monkeypatch):
     assert item.headline == 'H'
 
 
-def test_enrich_ids_commits_per_item(db, monkeypatch):
-    """Per-item commit: a crash on item N leaves items < N durably enriched and
-    bounds the open-transaction window to a single LLM round-trip."""
+def test_enrich_ids_commits_per_chunk(db, monkeypatch):
+    """Per-chunk commit: a crash on chunk N leaves chunks < N durably enriched."""
     import datetime as _dt
     import pytest
     import app.services.legal_feed.ingest as ing
@@ -141,15 +147,17 @@ def test_enrich_ids_commits_per_item(db, monkeypatch):
 
     calls = {'n': 0}
 
-    def flaky(item, client):
+    def flaky(items, client):
         calls['n'] += 1
         if calls['n'] == 2:
-            raise RuntimeError('worker died mid-item')
-        item.enriched_at = _dt.datetime.utcnow()
-        item.topics = ['Tax']
-        return True
+            raise RuntimeError('worker died mid-chunk')
+        for item in items:
+            item.enriched_at = _dt.datetime.utcnow()
+            item.topics = ['Tax']
+        return len(items), 0
 
-    monkeypatch.setattr(ing, 'enrich_item', flaky)
+    monkeypatch.setattr(ing, 'ENRICH_COMMIT_CHUNK', 1)
+    monkeypatch.setattr(ing, 'enrich_items', flaky)
 
     with pytest.raises(RuntimeError):
         ing._enrich_ids(ids, client=object())
@@ -157,3 +165,117 @@ def test_enrich_ids_commits_per_item(db, monkeypatch):
     db.session.rollback()  # discard any uncommitted state from the crash
     assert LegalFeedItem.query.get(i1.id).enriched_at is not None  # committed before crash
     assert LegalFeedItem.query.get(i2.id).enriched_at is None
+
+
+def test_not_modified_feed_skips_parsing(db, monkeypatch):
+    import app.services.legal_feed.ingest as ing
+    src = _add_source()
+    seen = []
+
+    def conditional(url, etag=None, last_modified=None, timeout=None):
+        seen.append((etag, last_modified))
+        if etag == '"v1"':
+            return rss.FetchResult(None, etag, last_modified)
+        return rss.FetchResult(SAMPLE, '"v1"', 'Tue, 17 Jun 2026 10:00:00 GMT')
+
+    monkeypatch.setattr(rss, 'fetch', conditional)
+    run_ingestion('manual')
+    assert LegalFeedSource.query.get(src.id).etag == '"v1"'
+
+    def no_parse(raw):
+        raise AssertionError('304 must not be parsed')
+
+    monkeypatch.setattr(ing.rss, 'parse_feed', no_parse)
+    result = run_ingestion('manual')
+    assert seen[1] == ('"v1"', 'Tue, 17 Jun 2026 10:00:00 GMT')
+    assert result['status'] == 'success'
+    assert result['results'][0]['not_modified'] is True
+
+
+def test_sources_are_fetched_concurrently(db, monkeypatch):
+    import threading
+    _add_source(name='A', url='https://a.example/feed')
+    _add_source(name='B', url='https://b.example/feed')
+    both_in_flight = threading.Barrier(2, timeout=5)
+
+    def slow(url, etag=None, last_modified=None, timeout=None):
+        both_in_flight.wait()  # raises BrokenBarrierError if fetched one at a time
+        return rss.FetchResult(SAMPLE.replace('/doc/1/', f'/doc/{url[8]}/'), None, None)
+
+    monkeypatch.setattr(rss, 'fetch', slow)
+    result = run_ingestion('manual')
+    assert result['status'] == 'success'
+    assert result['total_ingested'] == 2
+
+
+def test_circuit_breaker_backs_off_failing_source(db, monkeypatch):
+    import app.services.legal_feed.ingest as ing
+    src = _add_source()
+    calls = {'n': 0}
+
+    def down(url, etag=None, last_modified=None, timeout=None):
+        calls['n'] += 1
+        raise RuntimeError('503')
+
+    monkeypatch.setattr(rss, 'fetch', down)
+    for _ in range(ing.BREAKER_THRESHOLD):
+        assert run_ingestion('scheduled')['status'] == 'failed'
+    src = LegalFeedSource.query.get(src.id)
+    assert src.failure_count == ing.BREAKER_THRESHOLD
+    assert src.backoff_until > datetime.utcnow()
+
+    result = run_ingestion('scheduled')
+    assert calls['n'] == ing.BREAKER_THRESHOLD  # open circuit: not fetched
+    assert result['results'][0]['skipped'] == 'circuit_open'
+    assert result['status'] == 'success'
+
+    # After the backoff a successful trial fetch closes the breaker.
+    src.backoff_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    monkeypatch.setattr(rss, 'fetch', _serve(SAMPLE))
+    assert run_ingestion('scheduled')['total_ingested'] == 1
+    src = LegalFeedSource.query.get(src.id)
+    assert src.failure_count == 0 and src.backoff_until is None
+
+
+def test_500_entry_feed_dedups_and_inserts_set_based(db, monkeypatch):
+    """A 500-entry feed costs one IN check and one INSERT, not 2N queries."""
+    from sqlalchemy import event
+    import app.services.legal_feed.ingest as ing
+
+    src = _add_source()
+    entries = [{'title': f'Case {i}', 'summary': None, 'source_url': f'https://ik.org/doc/{i}/',
+                'published_at': None, 'image_url': None} for i in range(500)]
+    ing.insert_new_items(src, entries[:200], datetime.utcnow())  # already stored
+    db.session.commit()
+    src.name  # reload the expired source outside the measured window
+
+    statements = []
+    engine = db.engine
+    listener = lambda conn, cursor, stmt, *a: statements.append(stmt)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        ids = ing.insert_new_items(src, entries + entries[:10], datetime.utcnow())
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    db.session.commit()
+
+    assert len(ids) == 300
+    assert len(statements) == 2
+    assert LegalFeedItem.query.count() == 500
+    assert ing.insert_new_items(src, entries, datetime.utcnow()) == []
+
+
+def test_archived_entry_still_in_the_feed_is_not_ingested_again(db, monkeypatch):
+    from app.services.legal_feed import retention
+
+    _add_source()
+    monkeypatch.setattr(rss, 'fetch', _serve(SAMPLE))
+    assert run_ingestion('manual')['total_ingested'] == 1
+
+    later = datetime(2026, 6, 17) + timedelta(days=retention.ARCHIVE_DAYS + 1)
+    assert retention.run_retention(later)['archived'] == 1
+    assert LegalFeedItem.query.count() == 0
+
+    assert run_ingestion('manual')['total_ingested'] == 0
+    assert LegalFeedItem.query.count() == 0
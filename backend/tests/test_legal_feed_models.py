@@ -102,3 +102,40 @@ def test_preference_has_behavior_columns(db):
     db.session.commit()
     got = LegalFeedPreference.query.filter_by(user_id=9).first()
     assert got.behavior_embedding == [0.1, 0.2]
+
+
+def test_embeddings_round_trip_as_packed_float32(db):
+    import numpy as np
+    from app.models.vector import PackedVector
+    item = LegalFeedItem(content_type='news', title='t', source_url='u', source_name='s',
+                         dedup_key='vec1', embedding=[0.1, -0.25, 3.0])
+    db.session.add(item)
+    db.session.commit()
+    raw = db.session.execute(db.text('SELECT embedding FROM legal_feed_items')).scalar()
+    assert raw == np.array([0.1, -0.25, 3.0], dtype='<f4').tobytes()
+
+    db.session.expire_all()
+    vec = LegalFeedItem.query.get(item.id).embedding
+    assert isinstance(vec, PackedVector)
+    assert vec._array is None                 # not decoded until read
+    assert vec == [0.1, -0.25, 3.0]           # equal at float32 precision
+    assert vec.array.dtype == np.float32 and len(vec) == 3
+    assert np.asarray(vec) is vec.array       # zero-copy view
+    assert vec[1] == -0.25 and list(vec)[2] == 3.0
+
+
+def test_empty_embedding_is_stored_as_null(db):
+    pref = LegalFeedPreference(user_id=9, interest_embedding=[])
+    db.session.add(pref)
+    db.session.commit()
+    db.session.expire_all()
+    assert LegalFeedPreference.query.filter_by(user_id=9).one().interest_embedding is None
+
+
+def test_embedding_storage_report():
+    import numpy as np
+    from app.services.legal_feed.embedding_report import measure
+    vectors = np.random.default_rng(1).standard_normal((20, 1536)).tolist()
+    out = measure(vectors)
+    assert out['packed_bytes'] == 20 * 1536 * 4
+    assert out['json_bytes'] > 3 * out['packed_bytes']
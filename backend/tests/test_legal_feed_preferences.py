@@ -34,3 +34,32 @@ def test_upsert_no_phrases_clears_embedding(db):
     upsert_preference(4, {'Tax': 1.0}, [], ['x'], client=_Embedder())
     pref = upsert_preference(4, {'Tax': 1.0}, [], [], client=_Embedder())
     assert pref.interest_embedding is None
+
+
+class _CountingEmbedder(_Embedder):
+    def __init__(self, embed_model='text-embedding-3-small'):
+        self.embed_model = embed_model
+        self.calls = 0
+
+    def embed(self, text):
+        self.calls += 1
+        return super().embed(text)
+
+
+def test_unchanged_phrases_are_not_re_embedded(db):
+    client = _CountingEmbedder()
+    upsert_preference(5, {'Tax': 1.0}, [], ['GST credit'], client=client)
+    upsert_preference(5, {'IP': 1.0}, [], ['GST credit'], client=client)
+    assert client.calls == 1
+
+
+def test_phrase_embeddings_are_shared_through_the_cache(db):
+    client = _CountingEmbedder()
+    upsert_preference(6, {}, [], ['arbitration  awards'], client=client)
+    pref = upsert_preference(7, {}, [], ['arbitration awards'], client=client)
+    assert client.calls == 1          # whitespace-normalised hash hit
+    assert pref.interest_embedding == [0.5, 0.6]
+
+    other = _CountingEmbedder(embed_model='text-embedding-3-large')
+    upsert_preference(8, {}, [], ['arbitration awards'], client=other)
+    assert other.calls == 1           # cache entries are per model
@@ -0,0 +1,118 @@
+"""Versioned read cache, ETags and demotion for the legal feed endpoints."""
+import base64
+from datetime import datetime
+
+import jwt as pyjwt
+import pytest
+from sqlalchemy import event
+
+import app.middleware.jwt_auth as jwt_auth
+from app.models.auth import User
+from app.models.models import db, LegalFeedSource, LegalFeedItem, LegalFeedSetting
+from app.services.legal_feed import read_cache
+from app.services.legal_feed.events import record_event
+from app.services.legal_feed.query import get_ordering_mode, query_feed
+
+TEST_SECRET = 'test-jwt-secret'
+
+
+@pytest.fixture
+def user_headers(monkeypatch):
+    monkeypatch.setenv('SUPABASE_JWT_SECRET', TEST_SECRET)
+    monkeypatch.setenv('ADMIN_PASSWORD', 'pw')
+    jwt_auth._jwt_secret_cache = None
+    user = User(supabase_id='reader', email='reader@t.test')
+    db.session.add(user)
+    db.session.commit()
+    token = pyjwt.encode({'sub': 'reader', 'aud': 'authenticated', 'email': 'reader@t.test'},
+                         TEST_SECRET, algorithm='HS256')
+    yield {'Authorization': f'Bearer {token}'}, user.id
+    jwt_auth._jwt_secret_cache = None
+
+
+ADMIN = {'Authorization': 'Basic ' + base64.b64encode(b'admin:pw').decode()}
+
+
+def _seed(n=3):
+    src = LegalFeedSource(name='SC', content_type='news', court='Supreme Court', kind='rss',
+                          feed_url='https://x/sc', enabled=True, weight=1)
+    db.session.add(src)
+    db.session.flush()
+    items = [LegalFeedItem(source_id=src.id, content_type='news', title=f'N{i}',
+                           source_url=f'https://x/{i}', source_name='SC', dedup_key=f'k{i}',
+                           published_at=datetime(2026, 6, 1 + i)) for i in range(n)]
+    db.session.add_all(items)
+    db.session.commit()
+    return src, items
+
+
+def _count_item_queries(run):
+    statements = []
+    listener = lambda conn, cursor, stmt, *a: statements.append(stmt)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        run()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return sum('FROM legal_feed_items' in s for s in statements)
+
+
+def test_ordering_mode_read_never_writes(db):
+    assert get_ordering_mode() == 'recency'
+    assert LegalFeedSetting.query.count() == 0
+
+
+def test_first_page_is_cached_until_content_changes(client, db, user_headers):
+    headers, _ = user_headers
+    _, items = _seed()
+    first = client.get('/api/v1/legal-feed', headers=headers)
+    assert [d['title'] for d in first.get_json()['data']] == ['N2', 'N1', 'N0']
+    assert _count_item_queries(lambda: client.get('/api/v1/legal-feed', headers=headers)) == 0
+
+    resp = client.post(f'/admin/api/legal-feed/items/{items[2].id}/hide', headers=ADMIN, json={})
+    assert resp.status_code == 200
+    assert [d['title'] for d in client.get('/api/v1/legal-feed', headers=headers)
+            .get_json()['data']] == ['N1', 'N0']
+
+
+def test_etag_revalidation_returns_304_until_a_change(client, db, user_headers):
+    headers, _ = user_headers
+    _seed()
+    resp = client.get('/api/v1/legal-feed', headers=headers)
+    tag = resp.headers['ETag']
+    assert resp.headers['Cache-Control'] == 'private, no-cache'
+    again = client.get('/api/v1/legal-feed', headers={**headers, 'If-None-Match': tag})
+    assert again.status_code == 304 and again.data == b''
+
+    client.put('/admin/api/legal-feed/settings', headers=ADMIN, json={'ordering_mode': 'weighted'})
+    changed = client.get('/api/v1/legal-feed', headers={**headers, 'If-None-Match': tag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != tag
+
+    courts = client.get('/api/v1/legal-feed/courts', headers=headers)
+    assert courts.get_json() == {'courts': ['Supreme Court']}
+    assert client.get('/api/v1/legal-feed/courts', headers={
+        **headers, 'If-None-Match': courts.headers['ETag']}).status_code == 304
+
+
+def test_rejections_are_demoted_by_anti_join(client, db, user_headers):
+    headers, uid = user_headers
+    _, items = _seed()
+    record_event(uid, items[2].id, 'not_interested')
+
+    assert [d['title'] for d in query_feed(demote_user_id=uid)['data']] == ['N1', 'N0', 'N2']
+    assert [d['title'] for d in query_feed(demote_user_id=uid + 1)['data']] == ['N2', 'N1', 'N0']
+    body = client.get('/api/v1/legal-feed', headers=headers).get_json()
+    assert [d['title'] for d in body['data']] == ['N1', 'N0', 'N2']
+
+
+def test_courts_cached_until_a_source_changes(client, db, user_headers):
+    headers, _ = user_headers
+    src, _ = _seed(1)
+    assert client.get('/api/v1/legal-feed/courts', headers=headers).get_json()['courts'] == ['Supreme Court']
+    src.court = 'Delhi HC'  # direct write: not an admin change, stays cached
+    db.session.commit()
+    assert client.get('/api/v1/legal-feed/courts', headers=headers).get_json()['courts'] == ['Supreme Court']
+
+    client.put(f'/admin/api/legal-feed/sources/{src.id}', headers=ADMIN, json={'court': 'Bombay HC'})
+    assert client.get('/api/v1/legal-feed/courts', headers=headers).get_json()['courts'] == ['Bombay HC']
+    assert read_cache.state().config_version == 1
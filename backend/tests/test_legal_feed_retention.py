@@ -0,0 +1,159 @@
+"""Embedding pruning, archiving and feed latency as history grows."""
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.models.models import (
+    db, LegalFeedItem, LegalFeedItemArchive, LegalFeedEvent, LegalFeedLshBand,
+)
+from app.services.legal_feed import retention
+from app.services.legal_feed.query import query_feed
+
+NOW = datetime(2026, 10, 1)
+
+
+def _item(key, days_old, **kw):
+    it = LegalFeedItem(content_type='news', title=key, source_url='u/' + key, source_name='s',
+                       dedup_key=key, published_at=NOW - timedelta(days=days_old),
+                       ingested_at=NOW - timedelta(days=days_old), **kw)
+    db.session.add(it)
+    db.session.flush()
+    return it
+
+
+def _bulk(n, days_old, prefix):
+    when = NOW - timedelta(days=days_old)
+    db.session.execute(LegalFeedItem.__table__.insert(), [
+        {'content_type': 'news', 'title': f'{prefix}{i}', 'source_url': f'u/{prefix}{i}',
+         'source_name': 's', 'dedup_key': f'{prefix}{i}', 'hidden': False,
+         'published_at': when - timedelta(minutes=i), 'ingested_at': when} for i in range(n)])
+    db.session.commit()
+
+
+def test_prune_drops_old_embeddings_but_keeps_engaged_ones(db):
+    recent = _item('recent', 3, embedding=[1.0, 0.0], minhash=b'x')
+    old = _item('old', 60, embedding=[1.0, 0.0], minhash=b'x')
+    liked = _item('liked', 60, embedding=[0.0, 1.0])
+    db.session.add_all([LegalFeedEvent(user_id=1, item_id=liked.id, kind='click'),
+                        LegalFeedLshBand(item_id=old.id, band=0, bucket=1),
+                        LegalFeedLshBand(item_id=recent.id, band=0, bucket=2)])
+    db.session.commit()
+
+    result = retention.prune_embeddings(NOW)
+    db.session.commit()
+    db.session.expire_all()
+    assert result == {'embeddings_pruned': 1, 'lsh_bands_deleted': 1, 'signatures_pruned': 1}
+    assert old.embedding is None and old.minhash is None
+    assert recent.embedding == [1.0, 0.0] and liked.embedding == [0.0, 1.0]
+
+
+def test_archive_moves_items_past_the_horizon(db):
+    rep = _item('rep', 400)
+    member = _item('member', 100, duplicate_of=rep.id)
+    ancient_member = _item('ancient', 401, duplicate_of=rep.id)
+    kept = _item('kept', 500)
+    db.session.add(LegalFeedEvent(user_id=1, item_id=kept.id, kind='click'))
+    rep_id, member_id, ancient_id = rep.id, member.id, ancient_member.id
+    db.session.commit()
+
+    result = retention.run_retention(NOW)
+    assert result['archived'] == 2
+    assert {i.dedup_key for i in LegalFeedItem.query} == {'member', 'kept'}
+    assert LegalFeedItem.query.get(member_id).duplicate_of is None
+    archived = LegalFeedItemArchive.query.filter_by(id=rep_id).one()
+    assert archived.bucket_month == date(2025, 8, 1) and archived.title == 'rep'
+    assert LegalFeedItemArchive.query.get((ancient_id, date(2025, 8, 1))).duplicate_of == rep_id
+
+
+def test_cache_stores_embeddings_packed_and_expires_idle_entries(db):
+    from app.models.models import LegalFeedCache
+    from app.services.legal_feed import cache
+
+    cache.store(cache.EMBEDDING, 'm', {'idle': [0.5, 0.25], 'hit': [1.0, 0.0]})
+    cache.put(cache.ENRICHMENT, 'm', 'fields', {'headline': 'H'})
+    db.session.commit()
+    row = LegalFeedCache.query.filter_by(content_hash='idle').one()
+    assert row.value is None and row.vector == [0.5, 0.25] and len(row.vector.tobytes()) == 8
+
+    LegalFeedCache.query.update({'last_hit_at': NOW - timedelta(days=cache.TTL_DAYS + 1)})
+    db.session.commit()
+    assert cache.lookup(cache.EMBEDDING, 'm', ['hit'])['hit'] == [1.0, 0.0]
+    db.session.commit()
+
+    later = datetime.utcnow() + timedelta(days=1)
+    assert retention.run_retention(later)['cache_expired'] == 2
+    assert [r.content_hash for r in LegalFeedCache.query] == ['hit']
+
+
+def test_retention_endpoint_requires_secret(client, monkeypatch):
+    monkeypatch.setenv('LEGAL_FEED_INGEST_SECRET', 'topsecret')
+    assert client.post('/api/v1/legal-feed/retention').status_code == 401
+    ok = client.post('/api/v1/legal-feed/retention', headers={'X-Ingest-Secret': 'topsecret'})
+    assert ok.status_code == 200 and ok.get_json()['archived'] == 0
+
+
+def _feed_plans(db):
+    """The first feed page, and the query plan of each legal_feed_items
+    statement it ran."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM legal_feed_items' in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        page = query_feed(page=1, page_size=50)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    conn = db.session.connection()
+    plans = [' | '.join(row[-1] for row in
+                        conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters))
+             for statement, parameters in statements]
+    return page, plans
+
+
+def test_feed_reads_its_index_and_archiving_shrinks_the_hot_table(db):
+    """20x more history: the first page still walks ix_lfi_feed_order with no
+    sort, and archiving takes the hot table (and the page count) back to the
+    recent items."""
+    _bulk(1000, 1, 'r')
+    _bulk(20000, 500, 'h')
+    page, plans = _feed_plans(db)
+    assert page['total'] == 21000 and page['data'][0]['title'] == 'r0'
+    assert len(plans) == 2   # count + page
+    for plan in plans:
+        assert 'USING INDEX ix_lfi_feed_order' in plan and 'TEMP B-TREE' not in plan, plan
+
+    assert retention.archive_items(NOW) == 20000
+    assert LegalFeedItem.query.count() == 1000
+    page, plans = _feed_plans(db)
+    assert page['total'] == 1000 and page['data'][0]['title'] == 'r0'
+    assert all('USING INDEX ix_lfi_feed_order' in plan for plan in plans)
+
+
+def _latency():
+    samples = []
+    for _ in range(7):
+        started = time.perf_counter()
+        query_feed(page=1, page_size=50)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+@pytest.mark.benchmark
+def test_feed_latency_stays_flat_as_history_grows(db):
+    """20x more history, archived, leaves the first page as fast."""
+    _bulk(1000, 1, 'r')
+    baseline = _latency()
+    _bulk(20000, 500, 'h')
+    grown = _latency()
+    retention.archive_items(NOW)
+    after = _latency()
+
+    assert LegalFeedItem.query.count() == 1000
+    assert after < grown
+    assert after < baseline * 2 + 0.005
@@ -1,7 +1,12 @@
 """Tests for the RSS feed parser."""
 import os
+import time
 from datetime import datetime
-from app.services.legal_feed import rss
+
+import feedparser
+import pytest
+
+from app.services.legal_feed import rss, rss_fast
 
 FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'sample_feed.xml')
 
@@ -44,3 +49,118 @@ def test_parse_feed_falls_back_to_enclosure_image():
         <enclosure url="http://img/enc.png" type="image/png"/></item>
     </channel></rss>'''
     assert rss.parse_feed(raw)[0]['image_url'] == 'http://img/enc.png'
+
+
+def test_timeout_for_uses_host_overrides():
+    overrides = {'livelaw.in': 45.0}
+    assert rss.timeout_for('https://www.livelaw.in/feed', overrides) == (rss.DEFAULT_TIMEOUT[0], 45.0)
+    assert rss.timeout_for('https://barandbench.com/feed', overrides) == rss.DEFAULT_TIMEOUT
+
+
+def test_host_timeouts_env(monkeypatch):
+    monkeypatch.setenv('LEGAL_FEED_HOST_TIMEOUTS', 'livelaw.in=45, bad=x')
+    assert rss.host_timeouts() == {'livelaw.in': 45.0}
+
+
+RSS = ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0" '
+       'xmlns:media="http://search.yahoo.com/mrss/" '
+       'xmlns:content="http://purl.org/rss/1.0/modules/content/" '
+       'xmlns:dc="http://purl.org/dc/elements/1.1/" '
+       'xmlns:atom="http://www.w3.org/2005/Atom"><channel><title>T</title>%s</channel></rss>')
+ATOM = ('<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom" '
+        'xmlns:media="http://search.yahoo.com/mrss/"><title>T</title>%s</feed>')
+ITEMS = [
+    '<item><title>Tom &amp; Jerry &lt; 3</title><link>http://x/?a=1&amp;b=2</link>'
+    '<description>Tom &amp; Jerry &lt; 3 &gt; 2</description></item>',
+    '<item><title>A &lt;b&gt;B&lt;/b&gt;</title><link>http://x/2</link><description><![CDATA['
+    '<p>Para <script>bad()</script><a href="/rel" onclick="x">l</a></p>]]></description></item>',
+    '<item><title>  spaced\n title </title><link>\n http://x/3 \n</link>'
+    '<description>\n multi\n line\t text \n</description></item>',
+    '<item><title>Guid</title><guid>http://x/guid</guid></item>',
+    '<item><title>Not a permalink</title><guid isPermaLink="false">abc</guid></item>',
+    '<item><title>Empty link</title><link/><guid>http://x/g2</guid></item>',
+    '<item><title>Encoded</title><link>http://x/e</link>'
+    '<content:encoded><![CDATA[<p>Body</p>]]></content:encoded><description>Desc</description></item>',
+    '<item><title>Two descriptions</title><link>http://x/d</link>'
+    '<description>one</description><description>two</description></item>',
+    '<item><title>DC</title><link>http://x/dc</link><dc:date>2026-06-17T10:00:00Z</dc:date></item>',
+    '<item><title>IST</title><link>http://x/ist</link><pubDate>Tue, 17 Jun 2026 10:00:00 IST</pubDate></item>',
+    '<item><title>Bad date</title><link>http://x/bd</link><pubDate>yesterday</pubDate></item>',
+    '<item><title>Media</title><link>http://x/m</link><media:group>'
+    '<media:content url="http://img/g.jpg"/></media:group><media:thumbnail url="http://img/t.jpg"/></item>',
+    '<item><title>Thumb</title><link>http://x/t</link><media:thumbnail>http://img/tt.jpg</media:thumbnail></item>',
+    '<item><title>Enclosures</title><link>http://x/et</link><enclosure url="http://a/a.mp3" type="audio/mpeg"/>'
+    '<enclosure url="http://a/b.jpg" type="image/jpeg"/></item>',
+    '<item><title>Atom link</title><atom:link href="http://x/al" rel="alternate"/></item>',
+    '<item><title>Café — € Ã©</title><link>http://x/u</link><description>naïve “quotes”</description></item>',
+    '<item><title></title><title>Second</title><link>http://x/tt</link></item>',
+    '<item><TITLE>Upper</TITLE><Link>http://x/up</Link><pubdate>Tue, 17 Jun 2026 10:00:00 GMT</pubdate></item>',
+]
+ENTRIES = [
+    '<entry><title>Atom</title><link href="http://x/a1"/><id>urn:1</id><summary>S</summary>'
+    '<published>2026-06-17T10:00:00Z</published></entry>',
+    '<entry><title type="html">A &lt;b&gt;b&lt;/b&gt;</title><link href="http://x/a2"/>'
+    '<link rel="enclosure" type="image/png" href="http://img/a.png"/>'
+    '<content type="html">&lt;p&gt;c&lt;/p&gt;</content></entry>',
+    '<entry><title>Id as link</title><id>http://x/id</id><updated>2026-06-18T10:00:00Z</updated>'
+    '<content>text &lt;b&gt;x&lt;/b&gt;</content></entry>',
+    '<entry><title>Two links</title><link href="http://x/first"/><link href="http://x/second"/>'
+    '<link rel="self" href="http://x/self"/></entry>',
+]
+
+
+def _fields(entries):
+    return [(e.get('title'), e.get('summary'), e.get('link'), rss._parse_date(e),
+             rss._extract_image(e)) for e in entries]
+
+
+@pytest.mark.parametrize('raw', [_raw()] + [RSS % i for i in ITEMS] + [ATOM % e for e in ENTRIES]
+                         + [RSS % ''.join(ITEMS), ATOM % ''.join(ENTRIES)])
+def test_fast_path_matches_feedparser(raw):
+    assert _fields(rss_fast.parse_entries(raw)) == _fields(feedparser.parse(raw).entries)
+
+
+@pytest.mark.parametrize('raw', [
+    '<rss version="2.0"><channel><item><title>A&nbsp;B</title><link>http://l</link></item></channel></rss>',
+    '<rss version="2.0"><channel><item><title>A & B</title><link>http://l</link></item></channel></rss>',
+    '<?xml version="1.0" encoding="iso-8859-1"?><rss version="2.0"><channel>'
+    '<item><title>café</title><link>http://l</link></item></channel></rss>',
+    '<rss version="2.0" xml:base="http://base/"><channel><item><title>b</title><link>rel</link></item></channel></rss>',
+    RSS % '<item><title>T</title><link>http://l</link><media:title>Media title</media:title></item>',
+])
+def test_unsupported_feeds_fall_back_to_feedparser(raw):
+    with pytest.raises(rss_fast.Unsupported):
+        rss_fast.parse_entries(raw)
+    expected = feedparser.parse(raw).entries
+    assert expected and _fields(rss.parse_entries(raw)) == _fields(expected)
+    assert rss.parse_feed(raw)[0]['source_url'] == expected[0]['link']
+
+
+def _long_feed(n):
+    return RSS % ''.join(
+        f'<item><title>Case {i} v. State &amp; Ors</title><link>https://x.org/doc/{i}/</link>'
+        f'<guid isPermaLink="false">id-{i}</guid>'
+        f'<description>The bench held in case {i} that the impugned order could not stand.</description>'
+        f'<pubDate>Tue, 17 Jun 2026 10:{i % 60:02d}:00 +0530</pubDate>'
+        f'<media:content url="https://img/{i}.jpg" medium="image"/></item>' for i in range(n))
+
+
+def test_fast_path_matches_feedparser_on_long_feeds():
+    raw = _long_feed(1000)
+    fast = _fields(rss_fast.parse_entries(raw))
+    assert fast == _fields(feedparser.parse(raw).entries) and len(fast) == 1000
+
+
+@pytest.mark.benchmark
+def test_fast_path_outpaces_feedparser_on_long_feeds():
+    """Same items, a fraction of feedparser's time."""
+    raw = _long_feed(1000)
+    started = time.perf_counter()
+    slow = _fields(feedparser.parse(raw).entries)
+    slow_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    fast = _fields(rss_fast.parse_entries(raw))
+    fast_seconds = time.perf_counter() - started
+
+    assert fast == slow and len(fast) == 1000
+    assert fast_seconds < slow_seconds / 2, f'{fast_seconds:.3f}s vs {slow_seconds:.3f}s'
@@ -0,0 +1,193 @@
+"""Tests for legal feed ingestion runs as resumable background jobs."""
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import db, LegalFeedSource, LegalFeedItem, LegalFeedRun
+from app.services.legal_feed import ingest, rss
+from app.services.legal_feed.enrichment import FakeEnrichment
+
+
+class Killed(BaseException):
+    """Stands in for the worker process dying (not caught like an error)."""
+
+
+def _feed(tag, n=1):
+    items = ''.join(f'<item><title>{tag} story {i}</title>'
+                    f'<link>https://{tag}.example/{i}</link>'
+                    f'<description>About {tag} {i}</description></item>' for i in range(n))
+    return f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'
+
+
+def _add_source(name):
+    s = LegalFeedSource(name=name, content_type='news', kind='rss',
+                        feed_url=f'https://{name}.example/feed', enabled=True, weight=1)
+    db.session.add(s)
+    db.session.commit()
+    return s
+
+
+def _serve(calls):
+    def fetch(url, etag=None, last_modified=None, timeout=None):
+        tag = url.split('//')[1].split('.')[0]
+        calls.append(tag)
+        body = _feed(tag, 2)
+        return rss.FetchResult(body, None, None, size=len(body))
+    return fetch
+
+
+def _orphan(run_id):
+    """What a dead worker leaves behind: running, with a stale heartbeat."""
+    db.session.rollback()
+    run = db.session.get(LegalFeedRun, run_id)
+    assert run.status == 'running'
+    run.heartbeat_at = datetime.utcnow() - ingest.STALE_AFTER - timedelta(seconds=1)
+    db.session.commit()
+    return run
+
+
+def _admin(monkeypatch):
+    monkeypatch.setenv('ADMIN_PASSWORD', 'pw')
+    return {'Authorization': 'Basic ' + base64.b64encode(b'admin:pw').decode()}
+
+
+def test_endpoints_queue_one_run_and_return_at_once(client, db, monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(ingest, 'dispatch', dispatched.append)
+    monkeypatch.setenv('LEGAL_FEED_INGEST_SECRET', 's')
+
+    first = client.post('/api/v1/legal-feed/ingest', headers={'X-Ingest-Secret': 's'})
+    assert first.status_code == 202
+    body = first.get_json()
+    assert body['status'] == 'queued' and body['stage'] == 'fetch'
+
+    # A second trigger while the first is active gets the same run.
+    again = client.post('/admin/api/legal-feed/run', headers=_admin(monkeypatch))
+    assert again.status_code == 202
+    assert again.get_json()['id'] == body['id']
+    assert dispatched == [body['id']]
+    assert LegalFeedRun.query.count() == 1
+
+    polled = client.get(f"/admin/api/legal-feed/runs/{body['id']}", headers=_admin(monkeypatch))
+    assert polled.get_json()['status'] == 'queued'
+    assert client.get('/admin/api/legal-feed/runs/999',
+                      headers=_admin(monkeypatch)).status_code == 404
+
+
+def test_concurrent_submit_returns_the_run_that_won(db, monkeypatch):
+    winner, created = ingest.submit_run('scheduled')
+    assert created
+    real_active_run = ingest.active_run
+    checks = iter([None])   # the loser's check ran before the winner committed
+    monkeypatch.setattr(ingest, 'active_run', lambda: next(checks, None) or real_active_run())
+
+    run, created = ingest.submit_run('manual')
+
+    assert (run.id, created) == (winner.id, False)
+    assert LegalFeedRun.query.count() == 1
+
+
+def test_killed_fetch_resumes_with_remaining_sources(db, monkeypatch):
+    for name in ('alpha', 'beta', 'gamma'):
+        _add_source(name)
+    calls = []
+    monkeypatch.setattr(rss, 'fetch', _serve(calls))
+    real_insert = ingest.insert_new_items
+
+    def dies_on_beta(source, items, now):
+        if source.name == 'beta':
+            raise Killed()
+        return real_insert(source, items, now)
+
+    monkeypatch.setattr(ingest, 'insert_new_items', dies_on_beta)
+    run, _ = ingest.submit_run('scheduled')
+    with pytest.raises(Killed):
+        ingest.run_job(run.id)
+    db.session.rollback()
+    # Its heartbeat is fresh: nobody else takes it over yet.
+    assert ingest.claim_run(run.id) is False
+
+    run = _orphan(run.id)
+    assert run.state['done'] == [LegalFeedSource.query.filter_by(name='alpha').one().id]
+    assert ingest.submit_run('manual') == (run, False)
+    calls.clear()
+    monkeypatch.setattr(ingest, 'insert_new_items', real_insert)
+    result = ingest.run_job(run.id)
+
+    assert sorted(calls) == ['beta', 'gamma']  # alpha is not fetched again
+    assert result['status'] == 'success'
+    assert result['attempts'] == 2
+    assert result['total_ingested'] == 6
+    assert sorted(r['source_id'] for r in result['results']) == \
+        [s.id for s in LegalFeedSource.query.order_by(LegalFeedSource.id)]
+    assert LegalFeedItem.query.count() == 6
+    assert db.session.get(LegalFeedRun, run.id).state == {}
+
+
+def test_killed_enrichment_resumes_after_last_chunk(db, monkeypatch):
+    _add_source('alpha')
+    monkeypatch.setattr(rss, 'fetch', _serve([]))
+    monkeypatch.setattr(ingest, 'ENRICH_COMMIT_CHUNK', 1)
+    client = FakeEnrichment()
+    monkeypatch.setattr(ingest, 'get_enrichment_client', lambda: client)
+    real_enrich = ingest.enrich_items
+    seen = []
+
+    def dies_on_second(items, c):
+        seen.extend(it.id for it in items)
+        if len(seen) == 2:
+            raise Killed()
+        return real_enrich(items, c)
+
+    monkeypatch.setattr(ingest, 'enrich_items', dies_on_second)
+    run, _ = ingest.submit_run('manual')
+    with pytest.raises(Killed):
+        ingest.run_job(run.id)
+
+    run = _orphan(run.id)
+    assert run.stage == 'enrich' and run.state['enrich_done'] == 1
+    monkeypatch.setattr(ingest, 'enrich_items', lambda items, c: (
+        seen.extend(it.id for it in items), real_enrich(items, c))[1])
+    result = ingest.run_job(run.id)
+
+    first, second = sorted(it.id for it in LegalFeedItem.query)
+    assert seen == [first, second, second]  # the first item is not enriched twice
+    assert result['enriched'] == 2 and result['stage'] == 'done'
+    assert LegalFeedItem.query.filter(LegalFeedItem.enriched_at.is_(None)).count() == 0
+
+
+def test_run_records_per_stage_telemetry(db, monkeypatch):
+    _add_source('alpha')
+    _add_source('beta')
+    monkeypatch.setattr(rss, 'fetch', _serve([]))
+    monkeypatch.setattr(ingest, 'get_enrichment_client', lambda: FakeEnrichment())
+
+    result = ingest.run_ingestion('manual')
+
+    telemetry = result['telemetry']
+    for stage in ('fetch', 'parse', 'write'):
+        assert telemetry[stage]['count'] == 2
+        assert telemetry[stage]['p50_ms'] <= telemetry[stage]['p95_ms'] <= telemetry[stage]['max_ms']
+    assert telemetry['fetch']['bytes'] == sum(r['bytes'] for r in result['results']) > 0
+    assert telemetry['enrich']['items'] == 4
+    assert telemetry['api_calls']['complete'] == 4
+    assert telemetry['api_calls']['embed'] >= 1
+    assert all({'fetch_ms', 'parse_ms', 'write_ms'} <= set(r) for r in result['results'])
+
+
+def test_status_poll_redispatches_orphaned_run(client, db, monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(ingest, 'dispatch', dispatched.append)
+    h = _admin(monkeypatch)
+    run_id = client.post('/admin/api/legal-feed/run', headers=h).get_json()['id']
+    run = db.session.get(LegalFeedRun, run_id)
+    run.status = 'running'
+    db.session.commit()
+
+    client.get(f'/admin/api/legal-feed/runs/{run_id}', headers=h)
+    assert dispatched == [run_id]  # still fresh: left alone
+
+    _orphan(run_id)
+    client.get(f'/admin/api/legal-feed/runs/{run_id}', headers=h)
+    assert dispatched == [run_id, run_id]
@@ -0,0 +1,249 @@
+"""Tests for feed image thumbnails (prefetch, storage and the proxy endpoint)."""
+import io
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+
+from app.models.models import db, LegalFeedItem, LegalFeedRun, LegalFeedSource, LegalFeedThumbnail
+from app.services import document_storage
+from app.services.legal_feed import ingest, rss, thumbnails
+from app.services.legal_feed.ingest import run_ingestion
+from app.services.legal_feed.telemetry import RunTelemetry
+
+
+def _image(size=(2000, 1500), fmt='JPEG', mode='RGB') -> bytes:
+    buf = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(buf, fmt)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def origin(monkeypatch):
+    """Thumbnails on, a fake publisher CDN and an in-memory storage bucket."""
+    monkeypatch.setattr(thumbnails, 'ENABLED', True)
+    monkeypatch.setattr(thumbnails, '_memory', thumbnails.OrderedDict())
+    fake = {'images': {}, 'fetched': [], 'stored': {}, 'queued': []}
+
+    def fetch_image(url):
+        fake['fetched'].append(url)
+        if url not in fake['images']:
+            raise thumbnails.ThumbnailError('404')
+        return fake['images'][url]
+
+    def put_object(path, data, content_type, bucket=None, upsert=False):
+        fake['stored'][(bucket, path)] = (data, content_type)
+
+    def get_object(path, bucket=None):
+        if (bucket, path) not in fake['stored']:
+            raise document_storage.StorageError('missing')
+        return fake['stored'][(bucket, path)][0]
+
+    def dispatch_prefetch(url):   # inline, after the request that queued it
+        fake['queued'].append(url)
+        thumbnails.prefetch([url])
+
+    monkeypatch.setattr(thumbnails, 'fetch_image', fetch_image)
+    monkeypatch.setattr(thumbnails, 'dispatch_prefetch', dispatch_prefetch)
+    monkeypatch.setattr(document_storage, 'put_object', put_object)
+    monkeypatch.setattr(document_storage, 'get_object', get_object)
+    return fake
+
+
+def _item(url, key='k1'):
+    it = LegalFeedItem(content_type='news', title='t', source_url='u', source_name='s',
+                       dedup_key=key, image_url=url)
+    db.session.add(it)
+    db.session.commit()
+    return it
+
+
+def test_render_crops_to_fixed_size_in_both_formats():
+    for data in (_image(), _image((300, 900), 'PNG', 'RGBA')):
+        out = thumbnails.render(data)
+        assert Image.open(io.BytesIO(out['webp'])).format == 'WEBP'
+        jpeg = Image.open(io.BytesIO(out['jpg']))
+        assert jpeg.format == 'JPEG' and jpeg.size == thumbnails.SIZE
+    with pytest.raises(thumbnails.ThumbnailError):
+        thumbnails.render(b'<html>not an image</html>')
+
+
+def test_prefetch_fetches_each_url_once(db, origin):
+    origin['images']['http://cdn/a.jpg'] = _image()
+    made = thumbnails.prefetch(['http://cdn/a.jpg', 'http://cdn/a.jpg', 'http://cdn/gone.jpg'])
+    assert made == {'created': 1, 'failed': 1}
+    key = thumbnails.url_hash('http://cdn/a.jpg')
+    assert set(origin['stored']) == {(thumbnails.BUCKET, f'{key}.webp'),
+                                     (thumbnails.BUCKET, f'{key}.jpg')}
+    assert db.session.get(LegalFeedThumbnail, key).status == 'ready'
+
+    # Done and recently failed URLs are not fetched again.
+    assert thumbnails.prefetch(['http://cdn/a.jpg', 'http://cdn/gone.jpg']) == \
+        {'created': 0, 'failed': 0}
+    assert len(origin['fetched']) == 2
+
+
+def test_endpoint_serves_cached_thumbnail_with_long_lived_headers(client, db, origin):
+    origin['images']['http://cdn/a.jpg'] = _image()
+    it = _item('http://cdn/a.jpg')
+    thumbnails.prefetch([it.image_url])
+    thumbnails._memory.clear()   # a fresh process: bytes come from storage
+
+    webp = client.get(f'/api/v1/legal-feed/items/{it.id}/image',
+                      headers={'Accept': 'image/avif,image/webp,*/*'})
+    assert webp.status_code == 200 and webp.mimetype == 'image/webp'
+    assert 'immutable' in webp.headers['Cache-Control']
+    assert webp.headers['Vary'] == 'Accept'
+    jpeg = client.get(f'/api/v1/legal-feed/items/{it.id}/image', headers={'Accept': 'image/*'})
+    assert jpeg.mimetype == 'image/jpeg'
+    assert Image.open(io.BytesIO(jpeg.data)).size == thumbnails.SIZE
+    assert origin['fetched'] == ['http://cdn/a.jpg']   # never refetched
+
+    again = client.get(f'/api/v1/legal-feed/items/{it.id}/image',
+                       headers={'Accept': 'image/webp', 'If-None-Match': webp.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_endpoint_queues_missing_thumbnail_and_404s_failures(client, db, origin):
+    origin['images']['http://cdn/late.png'] = _image((800, 800), 'PNG')
+    late = _item('http://cdn/late.png', 'k1')
+    broken = _item('http://cdn/broken.jpg', 'k2')
+    bare = _item(None, 'k3')
+
+    # A miss is never fetched on the request: 404 now, queued for prefetch.
+    assert client.get(f'/api/v1/legal-feed/items/{late.id}/image').status_code == 404
+    assert origin['queued'] == ['http://cdn/late.png']
+    assert client.get(f'/api/v1/legal-feed/items/{late.id}/image').status_code == 200
+    assert client.get(f'/api/v1/legal-feed/items/{broken.id}/image').status_code == 404
+    assert client.get(f'/api/v1/legal-feed/items/{broken.id}/image').status_code == 404
+    assert origin['fetched'].count('http://cdn/broken.jpg') == 1   # failure remembered
+    assert client.get(f'/api/v1/legal-feed/items/{bare.id}/image').status_code == 404
+
+    row = db.session.get(LegalFeedThumbnail, thumbnails.url_hash('http://cdn/broken.jpg'))
+    row.created_at = datetime.utcnow() - thumbnails.RETRY_AFTER - timedelta(minutes=1)
+    db.session.commit()
+    client.get(f'/api/v1/legal-feed/items/{broken.id}/image')
+    assert origin['fetched'].count('http://cdn/broken.jpg') == 2   # retried later
+
+
+class _Redirect:
+    is_redirect = True
+    headers = {'Location': 'http://metadata.internal/latest/meta-data/'}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_fetch_image_refuses_non_public_hosts_and_redirects(monkeypatch):
+    addresses = {'cdn.example': '93.184.216.34', 'metadata.internal': '169.254.169.254',
+                 'mapped.example': '::ffff:127.0.0.1'}
+    monkeypatch.setattr(socket, 'getaddrinfo', lambda host, *a, **kw: [
+        (socket.AF_INET, socket.SOCK_STREAM, 6, '', (addresses.get(host, host), 80))])
+    requested = []
+    monkeypatch.setattr(thumbnails.requests.Session, 'get',
+                        lambda self, url, **kw: requested.append((url, kw)) or _Redirect())
+
+    for url in ('http://127.0.0.1/a.jpg', 'http://10.1.2.3/a.jpg', 'http://[::1]/a.jpg',
+                'http://metadata.internal/a.jpg', 'http://mapped.example/a.jpg',
+                'file:///etc/passwd'):
+        with pytest.raises(thumbnails.ThumbnailError):
+            thumbnails.fetch_image(url)
+    assert requested == []
+
+    # The public first hop is fetched; its redirect to a private host is not.
+    with pytest.raises(thumbnails.ThumbnailError, match='non-public'):
+        thumbnails.fetch_image('https://cdn.example/a.jpg')
+    assert [url for url, _ in requested] == ['https://cdn.example/a.jpg']
+    assert requested[0][1]['allow_redirects'] is False
+
+
+def test_fetch_image_connects_to_the_checked_address(monkeypatch):
+    """A second lookup (DNS rebinding) is never made: the connection goes to
+    the address check_public vetted, under the original Host and SNI."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append(self.headers['Host'])
+            self.send_response(200)
+            self.send_header('Content-Length', '3')
+            self.end_headers()
+            self.wfile.write(b'img')
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    # 'cdn.invalid' does not resolve: only the pinned address can answer.
+    monkeypatch.setattr(thumbnails, 'check_public', lambda url: '127.0.0.1')
+    try:
+        assert thumbnails.fetch_image(f'http://cdn.invalid:{port}/a.jpg') == b'img'
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert seen == [f'cdn.invalid:{port}']
+
+    adapter = thumbnails._PinnedAdapter('cdn.example', '93.184.216.34')
+    pool = adapter.poolmanager.connection_from_url('https://93.184.216.34/')
+    assert pool.conn_kw['server_hostname'] == 'cdn.example'
+
+
+def test_ingestion_prefetches_new_items_images(db, origin, monkeypatch):
+    db.session.add(LegalFeedSource(name='S', content_type='news', kind='rss',
+                                   feed_url='http://feed', enabled=True, weight=1))
+    db.session.commit()
+    origin['images']['http://img/a'] = _image()
+    monkeypatch.setattr(rss, 'fetch', lambda *a, **kw: rss.FetchResult('raw', None, None))
+    monkeypatch.setattr(rss, 'parse_feed', lambda raw: [
+        {'title': 'News A', 'summary': 's', 'source_url': 'http://x/a',
+         'published_at': None, 'image_url': 'http://img/a'},
+    ])
+
+    result = run_ingestion('manual')
+
+    assert result['stage'] == 'done'
+    assert result['telemetry']['images']['count'] == 1
+    assert db.session.get(LegalFeedThumbnail, thumbnails.url_hash('http://img/a')).status == 'ready'
+
+
+def test_images_stage_heartbeats_per_chunk_and_resumes(db, origin, monkeypatch):
+    monkeypatch.setattr(ingest, 'IMAGES_CHUNK', 2)
+    items = [_item(f'http://cdn/{i}.jpg', f'k{i}') for i in range(5)]
+    for it in items:
+        origin['images'][it.image_url] = _image((400, 300))
+    run = LegalFeedRun(started_at=datetime.utcnow(), trigger='manual', status='running',
+                       stage='images', total_ingested=0, results=[], attempts=1,
+                       state={'enrich_ids': [it.id for it in items]}, telemetry={},
+                       heartbeat_at=datetime.utcnow() - timedelta(minutes=5))
+    db.session.add(run)
+    db.session.commit()
+
+    real_prefetch = thumbnails.prefetch
+    beats = []
+
+    def dies_on_third_chunk(urls, telemetry=None):
+        beats.append(run.heartbeat_at)
+        if len(beats) == 3:
+            raise KeyboardInterrupt   # the worker dying mid-stage
+        return real_prefetch(urls, telemetry)
+
+    monkeypatch.setattr(thumbnails, 'prefetch', dies_on_third_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        ingest._images_stage(run, RunTelemetry())
+    db.session.rollback()
+    assert run.state['images_done'] == 4 and run.stage == 'images'
+    assert beats[0] < beats[1] < beats[2]   # heartbeat moved after every chunk
+
+    monkeypatch.setattr(thumbnails, 'prefetch', real_prefetch)
+    ingest._images_stage(run, RunTelemetry(run.state['telemetry']))
+    assert run.stage == 'enrich'
+    assert sorted(origin['fetched']) == sorted(it.image_url for it in items)   # none twice
@@ -0,0 +1,155 @@
+"""Bank-statement reconciliation: parsing, matching, bulk apply, review queue."""
+import io
+from datetime import date
+from decimal import Decimal
+
+from app.models.models import db, Client, Invoice
+from app.models.reconciliation import BankStatementLine
+from app.services.reconciliation import parse_statement, match_lines, reference_key
+
+
+def _invoice(firm_id, client, number, total, status='sent'):
+    inv = Invoice(firm_id=firm_id, client_id=client.id, invoice_number=number,
+                  total=total, status=status)
+    db.session.add(inv)
+    db.session.commit()
+    return inv
+
+
+def _upload(client, headers, content):
+    return client.post('/api/v1/reconciliation/statements', headers=headers, data={
+        'file': (io.BytesIO(content.encode()), 'statement.csv'),
+    }, content_type='multipart/form-data')
+
+
+def test_parse_statement_keeps_credits_only():
+    csv_text = ("Txn Date,Narration,Ref No.,Debit,Credit\n"
+                "05-Jan-2026,UPI/ACME/LAW-0042,UTR1,,\"1,180.00\"\n"
+                "06/01/2026,ATM WDL,UTR2,500.00,\n")
+    lines, skipped = parse_statement(csv_text)
+    assert skipped == 1
+    [line] = lines
+    assert line['amount'] == Decimal('1180.00')
+    assert line['txn_date'] == date(2026, 1, 5)
+    assert line['reference'] == 'UTR1'
+
+
+def test_reference_key_normalises():
+    assert reference_key('law/0042') == 'LAW0042'
+    assert reference_key('0042') == '0042'
+
+
+def test_date_and_utr_fragments_do_not_match_numeric_invoices():
+    invoices = [(1, '0005', Decimal('10000'), 'Acme Traders'),
+                (2, '0012', Decimal('10000'), 'Bharat Steel')]
+    lines = [{'amount': Decimal('10000'), 'reference': '',
+              'description': 'UPI CR 05-06-2026 BHSTL', 'payer': ''},
+             {'amount': Decimal('10000'), 'reference': 'UTR 000512 0005',
+              'description': 'IMPS 2026 0012', 'payer': ''}]
+    first, second = match_lines(lines, invoices)
+    assert first['status'] == 'review' and first['invoice_id'] is None
+    assert all('reference' not in c['reasons'] for c in first['candidates'])
+    # a bare short number is only a hint: both invoices are named, neither applied
+    assert second['status'] == 'review'
+    assert {c['invoice_id'] for c in second['candidates']
+            if 'reference' in c['reasons']} == {1, 2}
+
+
+def test_match_lines_signals():
+    invoices = [(1, 'LAW-0042', Decimal('1180'), 'Acme Traders'),
+                (2, 'LAW-0043', Decimal('500'), 'Beta LLP'),
+                (3, 'LAW-0044', Decimal('500'), 'Gamma Pvt Ltd')]
+    lines = [
+        # reference echoed by the UPI app + exact amount
+        {'amount': Decimal('1180'), 'reference': '', 'description': 'UPI/123/LAW/0042', 'payer': ''},
+        # amount shared by two invoices; payer name decides
+        {'amount': Decimal('500'), 'reference': '', 'description': 'NEFT', 'payer': 'GAMMA PRIVATE'},
+        # amount only, no way to choose
+        {'amount': Decimal('500'), 'reference': '', 'description': 'CASH DEP', 'payer': ''},
+        {'amount': Decimal('7'), 'reference': '', 'description': 'INTEREST', 'payer': ''},
+    ]
+    res = match_lines(lines, invoices)
+    assert [r['status'] for r in res] == ['applied', 'applied', 'review', 'unmatched']
+    assert res[0]['invoice_id'] == 1
+    assert res[0]['candidates'][0]['reasons'] == ['reference', 'amount']
+    assert res[1]['invoice_id'] == 3
+    assert {c['invoice_id'] for c in res[2]['candidates']} == {2, 3}
+
+
+def test_contested_invoice_goes_to_review():
+    invoices = [(1, 'A-1', Decimal('100'), 'Acme')]
+    line = {'amount': Decimal('100'), 'reference': 'A-1', 'description': '', 'payer': ''}
+    res = match_lines([line, dict(line)], invoices)
+    assert [r['status'] for r in res] == ['review', 'review']
+
+
+def test_upload_applies_matches_and_queues_review(client, make_owner):
+    headers, firm_id = make_owner()
+    acme = Client(firm_id=firm_id, name='Acme Traders')
+    beta = Client(firm_id=firm_id, name='Beta LLP')
+    db.session.add_all([acme, beta])
+    db.session.commit()
+    inv1 = _invoice(firm_id, acme, 'LAW-0042', 1180)
+    inv2 = _invoice(firm_id, beta, 'LAW-0043', 500)
+    inv3 = _invoice(firm_id, beta, 'LAW-0044', 500)
+    _invoice(firm_id, acme, 'LAW-0001', 250, status='paid')
+
+    csv_text = ("Date,Description,Amount,Type\n"
+                "2026-02-01,UPI-LAW0042-ACME,1180,CR\n"
+                "2026-02-02,NEFT BETA,500,CR\n"
+                "2026-02-03,NEFT ACME,250,CR\n"
+                "2026-02-03,CHARGES,20,DR\n")
+    resp = _upload(client, headers, csv_text)
+    assert resp.status_code == 201
+    body = resp.get_json()
+    assert body['counts'] == {'applied': 1, 'review': 1, 'unmatched': 1, 'skipped': 1}
+
+    db.session.expire_all()
+    paid = Invoice.query.get(inv1.id)
+    assert paid.status == 'paid' and paid.paid_date == date(2026, 2, 1)
+
+    queue = client.get('/api/v1/reconciliation/review', headers=headers).get_json()
+    [line] = queue['data']
+    assert {c['invoice_number'] for c in line['candidates']} == {'LAW-0043', 'LAW-0044'}
+
+    resp = client.post(f"/api/v1/reconciliation/lines/{line['id']}/resolve", headers=headers,
+                       json={'invoice_id': inv3.id})
+    assert resp.status_code == 200 and resp.get_json()['status'] == 'applied'
+    db.session.expire_all()
+    assert Invoice.query.get(inv3.id).status == 'paid'
+    assert Invoice.query.get(inv2.id).status == 'sent'
+    assert client.get('/api/v1/reconciliation/review', headers=headers).get_json()['total'] == 0
+
+
+def test_resolve_rejects_foreign_invoice(client, make_owner):
+    headers, firm_a = make_owner()
+    _, firm_b = make_owner(supabase_id='sb-2', email='b@firm.com', firm_name='B')
+    mine = Client(firm_id=firm_a, name='Acme')
+    theirs = Client(firm_id=firm_b, name='Acme')
+    db.session.add_all([mine, theirs])
+    db.session.commit()
+    _invoice(firm_a, mine, 'X-1', 100)
+    _invoice(firm_a, mine, 'X-2', 100)
+    foreign = _invoice(firm_b, theirs, 'X-3', 100)
+
+    _upload(client, headers, "Date,Narration,Credit\n2026-01-01,CASH,100\n")
+    line = BankStatementLine.query.filter_by(firm_id=firm_a, status='review').one()
+    resp = client.post(f'/api/v1/reconciliation/lines/{line.id}/resolve', headers=headers,
+                       json={'invoice_id': foreign.id})
+    assert resp.status_code == 400
+    assert Invoice.query.get(foreign.id).status == 'sent'
+
+    resp = client.post(f'/api/v1/reconciliation/lines/{line.id}/resolve', headers=headers,
+                       json={'dismiss': True})
+    assert resp.get_json()['status'] == 'dismissed'
+
+
+def test_large_statement_matches():
+    invoices = [(i, f'LAW-{i:05d}', Decimal(1000 + i), f'Client {i % 500}') for i in range(5000)]
+    lines = [{'amount': Decimal(1000 + i % 5000), 'reference': f'UTR{i}',
+              'description': f'UPI/{900000 + i}/LAW/{i % 5000:05d}', 'payer': f'CLIENT {i % 500}'}
+             for i in range(20000)]
+    res = match_lines(lines, invoices)
+    # every invoice is paid four times over, so all lines are contested
+    assert {r['status'] for r in res} == {'review'}
+    assert res[0]['candidates'][0]['invoice_id'] == 0
@@ -0,0 +1,99 @@
+"""Streaming CSV/XLSX register exports for invoices, case files and expenses."""
+import csv
+import io
+from datetime import date
+
+from openpyxl import load_workbook
+
+from app.models.models import db, Client, Invoice
+from app.models.case import CaseFile, CaseExpense
+from app.services import register_export
+
+
+def _seed(firm_id):
+    acme = Client(firm_id=firm_id, name='Acme')
+    beta = Client(firm_id=firm_id, name='=Beta')  # formula-looking name
+    db.session.add_all([acme, beta])
+    db.session.flush()
+    case = CaseFile(firm_id=firm_id, case_number='CF/1', title='Acme v. State', client_id=acme.id)
+    db.session.add(case)
+    db.session.flush()
+    db.session.add_all([
+        Invoice(firm_id=firm_id, invoice_number='0001', client_id=acme.id, case_file_id=case.id,
+                invoice_date=date(2026, 1, 5), total=1180, status='paid'),
+        Invoice(firm_id=firm_id, invoice_number='0002', client_id=beta.id,
+                invoice_date=date(2026, 2, 5), total=500, status='sent'),
+        CaseExpense(firm_id=firm_id, case_file_id=case.id, description='Court fee',
+                    category='court_fee', amount=250, expense_date=date(2026, 1, 2)),
+    ])
+    db.session.commit()
+    return case
+
+
+def _csv(resp):
+    return list(csv.reader(io.StringIO(resp.get_data(as_text=True))))
+
+
+def test_invoice_csv_streams_with_list_filters(client, make_owner):
+    headers, firm_id = make_owner()
+    _seed(firm_id)
+    resp = client.get('/api/v1/invoices/export?status=paid', headers=headers)
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert resp.mimetype == 'text/csv'
+    assert 'attachment; filename="invoices-' in resp.headers['Content-Disposition']
+    rows = _csv(resp)
+    assert rows[0][:5] == ['Invoice No.', 'Invoice Date', 'Due Date', 'Client', 'Case No.']
+    assert len(rows) == 2
+    assert rows[1][:5] == ['0001', '2026-01-05', '', 'Acme', 'CF/1']
+
+
+def test_invoice_export_sorts_and_escapes_formulas(client, make_owner):
+    headers, firm_id = make_owner()
+    _seed(firm_id)
+    rows = _csv(client.get('/api/v1/invoices/export?sort=client_name&order=asc', headers=headers))
+    assert [r[3] for r in rows[1:]] == ["'=Beta", 'Acme']
+
+
+def test_invoice_xlsx(client, make_owner):
+    headers, firm_id = make_owner()
+    _seed(firm_id)
+    resp = client.get('/api/v1/invoices/export?format=xlsx', headers=headers)
+    assert resp.status_code == 200
+    ws = load_workbook(io.BytesIO(resp.get_data())).active
+    values = list(ws.values)
+    assert values[0][0] == 'Invoice No.'
+    assert [v[0] for v in values[1:]] == ['0002', '0001']
+    assert float(values[2][10]) == 1180.0
+
+
+def test_unknown_format_rejected(client, make_owner):
+    headers, _ = make_owner()
+    resp = client.get('/api/v1/invoices/export?format=pdf', headers=headers)
+    assert resp.status_code == 400
+
+
+def test_case_file_and_expense_exports(client, make_owner):
+    headers, firm_id = make_owner()
+    case = _seed(firm_id)
+    rows = _csv(client.get('/api/v1/case-files/export?search=acme', headers=headers))
+    assert rows[1][:3] == ['CF/1', 'Acme v. State', 'Acme']
+
+    rows = _csv(client.get(f'/api/v1/case-files/{case.id}/expenses/export', headers=headers))
+    assert rows == [['Date', 'Category', 'Description', 'Amount'],
+                    ['2026-01-02', 'court_fee', 'Court fee', '250.00']]
+
+
+def test_expense_export_is_firm_scoped(client, make_owner):
+    _, firm_a = make_owner()
+    headers_b, _ = make_owner(supabase_id='sb-2', email='b@firm.com', firm_name='B')
+    case = _seed(firm_a)
+    resp = client.get(f'/api/v1/case-files/{case.id}/expenses/export', headers=headers_b)
+    assert resp.status_code == 404
+
+
+def test_csv_flushes_in_chunks(monkeypatch):
+    monkeypatch.setattr(register_export, 'FLUSH_BYTES', 10)
+    chunks = list(register_export._csv_chunks(['a'], ([str(i) * 5] for i in range(4))))
+    assert len(chunks) > 2
+    assert ''.join(chunks).splitlines() == ['a', '00000', '11111', '22222', '33333']
@@ -281,7 +281,7 @@ export interface CaseFile {
   opposing_counsel?: string;
   stage: string;
   priority: string;
-  position: number;
+  position: string;
   handling_advocate_user_id?: number | null;
   filing_date?: string | null;
   next_hearing_date?: string | null;
@@ -289,10 +289,37 @@ export interface CaseFile {
   description?: string;
   agreed_fee?: number | null;
   parties?: CaseParty[];
+  summary?: CaseSummary;
   created_at?: string;
   updated_at?: string;
 }
 
+/** Card aggregates, returned by the case list and the board. */
+export interface CaseSummary {
+  document_count: number;
+  open_task_count: number;
+  outstanding_fees: number;
+  last_activity_at: string | null;
+}
+
+export interface CaseMoveAnchor {
+  after_id?: number;
+  before_id?: number;
+}
+
+export interface CaseBoardColumn {
+  stage: string;
+  label: string;
+  count: number;
+  cards: CaseFile[];
+  next_cursor: string | null;
+}
+
+export interface CaseBoard {
+  columns: CaseBoardColumn[];
+  limit: number;
+}
+
 export interface CaseEvent {
   id: number;
   case_file_id: number;
@@ -709,14 +736,14 @@ export const api = {
     return res.courts;
   },
 
-  getLegalFeedForYou: async (params: { type: string; limit?: number; offset?: number }): Promise<LegalFeedItem[]> => {
+  getLegalFeedForYou: (params: { type: string; limit?: number; cursor?: string | null }) => {
     const q = new URLSearchParams({
       type: params.type,
       limit: String(params.limit ?? 10),
-      offset: String(params.offset ?? 0),
     });
-    const res = await fetchAPI<{ data: LegalFeedItem[] }>(`${API_ENDPOINTS.legalFeed}/for-you?${q}`);
-    return res.data;
+    if (params.cursor) q.append('cursor', params.cursor);
+    return fetchAPI<{ data: LegalFeedItem[]; next_cursor: string | null }>(
+      `${API_ENDPOINTS.legalFeed}/for-you?${q}`);
   },
 
   postLegalFeedEvent: (item_id: number, kind: 'click' | 'not_interested') =>
@@ -724,6 +751,9 @@ export const api = {
       method: 'POST', body: JSON.stringify({ item_id, kind }),
     }),
 
+  // Proxied thumbnail (never the publisher's URL): public, cached for a year.
+  legalFeedImageUrl: (item_id: number) => `${API_ENDPOINTS.legalFeed}/items/${item_id}/image`,
+
   getLegalFeedPreferences: () =>
     fetchAPI<LegalFeedPreference>(`${API_ENDPOINTS.legalFeed}/preferences`),
 
@@ -909,6 +939,15 @@ export const api = {
     return fetchAPI<CaseFile[]>(`${API_BASE_URL}/case-files${qs ? `?${qs}` : ''}`);
   },
 
+  getCaseBoard: (params?: { limit?: number; cursor?: string; include_closed?: boolean }) => {
+    const q = new URLSearchParams();
+    if (params?.limit) q.append('limit', String(params.limit));
+    if (params?.cursor) q.append('cursor', params.cursor);
+    if (params?.include_closed) q.append('include_closed', 'true');
+    const qs = q.toString();
+    return fetchAPI<CaseBoard>(`${API_BASE_URL}/case-files/board${qs ? `?${qs}` : ''}`);
+  },
+
   getCaseFile: (id: number) => fetchAPI<CaseFile>(`${API_BASE_URL}/case-files/${id}`),
 
   createCaseFile: (data: Partial<CaseFile>) =>
@@ -921,9 +960,15 @@ export const api = {
       method: 'PATCH', body: JSON.stringify(data),
     }),
 
-  moveCaseFile: (id: number, stage: string, position?: number) =>
+  /** Moves a card right below `after_id`, else right above `before_id`, else to the top. */
+  moveCaseFile: (id: number, stage: string, anchor?: CaseMoveAnchor) =>
     fetchAPI<CaseFile>(`${API_BASE_URL}/case-files/${id}/move`, {
-      method: 'PATCH', body: JSON.stringify({ stage, position }),
+      method: 'PATCH', body: JSON.stringify({ stage, ...anchor }),
+    }),
+
+  reorderCaseFiles: (moves: Array<{ id: number; stage?: string } & CaseMoveAnchor>) =>
+    fetchAPI<{ case_files: CaseFile[]; stage_changes: number }>(`${API_BASE_URL}/case-files/reorder`, {
+      method: 'POST', body: JSON.stringify({ moves }),
     }),
 
   deleteCaseFile: (id: number) =>
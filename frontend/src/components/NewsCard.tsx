@@ -1,9 +1,11 @@
+import { useState } from 'react';
 import { api, LegalFeedItem } from '../api';
 
 export default function NewsCard({ item, onNotInterested }: {
   item: LegalFeedItem;
   onNotInterested: (id: number) => void;
 }) {
+  const [showImage, setShowImage] = useState(Boolean(item.image_url));
   const open = () => { void api.postLegalFeedEvent(item.id, 'click'); };
   const notInterested = () => {
     void api.postLegalFeedEvent(item.id, 'not_interested');
@@ -11,6 +13,11 @@ export default function NewsCard({ item, onNotInterested }: {
   };
   return (
     <div className="break-inside-avoid mb-4 border border-rule rounded-lg p-3 bg-paper">
+      {showImage && (
+        <img src={api.legalFeedImageUrl(item.id)} alt="" loading="lazy" decoding="async"
+          width={480} height={270} onError={() => setShowImage(false)}
+          className="w-full aspect-video object-cover rounded mb-2" />
+      )}
       <div className="flex items-center gap-2 mb-1">
         <span className="eyebrow text-ink-faint">{item.source_name}</span>
         {item.published_at && (
@@ -156,6 +156,9 @@ export default function CaseVault() {
                 <span className="text-2xs font-mono text-oxblood w-28 shrink-0">{c.case_number}</span>
                 <span className="text-sm text-ink flex-1 truncate">{c.title}</span>
                 <span className="text-xs text-ink-muted w-40 truncate">{c.client_name}</span>
+                <span className="text-2xs text-ink-faint w-28 text-right">
+                  {c.summary ? `${c.summary.document_count} docs · ${c.summary.open_task_count} tasks` : ''}
+                </span>
                 <span className="text-2xs uppercase tracking-eyebrow text-ink-muted w-36 text-right">
                   {stages.find((s) => s.key === c.stage)?.label ?? c.stage}
                 </span>
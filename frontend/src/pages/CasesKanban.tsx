@@ -1,12 +1,15 @@
-import { useMemo } from 'react';
+import { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
-import { api, CaseFile } from '../api';
+import { api, CaseBoardColumn, CaseMoveAnchor } from '../api';
 import { usePermissions } from '../hooks/usePermissions';
 import { useToast } from '../contexts/ToastContext';
 
 const errMsg = (e: unknown) => (e instanceof Error ? e.message : 'Something went wrong');
 
+const formatAmount = (value: number) =>
+  '₹' + value.toLocaleString('en-IN', { maximumFractionDigits: 0 });
+
 const PRIORITY_DOT: Record<string, string> = {
   urgent: 'bg-oxblood', high: 'bg-oxblood/60', normal: 'bg-ink-faint', low: 'bg-rule',
 };
@@ -17,49 +20,68 @@ export default function CasesKanban() {
   const { has } = usePermissions();
   const canMove = has('case_files.update');
 
-  const { data: meta } = useQuery({ queryKey: ['case-meta'], queryFn: api.getCaseMeta });
-  const { data: cases = [], isLoading } = useQuery({
-    queryKey: ['case-files'], queryFn: () => api.getCaseFiles(),
+  // One request for every open column's count and first cards; "Load more"
+  // pages a single column with its cursor. Closed cases are not loaded.
+  const { data: board, isLoading } = useQuery({
+    queryKey: ['case-files', 'board'], queryFn: () => api.getCaseBoard(),
   });
 
-  const stages = (meta?.stages ?? []).filter((s) => s.key !== 'closed');
-  const byStage = useMemo(() => {
-    const map: Record<string, CaseFile[]> = {};
-    stages.forEach((s) => { map[s.key] = []; });
-    cases.forEach((c) => { if (map[c.stage]) map[c.stage].push(c); });
-    return map;
-  }, [cases, stages]);
+  // Cards loaded past the first page, per stage. Reset whenever the board refetches.
+  const [more, setMore] = useState<Record<string, CaseBoardColumn>>({});
+  const [loadingStage, setLoadingStage] = useState<string | null>(null);
+  useEffect(() => { setMore({}); }, [board]);
+
+  const loadMore = async (col: CaseBoardColumn) => {
+    const cursor = more[col.stage]?.next_cursor ?? col.next_cursor;
+    if (!cursor) return;
+    setLoadingStage(col.stage);
+    try {
+      const next = (await api.getCaseBoard({ cursor, limit: board?.limit })).columns[0];
+      setMore((m) => ({
+        ...m,
+        [col.stage]: { ...next, cards: [...(m[col.stage]?.cards ?? []), ...next.cards] },
+      }));
+    } catch (e) {
+      showToast(errMsg(e), 'error');
+    } finally {
+      setLoadingStage(null);
+    }
+  };
 
   const moveMutation = useMutation({
-    mutationFn: ({ id, stage }: { id: number; stage: string }) => api.moveCaseFile(id, stage),
+    mutationFn: ({ id, stage, ...anchor }: { id: number; stage: string } & CaseMoveAnchor) =>
+      api.moveCaseFile(id, stage, anchor),
     onSuccess: () => queryClient.invalidateQueries({ queryKey: ['case-files'] }),
     onError: (e) => showToast(errMsg(e), 'error'),
   });
 
-  const onDrop = (stage: string, e: React.DragEvent) => {
+  // Dropped on a card: lands right above it. Dropped on the column: on top.
+  const onDrop = (stage: string, e: React.DragEvent, beforeId?: number) => {
     e.preventDefault();
+    e.stopPropagation();
     const id = Number(e.dataTransfer.getData('text/case-id'));
-    if (id && canMove) moveMutation.mutate({ id, stage });
+    if (id && canMove && id !== beforeId) moveMutation.mutate({ id, stage, before_id: beforeId });
   };
 
   if (isLoading) return <div className="card p-16 flex justify-center"><div className="spinner" /></div>;
 
   return (
     <div className="flex gap-4 overflow-x-auto pb-4">
-      {stages.map((s) => (
-        <div key={s.key}
+      {(board?.columns ?? []).map((col) => (
+        <div key={col.stage}
           onDragOver={(e) => e.preventDefault()}
-          onDrop={(e) => onDrop(s.key, e)}
+          onDrop={(e) => onDrop(col.stage, e)}
           className="w-72 shrink-0">
           <div className="eyebrow mb-2 flex items-center justify-between">
-            <span>{s.label}</span>
-            <span className="text-ink-faint">{byStage[s.key]?.length ?? 0}</span>
+            <span>{col.label}</span>
+            <span className="text-ink-faint">{col.count}</span>
           </div>
           <div className="space-y-2 min-h-[60px]">
-            {(byStage[s.key] ?? []).map((c) => (
+            {[...col.cards, ...(more[col.stage]?.cards ?? [])].map((c) => (
               <Link key={c.id} to={`/cases/${c.id}`}
                 draggable={canMove}
                 onDragStart={(e) => e.dataTransfer.setData('text/case-id', String(c.id))}
+                onDrop={(e) => onDrop(col.stage, e, c.id)}
                 className="block card p-3 hover:bg-paper-deep/40 transition-colors">
                 <div className="flex items-center gap-1.5">
                   <span className={`h-1.5 w-1.5 rounded-full shrink-0 ${PRIORITY_DOT[c.priority] ?? PRIORITY_DOT.normal}`}
@@ -72,8 +94,24 @@ export default function CasesKanban() {
                 {c.next_hearing_date && (
                   <div className="text-2xs text-oxblood mt-1">Next: {c.next_hearing_date}</div>
                 )}
+                {c.summary && (
+                  <div className="text-2xs text-ink-faint mt-1 flex gap-3">
+                    <span>{c.summary.document_count} docs</span>
+                    <span>{c.summary.open_task_count} tasks</span>
+                    {c.summary.outstanding_fees > 0 && (
+                      <span className="text-oxblood">{formatAmount(c.summary.outstanding_fees)} due</span>
+                    )}
+                  </div>
+                )}
               </Link>
             ))}
+            {(more[col.stage] ?? col).next_cursor && (
+              <button type="button" onClick={() => loadMore(col)}
+                disabled={loadingStage === col.stage}
+                className="w-full text-2xs text-ink-muted hover:text-ink py-1.5">
+                {loadingStage === col.stage ? 'Loading…' : 'Load more'}
+              </button>
+            )}
           </div>
         </div>
       ))}
@@ -9,8 +9,7 @@ const FORYOU_PAGE = 30;
 
 export default function LegalFeed() {
   const [forYou, setForYou] = useState<LegalFeedItem[]>([]);
-  const [forYouOffset, setForYouOffset] = useState(0);
-  const [forYouMore, setForYouMore] = useState(true);
+  const [forYouCursor, setForYouCursor] = useState<string | null>(null);
   const [items, setItems] = useState<LegalFeedItem[]>([]);
   const [page, setPage] = useState(1);
   const [totalPages, setTotalPages] = useState(1);
@@ -22,10 +21,9 @@ export default function LegalFeed() {
 
   // For you: reset + load first page on mount / when prefs are saved.
   useEffect(() => {
-    setForYouOffset(0);
-    api.getLegalFeedForYou({ type: 'news', limit: FORYOU_PAGE, offset: 0 })
-      .then((d) => { setForYou(d); setForYouMore(d.length === FORYOU_PAGE); })
-      .catch(() => { setForYou([]); setForYouMore(false); });
+    api.getLegalFeedForYou({ type: 'news', limit: FORYOU_PAGE })
+      .then((res) => { setForYou(res.data); setForYouCursor(res.next_cursor); })
+      .catch(() => { setForYou([]); setForYouCursor(null); });
   }, [refreshKey]);
 
   useEffect(() => {
@@ -38,11 +36,9 @@ export default function LegalFeed() {
   }, [page]);
 
   const loadMore = async () => {
-    const next = forYouOffset + FORYOU_PAGE;
-    const more = await api.getLegalFeedForYou({ type: 'news', limit: FORYOU_PAGE, offset: next });
-    setForYou((cur) => [...cur, ...more]);
-    setForYouOffset(next);
-    setForYouMore(more.length === FORYOU_PAGE);
+    const res = await api.getLegalFeedForYou({ type: 'news', limit: FORYOU_PAGE, cursor: forYouCursor });
+    setForYou((cur) => [...cur, ...res.data.filter((i) => !cur.some((c) => c.id === i.id))]);
+    setForYouCursor(res.next_cursor);
   };
 
   const removeItem = (id: number) => {
@@ -70,7 +66,7 @@ export default function LegalFeed() {
           <div className="columns-1 sm:columns-2 lg:columns-3 gap-4">
             {forYou.map((i) => <NewsCard key={`fy-${i.id}`} item={i} onNotInterested={removeItem} />)}
           </div>
-          {forYouMore && (
+          {forYouCursor && (
             <button onClick={loadMore}
               className="mt-4 text-sm border border-rule rounded px-4 py-1.5 text-ink-soft hover:text-ink">
               Load more